@@ -1,7 +1,11 @@
 from pydantic import BaseModel
 import os
+import platform
 from typing import Optional, Set, List
 
+# Directory of the emotion-backend package, used to resolve relative paths
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Settings(BaseModel):
     # Server configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
@@ -11,22 +15,179 @@ class Settings(BaseModel):
     MODEL_PATH: str = os.getenv("MODEL_PATH", "models/keras_model/model_klasifikasi_emosi_suara.keras")  # Path to your specific model file
     PREPROCESSING_CONFIG_PATH: str = os.getenv("PREPROCESSING_CONFIG_PATH", "preprocessing/feature_config.json")
     SCALER_PATH: str = os.getenv("SCALER_PATH", "models/keras_model/scaler.pkl")  # Updated path to your scaler file
+    DEFAULT_MODEL_NAME: str = os.getenv("DEFAULT_MODEL_NAME", "emotion")  # Registry name of the MODEL_PATH model
+    MODEL_REGISTRY_PATH: Optional[str] = os.getenv("MODEL_REGISTRY_PATH")  # JSON file of additional named models
+
+    # Quantized model configuration
+    MODEL_QUANTIZATION: str = os.getenv("MODEL_QUANTIZATION", "none")  # none, dynamic or int8
+    QUANTIZED_MODEL_PATH: str = os.getenv("QUANTIZED_MODEL_PATH", "models/keras_model/model_klasifikasi_emosi_suara_{mode}.tflite")
+    QUANTIZATION_CALIBRATION_PATH: Optional[str] = os.getenv("QUANTIZATION_CALIBRATION_PATH")  # .npy/.npz of unscaled feature vectors
+    QUANTIZATION_CALIBRATION_SAMPLES: int = int(os.getenv("QUANTIZATION_CALIBRATION_SAMPLES", 200))
+    QUANTIZATION_SYNTHETIC_CALIBRATION: bool = os.getenv("QUANTIZATION_SYNTHETIC_CALIBRATION", "false").lower() in ("1", "true", "yes")  # Calibrate int8 on random vectors when no calibration path is set
+    QUANTIZED_NUM_THREADS: Optional[int] = int(os.getenv("QUANTIZED_NUM_THREADS")) if os.getenv("QUANTIZED_NUM_THREADS") else None
 
     # Audio processing configuration
     SAMPLE_RATE: int = int(os.getenv("SAMPLE_RATE", 22050))  # Standard sample rate
     DURATION: int = int(os.getenv("DURATION", 3))  # Duration in seconds for each chunk
     HOP_LENGTH: int = int(os.getenv("HOP_LENGTH", 512))
     N_FFT: int = int(os.getenv("N_FFT", 2048))
+    FEATURE_BACKEND: str = os.getenv("FEATURE_BACKEND", "librosa")  # librosa or numpy (no numba JIT, faster cold start)
+
+    # Audio decoding configuration
+    FFMPEG_PATH: str = os.getenv("FFMPEG_PATH", "ffmpeg")  # External decoder for MP3/M4A
+    AUDIO_DECODER_POOL_SIZE: int = int(os.getenv("AUDIO_DECODER_POOL_SIZE", os.cpu_count() or 2))  # Max concurrent ffmpeg processes
+    AUDIO_STREAM_DECODERS: int = int(os.getenv("AUDIO_STREAM_DECODERS", os.cpu_count() or 2))  # Max open ffmpeg streams (separate from the pool above)
+    AUDIO_DECODER_TIMEOUT: int = int(os.getenv("AUDIO_DECODER_TIMEOUT", 60))  # Seconds
+    REALTIME_DECODER_MAX_STREAMS: int = int(os.getenv("REALTIME_DECODER_MAX_STREAMS", 64))  # Concurrent WebM/Ogg realtime sessions
+    REALTIME_DECODER_MAX_WAIT_MS: float = float(os.getenv("REALTIME_DECODER_MAX_WAIT_MS", 250))  # Wait for a chunk's first samples
+    REALTIME_DECODER_QUIET_MS: float = float(os.getenv("REALTIME_DECODER_QUIET_MS", 20))  # Decoder silence that ends a chunk
 
     # File upload configuration
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))  # 10MB in bytes
     ALLOWED_EXTENSIONS: Set[str] = {"wav", "mp3", "m4a", "flac"}
+    MAX_AUDIO_DURATION: float = float(os.getenv("MAX_AUDIO_DURATION", 600))  # Seconds, read from the file header
+
+    # Batch upload configuration
+    MAX_BATCH_FILES: int = int(os.getenv("MAX_BATCH_FILES", 200))
+    MAX_BATCH_TOTAL_SIZE: int = int(os.getenv("MAX_BATCH_TOTAL_SIZE", 200 * 1024 * 1024))  # 200MB in bytes
+    BATCH_DECODE_WORKERS: int = int(os.getenv("BATCH_DECODE_WORKERS", os.cpu_count() or 4))
+
+    # Preview mode configuration (analyze sampled windows of long files)
+    MAX_PREVIEW_FILE_SIZE: int = int(os.getenv("MAX_PREVIEW_FILE_SIZE", 200 * 1024 * 1024))  # 200MB in bytes
+    MAX_PREVIEW_DURATION: float = float(os.getenv("MAX_PREVIEW_DURATION", 4 * 3600))  # Seconds
+    PREVIEW_WINDOWS: int = int(os.getenv("PREVIEW_WINDOWS", 8))
+    PREVIEW_MAX_WINDOWS: int = int(os.getenv("PREVIEW_MAX_WINDOWS", 64))
+    PREVIEW_HEAD_SECONDS: float = float(os.getenv("PREVIEW_HEAD_SECONDS", 30))
+    PREVIEW_ENERGY_CANDIDATES: int = int(os.getenv("PREVIEW_ENERGY_CANDIDATES", 4))  # Probes per selected window
+    PREVIEW_ENERGY_PROBE_SECONDS: float = float(os.getenv("PREVIEW_ENERGY_PROBE_SECONDS", 0.25))
+    PREVIEW_ENERGY_MAX_PROBES: int = int(os.getenv("PREVIEW_ENERGY_MAX_PROBES", 64))  # Probes per file, whatever the window count
+
+    # Streamed file analysis (per-window results sent while the file is still being decoded)
+    MAX_STREAM_FILE_SIZE: int = int(os.getenv("MAX_STREAM_FILE_SIZE", 200 * 1024 * 1024))  # 200MB in bytes
+    MAX_STREAM_DURATION: float = float(os.getenv("MAX_STREAM_DURATION", 4 * 3600))  # Seconds
+    STREAM_BATCH_WINDOWS: int = int(os.getenv("STREAM_BATCH_WINDOWS", 4))  # Windows decoded and scored per message batch
+
+    # Waveform previews (peaks and log-mel summaries for display, cached by content hash)
+    WAVEFORM_PEAK_BUCKET_SAMPLES: int = int(os.getenv("WAVEFORM_PEAK_BUCKET_SAMPLES", 256))  # Finest zoom level
+    WAVEFORM_PEAK_MIN_BUCKETS: int = int(os.getenv("WAVEFORM_PEAK_MIN_BUCKETS", 256))  # Coarsest zoom level
+    WAVEFORM_MEL_BANDS: int = int(os.getenv("WAVEFORM_MEL_BANDS", 64))
+    WAVEFORM_MEL_N_FFT: int = int(os.getenv("WAVEFORM_MEL_N_FFT", 1024))
+    WAVEFORM_MEL_COLUMNS: int = int(os.getenv("WAVEFORM_MEL_COLUMNS", 1024))  # Maximum columns per file
+    WAVEFORM_CACHE_MAX_BYTES: int = int(os.getenv("WAVEFORM_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # 64MB
+
+    # Background job configuration (long-file analysis outside the request)
+    JOB_DB_PATH: str = os.getenv("JOB_DB_PATH", "jobs/jobs.sqlite3")
+    JOB_SPOOL_DIR: str = os.getenv("JOB_SPOOL_DIR", "jobs/spool")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 2))  # Jobs analyzed concurrently
+    JOB_BLOCK_WINDOWS: int = int(os.getenv("JOB_BLOCK_WINDOWS", 32))  # Windows decoded and scored per step
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", 5))  # Seconds between idle queue checks
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3))  # Runs before an interrupted job is failed
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", 60))  # Heartbeat age after which a running job is requeued
+    JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("JOB_HEARTBEAT_INTERVAL", 10))  # Seconds between lease renewals
+    JOB_RETENTION_HOURS: float = float(os.getenv("JOB_RETENTION_HOURS", 72))  # Finished jobs kept for polling
+    MAX_JOB_FILE_SIZE: int = int(os.getenv("MAX_JOB_FILE_SIZE", 200 * 1024 * 1024))  # 200MB in bytes
+    MAX_JOB_DURATION: float = float(os.getenv("MAX_JOB_DURATION", 8 * 3600))  # Seconds
+
+    # Feature store configuration (precomputed features for re-scoring corpora)
+    FEATURE_STORE_DIR: str = os.getenv("FEATURE_STORE_DIR", "feature_store")
+    FEATURE_STORE_BATCH_SIZE: int = int(os.getenv("FEATURE_STORE_BATCH_SIZE", 4096))  # Rows per model call
 
     # WebSocket configuration
     MAX_WEBSOCKET_CONNECTIONS: int = int(os.getenv("MAX_WEBSOCKET_CONNECTIONS", 100))
     WEBSOCKET_TIMEOUT: int = int(os.getenv("WEBSOCKET_TIMEOUT", 300))  # 5 minutes
 
+    # Realtime latency accounting
+    REALTIME_SESSION_QUEUE_SIZE: int = int(os.getenv("REALTIME_SESSION_QUEUE_SIZE", 8))  # Audio messages buffered per session
+    REALTIME_LATENCY_SLO_MS: float = float(os.getenv("REALTIME_LATENCY_SLO_MS", 500))  # Receive-to-send target per message
+    LATENCY_SUMMARY_WINDOW: int = int(os.getenv("LATENCY_SUMMARY_WINDOW", 1000))  # Recent messages per session in percentiles
+    LATENCY_SUMMARY_RETENTION: int = int(os.getenv("LATENCY_SUMMARY_RETENTION", 1000))  # Finished sessions kept
+
+    # Realtime session store (state a reconnecting client resumes from, on any worker)
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "memory")  # memory, sqlite or redis
+    SESSION_STORE_PATH: str = os.getenv("SESSION_STORE_PATH", "sessions/sessions.sqlite3")  # sqlite backend
+    SESSION_STORE_URL: str = os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0")  # redis backend; local:// for the in-process stand-in
+    SESSION_STORE_PREFIX: str = os.getenv("SESSION_STORE_PREFIX", "emotion:session:")
+    SESSION_STORE_TTL: float = float(os.getenv("SESSION_STORE_TTL", 300))  # Seconds a state is kept after its last save
+    SESSION_STORE_SYNC_INTERVAL: float = float(os.getenv("SESSION_STORE_SYNC_INTERVAL", 1.0))  # Seconds between saves of a live session
+    SESSION_STORE_HISTORY: int = int(os.getenv("SESSION_STORE_HISTORY", 20))  # Recent results kept per session
+    SESSION_STORE_AUDIO_SECONDS: float = float(os.getenv("SESSION_STORE_AUDIO_SECONDS", 0))  # Recent audio kept per session, and analyzed before short frames; 0 keeps none
+    NODE_ID: str = os.getenv("NODE_ID") or f"{platform.node()}:{os.getpid()}"  # Recorded as the owner of a session
+
+    # Realtime overload control (step quality down under load, back up as it falls)
+    OVERLOAD_ENABLED: bool = os.getenv("OVERLOAD_ENABLED", "true").lower() in ("1", "true", "yes")
+    OVERLOAD_LATENCY_TARGET_MS: float = float(os.getenv("OVERLOAD_LATENCY_TARGET_MS", 250))  # Smoothed receive-to-ready time
+    OVERLOAD_QUEUE_TARGET: float = float(os.getenv("OVERLOAD_QUEUE_TARGET", 1.0))  # Waiting messages per session
+    OVERLOAD_HIGH_WATERMARK: float = float(os.getenv("OVERLOAD_HIGH_WATERMARK", 1.0))  # Load above which quality drops
+    OVERLOAD_LOW_WATERMARK: float = float(os.getenv("OVERLOAD_LOW_WATERMARK", 0.5))  # Load below which quality recovers
+    OVERLOAD_STEP_DOWN_SECONDS: float = float(os.getenv("OVERLOAD_STEP_DOWN_SECONDS", 1.0))
+    OVERLOAD_STEP_UP_SECONDS: float = float(os.getenv("OVERLOAD_STEP_UP_SECONDS", 5.0))
+    OVERLOAD_EWMA_ALPHA: float = float(os.getenv("OVERLOAD_EWMA_ALPHA", 0.2))
+    OVERLOAD_COARSE_HOP_FACTOR: int = int(os.getenv("OVERLOAD_COARSE_HOP_FACTOR", 2))
+    OVERLOAD_SKIP_FEATURES: str = os.getenv("OVERLOAD_SKIP_FEATURES", "chroma")  # Comma-separated, for the reduced tier
+    OVERLOAD_SAMPLE_EVERY: int = int(os.getenv("OVERLOAD_SAMPLE_EVERY", 2))  # Windows per analyzed window in the sampled tier
+
+    # Stability-adaptive cadence (analyze fewer messages of a session while its predictions hold steady)
+    CADENCE_ENABLED: bool = os.getenv("CADENCE_ENABLED", "false").lower() in ("1", "true", "yes")  # Off until validated on your traffic
+    CADENCE_MAX_INTERVAL: int = int(os.getenv("CADENCE_MAX_INTERVAL", 4))  # Messages per analyzed message at the slowest cadence
+    CADENCE_DIVERGENCE_THRESHOLD: float = float(os.getenv("CADENCE_DIVERGENCE_THRESHOLD", 0.02))  # Jensen-Shannon, bits
+    CADENCE_STABLE_INFERENCES: int = int(os.getenv("CADENCE_STABLE_INFERENCES", 2))  # Stable inferences before slowing down
+    CADENCE_ENERGY_CHANGE_DB: float = float(os.getenv("CADENCE_ENERGY_CHANGE_DB", 6.0))  # Level change that snaps back
+    CADENCE_SPEECH_DB: float = float(os.getenv("CADENCE_SPEECH_DB", -45.0))  # dBFS; crossing it from below is an onset
+
+    # Process-based inference workers fed through a shared-memory slot ring (0 = predict in-process)
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", 0))
+    INFERENCE_SLOTS: int = int(os.getenv("INFERENCE_SLOTS", 32))  # Requests in flight across all workers
+    INFERENCE_SLOT_SECONDS: float = float(os.getenv("INFERENCE_SLOT_SECONDS", 2 * DURATION))  # Audio capacity per slot
+    INFERENCE_SLOT_MAX_ROWS: int = int(os.getenv("INFERENCE_SLOT_MAX_ROWS", 256))  # Feature rows per slot
+    INFERENCE_SLOT_WAIT: float = float(os.getenv("INFERENCE_SLOT_WAIT", 2.0))  # Seconds to wait for a free slot
+    INFERENCE_TIMEOUT: float = float(os.getenv("INFERENCE_TIMEOUT", 10.0))  # Seconds to wait for a worker answer
+
+    # Reused scratch arrays for decode, normalization and feature intermediates
+    BUFFER_POOL_ENABLED: bool = os.getenv("BUFFER_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+    BUFFER_POOL_MAX_BUFFER_BYTES: int = int(os.getenv("BUFFER_POOL_MAX_BUFFER_BYTES", 8 * 1024 * 1024))  # Larger requests are not kept
+
+    # Realtime observer configuration
+    OBSERVE_ENABLED: bool = os.getenv("OBSERVE_ENABLED", "false").lower() in ("1", "true", "yes")  # /ws/observe also needs PROFILING_TOKEN
+    MAX_OBSERVED_CLIENTS: int = int(os.getenv("MAX_OBSERVED_CLIENTS", 50))  # Client ids per observer connection
+    OBSERVER_QUEUE_SIZE: int = int(os.getenv("OBSERVER_QUEUE_SIZE", 64))  # Buffered messages per observer
+    OBSERVER_DROP_POLICY: str = os.getenv("OBSERVER_DROP_POLICY", "drop_oldest")  # drop_oldest or drop_newest
+
+    # Logging configuration
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "kv")  # kv (key=value records) or text
+    LOG_STAGE_LEVELS: str = os.getenv("LOG_STAGE_LEVELS", "")  # e.g. "realtime.receive=DEBUG,realtime.predict=WARNING"
+    LOG_SESSION_EVENTS_PER_SECOND: float = float(os.getenv("LOG_SESSION_EVENTS_PER_SECOND", 0.2))  # Per session and event
+
+    # Profiling configuration (per-request profiling is disabled while PROFILING_TOKEN is unset)
+    PROFILING_TOKEN: Optional[str] = os.getenv("PROFILING_TOKEN")
+    PROFILE_OUTPUT_DIR: str = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+    PROFILE_REPORT_LINES: int = int(os.getenv("PROFILE_REPORT_LINES", 40))
+
+    # Memory instrumentation and guard (the /admin/memory endpoints use PROFILING_TOKEN)
+    # The worker recycles itself with SIGTERM, so only set this under a supervisor that restarts
+    # workers (gunicorn with uvicorn workers, systemd, Kubernetes); plain uvicorn just exits
+    MEMORY_RSS_LIMIT_MB: float = float(os.getenv("MEMORY_RSS_LIMIT_MB", 0))  # Drain and recycle the worker above this; 0 disables
+    MEMORY_CHECK_INTERVAL: float = float(os.getenv("MEMORY_CHECK_INTERVAL", 30))  # Seconds between RSS samples
+    MEMORY_DRAIN_TIMEOUT: float = float(os.getenv("MEMORY_DRAIN_TIMEOUT", 300))  # Seconds to wait for open sessions
+    MEMORY_HISTORY_SAMPLES: int = int(os.getenv("MEMORY_HISTORY_SAMPLES", 120))  # RSS samples kept for the growth rate
+    MEMORY_TRACEMALLOC_FRAMES: int = int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", 10))
+
     # Emotion labels (based on the model)
     EMOTION_LABELS: List[str] = ["neutral", "happy", "sad", "angry", "fear", "surprise"]
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+
+def resolve_path(path: str) -> str:
+    """
+    Resolve a configured path relative to the emotion-backend directory.
+
+    Args:
+        path: Absolute path, or a path relative to the emotion-backend directory
+
+    Returns:
+        Absolute path
+    """
+    if os.path.isabs(path):
+        return path
+    return os.path.join(BACKEND_DIR, path)
@@ -5,11 +5,22 @@ from typing import Dict
 import asyncio
 import logging
 
-from routes import predict_file, health_check, predict_realtime
+from utils.logging_config import setup_logging
+
+# Set up logging before the routes load the model, so their records go through the queue
+setup_logging()
+
+from routes import predict_file, health_check, predict_realtime, jobs, waveform, admin
+from services.job_queue import job_queue
+from services.inference_pool import inference_pool
+from services.memory_monitor import memory_monitor
+from services.realtime_pubsub import broker
+from services.waveform_preview import waveform_cache
+from preprocessing.stream_decoding import stream_decoders
+from utils.buffer_pool import thread_buffer_pool_bytes
+from utils.latency import latency_registry
 from config import settings
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -32,6 +43,44 @@ app.add_middleware(
 app.include_router(health_check.router, tags=["health"])
 app.include_router(predict_file.router, tags=["prediction"])
 app.include_router(predict_realtime.router, tags=["realtime"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(waveform.router, tags=["waveform"])
+app.include_router(admin.router, tags=["admin"])
+
+# Long-lived holders of memory, reported by /admin/memory and logged when the memory guard trips
+memory_monitor.register_gauge("realtime_connections", lambda: len(predict_realtime.manager.active_connections))
+memory_monitor.register_gauge("latency_sessions", lambda: {"active": len(latency_registry.active), "finished": len(latency_registry.finished)})
+memory_monitor.register_gauge("observers", lambda: {"subscribers": broker.stats()["subscribers"], "observed_clients": len(broker.subscribers)})
+memory_monitor.register_gauge("thread_buffer_pool_bytes", thread_buffer_pool_bytes)
+memory_monitor.register_gauge("waveform_cache_bytes", lambda: waveform_cache.stats()["bytes"])
+memory_monitor.register_gauge("realtime_decoders", lambda: stream_decoders.in_use)
+memory_monitor.register_gauge("inference_worker_rss_bytes", lambda: {
+    worker["pid"]: worker["rss_bytes"] for worker in inference_pool.stats()["workers"]
+})
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("startup")
+async def start_inference_pool():
+    await inference_pool.start()
+
+@app.on_event("startup")
+async def start_memory_monitor():
+    await memory_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_memory_monitor():
+    await memory_monitor.stop()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_inference_pool():
+    await inference_pool.stop()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,442 @@
+import numpy as np
+import soundfile as sf
+import soxr
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple, Union
+
+from config import settings
+from utils.audio_headers import sniff_format
+
+logger = logging.getLogger(__name__)
+
+DECODER_SOUNDFILE = "soundfile"
+DECODER_FFMPEG = "ffmpeg"
+DECODER_LIBROSA = "librosa"
+
+# Containers libsndfile decodes natively (MP3 needs libsndfile >= 1.1)
+_SOUNDFILE_FORMATS = {"wav", "flac", "ogg"}
+if "MP3" in sf.available_formats():
+    _SOUNDFILE_FORMATS.add("mp3")
+
+# Bounds the number of concurrent external decoder processes
+_ffmpeg_slots = threading.BoundedSemaphore(settings.AUDIO_DECODER_POOL_SIZE)
+# Streams hold their process for as long as the reader takes (e.g. a slow client of a
+# streamed response), so they are bounded separately and can never starve whole-file decodes
+_stream_slots = threading.BoundedSemaphore(settings.AUDIO_STREAM_DECODERS)
+_ffmpeg_path: Optional[str] = None
+# Decoded audio read at a time while cutting regions out of one ffmpeg pass
+_REGION_SCAN_BLOCK_SECONDS = 10.0
+
+
+@dataclass
+class DecodedAudio:
+    """Mono float32 audio at the target sample rate, plus how it was decoded."""
+    audio: np.ndarray
+    sample_rate: int
+    decoder: str
+    source_format: Optional[str] = None
+    source_sample_rate: Optional[int] = None
+
+
+def _get_ffmpeg() -> Optional[str]:
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        _ffmpeg_path = shutil.which(settings.FFMPEG_PATH) or ""
+    return _ffmpeg_path or None
+
+
+def _to_target(audio: np.ndarray, sample_rate: int, target_sr: int) -> np.ndarray:
+    """Downmix (frames, channels) audio to mono, then resample once to target_sr."""
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+    if sample_rate != target_sr:
+        audio = soxr.resample(audio, sample_rate, target_sr, quality="HQ")
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def _decode_soundfile(source: Union[str, bytes], target_sr: int) -> DecodedAudio:
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    audio, sample_rate = sf.read(source, dtype="float32", always_2d=True)
+    return DecodedAudio(_to_target(audio, sample_rate, target_sr), target_sr, DECODER_SOUNDFILE,
+                        source_sample_rate=sample_rate)
+
+
+def _decode_ffmpeg(source: Union[str, bytes], target_sr: int, fmt: Optional[str]) -> DecodedAudio:
+    ffmpeg = _get_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not available")
+
+    temp_path = None
+    stdin_data = None
+    input_arg = source
+    if isinstance(source, bytes):
+        if fmt == "m4a":
+            # MP4 containers often keep the index at the end, which ffmpeg cannot seek to on a pipe
+            with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as f:
+                f.write(source)
+                temp_path = f.name
+            input_arg = temp_path
+        else:
+            input_arg = "pipe:0"
+            stdin_data = source
+
+    command = [
+        ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", input_arg,
+        "-f", "f32le", "-ac", "1", "-ar", str(target_sr),
+        "pipe:1"
+    ]
+    try:
+        with _ffmpeg_slots:
+            completed = subprocess.run(
+                command,
+                input=stdin_data,
+                stdin=None if stdin_data is not None else subprocess.DEVNULL,
+                capture_output=True,
+                timeout=settings.AUDIO_DECODER_TIMEOUT
+            )
+    finally:
+        if temp_path:
+            os.unlink(temp_path)
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {completed.stderr.decode(errors='replace').strip()}")
+    audio = np.frombuffer(completed.stdout, dtype=np.float32).copy()
+    return DecodedAudio(audio, target_sr, DECODER_FFMPEG)
+
+
+def _decode_librosa(source: Union[str, bytes], target_sr: int) -> DecodedAudio:
+    import librosa
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    audio, sample_rate = librosa.load(source, sr=target_sr, mono=True)
+    return DecodedAudio(audio.astype(np.float32, copy=False), sample_rate, DECODER_LIBROSA)
+
+
+def decode_audio(source: Union[str, bytes], target_sr: int = None, fmt: Optional[str] = None) -> DecodedAudio:
+    """
+    Decode an audio file straight to mono float32 at the target sample rate.
+
+    Picks the fastest decoder available for the container: libsndfile for WAV/FLAC/OGG
+    (and MP3 when supported), a bounded pool of ffmpeg processes for MP3/M4A, and
+    librosa/audioread as a last resort.
+
+    Args:
+        source: Path to an audio file, or the file contents as bytes
+        target_sr: Output sample rate. Defaults to settings.SAMPLE_RATE
+        fmt: Container format hint ("wav", "mp3", ...). Sniffed from the data if None
+
+    Returns:
+        DecodedAudio with the samples and the decoder that produced them
+    """
+    if target_sr is None:
+        target_sr = settings.SAMPLE_RATE
+
+    if fmt is None:
+        if isinstance(source, bytes):
+            fmt = sniff_format(source[:12])
+        else:
+            with open(source, "rb") as f:
+                fmt = sniff_format(f.read(12))
+
+    decoders = []
+    if fmt in _SOUNDFILE_FORMATS:
+        decoders.append(lambda: _decode_soundfile(source, target_sr))
+    if fmt in ("mp3", "m4a") and _get_ffmpeg():
+        decoders.append(lambda: _decode_ffmpeg(source, target_sr, fmt))
+    decoders.append(lambda: _decode_librosa(source, target_sr))
+
+    last_error = None
+    for decode in decoders:
+        try:
+            decoded = decode()
+            decoded.source_format = fmt
+            return decoded
+        except Exception as e:
+            logger.debug(f"Decoder failed for {fmt} audio, trying next: {e}")
+            last_error = e
+    raise last_error
+
+
+def decode_audio_regions(source: Union[str, bytes], regions: List[Tuple[float, float]],
+                         target_sr: int = None, fmt: Optional[str] = None) -> Tuple[List[np.ndarray], str]:
+    """
+    Decode only the given (offset, duration) regions of an audio file.
+
+    Seekable containers are opened once and each region is read after a seek, so the
+    cost grows with the number and length of the regions rather than the file length.
+    Other files are decoded in a single pass (one ffmpeg stream, or one librosa decode)
+    up to the end of the last region, and every region is cut from that pass.
+
+    Args:
+        source: Path to an audio file, or the file contents as bytes
+        regions: List of (offset_seconds, duration_seconds) tuples
+        target_sr: Output sample rate. Defaults to settings.SAMPLE_RATE
+        fmt: Container format hint. Sniffed from the data if None
+
+    Returns:
+        Tuple of (list of mono float32 arrays at target_sr, decoder used)
+    """
+    if target_sr is None:
+        target_sr = settings.SAMPLE_RATE
+    if fmt is None:
+        if isinstance(source, bytes):
+            fmt = sniff_format(source[:12])
+        else:
+            with open(source, "rb") as f:
+                fmt = sniff_format(f.read(12))
+
+    if fmt in _SOUNDFILE_FORMATS:
+        try:
+            return _decode_regions_soundfile(source, regions, target_sr), DECODER_SOUNDFILE
+        except Exception as e:
+            logger.debug(f"Seeking decode failed for {fmt} audio, trying next: {e}")
+
+    if fmt in ("mp3", "m4a") and _get_ffmpeg():
+        # One process for all regions, instead of one seeking process per region
+        blocks = _stream_ffmpeg(source, _REGION_SCAN_BLOCK_SECONDS, target_sr, fmt)
+        try:
+            return _collect_regions(blocks, regions, target_sr), DECODER_FFMPEG
+        except Exception as e:
+            logger.debug(f"ffmpeg region decode failed for {fmt} audio, trying next: {e}")
+        finally:
+            blocks.close()
+
+    decoded = _decode_librosa(source, target_sr)
+    return _collect_regions(iter([decoded.audio]), regions, target_sr), decoded.decoder
+
+
+def _collect_regions(blocks: Iterator[np.ndarray], regions: List[Tuple[float, float]], sample_rate: int) -> List[np.ndarray]:
+    """
+    Cut (offset, duration) regions out of the consecutive blocks of one decode pass.
+
+    Blocks are read only up to the end of the last region. Regions may overlap and come
+    in any order; they are returned in the given order.
+    """
+    spans = [(int(offset * sample_rate), int(offset * sample_rate) + int(duration * sample_rate))
+             for offset, duration in regions]
+    parts: List[List[np.ndarray]] = [[] for _ in spans]
+    end = max((stop for _, stop in spans), default=0)
+    position = 0
+    for block in blocks if end > 0 else ():
+        block_end = position + len(block)
+        for index, (start, stop) in enumerate(spans):
+            if start < block_end and stop > position:
+                # Copied, so a kept slice does not hold on to the whole block
+                parts[index].append(block[max(start - position, 0):min(stop, block_end) - position].copy())
+        position = block_end
+        if position >= end:
+            break
+    return [np.concatenate(part) if part else np.zeros(0, dtype=np.float32) for part in parts]
+
+
+def _decode_regions_soundfile(source: Union[str, bytes], regions: List[Tuple[float, float]], target_sr: int) -> List[np.ndarray]:
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    chunks = []
+    with sf.SoundFile(source) as f:
+        for offset, duration in regions:
+            start = int(offset * f.samplerate)
+            if start >= f.frames:
+                chunks.append(np.zeros(0, dtype=np.float32))
+                continue
+            f.seek(start)
+            audio = f.read(int(duration * f.samplerate), dtype="float32", always_2d=True)
+            chunks.append(_to_target(audio, f.samplerate, target_sr))
+    return chunks
+
+
+class AudioStream:
+    """
+    Consecutive fixed-length windows of mono float32 audio, decoded as they are read.
+
+    Only about one window of decoded audio is held at a time, so the first windows are
+    available long before a long file is fully decoded. read() and close() may be
+    called from different threads (e.g. executor threads of a streaming response);
+    close() waits for a read in progress and releases the decoder.
+    """
+
+    def __init__(self, blocks: Iterator[np.ndarray], window_samples: int, sample_rate: int, decoder: str):
+        self._blocks = blocks
+        self._windows = _reframe(blocks, window_samples)
+        self._lock = threading.Lock()
+        self.sample_rate = sample_rate
+        self.decoder = decoder
+
+    def read(self, count: int) -> List[np.ndarray]:
+        """Decode up to count more windows; an empty list means the end of the audio."""
+        with self._lock:
+            windows = []
+            for window in self._windows:
+                windows.append(window)
+                if len(windows) == count:
+                    break
+            return windows
+
+    def close(self):
+        with self._lock:
+            self._windows.close()
+            # The decoder too: before the first read, closing the windows does not reach it
+            self._blocks.close()
+
+
+class _StartedBlocks:
+    """Blocks of a decoder whose first block is read up front, so a decoder that cannot start fails at once."""
+
+    def __init__(self, blocks: Iterator[np.ndarray]):
+        self._blocks = blocks
+        self._first = next(blocks, None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> np.ndarray:
+        if self._first is not None:
+            block, self._first = self._first, None
+            return block
+        return next(self._blocks)
+
+    def close(self):
+        self._first = None
+        self._blocks.close()
+
+
+def _reframe(blocks: Iterator[np.ndarray], window_samples: int) -> Iterator[np.ndarray]:
+    """Cut a stream of blocks of any length into windows of window_samples (the last may be shorter)."""
+    pending = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        pending = np.concatenate([pending, block]) if len(pending) else block
+        while len(pending) >= window_samples:
+            yield np.array(pending[:window_samples], dtype=np.float32)
+            pending = pending[window_samples:]
+    if len(pending):
+        yield np.array(pending, dtype=np.float32)
+
+
+def _stream_soundfile(source: Union[str, bytes], block_seconds: float, target_sr: int) -> Iterator[np.ndarray]:
+    def blocks():
+        # Opened inside the generator, so closing it at any point closes the file
+        with sf.SoundFile(io.BytesIO(source) if isinstance(source, bytes) else source) as f:
+            # Resampled as one continuous signal, so window edges carry no filter artifacts
+            resampler = soxr.ResampleStream(f.samplerate, target_sr, 1, dtype="float32", quality="HQ") \
+                if f.samplerate != target_sr else None
+            block_frames = max(1, int(block_seconds * f.samplerate))
+            while True:
+                audio = f.read(block_frames, dtype="float32", always_2d=True)
+                last = len(audio) < block_frames
+                mono = audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+                if resampler is not None:
+                    mono = resampler.resample_chunk(np.ascontiguousarray(mono), last=last)
+                yield mono
+                if last:
+                    break
+    return blocks()
+
+
+def _stream_ffmpeg(source: Union[str, bytes], block_seconds: float, target_sr: int, fmt: Optional[str]) -> Iterator[np.ndarray]:
+    def blocks():
+        temp_path = None
+        if isinstance(source, bytes):
+            # Written once; ffmpeg then reads the container at its own pace
+            with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as f:
+                f.write(source)
+                temp_path = f.name
+        command = [
+            _get_ffmpeg(), "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", temp_path or source,
+            "-f", "f32le", "-ac", "1", "-ar", str(target_sr),
+            "pipe:1"
+        ]
+        block_bytes = max(1, int(block_seconds * target_sr)) * 4
+        try:
+            # The stream slot is held for as long as the stream is being read
+            if not _stream_slots.acquire(timeout=settings.AUDIO_DECODER_TIMEOUT):
+                raise RuntimeError(f"All {settings.AUDIO_STREAM_DECODERS} streaming decoders are busy")
+            # Errors go to a file: nothing reads a stderr pipe while blocks are being yielded
+            stderr_file = tempfile.TemporaryFile()
+            try:
+                process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr_file)
+                try:
+                    while True:
+                        data = process.stdout.read(block_bytes)
+                        if not data:
+                            break
+                        yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+                    if process.wait(timeout=settings.AUDIO_DECODER_TIMEOUT) != 0:
+                        stderr_file.seek(0)
+                        raise RuntimeError(f"ffmpeg failed: {stderr_file.read().decode(errors='replace').strip()}")
+                finally:
+                    if process.poll() is None:
+                        process.kill()
+                        process.wait()
+                    process.stdout.close()
+            finally:
+                stderr_file.close()
+                _stream_slots.release()
+        finally:
+            if temp_path:
+                os.unlink(temp_path)
+    return blocks()
+
+
+def _slice_decoded(decoded: DecodedAudio, block_seconds: float) -> Iterator[np.ndarray]:
+    block_samples = max(1, int(block_seconds * decoded.sample_rate))
+    for start in range(0, len(decoded.audio), block_samples):
+        yield decoded.audio[start:start + block_samples]
+
+
+def stream_audio(source: Union[str, bytes], window_seconds: float, target_sr: int = None,
+                 fmt: Optional[str] = None) -> AudioStream:
+    """
+    Open an audio file for windowed decoding, in file order.
+
+    libsndfile formats are read block by block with a streaming resampler, and MP3/M4A
+    are piped out of an ffmpeg process. The first block is decoded here, so a decoder
+    that cannot start (unreadable file, ffmpeg error) is caught now; errors later in the
+    file are raised by read(). Other inputs, and those whose streaming decoder failed to
+    start, are decoded in full with librosa and then cut into windows, so only those
+    lose the early first window.
+
+    Args:
+        source: Path to an audio file, or the file contents as bytes
+        window_seconds: Length of each window
+        target_sr: Output sample rate. Defaults to settings.SAMPLE_RATE
+        fmt: Container format hint. Sniffed from the data if None
+
+    Returns:
+        AudioStream; close it when done to release the decoder
+    """
+    if target_sr is None:
+        target_sr = settings.SAMPLE_RATE
+    if fmt is None:
+        if isinstance(source, bytes):
+            fmt = sniff_format(source[:12])
+        else:
+            with open(source, "rb") as f:
+                fmt = sniff_format(f.read(12))
+    window_samples = max(1, int(window_seconds * target_sr))
+
+    if fmt in _SOUNDFILE_FORMATS:
+        try:
+            return AudioStream(_StartedBlocks(_stream_soundfile(source, window_seconds, target_sr)), window_samples,
+                               target_sr, DECODER_SOUNDFILE)
+        except Exception as e:
+            logger.debug(f"Streaming decode failed for {fmt} audio, trying next: {e}")
+    if fmt in ("mp3", "m4a") and _get_ffmpeg():
+        try:
+            return AudioStream(_StartedBlocks(_stream_ffmpeg(source, window_seconds, target_sr, fmt)), window_samples,
+                               target_sr, DECODER_FFMPEG)
+        except Exception as e:
+            logger.warning(f"ffmpeg could not stream {fmt} audio, decoding it in full: {e}")
+
+    decoded = _decode_librosa(source, target_sr)
+    return AudioStream(_slice_decoded(decoded, window_seconds), window_samples, target_sr, decoded.decoder)
@@ -0,0 +1,104 @@
+import numpy as np
+import logging
+from typing import List, Optional, Tuple, Union
+
+from config import settings
+from preprocessing.audio_decoding import decode_audio_regions
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MODES = ("head", "uniform", "energy")
+
+# Sample rate used for the energy scan probes; only loudness matters there
+_ENERGY_PROBE_SAMPLE_RATE = 8000
+
+
+def select_preview_regions(
+    source: Union[str, bytes],
+    duration: float,
+    mode: str,
+    num_windows: int = None,
+    head_seconds: float = None,
+    window_seconds: float = None,
+    fmt: Optional[str] = None
+) -> List[Tuple[float, float]]:
+    """
+    Choose which regions of a long recording to analyze in preview mode.
+
+    Args:
+        source: Path to an audio file, or the file contents as bytes (used by the energy scan)
+        duration: Total duration of the file in seconds, from its header
+        mode: "head" (first head_seconds), "uniform" (num_windows evenly spaced windows)
+            or "energy" (the num_windows loudest windows found by a cheap probe scan)
+        num_windows: Number of windows for "uniform" and "energy". Defaults to settings.PREVIEW_WINDOWS
+        head_seconds: Length analyzed by "head". Defaults to settings.PREVIEW_HEAD_SECONDS
+        window_seconds: Length of each window. Defaults to settings.DURATION
+        fmt: Container format hint
+
+    Returns:
+        Sorted list of (offset_seconds, duration_seconds) regions
+    """
+    if mode not in PREVIEW_MODES:
+        raise ValueError(f"Unknown preview mode {mode}. Supported modes: {PREVIEW_MODES}")
+    if num_windows is None:
+        num_windows = settings.PREVIEW_WINDOWS
+    if head_seconds is None:
+        head_seconds = settings.PREVIEW_HEAD_SECONDS
+    if window_seconds is None:
+        window_seconds = settings.DURATION
+
+    if duration <= window_seconds:
+        return [(0.0, duration)]
+
+    if mode == "head":
+        end = min(head_seconds, duration)
+        starts = np.arange(0.0, end, window_seconds)
+        return [(float(start), float(min(window_seconds, end - start))) for start in starts]
+
+    last_start = duration - window_seconds
+    if mode == "uniform" or num_windows * window_seconds >= duration:
+        starts = np.linspace(0.0, last_start, num=max(1, num_windows))
+        return [(float(start), float(window_seconds)) for start in np.unique(starts)]
+
+    return _select_energy_regions(source, duration, num_windows, window_seconds, fmt)
+
+
+def _select_energy_regions(source, duration: float, num_windows: int, window_seconds: float,
+                           fmt: Optional[str]) -> List[Tuple[float, float]]:
+    """Probe short snippets at evenly spaced positions and keep the loudest non-overlapping windows."""
+    # Capped, but never fewer probes than windows to choose
+    num_candidates = max(num_windows, min(num_windows * settings.PREVIEW_ENERGY_CANDIDATES,
+                                          settings.PREVIEW_ENERGY_MAX_PROBES))
+    probe_seconds = settings.PREVIEW_ENERGY_PROBE_SECONDS
+    last_start = duration - window_seconds
+
+    starts = np.linspace(0.0, last_start, num=num_candidates)
+    probes = [(float(start + (window_seconds - probe_seconds) / 2), probe_seconds) for start in starts]
+    snippets, _ = decode_audio_regions(source, probes, target_sr=_ENERGY_PROBE_SAMPLE_RATE, fmt=fmt)
+    energies = np.array([np.sqrt(np.mean(np.square(s))) if len(s) else 0.0 for s in snippets])
+
+    selected = []
+    for index in np.argsort(-energies):
+        start = starts[index]
+        if all(abs(start - other) >= window_seconds for other in selected):
+            selected.append(start)
+        if len(selected) == num_windows:
+            break
+    return [(float(start), float(window_seconds)) for start in sorted(selected)]
+
+
+def region_coverage(regions: List[Tuple[float, float]], duration: float) -> float:
+    """
+    Fraction of the file covered by the analyzed regions.
+
+    Args:
+        regions: List of (offset_seconds, duration_seconds) regions
+        duration: Total duration of the file in seconds
+
+    Returns:
+        Covered fraction between 0 and 1
+    """
+    if duration <= 0:
+        return 0.0
+    covered = sum(min(length, max(0.0, duration - offset)) for offset, length in regions)
+    return min(1.0, covered / duration)
@@ -1,16 +1,17 @@
 import librosa
 import numpy as np
-import io
-from typing import Tuple
+from typing import Optional, Tuple
 import logging
 
 from config import settings
+from utils.buffer_pool import normalize_peak
+from preprocessing.audio_decoding import decode_audio, DecodedAudio
 
 logger = logging.getLogger(__name__)
 
 def load_audio_from_file(file_path: str) -> Tuple[np.ndarray, int]:
     """
-    Load audio from a file path.
+    Load audio from a file path as mono float32 at settings.SAMPLE_RATE.
     
     Args:
         file_path: Path to the audio file
@@ -18,43 +19,91 @@ def load_audio_from_file(file_path: str) -> Tuple[np.ndarray, int]:
     Returns:
         Tuple of (audio_data, sample_rate)
     """
+    decoded = decode_audio_file(file_path)
+    return decoded.audio, decoded.sample_rate
+
+
+def load_audio_from_bytes(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Load audio from bytes as mono float32 at settings.SAMPLE_RATE.
+    
+    Args:
+        audio_bytes: Audio data as bytes
+        
+    Returns:
+        Tuple of (audio_data, sample_rate)
+    """
+    decoded = decode_audio_bytes(audio_bytes)
+    return decoded.audio, decoded.sample_rate
+
+
+def decode_audio_file(file_path: str) -> DecodedAudio:
+    """
+    Decode an audio file, reporting which decoder was used.
+    
+    Args:
+        file_path: Path to the audio file
+        
+    Returns:
+        DecodedAudio at settings.SAMPLE_RATE
+    """
     try:
-        audio_data, sample_rate = librosa.load(file_path, sr=None)
-        return audio_data, sample_rate
+        decoded = decode_audio(file_path)
+        logger.debug(f"Decoded {file_path} with {decoded.decoder}")
+        return decoded
     except Exception as e:
         logger.error(f"Error loading audio from {file_path}: {e}")
         raise
 
 
-def load_audio_from_bytes(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+def decode_audio_bytes(audio_bytes: bytes, fmt: str = None) -> DecodedAudio:
     """
-    Load audio from bytes.
+    Decode audio bytes, reporting which decoder was used.
     
     Args:
         audio_bytes: Audio data as bytes
+        fmt: Optional container format hint ("wav", "mp3", ...)
         
     Returns:
-        Tuple of (audio_data, sample_rate)
+        DecodedAudio at settings.SAMPLE_RATE
     """
     try:
-        # Create a BytesIO buffer from the bytes
-        buffer = io.BytesIO(audio_bytes)
-        
-        # Load audio from the buffer
-        audio_data, sample_rate = librosa.load(buffer, sr=None)
-        return audio_data, sample_rate
+        return decode_audio(audio_bytes, fmt=fmt)
     except Exception as e:
         logger.error(f"Error loading audio from bytes: {e}")
         raise
 
 
-def preprocess_audio_chunk(audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
+def pcm_to_float(samples: np.ndarray, pool=None) -> np.ndarray:
+    """
+    Scale integer PCM samples to [-1, 1], like samples.astype(np.float32) / np.iinfo(dtype).max.
+    
+    Args:
+        samples: int16 or int32 samples
+        pool: Optional BufferPool receiving the converted samples instead of new arrays
+        
+    Returns:
+        Float samples (float64 for int32, whose maximum is not exact in float32)
+    """
+    max_val = np.iinfo(samples.dtype).max
+    converted = pool.get("pcm", samples.shape, np.float32) if pool is not None else np.empty(samples.shape, np.float32)
+    np.copyto(converted, samples, casting="unsafe")
+    result_dtype = np.result_type(converted, max_val)
+    if result_dtype == converted.dtype:
+        return np.divide(converted, max_val, out=converted)
+    out = pool.get("pcm.scaled", samples.shape, result_dtype) if pool is not None else None
+    return np.divide(converted, max_val, out=out)
+
+
+def preprocess_audio_chunk(audio_data: np.ndarray, sample_rate: int, out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Preprocess an audio chunk for model inference.
     
     Args:
         audio_data: Raw audio data
         sample_rate: Sample rate of the audio
+        out: Optional array (e.g. a pooled buffer, or audio_data itself) receiving the
+            normalized samples; used only when no resampling or downmix is needed
         
     Returns:
         Preprocessed audio data ready for model input
@@ -62,15 +111,15 @@ def preprocess_audio_chunk(audio_data: np.ndarray, sample_rate: int) -> np.ndarr
     # Resample to the required sample rate if needed
     if sample_rate != settings.SAMPLE_RATE:
         audio_data = librosa.resample(audio_data, orig_sr=sample_rate, target_sr=settings.SAMPLE_RATE)
+        out = None
     
     # Convert to mono if stereo
     if len(audio_data.shape) > 1:
         audio_data = librosa.to_mono(audio_data)
+        out = None
     
     # Normalize audio
-    audio_data = audio_data / np.max(np.abs(audio_data)) if np.max(np.abs(audio_data)) != 0 else audio_data
-    
-    return audio_data
+    return normalize_peak(audio_data, out=out)
 
 
 def segment_audio(audio_data: np.ndarray, sample_rate: int) -> list:
@@ -0,0 +1,349 @@
+"""
+numpy/scipy implementation of the feature plan's building blocks.
+
+Mirrors librosa 0.10 (centered constant-padded Hann STFT, Slaney mel filters,
+librosa's chroma filters and tuning estimate, and the same spectral and
+zero-crossing definitions) step for step, including intermediate dtypes, but
+never imports librosa, so there are no numba JIT or cache loads at startup.
+Parity with the librosa backend is checked by scripts/check_feature_backends.py.
+"""
+import functools
+from typing import Any, Dict, Optional
+
+import numpy as np
+import scipy.fft
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+def fft_frequencies(sr: float, n_fft: int) -> np.ndarray:
+    return np.fft.rfftfreq(n=n_fft, d=1.0 / sr)
+
+
+@functools.lru_cache(maxsize=None)
+def hann_window(n: int) -> np.ndarray:
+    """Periodic Hann window, computed exactly as scipy.signal.get_window("hann", n) does."""
+    fac = np.linspace(-np.pi, np.pi, n + 1)
+    window = np.zeros(n + 1)
+    for k, coefficient in enumerate((0.5, 0.5)):
+        window += coefficient * np.cos(k * fac)
+    return _readonly(window[:-1])
+
+
+def _frame(audio: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """(frame_length, n_frames) strided view, like librosa.util.frame."""
+    return np.lib.stride_tricks.sliding_window_view(audio, frame_length)[::hop_length].T
+
+
+def stft_magnitude(audio: np.ndarray, n_fft: int, hop_length: int, pool=None) -> np.ndarray:
+    """
+    Magnitude of the centered, zero-padded Hann STFT (librosa.stft defaults).
+
+    With a BufferPool, the padded signal, windowed frames and result are written into
+    its buffers; only the FFT output itself is allocated.
+    """
+    complex_dtype = np.complex64 if audio.dtype == np.float32 else np.complex128
+    if pool is None:
+        padded = np.pad(audio, n_fft // 2, mode="constant")
+        frames = _frame(padded, n_fft, hop_length)
+        spectrum = np.fft.rfft(hann_window(n_fft)[:, np.newaxis] * frames, axis=0)
+        return np.abs(spectrum.astype(complex_dtype, copy=False))
+
+    pad = n_fft // 2
+    padded = pool.get("stft.padded", len(audio) + 2 * pad, audio.dtype)
+    padded[:pad] = 0
+    padded[pad:pad + len(audio)] = audio
+    padded[pad + len(audio):] = 0
+    frames = _frame(padded, n_fft, hop_length)
+    window = hann_window(n_fft)[:, np.newaxis]
+    windowed = np.multiply(window, frames, out=pool.get("stft.windowed", frames.shape, np.result_type(window, frames)))
+    spectrum = np.fft.rfft(windowed, axis=0)
+    if spectrum.dtype != complex_dtype:
+        cast = pool.get("stft.spectrum", spectrum.shape, complex_dtype)
+        np.copyto(cast, spectrum, casting="same_kind")
+        spectrum = cast
+    return np.abs(spectrum, out=pool.get("stft.magnitude", spectrum.shape, spectrum.real.dtype))
+
+
+def _normalize(S: np.ndarray, norm: float, pool=None, name: str = "normalize") -> np.ndarray:
+    """
+    Column normalization with librosa.util.normalize semantics (small columns left as is).
+
+    With a BufferPool, the temporaries and the result are kept in buffers named after name.
+    """
+    if pool is None:
+        magnitude = np.abs(S).astype(float)
+        normalized = np.empty_like(S)
+    else:
+        magnitude = np.abs(S, out=pool.get(f"{name}.magnitude", S.shape, float))
+        normalized = pool.get(name, S.shape, S.dtype)
+    if norm == np.inf:
+        length = np.max(magnitude, axis=0, keepdims=True)
+    else:
+        if norm != 1:
+            magnitude **= norm
+        length = np.sum(magnitude, axis=0, keepdims=True) ** (1.0 / norm)
+    length[length < np.finfo(S.dtype).tiny] = 1.0
+    np.divide(S, length, out=normalized, casting="unsafe")
+    return normalized
+
+
+def power_to_db(S: np.ndarray, amin: float = 1e-10, top_db: float = 80.0, out: Optional[np.ndarray] = None) -> np.ndarray:
+    log_spec = np.maximum(amin, S, out=out)
+    np.log10(log_spec, out=log_spec)
+    log_spec *= 10.0
+    log_spec -= 10.0 * np.log10(np.maximum(amin, 1.0))
+    return np.maximum(log_spec, log_spec.max() - top_db, out=log_spec)
+
+
+def _hz_to_mel(frequencies: np.ndarray) -> np.ndarray:
+    frequencies = np.asanyarray(frequencies)
+    f_sp = 200.0 / 3
+    mels = frequencies / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    if frequencies.ndim:
+        log_t = frequencies >= min_log_hz
+        mels[log_t] = min_log_mel + np.log(frequencies[log_t] / min_log_hz) / logstep
+    elif frequencies >= min_log_hz:
+        mels = min_log_mel + np.log(frequencies / min_log_hz) / logstep
+    return mels
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = mels >= min_log_mel
+    freqs[log_t] = min_log_hz * np.exp(logstep * (mels[log_t] - min_log_mel))
+    return freqs
+
+
+def mel_filterbank(sr: float, n_fft: int, n_mels: int = 128, fmin: float = 0.0, fmax: float = None) -> np.ndarray:
+    """Slaney-normalized mel filter bank, like librosa.filters.mel."""
+    if fmax is None:
+        fmax = float(sr) / 2
+    weights = np.zeros((n_mels, int(1 + n_fft // 2)), dtype=np.float32)
+    fftfreqs = fft_frequencies(sr, n_fft)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fftfreqs)
+    for i in range(n_mels):
+        lower = -ramps[i] / fdiff[i]
+        upper = ramps[i + 2] / fdiff[i + 1]
+        weights[i] = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels]))[:, np.newaxis]
+    return weights
+
+
+def _hz_to_octs(frequencies: np.ndarray, tuning: float = 0.0, bins_per_octave: int = 12) -> np.ndarray:
+    a440 = 440.0 * 2.0 ** (tuning / bins_per_octave)
+    return np.log2(frequencies / (float(a440) / 16))
+
+
+def chroma_filterbank(sr: float, n_fft: int, n_chroma: int = 12, tuning: float = 0.0) -> np.ndarray:
+    """Chroma filter bank, like librosa.filters.chroma with its defaults."""
+    frequencies = np.linspace(0, sr, n_fft, endpoint=False)[1:]
+    frqbins = n_chroma * _hz_to_octs(frequencies, tuning=tuning, bins_per_octave=n_chroma)
+    frqbins = np.concatenate(([frqbins[0] - 1.5 * n_chroma], frqbins))
+    binwidthbins = np.concatenate((np.maximum(frqbins[1:] - frqbins[:-1], 1.0), [1]))
+    D = np.subtract.outer(frqbins, np.arange(0, n_chroma, dtype="d")).T
+    n_chroma2 = np.round(float(n_chroma) / 2)
+    D = np.remainder(D + n_chroma2 + 10 * n_chroma, n_chroma) - n_chroma2
+    weights = np.exp(-0.5 * (2 * D / np.tile(binwidthbins, (n_chroma, 1))) ** 2)
+    weights = _normalize(weights, 2)
+    weights *= np.tile(np.exp(-0.5 * (((frqbins / n_chroma - 5.0) / 2) ** 2)), (n_chroma, 1))
+    weights = np.roll(weights, -3 * (n_chroma // 12), axis=0)
+    return np.ascontiguousarray(weights[:, :int(1 + n_fft / 2)], dtype=np.float32)
+
+
+def _parabolic_shift(S: np.ndarray) -> np.ndarray:
+    a = S[2:] + S[:-2] - 2 * S[1:-1]
+    b = (S[2:] - S[:-2]) / 2
+    shift = np.zeros_like(S)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift[1:-1] = np.where(np.abs(b) >= np.abs(a), 0, -b / a)
+    return shift
+
+
+def _localmax(x: np.ndarray) -> np.ndarray:
+    peaks = np.zeros(x.shape, dtype=bool)
+    peaks[1:-1] = (x[1:-1] > x[:-2]) & (x[1:-1] >= x[2:])
+    peaks[-1] = x[-1] > x[-2]
+    return peaks
+
+
+def estimate_tuning(S: np.ndarray, sr: float, bins_per_octave: int = 12, resolution: float = 0.01,
+                    fmin: float = 150.0, fmax: float = 4000.0, threshold: float = 0.1) -> float:
+    """Tuning deviation in fractions of a bin, like librosa.estimate_tuning (piptrack + pitch_tuning)."""
+    S = np.abs(S)
+    n_fft = 2 * (S.shape[0] - 1)
+    fmax = min(fmax, float(sr) / 2)
+    freqs = fft_frequencies(sr, n_fft)
+
+    shift = _parabolic_shift(S)
+    dskew = 0.5 * np.gradient(S, axis=0) * shift
+    freq_mask = ((fmin <= freqs) & (freqs < fmax))[:, np.newaxis]
+    ref_value = threshold * np.max(S, axis=0, keepdims=True)
+    idx = np.nonzero(freq_mask & _localmax(S * (S > ref_value)))
+    pitches = ((idx[0] + shift[idx]) * float(sr) / n_fft).astype(S.dtype)
+    mags = (S[idx] + dskew[idx]).astype(S.dtype)
+
+    voiced = pitches > 0
+    mag_threshold = np.median(mags[voiced]) if voiced.any() else 0.0
+    frequencies = pitches[(mags >= mag_threshold) & voiced]
+    if not np.any(frequencies):
+        return 0.0
+
+    residual = np.mod(bins_per_octave * _hz_to_octs(frequencies), 1.0)
+    residual[residual >= 0.5] -= 1.0
+    counts, edges = np.histogram(residual, np.linspace(-0.5, 0.5, int(np.ceil(1.0 / resolution)) + 1))
+    return edges[np.argmax(counts)]
+
+
+def zero_crossing_rate(audio: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """Centered (edge-padded) zero-crossing rate, like librosa.feature.zero_crossing_rate."""
+    padded = np.pad(audio, frame_length // 2, mode="edge")
+    signs = np.signbit(np.where(np.abs(padded) <= 1e-10, 0.0, padded))
+    # crossings[i] marks a sign change between samples i and i + 1; a frame counts the
+    # changes between its own samples only
+    crossings = np.concatenate(([0], np.cumsum(signs[1:] != signs[:-1])))
+    starts = np.arange(0, len(padded) - frame_length + 1, hop_length)
+    counts = crossings[starts + frame_length - 1] - crossings[starts]
+    return (counts / frame_length)[np.newaxis, :]
+
+
+def _compile_mfcc(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    n_mfcc = spec.get("n_mfcc", config.get("n_mfcc", 13))
+    mel_basis = _readonly(mel_filterbank(
+        sr, n_fft, spec.get("n_mels", config.get("n_mels", 128)), spec.get("fmin", 0.0), spec.get("fmax")
+    ))
+
+    def compute(frames) -> np.ndarray:
+        mel = frames.project("mel", mel_basis)
+        log_mel = power_to_db(mel, out=mel)
+        return scipy.fft.dct(log_mel, axis=-2, type=2, norm="ortho")[:n_mfcc]
+    return n_mfcc, compute
+
+
+def _compile_mel(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    n_mels = spec.get("n_mels", config.get("n_mels", 128))
+    mel_basis = _readonly(mel_filterbank(sr, n_fft, n_mels, spec.get("fmin", 0.0), spec.get("fmax")))
+
+    def compute(frames) -> np.ndarray:
+        mel = frames.project("mel", mel_basis)
+        return power_to_db(mel, out=mel)
+    return n_mels, compute
+
+
+def _compile_chroma(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    n_chroma = spec.get("n_chroma", 12)
+    tuning = spec.get("tuning")
+    if tuning is None:
+        def compute(frames) -> np.ndarray:
+            basis = chroma_filterbank(sr, n_fft, n_chroma, estimate_tuning(frames.power, sr, n_chroma))
+            return _normalize(np.einsum("cf,ft->ct", basis, frames.power, optimize=True), np.inf, frames.pool, "chroma.normalized")
+        return n_chroma, compute
+
+    chroma_basis = _readonly(chroma_filterbank(sr, n_fft, n_chroma, tuning))
+
+    def compute(frames) -> np.ndarray:
+        return _normalize(frames.project("chroma", chroma_basis), np.inf, frames.pool, "chroma.normalized")
+    return n_chroma, compute
+
+
+def _spectral_options(spec: Dict[str, Any], supported: Dict[str, Any]) -> Dict[str, Any]:
+    extra = {key: value for key, value in spec.items() if key not in ("name", "stats")}
+    unknown = sorted(set(extra) - set(supported))
+    if unknown:
+        raise ValueError(f"Unsupported parameters {unknown} for feature {spec.get('name')} with the numpy backend")
+    return {**supported, **extra}
+
+
+def _centroid(S: np.ndarray, freq: np.ndarray, pool=None) -> np.ndarray:
+    return np.sum(freq[:, np.newaxis] * _normalize(S, 1, pool), axis=0, keepdims=True)
+
+
+def _compile_centroid(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    _spectral_options(spec, {})
+    freq = _readonly(fft_frequencies(sr, n_fft))
+
+    def compute(frames) -> np.ndarray:
+        return _centroid(frames.magnitude, freq, frames.pool)
+    return 1, compute
+
+
+def _compile_rolloff(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    roll_percent = _spectral_options(spec, {"roll_percent": 0.85})["roll_percent"]
+    if not 0.0 < roll_percent < 1.0:
+        raise ValueError("roll_percent must lie in the range (0, 1)")
+    freq = _readonly(fft_frequencies(sr, n_fft))
+
+    def compute(frames) -> np.ndarray:
+        total_energy = np.cumsum(frames.magnitude, axis=0)
+        threshold = roll_percent * total_energy[-1]
+        # Frequencies rise with the bin index, so the smallest qualifying one is the first
+        return freq[np.argmax(total_energy >= threshold, axis=0)][np.newaxis, :]
+    return 1, compute
+
+
+def _compile_bandwidth(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    options = _spectral_options(spec, {"p": 2, "norm": True})
+    p = options["p"]
+    freq = _readonly(fft_frequencies(sr, n_fft))
+
+    def compute(frames) -> np.ndarray:
+        S = frames.magnitude
+        deviation = np.abs(np.subtract.outer(_centroid(S, freq, frames.pool)[0], freq).T)
+        if options["norm"]:
+            S = _normalize(S, 1, frames.pool)
+        return np.sum(S * deviation ** p, axis=0, keepdims=True) ** (1.0 / p)
+    return 1, compute
+
+
+def _compile_flatness(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    def compute(frames) -> np.ndarray:
+        power = frames.power
+        S_thresh = np.maximum(1e-10, power, out=frames.pool.get("flatness", power.shape, power.dtype))
+        log_S = np.log(S_thresh, out=frames.pool.get("flatness.log", power.shape, power.dtype))
+        gmean = np.exp(np.mean(log_S, axis=0, keepdims=True))
+        return gmean / np.mean(S_thresh, axis=0, keepdims=True)
+    return 1, compute
+
+
+def _compile_rms(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    def compute(frames) -> np.ndarray:
+        x = np.power(frames.magnitude, 2, dtype=np.float32)
+        x[0] *= 0.5
+        if n_fft % 2 == 0:
+            x[-1] *= 0.5
+        return np.sqrt(2 * np.sum(x, axis=0, keepdims=True) / n_fft ** 2)
+    return 1, compute
+
+
+def _compile_zcr(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    frame_length = spec.get("frame_length", 2048)
+    zcr_hop = spec.get("hop_length", 512)
+
+    def compute(frames) -> np.ndarray:
+        return zero_crossing_rate(frames.audio, frame_length, zcr_hop)
+    return 1, compute
+
+
+FEATURES = {
+    "mfcc": _compile_mfcc,
+    "mel": _compile_mel,
+    "chroma": _compile_chroma,
+    "spectral_centroid": _compile_centroid,
+    "spectral_rolloff": _compile_rolloff,
+    "spectral_bandwidth": _compile_bandwidth,
+    "spectral_flatness": _compile_flatness,
+    "rms": _compile_rms,
+    "zero_crossing_rate": _compile_zcr,
+}
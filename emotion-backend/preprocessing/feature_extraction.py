@@ -1,15 +1,18 @@
-import librosa
 import numpy as np
 from typing import Dict
 import json
 import os
 
 from config import settings
+from preprocessing.feature_plan import DEFAULT_FEATURES, compile_feature_plan
 
 def extract_features(audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
     """
     Extract features from audio data for emotion classification.
     
+    Compiles the pipeline declared in feature_config.json on every call; services
+    should compile a FeaturePlan once and reuse it.
+    
     Args:
         audio_data: Audio data as numpy array
         sample_rate: Sample rate of the audio
@@ -17,71 +20,7 @@ def extract_features(audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
     Returns:
         Extracted features as numpy array
     """
-    # Extract MFCCs
-    mfccs = librosa.feature.mfcc(
-        y=audio_data,
-        sr=sample_rate,
-        n_mfcc=settings.feature_config.get("n_mfcc", 13) if hasattr(settings, 'feature_config') else 13,
-        hop_length=settings.HOP_LENGTH,
-        n_fft=settings.N_FFT
-    )
-    
-    # Extract spectral centroid
-    spectral_centroids = librosa.feature.spectral_centroid(
-        y=audio_data,
-        sr=sample_rate,
-        n_fft=settings.N_FFT,
-        hop_length=settings.HOP_LENGTH
-    )
-    
-    # Extract spectral rolloff
-    spectral_rolloff = librosa.feature.spectral_rolloff(
-        y=audio_data,
-        sr=sample_rate,
-        n_fft=settings.N_FFT,
-        hop_length=settings.HOP_LENGTH
-    )
-    
-    # Extract zero crossing rate
-    zcr = librosa.feature.zero_crossing_rate(audio_data)
-    
-    # Extract chroma
-    chroma = librosa.feature.chroma_stft(
-        y=audio_data,
-        sr=sample_rate,
-        n_chroma=12,
-        n_fft=settings.N_FFT,
-        hop_length=settings.HOP_LENGTH
-    )
-    
-    # Extract spectral bandwidth
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(
-        y=audio_data,
-        sr=sample_rate,
-        n_fft=settings.N_FFT,
-        hop_length=settings.HOP_LENGTH
-    )
-    
-    # Compute statistics for each feature
-    features = np.array([
-        np.mean(mfccs, axis=1),
-        np.var(mfccs, axis=1),
-        np.mean(spectral_centroids),
-        np.var(spectral_centroids),
-        np.mean(spectral_rolloff),
-        np.var(spectral_rolloff),
-        np.mean(zcr),
-        np.var(zcr),
-        np.mean(chroma, axis=1),
-        np.var(chroma, axis=1),
-        np.mean(spectral_bandwidth),
-        np.var(spectral_bandwidth)
-    ])
-    
-    # Flatten the features array
-    features = features.flatten()
-    
-    return features
+    return compile_feature_plan(load_feature_config(), sample_rate).extract(audio_data)
 
 
 def save_feature_config(config_path: str = None) -> None:
@@ -99,7 +38,9 @@ def save_feature_config(config_path: str = None) -> None:
         "n_mels": 128,
         "hop_length": settings.HOP_LENGTH,
         "n_fft": settings.N_FFT,
-        "duration": settings.DURATION
+        "duration": settings.DURATION,
+        "input_mode": "summary",
+        "features": DEFAULT_FEATURES
     }
     
     # Create directory if it doesn't exist
@@ -0,0 +1,370 @@
+import copy
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import librosa
+import numpy as np
+
+from config import settings
+from preprocessing import fast_features
+from utils.buffer_pool import BufferPool, thread_buffer_pool
+
+logger = logging.getLogger(__name__)
+
+INPUT_MODES = ("auto", "summary", "raw")
+
+# "librosa" is the reference implementation; "numpy" (preprocessing/fast_features) computes
+# the same features without librosa's numba-compiled code, so it starts much faster
+BACKENDS = ("librosa", "numpy")
+
+# Summary features of the original hand-written extractor, in its order. Used when
+# feature_config.json does not declare a "features" list.
+DEFAULT_FEATURES = [
+    {"name": "mfcc", "stats": ["mean", "var"]},
+    {"name": "spectral_centroid", "stats": ["mean", "var"]},
+    {"name": "spectral_rolloff", "stats": ["mean", "var"]},
+    {"name": "zero_crossing_rate", "stats": ["mean", "var"]},
+    {"name": "chroma", "stats": ["mean", "var"], "n_chroma": 12},
+    {"name": "spectral_bandwidth", "stats": ["mean", "var"]},
+]
+
+STATISTICS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "mean": lambda x: np.mean(x, axis=1),
+    "var": lambda x: np.var(x, axis=1),
+    "std": lambda x: np.std(x, axis=1),
+    "min": lambda x: np.min(x, axis=1),
+    "max": lambda x: np.max(x, axis=1),
+    "median": lambda x: np.median(x, axis=1),
+}
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+class _Frames:
+    """
+    Per-clip spectrogram cache, so every feature in a plan shares one STFT.
+
+    The spectrogram and other large intermediates are written into the pool's buffers,
+    so they are only valid during one extract() call.
+    """
+
+    def __init__(self, plan: "FeaturePlan", audio: np.ndarray, pool: BufferPool):
+        self.plan = plan
+        self.audio = audio
+        self.pool = pool
+        self._magnitude = None
+        self._power = None
+
+    @property
+    def magnitude(self) -> np.ndarray:
+        if self._magnitude is None:
+            if self.plan.backend == "numpy":
+                self._magnitude = fast_features.stft_magnitude(self.audio, self.plan.n_fft, self.plan.hop_length, self.pool)
+            else:
+                spectrum = librosa.stft(self.audio, n_fft=self.plan.n_fft, hop_length=self.plan.hop_length)
+                self._magnitude = np.abs(spectrum, out=self.pool.get("stft.magnitude", spectrum.shape, spectrum.real.dtype))
+        return self._magnitude
+
+    @property
+    def power(self) -> np.ndarray:
+        if self._power is None:
+            magnitude = self.magnitude
+            self._power = np.square(magnitude, out=self.pool.get("stft.power", magnitude.shape, magnitude.dtype))
+        return self._power
+
+    def project(self, name: str, basis: np.ndarray) -> np.ndarray:
+        """basis @ power, written into a pooled buffer."""
+        power = self.power
+        shape = (basis.shape[0], power.shape[1])
+        return np.matmul(basis, power, out=self.pool.get(name, shape, np.result_type(basis, power)))
+
+
+@dataclass(frozen=True)
+class FeatureStep:
+    """
+    One compiled feature: how to compute its frame matrix and which statistics to take.
+
+    A step with a constant is not computed; the constant (its whole block of
+    statistics) is emitted instead.
+    """
+    name: str
+    rows: int
+    stats: Tuple[str, ...]
+    compute: Optional[Callable[[_Frames], np.ndarray]]
+    constant: Optional[np.ndarray] = None
+
+    @property
+    def dimension(self) -> int:
+        return self.rows * len(self.stats)
+
+
+@dataclass(frozen=True)
+class FeaturePlan:
+    """
+    Immutable feature extraction pipeline compiled from feature_config.json.
+
+    Filter banks and frequency tables are computed once at compile time and stored
+    read-only; extract() only runs the per-clip work.
+    """
+    input_mode: str
+    sample_rate: int
+    n_fft: int
+    hop_length: int
+    steps: Tuple[FeatureStep, ...]
+    dimension: int
+    backend: str = "librosa"
+
+    def extract(self, audio: np.ndarray, pool: Optional[BufferPool] = None) -> np.ndarray:
+        """
+        Extract the feature vector of a normalized mono clip.
+
+        Args:
+            audio: Audio at the plan's sample rate
+            pool: Buffer pool for the intermediates. Defaults to the calling thread's pool
+
+        Returns:
+            1-D feature vector of length self.dimension (a new array)
+        """
+        if self.input_mode == "raw":
+            if len(audio) < self.dimension:
+                return np.concatenate([audio, np.zeros(self.dimension - len(audio), dtype=audio.dtype)])
+            # A copy: the clip is usually the caller's pooled "normalized" buffer, reused by the next call
+            return audio[:self.dimension].copy()
+
+        frames = _Frames(self, audio, pool or thread_buffer_pool())
+        parts = []
+        for step in self.steps:
+            if step.constant is not None:
+                parts.append(step.constant)
+                continue
+            values = step.compute(frames)
+            for stat in step.stats:
+                parts.append(STATISTICS[stat](values))
+        return np.concatenate(parts)
+
+    def describe(self) -> Dict[str, Any]:
+        """Layout of the feature vector: name, statistic and offset of each block."""
+        layout = []
+        offset = 0
+        for step in self.steps:
+            for stat in step.stats:
+                layout.append({"feature": step.name, "stat": stat, "offset": offset, "size": step.rows})
+                offset += step.rows
+        return {"input_mode": self.input_mode, "backend": self.backend, "dimension": self.dimension, "layout": layout}
+
+
+def _compile_mfcc(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    n_mfcc = spec.get("n_mfcc", config.get("n_mfcc", 13))
+    mel_basis = _readonly(librosa.filters.mel(
+        sr=sr, n_fft=n_fft,
+        n_mels=spec.get("n_mels", config.get("n_mels", 128)),
+        fmin=spec.get("fmin", 0.0), fmax=spec.get("fmax")
+    ))
+
+    def compute(frames: _Frames) -> np.ndarray:
+        log_mel = librosa.power_to_db(frames.project("mel", mel_basis))
+        return librosa.feature.mfcc(S=log_mel, n_mfcc=n_mfcc)
+    return n_mfcc, compute
+
+
+def _compile_mel(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    n_mels = spec.get("n_mels", config.get("n_mels", 128))
+    mel_basis = _readonly(librosa.filters.mel(
+        sr=sr, n_fft=n_fft, n_mels=n_mels, fmin=spec.get("fmin", 0.0), fmax=spec.get("fmax")
+    ))
+
+    def compute(frames: _Frames) -> np.ndarray:
+        return librosa.power_to_db(frames.project("mel", mel_basis))
+    return n_mels, compute
+
+
+def _compile_chroma(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    n_chroma = spec.get("n_chroma", 12)
+    tuning = spec.get("tuning")
+    if tuning is None:
+        # Tuning is estimated per clip (librosa's default), so the filter bank cannot be precomputed
+        def compute(frames: _Frames) -> np.ndarray:
+            return librosa.feature.chroma_stft(S=frames.power, sr=sr, n_fft=n_fft, n_chroma=n_chroma)
+        return n_chroma, compute
+
+    chroma_basis = _readonly(librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=tuning, n_chroma=n_chroma))
+
+    def compute(frames: _Frames) -> np.ndarray:
+        return librosa.util.normalize(frames.project("chroma", chroma_basis), norm=np.inf, axis=-2)
+    return n_chroma, compute
+
+
+def _compile_spectral(function_name: str):
+    # Resolved at compile time: touching librosa.feature loads librosa's numba-compiled core
+    def compile_step(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+        function = getattr(librosa.feature, function_name)
+        freq = _readonly(librosa.fft_frequencies(sr=sr, n_fft=n_fft))
+        extra = {key: value for key, value in spec.items() if key not in ("name", "stats")}
+
+        def compute(frames: _Frames) -> np.ndarray:
+            return function(S=frames.magnitude, sr=sr, n_fft=n_fft, hop_length=hop_length, freq=freq, **extra)
+        return 1, compute
+    return compile_step
+
+
+def _compile_flatness(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    def compute(frames: _Frames) -> np.ndarray:
+        return librosa.feature.spectral_flatness(S=frames.magnitude)
+    return 1, compute
+
+
+def _compile_rms(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    def compute(frames: _Frames) -> np.ndarray:
+        return librosa.feature.rms(S=frames.magnitude, frame_length=n_fft)
+    return 1, compute
+
+
+def _compile_zcr(spec: Dict[str, Any], config: Dict[str, Any], sr: int, n_fft: int, hop_length: int):
+    # Framed on the waveform with librosa's own defaults, independently of the STFT settings
+    frame_length = spec.get("frame_length", 2048)
+    zcr_hop = spec.get("hop_length", 512)
+
+    def compute(frames: _Frames) -> np.ndarray:
+        return librosa.feature.zero_crossing_rate(frames.audio, frame_length=frame_length, hop_length=zcr_hop)
+    return 1, compute
+
+
+FEATURES = {
+    "mfcc": _compile_mfcc,
+    "mel": _compile_mel,
+    "chroma": _compile_chroma,
+    "spectral_centroid": _compile_spectral("spectral_centroid"),
+    "spectral_rolloff": _compile_spectral("spectral_rolloff"),
+    "spectral_bandwidth": _compile_spectral("spectral_bandwidth"),
+    "spectral_flatness": _compile_flatness,
+    "rms": _compile_rms,
+    "zero_crossing_rate": _compile_zcr,
+}
+
+
+def compile_feature_plan(config: Dict[str, Any], sample_rate: int = None,
+                         model_input_shape: Optional[Tuple] = None, backend: str = None) -> FeaturePlan:
+    """
+    Compile a feature configuration into a FeaturePlan.
+
+    Args:
+        config: Parsed feature_config.json. Optional keys: "input_mode" ("auto", "summary"
+            or "raw"), "features" (list of {"name", "stats", ...parameters}),
+            "raw_length", plus the shared "n_fft", "hop_length", "n_mfcc" and "n_mels"
+        sample_rate: Sample rate clips are extracted at. Defaults to settings.SAMPLE_RATE
+        model_input_shape: Input shape of the model the plan feeds, used to resolve
+            "auto" input mode and to check the output dimension
+        backend: "librosa" or "numpy". Defaults to settings.FEATURE_BACKEND
+
+    Returns:
+        The compiled plan
+
+    Raises:
+        ValueError: If the configuration is invalid or does not match the model input
+    """
+    sample_rate = sample_rate or settings.SAMPLE_RATE
+    n_fft = config.get("n_fft", settings.N_FFT)
+    hop_length = config.get("hop_length", settings.HOP_LENGTH)
+    backend = backend or settings.FEATURE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown feature backend {backend}. Supported backends: {BACKENDS}")
+    registry = fast_features.FEATURES if backend == "numpy" else FEATURES
+
+    input_mode = config.get("input_mode", "auto")
+    if input_mode not in INPUT_MODES:
+        raise ValueError(f"Unknown input_mode {input_mode}. Supported modes: {INPUT_MODES}")
+    if input_mode == "auto":
+        # Models whose input has a long time axis take raw samples
+        if model_input_shape is not None and len(model_input_shape) > 2 and (model_input_shape[1] or 0) > 1000:
+            input_mode = "raw"
+        else:
+            input_mode = "summary"
+
+    if input_mode == "raw":
+        raw_length = config.get("raw_length")
+        if raw_length is None and model_input_shape is not None and len(model_input_shape) > 1:
+            raw_length = model_input_shape[1]
+        if raw_length is None:
+            raw_length = int(config.get("duration", settings.DURATION) * sample_rate)
+        return FeaturePlan("raw", sample_rate, n_fft, hop_length, (), int(raw_length), backend)
+
+    steps = []
+    for spec in config.get("features", DEFAULT_FEATURES):
+        name = spec.get("name")
+        if name not in registry:
+            raise ValueError(f"Unknown feature {name}. Supported features: {sorted(registry)}")
+        stats = tuple(spec.get("stats", ["mean", "var"]))
+        unknown = [stat for stat in stats if stat not in STATISTICS]
+        if unknown or not stats:
+            raise ValueError(f"Invalid statistics {list(stats)} for feature {name}. Supported: {sorted(STATISTICS)}")
+        rows, compute = registry[name](spec, config, sample_rate, n_fft, hop_length)
+        steps.append(FeatureStep(name, rows, stats, compute))
+
+    plan = FeaturePlan("summary", sample_rate, n_fft, hop_length, tuple(steps),
+                       sum(step.dimension for step in steps), backend)
+
+    if model_input_shape is not None and len(model_input_shape) == 2 and model_input_shape[-1] is not None:
+        if model_input_shape[-1] != plan.dimension:
+            raise ValueError(
+                f"Feature plan produces {plan.dimension} features but the model expects {model_input_shape[-1]}"
+            )
+    return plan
+
+
+def derive_feature_plan(config: Dict[str, Any], sample_rate: int = None, hop_factor: int = 1,
+                        skip: Iterable[str] = (), fill_values: Optional[np.ndarray] = None,
+                        backend: str = None) -> FeaturePlan:
+    """
+    Compile a cheaper variant of a summary plan with the same output layout.
+
+    Args:
+        config: Parsed feature_config.json of the full plan
+        sample_rate: Sample rate clips are extracted at. Defaults to settings.SAMPLE_RATE
+        hop_factor: Multiplier for the STFT and zero-crossing hop lengths (fewer frames per clip)
+        skip: Features that are not computed; their block is taken from fill_values
+        fill_values: Full-length vector substituted for skipped features, e.g. the scaler's
+            training means. Without it, skipped chroma uses a fixed tuning instead of per-clip
+            estimation and other skipped features are still computed
+        backend: "librosa" or "numpy". Defaults to settings.FEATURE_BACKEND
+
+    Returns:
+        The derived plan
+    """
+    derived = copy.deepcopy(config)
+    derived["input_mode"] = "summary"
+    derived["hop_length"] = derived.get("hop_length", settings.HOP_LENGTH) * hop_factor
+    features = derived.setdefault("features", copy.deepcopy(DEFAULT_FEATURES))
+    skip = set(skip)
+    for spec in features:
+        if spec.get("name") == "zero_crossing_rate":
+            spec["hop_length"] = spec.get("hop_length", 512) * hop_factor
+        if spec.get("name") == "chroma" and "chroma" in skip and fill_values is None:
+            spec.setdefault("tuning", 0.0)
+
+    plan = compile_feature_plan(derived, sample_rate, backend=backend)
+    if fill_values is None or len(fill_values) != plan.dimension:
+        return plan
+
+    steps = []
+    offset = 0
+    for step in plan.steps:
+        if step.name in skip:
+            constant = _readonly(np.asarray(fill_values[offset:offset + step.dimension], dtype=np.float64).copy())
+            step = FeatureStep(step.name, step.rows, step.stats, None, constant)
+        steps.append(step)
+        offset += step.dimension
+    return FeaturePlan(plan.input_mode, plan.sample_rate, plan.n_fft, plan.hop_length, tuple(steps),
+                       plan.dimension, plan.backend)
+
+
+def load_feature_plan(config_path: str = None, sample_rate: int = None,
+                      model_input_shape: Optional[Tuple] = None, backend: str = None) -> FeaturePlan:
+    """Read feature_config.json and compile it. See compile_feature_plan."""
+    with open(config_path or settings.PREPROCESSING_CONFIG_PATH) as f:
+        config = json.load(f)
+    return compile_feature_plan(config, sample_rate, model_input_shape, backend)
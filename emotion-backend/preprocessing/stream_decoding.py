@@ -0,0 +1,267 @@
+"""
+Streaming decode of compressed realtime audio (MediaRecorder WebM/Opus or Ogg/Opus).
+
+MediaRecorder only puts the container header in its first chunk; later chunks are
+continuations of one byte stream. Each session therefore gets one long-lived ffmpeg
+process that keeps demuxer and decoder state across chunks: chunks are written to
+its stdin as they arrive and mono float32 at settings.SAMPLE_RATE is read back from
+its stdout. The number of such processes is bounded by REALTIME_DECODER_MAX_STREAMS.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg demuxer per accepted audio_format of a realtime session
+STREAM_CONTAINERS = {"webm": "matroska", "ogg": "ogg"}
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+# Decoder error output kept for error messages: the last few reads of up to 1KB each
+_STDERR_TAIL_CHUNKS = 8
+
+
+def sniff_stream_container(data: bytes) -> Optional[str]:
+    """"webm" or "ogg" when data starts a container stream, None for anything else (raw PCM)."""
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[:4] == b"OggS":
+        return "ogg"
+    return None
+
+
+def _process_cpu_seconds(pid: int) -> Optional[float]:
+    """User plus system CPU time of a process, from /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesized command name; utime and stime are the 12th and 13th
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StreamDecoderError(RuntimeError):
+    """The session's decoder could not be started or has failed."""
+
+
+class StreamingDecoder:
+    """One session's persistent ffmpeg process."""
+
+    def __init__(self, audio_format: str, sample_rate: int = None):
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate or settings.SAMPLE_RATE
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._pending = bytearray()
+        self._stderr_tail: Deque[bytes] = deque(maxlen=_STDERR_TAIL_CHUNKS)
+        self._stderr_reader: Optional[asyncio.Task] = None
+        self.bytes_in = 0
+        self.samples_out = 0
+        self.chunks = 0
+        self.decode_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    async def start(self):
+        ffmpeg = shutil.which(settings.FFMPEG_PATH)
+        if ffmpeg is None:
+            raise StreamDecoderError("ffmpeg is not available for compressed realtime audio")
+        command = [
+            ffmpeg, "-hide_banner", "-loglevel", "error",
+            # Decode each chunk as soon as it arrives instead of buffering input for probing
+            "-fflags", "nobuffer", "-probesize", "4096", "-analyzeduration", "0",
+            "-f", STREAM_CONTAINERS[self.audio_format], "-i", "pipe:0",
+            "-f", "f32le", "-ac", "1", "-ar", str(self.sample_rate), "-flush_packets", "1",
+            "pipe:1"
+        ]
+        self.process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        # Read all along: a decoder blocked on a full stderr pipe would stop producing audio
+        self._stderr_reader = asyncio.create_task(self._drain_stderr())
+
+    async def decode(self, data: bytes, pool=None) -> np.ndarray:
+        """
+        Feed one chunk and collect the samples the decoder produces for it.
+
+        Waits up to REALTIME_DECODER_MAX_WAIT_MS for the first output, then reads until
+        the decoder has been quiet for REALTIME_DECODER_QUIET_MS. Samples that arrive
+        later are returned with the next chunk.
+
+        Args:
+            data: Next chunk of the container stream
+            pool: Optional BufferPool; the samples are written into its "decoded" buffer
+
+        Returns:
+            Mono float32 samples at the decoder's sample rate (possibly empty)
+
+        Raises:
+            StreamDecoderError: If the ffmpeg process has exited
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            self.process.stdin.write(data)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise StreamDecoderError(f"Decoder exited: {await self._stderr()}")
+        self.bytes_in += len(data)
+        self.chunks += 1
+
+        deadline = loop.time() + settings.REALTIME_DECODER_MAX_WAIT_MS / 1000
+        quiet = settings.REALTIME_DECODER_QUIET_MS / 1000
+        received = False
+        while True:
+            timeout = quiet if received else deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                output = await asyncio.wait_for(self.process.stdout.read(1 << 16), timeout)
+            except asyncio.TimeoutError:
+                break
+            if not output:
+                raise StreamDecoderError(f"Decoder exited: {await self._stderr()}")
+            self._pending += output
+            received = True
+
+        count = len(self._pending) // 4
+        samples = pool.get("decoded", count) if pool is not None else np.empty(count, dtype=np.float32)
+        decoded = np.frombuffer(self._pending, dtype=np.float32, count=count)
+        samples[:] = decoded
+        # The bytearray cannot shrink while an array still exports its buffer
+        del decoded
+        del self._pending[:count * 4]
+        self.samples_out += count
+        self.decode_seconds += time.perf_counter() - start
+        return samples
+
+    async def _drain_stderr(self):
+        while True:
+            data = await self.process.stderr.read(1024)
+            if not data:
+                return
+            self._stderr_tail.append(data)
+
+    async def _stderr(self) -> str:
+        """The end of the decoder's error output, once it has been read to EOF (or after 1s)."""
+        try:
+            await asyncio.wait_for(asyncio.shield(self._stderr_reader), 1.0)
+        except Exception:
+            # Timed out or failed: the tail read so far is still the best message
+            pass
+        return b"".join(self._stderr_tail).decode(errors="replace").strip() or "no error output"
+
+    async def close(self):
+        """End the stream and stop the process (killed if it does not exit promptly)."""
+        if self.process is None:
+            return
+        self.cpu_seconds = _process_cpu_seconds(self.process.pid) or self.cpu_seconds
+        if self.process.stdin is not None and not self.process.stdin.is_closing():
+            self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 2.0)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+        if self._stderr_reader is not None:
+            self._stderr_reader.cancel()
+            await asyncio.gather(self._stderr_reader, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.process is not None and self.process.returncode is None:
+            self.cpu_seconds = _process_cpu_seconds(self.process.pid) or self.cpu_seconds
+        audio_seconds = self.samples_out / self.sample_rate
+        pcm_bytes = self.samples_out * 2
+        return {
+            "format": self.audio_format,
+            "pid": self.process.pid if self.process is not None else None,
+            "chunks": self.chunks,
+            "bytes_in": self.bytes_in,
+            "audio_seconds": round(audio_seconds, 3),
+            # Compressed bytes per byte of 16-bit PCM at the same rate
+            "bandwidth_ratio": round(self.bytes_in / pcm_bytes, 4) if pcm_bytes else None,
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "cpu_per_audio_second": round(self.cpu_seconds / audio_seconds, 4) if audio_seconds else None,
+            "decode_wait_ms_per_chunk": round(self.decode_seconds / self.chunks * 1000, 2) if self.chunks else None,
+        }
+
+
+class StreamDecoderPool:
+    """Bounds and accounts for the per-session decoder processes."""
+
+    def __init__(self, max_streams: int = None):
+        self.max_streams = max_streams or settings.REALTIME_DECODER_MAX_STREAMS
+        self.active: Dict[str, StreamingDecoder] = {}
+        self.in_use = 0
+        self.started = 0
+        self.rejected = 0
+        self.failed = 0
+        self.finished_bytes_in = 0
+        self.finished_audio_seconds = 0.0
+        self.finished_cpu_seconds = 0.0
+
+    async def acquire(self, client_id: str, audio_format: str) -> StreamingDecoder:
+        """
+        Start a decoder for a session.
+
+        Raises:
+            StreamDecoderError: If all REALTIME_DECODER_MAX_STREAMS are in use or ffmpeg cannot start
+        """
+        if self.in_use >= self.max_streams:
+            self.rejected += 1
+            raise StreamDecoderError(f"All {self.max_streams} realtime decoders are in use")
+        decoder = StreamingDecoder(audio_format)
+        self.in_use += 1
+        try:
+            await decoder.start()
+        except Exception as e:
+            self.in_use -= 1
+            self.failed += 1
+            if isinstance(e, StreamDecoderError):
+                raise
+            raise StreamDecoderError(f"Could not start the decoder: {e}")
+        self.active[client_id] = decoder
+        self.started += 1
+        return decoder
+
+    async def release(self, client_id: str, decoder: Optional[StreamingDecoder]) -> Optional[Dict[str, Any]]:
+        """Stop a session's decoder and fold its counters into the totals."""
+        if decoder is None:
+            return None
+        if self.active.get(client_id) is decoder:
+            del self.active[client_id]
+        self.in_use -= 1
+        await decoder.close()
+        stats = decoder.stats()
+        self.finished_bytes_in += decoder.bytes_in
+        self.finished_audio_seconds += decoder.samples_out / decoder.sample_rate
+        self.finished_cpu_seconds += decoder.cpu_seconds
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = {client_id: decoder.stats() for client_id, decoder in list(self.active.items())}
+        audio_seconds = self.finished_audio_seconds + sum(s["audio_seconds"] for s in sessions.values())
+        cpu_seconds = self.finished_cpu_seconds + sum(s["cpu_seconds"] for s in sessions.values())
+        return {
+            "ffmpeg": shutil.which(settings.FFMPEG_PATH) is not None,
+            "max_streams": self.max_streams,
+            "active": self.in_use,
+            "started": self.started,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "audio_seconds": round(audio_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "cpu_per_audio_second": round(cpu_seconds / audio_seconds, 4) if audio_seconds else None,
+            "sessions": sessions,
+        }
+
+
+# Global instance
+stream_decoders = StreamDecoderPool()
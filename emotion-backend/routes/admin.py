@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from typing import Dict, Any, Optional
+
+from services.memory_monitor import memory_monitor, release_free_memory
+from utils.profiling import profiling_authorized
+
+
+def require_admin(x_profile_token: Optional[str] = Header(None, description="Token checked against PROFILING_TOKEN")):
+    if not profiling_authorized(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are not enabled for this caller"
+        )
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@router.get("/memory",
+            summary="Process memory",
+            description="RSS, tensor memory, per-session buffers and registered gauges of this worker")
+async def memory_stats(sessions: bool = Query(True, description="Include the per-session breakdown")) -> Dict[str, Any]:
+    """
+    Get the memory accounting of this worker.
+
+    Args:
+        sessions: Whether to list every realtime session's buffers
+
+    Returns:
+        Dictionary with RSS and its growth rate, tensor memory, gauges and sessions
+    """
+    return memory_monitor.stats(sessions=sessions)
+
+
+@router.post("/memory/release",
+             summary="Release free memory",
+             description="Run a garbage collection and return freed heap pages to the OS")
+async def memory_release() -> Dict[str, Any]:
+    before = memory_monitor.stats(sessions=False)["rss_bytes"]
+    release_free_memory()
+    after = memory_monitor.stats(sessions=False)["rss_bytes"]
+    return {"rss_before_bytes": before, "rss_after_bytes": after}
+
+
+@router.post("/memory/tracemalloc",
+             summary="Start allocation tracing",
+             description="Start tracemalloc and take the baseline snapshot that diffs compare against")
+async def tracemalloc_start(frames: Optional[int] = Query(None, ge=1, le=100, description="Stack frames kept per allocation")) -> Dict[str, Any]:
+    memory_monitor.start_tracing(frames)
+    return {"tracing": True}
+
+
+@router.get("/memory/tracemalloc",
+            summary="Allocation growth since the baseline",
+            description="Top allocation sites by growth since tracing started or the last reset")
+async def tracemalloc_diff(
+    limit: int = Query(20, ge=1, le=500, description="Number of allocation sites"),
+    key_type: str = Query("lineno", description="Group by lineno, filename or traceback"),
+    reset: bool = Query(False, description="Make this snapshot the new baseline")
+) -> Dict[str, Any]:
+    """
+    Compare the current allocations with the baseline snapshot.
+
+    Args:
+        limit: Number of allocation sites to return
+        key_type: Grouping of allocation sites
+        reset: Whether to use this snapshot as the baseline of the next diff
+
+    Returns:
+        Traced totals and the sites that grew the most
+    """
+    if key_type not in ("lineno", "filename", "traceback"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="key_type must be lineno, filename or traceback"
+        )
+    try:
+        return memory_monitor.allocation_diff(limit, key_type, reset)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.delete("/memory/tracemalloc",
+               summary="Stop allocation tracing",
+               description="Stop tracemalloc and drop its snapshots")
+async def tracemalloc_stop() -> Dict[str, Any]:
+    memory_monitor.stop_tracing()
+    return {"tracing": False}
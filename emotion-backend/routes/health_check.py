@@ -2,16 +2,26 @@ from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from typing import Dict
 
+from services.memory_monitor import memory_monitor
+
 router = APIRouter(prefix="/health")
 
-@router.get("/", 
+@router.get("/",
             summary="Health check endpoint",
             description="Check if the server is running and healthy")
 async def health_check() -> Dict[str, str]:
     """
     Health check endpoint to verify the server is running.
-    
+
+    Returns 503 while the worker is draining before a memory recycle, so load
+    balancers stop sending it new sessions.
+
     Returns:
         Dictionary with status information
     """
-    return {"status": "healthy", "message": "Emotion Detection API is running"}
\ No newline at end of file
+    if memory_monitor.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "draining", "message": "Worker is draining before a restart (memory limit reached)"}
+        )
+    return {"status": "healthy", "message": "Emotion Detection API is running"}
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, status
+from typing import Dict, Any
+import logging
+
+from services.job_queue import job_queue, SUCCEEDED, FINISHED_STATUSES
+from utils.audio_headers import probe_audio, validate_audio_header, AudioHeaderError
+from config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/jobs")
+
+@router.post("/",
+             status_code=status.HTTP_202_ACCEPTED,
+             summary="Submit an audio file for background analysis",
+             description="Queue a (long) audio file for full analysis and return a job id immediately")
+async def submit_job(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """
+    Queue an uploaded audio file for background emotion analysis.
+    
+    Args:
+        file: The audio file to analyze (WAV, MP3, etc.)
+        
+    Returns:
+        The new job's status record, including its id
+    """
+    file_ext = file.filename.split(".")[-1].lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type {file_ext} not supported. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+        )
+    
+    file_content = await file.read()
+    if len(file_content) > settings.MAX_JOB_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size is {settings.MAX_JOB_FILE_SIZE / (1024*1024):.1f}MB"
+        )
+    
+    # Reject bad uploads now rather than failing the job later
+    try:
+        header = probe_audio(file_content)
+    except AudioHeaderError as e:
+        logger.info(f"Rejected job upload {file.filename}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a valid audio file"
+        )
+    is_valid, error_message = validate_audio_header(header, max_duration=settings.MAX_JOB_DURATION)
+    if not is_valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_message
+        )
+    
+    return await job_queue.submit(file.filename, file_content, header.format, header.duration)
+
+
+@router.get("/stats",
+            summary="Job queue statistics",
+            description="Number of jobs per status and the worker count")
+async def job_stats() -> Dict[str, Any]:
+    return job_queue.stats()
+
+
+@router.get("/{job_id}",
+            summary="Job status",
+            description="Poll the status and progress of a job")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/result",
+            summary="Job result",
+            description="Aggregated prediction and per-window timeline of a finished job")
+async def get_job_result(job_id: str) -> Dict[str, Any]:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job['status']}" + (f": {job['error']}" if job.get("error") else "")
+        )
+    return job_queue.result(job_id)
+
+
+@router.delete("/{job_id}",
+               summary="Cancel a job",
+               description="Cancel a queued job, or stop a running one at its next block of windows")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    if job["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is already {job['status']}")
+    return job_queue.cancel(job_id)
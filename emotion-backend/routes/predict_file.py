@@ -1,25 +1,56 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Header, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import io
+import json
 import logging
 import os
-from typing import Dict, Any
+import zipfile
+import zlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 
 from services.prediction_service import prediction_service
-from preprocessing.audio_processing import load_audio_from_bytes, preprocess_audio_chunk
+from services.waveform_preview import WaveformPreviewBuilder, build_waveform_preview, content_id, waveform_cache
+from preprocessing.audio_processing import decode_audio_bytes, preprocess_audio_chunk
+from preprocessing.audio_decoding import AudioStream, decode_audio_regions, stream_audio
+from preprocessing.audio_preview import PREVIEW_MODES, select_preview_regions, region_coverage
+from utils.audio_headers import AudioHeader, probe_audio, validate_audio_header, AudioHeaderError
+from utils.profiling import RequestProfile, profile_stage, profiling_authorized
 from config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/predict")
 
+# Decodes and extracts features for uploads off the event loop; libsndfile, soxr and numpy release the GIL
+_batch_executor = ThreadPoolExecutor(max_workers=settings.BATCH_DECODE_WORKERS, thread_name_prefix="batch-decode")
+
 @router.post("/file", 
              summary="Predict emotion from audio file",
              description="Upload an audio file to detect emotions in the audio content")
-async def predict_from_file(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def predict_from_file(
+    file: UploadFile = File(...),
+    preview: Optional[str] = Query(None, description=f"Analyze only sampled windows: one of {', '.join(PREVIEW_MODES)}"),
+    preview_windows: Optional[int] = Query(None, ge=1, le=settings.PREVIEW_MAX_WINDOWS, description="Number of windows for uniform/energy preview"),
+    preview_seconds: Optional[float] = Query(None, gt=0, description="Seconds analyzed by head preview"),
+    profile: Optional[str] = Query(None, description="Profile this request: inline (report in the response) or file (written to PROFILE_OUTPUT_DIR)"),
+    models: Optional[str] = Query(None, description="Comma-separated extra models scored on the same features (see /predict/models)"),
+    waveform: bool = Query(False, description="Also cache a waveform preview, served by /waveform/{audio_id}"),
+    x_profile_token: Optional[str] = Header(None, description="Token required to enable profiling")
+) -> Dict[str, Any]:
     """
     Predict emotion from an uploaded audio file.
     
     Args:
         file: The audio file to analyze (WAV, MP3, etc.)
+        preview: Optional preview mode that decodes and analyzes only sampled windows
+        preview_windows: Number of windows analyzed by the uniform and energy preview modes
+        preview_seconds: Number of leading seconds analyzed by the head preview mode
+        profile: Optional profiling delivery ("inline" or "file"); requires X-Profile-Token
+        models: Optional comma-separated model names; their results are added under "models"
+        waveform: Build a waveform preview from the same decode and cache it under audio_id
+        x_profile_token: Profiling access token, checked against PROFILING_TOKEN
         
     Returns:
         Dictionary containing the predicted emotion, confidence, and class probabilities
@@ -32,18 +63,72 @@ async def predict_from_file(file: UploadFile = File(...)) -> Dict[str, Any]:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File type {file_ext} not supported. Allowed types: {settings.ALLOWED_EXTENSIONS}"
             )
+        if preview is not None and preview not in PREVIEW_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Preview mode {preview} not supported. Allowed modes: {PREVIEW_MODES}"
+            )
+        requested_models = _resolve_models(models)
+        
+        request_profile = None
+        if profile is not None:
+            if profile not in ("inline", "file"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Profile delivery must be inline or file"
+                )
+            if not profiling_authorized(x_profile_token):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Profiling is not enabled for this caller"
+                )
+            request_profile = RequestProfile(f"file-{file.filename}")
         
         # Validate file size
+        max_file_size = settings.MAX_PREVIEW_FILE_SIZE if preview else settings.MAX_FILE_SIZE
         file_content = await file.read()
-        if len(file_content) > settings.MAX_FILE_SIZE:
+        if len(file_content) > max_file_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File too large. Maximum size is {max_file_size / (1024*1024):.1f}MB"
+            )
+        
+        # Check the container header before spending any time decoding
+        try:
+            with profile_stage(request_profile, "probe"):
+                header = probe_audio(file_content)
+        except AudioHeaderError as e:
+            logger.warning(f"Rejected upload {file.filename}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file is not a valid audio file"
+            )
+        max_duration = settings.MAX_PREVIEW_DURATION if preview else settings.MAX_AUDIO_DURATION
+        is_valid, error_message = validate_audio_header(header, max_duration=max_duration)
+        if not is_valid:
+            logger.warning(f"Rejected upload {file.filename}: {error_message}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+                detail=error_message
             )
         
-        # Check if content is actually audio by loading it
+        # Decoding may wait for an ffmpeg slot, so it never runs on the event loop
+        loop = asyncio.get_running_loop()
+        if preview:
+            with profile_stage(request_profile, "preview"):
+                result = await loop.run_in_executor(_batch_executor, lambda: _predict_preview(
+                    file.filename, file_content, header, preview, preview_windows, preview_seconds, requested_models
+                ))
+            if request_profile is not None:
+                result["profile"] = request_profile.to_response(profile)
+            return result
+        
         try:
-            audio_data, sample_rate = load_audio_from_bytes(file_content)
+            with profile_stage(request_profile, "decode"):
+                decoded = await loop.run_in_executor(
+                    _batch_executor, lambda: decode_audio_bytes(file_content, fmt=header.format)
+                )
+            audio_data, sample_rate = decoded.audio, decoded.sample_rate
         except Exception as e:
             logger.error(f"Error loading audio file: {e}")
             raise HTTPException(
@@ -51,13 +136,29 @@ async def predict_from_file(file: UploadFile = File(...)) -> Dict[str, Any]:
                 detail="Uploaded file is not a valid audio file"
             )
         
-        # Preprocess the audio
-        processed_audio = preprocess_audio_chunk(audio_data, sample_rate)
+        # Cache the display preview from this decode, so /waveform does not decode again. Only on
+        # request: the spectrogram costs about as much as the prediction, and most callers never draw it
+        audio_id = content_id(file_content)
+        if waveform and audio_id not in waveform_cache:
+            with profile_stage(request_profile, "waveform_preview"):
+                waveform_cache.put(await loop.run_in_executor(
+                    _batch_executor, build_waveform_preview, audio_id, audio_data, sample_rate
+                ))
+        
+        # Preprocess and predict off the event loop too, in one executor call: the preprocessed
+        # audio may sit in the thread's pooled buffer, which the thread's next task reuses
+        def preprocess_and_predict() -> Dict[str, Any]:
+            with profile_stage(request_profile, "preprocess_chunk"):
+                processed_audio = preprocess_audio_chunk(audio_data, sample_rate)
+            return prediction_service.predict(processed_audio, sample_rate, profile=request_profile, models=requested_models)
         
-        # Make prediction
-        result = prediction_service.predict(processed_audio, sample_rate)
+        result = await loop.run_in_executor(_batch_executor, preprocess_and_predict)
+        result["audio_id"] = audio_id
         
-        logger.info(f"Prediction made for file {file.filename}: {result['label']} with confidence {result['confidence']}")
+        logger.info(f"Prediction made for file {file.filename} (decoded with {decoded.decoder}): {result['label']} with confidence {result['confidence']}")
+        
+        if request_profile is not None:
+            result["profile"] = request_profile.to_response(profile)
         
         return result
         
@@ -68,4 +169,439 @@ async def predict_from_file(file: UploadFile = File(...)) -> Dict[str, Any]:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during emotion prediction"
-        )
\ No newline at end of file
+        )
+
+
+def _predict_preview(
+    filename: str,
+    file_content: bytes,
+    header: AudioHeader,
+    mode: str,
+    num_windows: Optional[int],
+    head_seconds: Optional[float],
+    models: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Predict emotion from sampled windows of a file, decoding only those windows.
+    
+    Args:
+        filename: Name of the uploaded file, for logging
+        file_content: Uploaded file contents
+        header: Probed header of the file
+        mode: Preview mode ("head", "uniform" or "energy")
+        num_windows: Number of windows for uniform/energy preview
+        head_seconds: Number of leading seconds for head preview
+        models: Optional validated model names scored alongside the default model
+        
+    Returns:
+        Aggregated prediction with per-window results and the covered fraction of the file
+    """
+    try:
+        regions = select_preview_regions(
+            file_content, header.duration, mode,
+            num_windows=num_windows, head_seconds=head_seconds, fmt=header.format
+        )
+        chunks, decoder = decode_audio_regions(file_content, regions, fmt=header.format)
+    except Exception as e:
+        logger.error(f"Error decoding preview windows: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a valid audio file"
+        )
+    
+    # Drop windows that decoded to nothing (e.g. a header that overstates the duration)
+    windows = [(region, chunk) for region, chunk in zip(regions, chunks) if len(chunk) > 0]
+    if not windows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Audio file contains no data"
+        )
+    
+    window_results = prediction_service.predict_batch(
+        [preprocess_audio_chunk(chunk, settings.SAMPLE_RATE) for _, chunk in windows],
+        settings.SAMPLE_RATE,
+        models
+    )
+    result = prediction_service.aggregate_predictions(window_results, models)
+    result["preview"] = {
+        "mode": mode,
+        "duration": header.duration,
+        "coverage": region_coverage([region for region, _ in windows], header.duration),
+        "windows": [
+            {
+                "start": start,
+                "duration": length,
+                "label": window_result["label"],
+                "confidence": window_result["confidence"]
+            }
+            for ((start, length), _), window_result in zip(windows, window_results)
+        ]
+    }
+    
+    logger.info(f"Preview ({mode}, {len(windows)} windows, decoded with {decoder}) for file {filename}: {result['label']} with confidence {result['confidence']}")
+    
+    return result
+
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+@router.post("/file/stream",
+             summary="Stream per-window emotion predictions for a long audio file",
+             description="Upload an audio file and receive each window's prediction as soon as it is scored, then the aggregate")
+async def predict_from_file_stream(
+    file: UploadFile = File(...),
+    format: str = Query("ndjson", description=f"Message framing: one of {', '.join(STREAM_FORMATS)}"),
+    models: Optional[str] = Query(None, description="Comma-separated extra models scored on the same features (see /predict/models)"),
+    waveform: bool = Query(False, description="Also cache a waveform preview, served by /waveform/{audio_id}")
+) -> StreamingResponse:
+    """
+    Predict emotion window by window and stream the results.
+    
+    The file is decoded as it is scored, STREAM_BATCH_WINDOWS windows at a time, so the
+    first results arrive after a few windows regardless of the file length. Messages
+    are a "start" message, one "window" message per DURATION-second window, then a
+    "final" message with the aggregated prediction (or an "error" message).
+    
+    Args:
+        file: The audio file to analyze (WAV, MP3, etc.)
+        format: "ndjson" for one JSON object per line, "sse" for Server-Sent Events
+        models: Optional comma-separated model names; their results are added under "models"
+        waveform: Build a waveform preview from the decoded windows and cache it under audio_id
+        
+    Returns:
+        Streaming response of prediction messages
+    """
+    file_ext = file.filename.split(".")[-1].lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type {file_ext} not supported. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+        )
+    if format not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stream format {format} not supported. Allowed formats: {sorted(STREAM_FORMATS)}"
+        )
+    requested_models = _resolve_models(models)
+    
+    file_content = await file.read()
+    if len(file_content) > settings.MAX_STREAM_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size is {settings.MAX_STREAM_FILE_SIZE / (1024*1024):.1f}MB"
+        )
+    try:
+        header = probe_audio(file_content)
+    except AudioHeaderError as e:
+        logger.warning(f"Rejected upload {file.filename}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a valid audio file"
+        )
+    is_valid, error_message = validate_audio_header(header, max_duration=settings.MAX_STREAM_DURATION)
+    if not is_valid:
+        logger.warning(f"Rejected upload {file.filename}: {error_message}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_message
+        )
+    
+    loop = asyncio.get_running_loop()
+    try:
+        stream = await loop.run_in_executor(
+            _batch_executor, lambda: stream_audio(file_content, settings.DURATION, fmt=header.format)
+        )
+    except Exception as e:
+        logger.error(f"Error opening audio stream: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a valid audio file"
+        )
+    
+    audio_id = content_id(file_content)
+    preview = None
+    if waveform and audio_id not in waveform_cache:
+        preview = WaveformPreviewBuilder(audio_id, stream.sample_rate, expected_duration=header.duration)
+    
+    return StreamingResponse(
+        _stream_predictions(file.filename, stream, header, format, requested_models, audio_id, preview),
+        media_type=STREAM_FORMATS[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _encode_message(message: Dict[str, Any], format: str) -> str:
+    """Frame one message as an NDJSON line or a Server-Sent Event."""
+    data = json.dumps(message)
+    if format == "sse":
+        return f"event: {message['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+async def _stream_predictions(
+    filename: str,
+    stream: AudioStream,
+    header: AudioHeader,
+    format: str,
+    models: Optional[List[str]],
+    audio_id: str,
+    preview: Optional[WaveformPreviewBuilder] = None
+) -> AsyncIterator[str]:
+    """
+    Decode and score a file batch by batch, yielding the framed messages of each batch.
+    
+    Decoding and prediction run on the batch executor. The stream is closed when the
+    response ends, including when the client disconnects mid-file. When a preview
+    builder is given, it is fed the decoded windows and its preview is cached once the
+    whole file has been read.
+    """
+    loop = asyncio.get_running_loop()
+    window_results: List[Dict[str, Any]] = []
+    position = 0.0
+    try:
+        yield _encode_message({
+            "type": "start",
+            "duration": header.duration,
+            "window_seconds": settings.DURATION,
+            "decoder": stream.decoder,
+            "audio_id": audio_id
+        }, format)
+        while True:
+            batch = await loop.run_in_executor(_batch_executor, _score_stream_batch, stream, models, preview)
+            if batch is None:
+                break
+            messages = []
+            for length, result in batch:
+                messages.append(_encode_message({
+                    "type": "window",
+                    "index": len(window_results),
+                    "start": round(position, 3),
+                    "duration": round(length, 3),
+                    **result
+                }, format))
+                window_results.append(result)
+                position += length
+            yield "".join(messages)
+        
+        if not window_results:
+            yield _encode_message({"type": "error", "message": "Audio file contains no data"}, format)
+            return
+        if preview is not None:
+            waveform_cache.put(await loop.run_in_executor(_batch_executor, preview.finish))
+        result = prediction_service.aggregate_predictions(window_results, models)
+        logger.info(f"Streamed prediction for file {filename} ({len(window_results)} windows, decoded with {stream.decoder}): {result['label']} with confidence {result['confidence']}")
+        yield _encode_message({"type": "final", "duration": round(position, 3), "windows": len(window_results), **result}, format)
+    except Exception as e:
+        logger.error(f"Error streaming predictions for file {filename}: {e}")
+        yield _encode_message({"type": "error", "message": "An error occurred during emotion prediction"}, format)
+    finally:
+        # Waits for a decode still running on the executor, without blocking the event loop
+        _batch_executor.submit(stream.close)
+
+
+def _score_stream_batch(
+    stream: AudioStream,
+    models: Optional[List[str]],
+    preview: Optional[WaveformPreviewBuilder] = None
+) -> Optional[List[Tuple[float, Dict[str, Any]]]]:
+    """
+    Decode and score the next STREAM_BATCH_WINDOWS windows of a stream, adding the
+    decoded samples to the preview builder if one is given.
+    
+    Returns:
+        List of (window seconds, result), or None at the end of the audio
+    """
+    windows = [window for window in stream.read(settings.STREAM_BATCH_WINDOWS) if len(window) > 0]
+    if not windows:
+        return None
+    if preview is not None:
+        for window in windows:
+            preview.add(window)
+    results = prediction_service.predict_batch(
+        [preprocess_audio_chunk(window, stream.sample_rate) for window in windows],
+        stream.sample_rate,
+        models
+    )
+    return [(len(window) / stream.sample_rate, result) for window, result in zip(windows, results)]
+
+
+@router.post("/files",
+             summary="Predict emotion for many audio files",
+             description="Upload several audio files, or one .zip archive of audio files, and score them in one batched model call")
+async def predict_from_files(
+    files: List[UploadFile] = File(...),
+    models: Optional[str] = Query(None, description="Comma-separated extra models scored on the same features (see /predict/models)")
+) -> Dict[str, Any]:
+    """
+    Predict emotion for a batch of uploaded audio files.
+    
+    Files are decoded and featurized concurrently, then scored with a single model call.
+    A file that cannot be used gets an error entry instead of failing the whole batch.
+    
+    Args:
+        files: The audio files to analyze, or a single .zip archive containing them
+        models: Optional comma-separated model names; their results are added under "models"
+        
+    Returns:
+        Dictionary with per-file results in upload order and success/failure counts
+    """
+    try:
+        requested_models = _resolve_models(models)
+        items = await _read_batch(files)
+        
+        loop = asyncio.get_running_loop()
+        featurized = iter(await asyncio.gather(*(
+            loop.run_in_executor(_batch_executor, _featurize_batch_item, content)
+            for _, content, _ in items if content is not None
+        )))
+        outcomes = [next(featurized) if content is not None else (None, error) for _, content, error in items]
+        
+        # One call per model for every file that produced features
+        ok_indices = [i for i, (features, _) in enumerate(outcomes) if features is not None]
+        predictions = await loop.run_in_executor(_batch_executor, lambda: prediction_service.predict_features(
+            np.stack([outcomes[i][0] for i in ok_indices]), requested_models
+        )) if ok_indices else []
+        predicted = dict(zip(ok_indices, predictions))
+        
+        results = []
+        for i, (filename, _, _) in enumerate(items):
+            if i in predicted:
+                results.append({"filename": filename, **predicted[i]})
+            else:
+                results.append({"filename": filename, "error": outcomes[i][1]})
+        
+        logger.info(f"Batch prediction for {len(items)} files: {len(ok_indices)} succeeded, {len(items) - len(ok_indices)} failed")
+        
+        return {
+            "results": results,
+            "succeeded": len(ok_indices),
+            "failed": len(items) - len(ok_indices)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in predict_from_files: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during emotion prediction"
+        )
+
+
+@router.get("/models",
+            summary="List served models",
+            description="Models that can be requested with the models parameter; all share one feature extraction pass")
+async def list_models() -> Dict[str, Any]:
+    """
+    List the served models.
+    
+    Returns:
+        Dictionary with the default model name and each model's name, task and labels
+    """
+    return {
+        "default": prediction_service.default_model,
+        "models": prediction_service.list_models()
+    }
+
+
+def _resolve_models(models: Optional[str]) -> Optional[List[str]]:
+    """
+    Validate a comma-separated models parameter.
+    
+    Raises:
+        HTTPException: If a model name is not registered
+    """
+    try:
+        return prediction_service.resolve_models(models)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+async def _read_batch(files: List[UploadFile]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Read the uploads (or the members of a single .zip upload) within the batch budget.
+    
+    Returns:
+        List of (filename, content, None), or (filename, None, error_message) for an
+        archive member that cannot be extracted
+    
+    Raises:
+        HTTPException: If the batch exceeds MAX_BATCH_FILES or MAX_BATCH_TOTAL_SIZE
+    """
+    def check_budget(count: int, total_size: int):
+        if count > settings.MAX_BATCH_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Too many files. Maximum is {settings.MAX_BATCH_FILES} per batch"
+            )
+        if total_size > settings.MAX_BATCH_TOTAL_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Batch too large. Maximum total size is {settings.MAX_BATCH_TOTAL_SIZE / (1024*1024):.1f}MB"
+            )
+    
+    if len(files) == 1 and files[0].filename.lower().endswith(".zip"):
+        archive_content = await files[0].read()
+        check_budget(1, len(archive_content))
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(archive_content))
+        except zipfile.BadZipFile:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded archive is not a valid zip file"
+            )
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        # Check declared uncompressed sizes before inflating anything
+        check_budget(len(members), sum(info.file_size for info in members))
+        # Inflating members is CPU work, so it runs off the event loop
+        loop = asyncio.get_running_loop()
+        return list(await loop.run_in_executor(_batch_executor, lambda: [_read_member(archive, info) for info in members]))
+    
+    check_budget(len(files), 0)
+    items = []
+    total_size = 0
+    for upload in files:
+        content = await upload.read()
+        total_size += len(content)
+        check_budget(len(files), total_size)
+        items.append((upload.filename, content, None))
+    return items
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> Tuple[str, Optional[bytes], Optional[str]]:
+    """Extract one archive member; an encrypted or corrupt member gets an error instead."""
+    try:
+        return info.filename, archive.read(info), None
+    except (RuntimeError, zipfile.BadZipFile, NotImplementedError, OSError, EOFError, zlib.error) as e:
+        logger.warning(f"Could not extract archive member {info.filename}: {e}")
+        return info.filename, None, "File could not be extracted from the archive"
+
+
+def _featurize_batch_item(content: bytes) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """
+    Validate, decode and extract the unscaled feature vector of one batch file.
+    
+    Returns:
+        Tuple of (features, None) on success, or (None, error_message)
+    """
+    if len(content) > settings.MAX_FILE_SIZE:
+        return None, f"File too large. Maximum size is {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB"
+    try:
+        header = probe_audio(content)
+    except AudioHeaderError:
+        return None, "Not a valid audio file"
+    is_valid, error_message = validate_audio_header(header)
+    if not is_valid:
+        return None, error_message
+    
+    try:
+        decoded = decode_audio_bytes(content, fmt=header.format)
+        processed_audio = preprocess_audio_chunk(decoded.audio, decoded.sample_rate)
+        return prediction_service.audio_to_features(processed_audio, decoded.sample_rate), None
+    except Exception as e:
+        logger.error(f"Error processing batch file: {e}")
+        return None, "Audio could not be decoded"
@@ -1,19 +1,35 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query, HTTPException
+from typing import Dict, Any, List, Optional
 import json
 import logging
 import asyncio
+import time
+import uuid
 import numpy as np
 
 from services.prediction_service import prediction_service
-from preprocessing.audio_processing import preprocess_audio_chunk
+from services.realtime_pubsub import broker, Subscriber
+from services.overload import overload_controller
+from services.inference_pool import inference_pool
+from services.memory_monitor import memory_monitor
+from services.session_store import SessionState, session_store
+from services.cadence import cadence_registry
+from preprocessing.audio_processing import pcm_to_float, preprocess_audio_chunk
+from preprocessing.stream_decoding import STREAM_CONTAINERS, StreamDecoderError, sniff_stream_container, stream_decoders
+from utils.logging_config import log_event, sampler
+from utils.profiling import RequestProfile, profile_stage, profiling_authorized
+from utils.latency import LatencyRecord, latency_registry
+from utils.buffer_pool import BufferPool
+from routes.admin import require_admin
 from config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/ws")
 
-# Store active WebSocket connections
-active_connections: Dict[str, WebSocket] = {}
+# Per-stage hot-path loggers; levels are configurable through LOG_STAGE_LEVELS
+receive_logger = logging.getLogger("realtime.receive")
+decode_logger = logging.getLogger("realtime.decode")
+predict_logger = logging.getLogger("realtime.predict")
 
 class ConnectionManager:
     def __init__(self):
@@ -24,8 +40,10 @@ class ConnectionManager:
         self.active_connections[client_id] = websocket
         logger.info(f"Client {client_id} connected. Total connections: {len(self.active_connections)}")
     
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
+    def disconnect(self, client_id: str, websocket: Optional[WebSocket] = None):
+        # A client that reconnected under the same id keeps its new entry
+        current = self.active_connections.get(client_id)
+        if current is not None and (websocket is None or current is websocket):
             del self.active_connections[client_id]
             logger.info(f"Client {client_id} disconnected. Total connections: {len(self.active_connections)}")
     
@@ -35,101 +53,579 @@ class ConnectionManager:
             await websocket.send_text(message)
     
     async def broadcast(self, message: str):
-        for client_id, websocket in self.active_connections.items():
-            try:
-                await websocket.send_text(message)
-            except Exception as e:
-                logger.error(f"Error sending message to client {client_id}: {e}")
-                self.disconnect(client_id)
+        # Send to a snapshot concurrently, so one slow client does not stall the others
+        connections = list(self.active_connections.items())
+        results = await asyncio.gather(
+            *(websocket.send_text(message) for _, websocket in connections),
+            return_exceptions=True
+        )
+        for (client_id, websocket), result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sending message to client {client_id}: {result}")
+                self.disconnect(client_id, websocket)
 
 manager = ConnectionManager()
 
 @router.websocket("/realtime/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    client_id: str,
+    latency: bool = Query(False, description="Include sequence number, capture timestamp and per-stage durations in every result"),
+    profile: bool = Query(False, description="Profile this session; the profile is written to PROFILE_OUTPUT_DIR on disconnect"),
+    profile_token: Optional[str] = Query(None, description="Token required to enable profiling"),
+    models: Optional[str] = Query(None, description="Comma-separated extra models scored on the same features (see /predict/models)"),
+    resume: bool = Query(True, description="Continue the stored session of this client id, if there is one"),
+    audio_format: str = Query("auto", description="Binary frame format: pcm, webm, ogg, or auto to detect it from the first frame")
+):
     """
     WebSocket endpoint for real-time emotion detection.
 
+    Binary frames carry audio. A client may precede a binary frame with a text frame
+    {"type": "meta", "seq": <int>, "capture_ts": <epoch ms>} describing it; otherwise
+    the server numbers messages itself. Frames are read by a separate task into a
+    bounded per-session queue, so time spent waiting behind earlier messages is
+    measured as queue wait.
+
+    The session's state (sequence numbers, last result, recent results and, if
+    configured, recent audio) is saved to the session store as it goes and on
+    disconnect, so a client reconnecting with the same id within SESSION_STORE_TTL
+    continues where it left off, on this worker or any other sharing the store.
+
+    Binary frames are either raw PCM (int16, int32 or float32) or consecutive chunks of
+    one compressed MediaRecorder stream (WebM/Opus or Ogg/Opus). A compressed stream is
+    fed to a decoder process kept for the whole session, since only its first chunk
+    carries the container header.
+
     Args:
         websocket: WebSocket connection object
         client_id: Unique identifier for the client
+        latency: Whether results carry a "latency" section
+        profile: Whether to profile the processing of every message in this session
+        profile_token: Profiling access token, checked against PROFILING_TOKEN
+        models: Optional comma-separated model names; their results are added under "models"
+        resume: Whether to continue a stored session; a new one is started otherwise
+        audio_format: "pcm", "webm", "ogg", or "auto" to detect a container from the first frame
     """
-    logger.info(f"Attempting to connect client {client_id} to WebSocket")
+    audio_format = audio_format.lower()
+    if audio_format not in ("auto", "pcm", *STREAM_CONTAINERS):
+        await websocket.close(code=1008, reason=f"Unknown audio_format {audio_format}")
+        return
+
+    try:
+        session_models = prediction_service.resolve_models(models)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    session_profile = None
+    if profile:
+        if not profiling_authorized(profile_token):
+            await websocket.close(code=1008, reason="Profiling is not enabled for this caller")
+            return
+        session_profile = RequestProfile(f"ws-{client_id}")
+
+    if memory_monitor.draining:
+        # 1013: try again later, on another worker
+        await websocket.close(code=1013, reason="Worker is draining before a restart")
+        return
+
+    state = await _resume_session(client_id, session_models) if resume else None
+    if state is None:
+        state = SessionState(client_id, models=session_models)
+    session_models = state.models
+    await _save_session(state)
+
     await manager.connect(websocket, client_id)
-    logger.info(f"Client {client_id} connected to WebSocket successfully")
+    broker.publish(client_id, {"type": "session", "event": "connected", "resumed": state.resumed > 0})
+    session_latency = latency_registry.start(client_id)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.REALTIME_SESSION_QUEUE_SIZE)
+    reader = asyncio.create_task(_read_frames(websocket, client_id, queue, session_profile, seq=state.last_seq))
+    overload_controller.register(queue)
+    # Decode and normalization write into the session's own buffers; the feature
+    # intermediates use the predicting thread's pool
+    session_buffers = BufferPool()
+    session_memory = memory_monitor.track_session(client_id, session_buffers, queue)
+    messages = state.messages
+    last_result = state.last_result
+    last_sync = time.monotonic()
+    pending_sync = None
+
+    def sync_state():
+        # At most one save in flight; a save that is due while one runs waits for the next message
+        nonlocal last_sync, pending_sync
+        if time.monotonic() - last_sync < settings.SESSION_STORE_SYNC_INTERVAL:
+            return
+        if pending_sync is not None and not pending_sync.done():
+            return
+        last_sync = time.monotonic()
+        pending_sync = asyncio.ensure_future(_save_session(state.copy()))
+
+    # Slows analysis down while this session's predictions stay stable (None when disabled)
+    cadence = cadence_registry.start(client_id)
+
+    # Decoder of a compressed stream, started on its first frame
+    decoder = None
+
+    async def send_reused(record: LatencyRecord, tier, audio: Optional[np.ndarray] = None):
+        # Same accounting and fan-out as an analyzed message, so observers and latency stats see every frame
+        result = {**last_result, "quality_tier": tier.name, "reused": True}
+        record.mark_ready()
+        session_latency.add(record)
+        overload_controller.observe(record.durations["server"])
+        overload_controller.count(tier)
+        sent = {**result, "latency": record.to_response(session_latency.last_send)} if latency else result
+        send_start = time.perf_counter()
+        await manager.send_personal_message(json.dumps(sent), client_id)
+        session_latency.add_send(time.perf_counter() - send_start)
+        broker.publish(client_id, {"type": "prediction", **result})
+        state.add_result(record.seq, last_result)
+        if audio is not None and settings.SESSION_STORE_AUDIO_SECONDS:
+            # Decoded but not analyzed: kept like an analyzed frame, so the kept audio has no gaps
+            state.add_audio(preprocess_audio_chunk(audio, settings.SAMPLE_RATE), settings.SAMPLE_RATE)
+        sync_state()
 
     try:
-        logger.info(f"Starting to receive data from client {client_id}")
         while True:
-            # Receive audio data from the client
-            logger.info(f"Waiting for audio data from client {client_id}")
-            data = await websocket.receive_bytes()
-            logger.info(f"Received audio data from client {client_id}, size: {len(data)} bytes")
+            item = await queue.get()
+            if item is None:
+                break
+            data, record = item
+            record.mark_dequeued()
+            tier = overload_controller.tier
+            messages += 1
 
             try:
-                # The data from browser is in WebM format, we need to process it differently
-                # For now, we'll try to convert it assuming it's raw audio data
-                # In a real implementation, you may need to properly decode the WebM format
-
-                # First, try to handle as raw bytes (might work if MediaRecorder outputs raw PCM)
-                logger.info(f"Attempting to process audio data from client {client_id}")
-                logger.info(f"Raw data size: {len(data)} bytes")
+                # Every frame is decoded, even one the sampled tier will not analyze: a compressed
+                # chunk is part of the decoder's byte stream, and the samples go to the kept audio
+                if decoder is None and audio_format != "pcm":
+                    container = sniff_stream_container(data) if audio_format == "auto" else audio_format
+                    # Once the first frame is raw PCM, later frames are not sniffed
+                    audio_format = container or "pcm"
+                    if container is not None:
+                        try:
+                            decoder = await stream_decoders.acquire(client_id, container)
+                        except StreamDecoderError as e:
+                            logger.error(f"No {container} decoder for client {client_id}: {e}")
+                            await manager.send_personal_message(json.dumps({
+                                "error": "Unsupported audio format", "message": str(e), "seq": record.seq
+                            }), client_id)
+                            # 1013: try again later, perhaps on another worker
+                            await websocket.close(code=1013, reason="No decoder available for compressed audio")
+                            break
+                        logger.info(f"Client {client_id} streams {container} audio; decoder pid {decoder.process.pid}")
 
                 audio_array = None
 
-                # Try different data types to handle potential alignment issues
-                for dtype in [np.int16, np.int32, np.float32]:
-                    try:
-                        # Check if buffer size is a multiple of element size
-                        element_size = np.dtype(dtype).itemsize
-                        if len(data) % element_size == 0:
-                            audio_array = np.frombuffer(data, dtype=dtype)
+                with profile_stage(record, "decode"):
+                    if decoder is not None:
+                        try:
+                            audio_array = await decoder.decode(data, session_buffers)
+                        except StreamDecoderError as e:
+                            logger.error(f"Decoder of client {client_id} failed: {e}")
+                            await websocket.close(code=1011, reason="Audio decoder failed")
+                            break
+                        log_event(decode_logger, logging.DEBUG, "audio_decoded", session=client_id,
+                                  dtype=decoder.audio_format, samples=len(audio_array))
+                    # Raw PCM: try the sample types whose size divides the frame
+                    for dtype in ([] if decoder is not None else [np.int16, np.int32, np.float32]):
+                        try:
+                            # Check if buffer size is a multiple of element size
+                            element_size = np.dtype(dtype).itemsize
+                            if len(data) % element_size == 0:
+                                audio_array = np.frombuffer(data, dtype=dtype)
 
-                            # If it's int16 or int32, convert to float32
-                            if dtype in [np.int16, np.int32]:
-                                max_val = np.iinfo(dtype).max
-                                audio_array = audio_array.astype(np.float32) / max_val
+                                # If it's int16 or int32, convert to float32 (in one pass, into the session buffer)
+                                if dtype in [np.int16, np.int32]:
+                                    audio_array = pcm_to_float(audio_array, session_buffers)
 
-                            logger.info(f"Successfully converted to {dtype}, size: {len(audio_array)}")
-                            break
-                        else:
-                            logger.debug(f"Buffer size not multiple of {dtype} element size, trying next type")
-                    except Exception:
-                        continue  # Try next dtype
+                                log_event(decode_logger, logging.DEBUG, "audio_decoded", session=client_id,
+                                          dtype=np.dtype(dtype).name, samples=len(audio_array))
+                                break
+                        except Exception:
+                            continue  # Try next dtype
 
                 # If all attempts failed, send error message
                 if audio_array is None:
                     logger.error(f"Could not convert audio data from client {client_id} - incompatible format")
                     error_msg = json.dumps({
                         "error": "Unsupported audio format",
-                        "message": f"Cannot process audio data of size {len(data)} bytes"
+                        "message": f"Cannot process audio data of size {len(data)} bytes",
+                        "seq": record.seq
                     })
                     await manager.send_personal_message(error_msg, client_id)
                     continue
 
-                logger.info(f"Audio array shape: {audio_array.shape if hasattr(audio_array, 'shape') else len(audio_array)}")
+                # A compressed chunk may only complete the decoder's input (e.g. the container header)
+                if len(audio_array) == 0:
+                    continue
+
+                # In the sampled tier, windows between analyzed ones repeat the last result
+                if tier.sample_every > 1 and last_result is not None and messages % tier.sample_every:
+                    await send_reused(record, tier, audio_array)
+                    continue
+
+                # While predictions are stable, messages between analyzed ones repeat the last result
+                if cadence is not None and not cadence.should_infer(audio_array) and last_result is not None:
+                    await send_reused(record, tier, audio_array)
+                    continue
 
                 # Preprocess the audio
-                processed_audio = preprocess_audio_chunk(audio_array, settings.SAMPLE_RATE)
-                logger.info("Audio preprocessing completed")
+                with profile_stage(record, "preprocess_chunk"):
+                    # Normalize in place when the samples are already in the session buffer
+                    out = audio_array if audio_array.flags.writeable else session_buffers.get("chunk", len(audio_array), audio_array.dtype)
+                    processed_audio = preprocess_audio_chunk(audio_array, settings.SAMPLE_RATE, out=out)
+
+                # Short frames are analyzed with the session's kept audio (the stored audio after a resume) before them
+                window = state.window(processed_audio, settings.SAMPLE_RATE)
+
+                # Make prediction with the current tier's features; the record times the stages
+                if inference_pool.enabled:
+                    result = await inference_pool.predict(window, settings.SAMPLE_RATE, tier=tier, profile=record,
+                                                            models=session_models)
+                else:
+                    # Off the event loop, so the frame reader keeps receiving (and timestamping) while this runs
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: prediction_service.predict(window, settings.SAMPLE_RATE, profile=record,
+                                                                 plan=tier.plan, models=session_models)
+                    )
+                result["quality_tier"] = tier.name
+                last_result = result
+                if cadence is not None:
+                    cadence.observe(result)
+                log_event(predict_logger, logging.INFO, "prediction", session=client_id,
+                          label=result["label"], confidence=round(result["confidence"], 3), tier=tier.name)
 
-                # Make prediction
-                result = prediction_service.predict(processed_audio, settings.SAMPLE_RATE)
-                logger.info(f"Prediction result for client {client_id}: {result}")
+                record.mark_ready()
+                session_latency.add(record)
+                overload_controller.observe(record.durations["server"])
+                overload_controller.count(tier)
+                if latency:
+                    result = {**result, "latency": record.to_response(session_latency.last_send)}
 
                 # Send prediction result back to client
+                send_start = time.perf_counter()
                 await manager.send_personal_message(json.dumps(result), client_id)
+                session_latency.add_send(time.perf_counter() - send_start)
+
+                # Fan the result out to any observers of this client
+                broker.publish(client_id, {"type": "prediction", **result})
+
+                state.add_result(record.seq, last_result)
+                state.add_audio(processed_audio, settings.SAMPLE_RATE)
+                sync_state()
 
             except Exception as processing_error:
                 logger.error(f"Error processing audio data from client {client_id}: {processing_error}")
                 error_msg = json.dumps({
                     "error": "Error processing audio data",
-                    "message": str(processing_error)
+                    "message": str(processing_error),
+                    "seq": record.seq
                 })
                 await manager.send_personal_message(error_msg, client_id)
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket connection for client {client_id} disconnected by client")
-        manager.disconnect(client_id)
     except Exception as e:
         logger.error(f"Unexpected error in WebSocket connection for client {client_id}: {e}")
-        manager.disconnect(client_id)
\ No newline at end of file
+    finally:
+        reader.cancel()
+        overload_controller.unregister(queue)
+        manager.disconnect(client_id, websocket)
+        memory_monitor.untrack_session(client_id, session_memory)
+        cadence_summary = cadence_registry.finish(client_id, cadence)
+        if cadence_summary is not None:
+            log_event(logger, logging.INFO, "cadence_summary", client_id=client_id, messages=cadence_summary["messages"],
+                      inferences=cadence_summary["inferences"], inference_ratio=cadence_summary["inference_ratio"])
+        decoder_summary = await stream_decoders.release(client_id, decoder)
+        if decoder_summary is not None:
+            log_event(logger, logging.INFO, "decoder_summary", client_id=client_id, format=decoder_summary["format"],
+                      audio_seconds=decoder_summary["audio_seconds"], cpu_seconds=decoder_summary["cpu_seconds"],
+                      bandwidth_ratio=decoder_summary["bandwidth_ratio"])
+        session_buffers.clear()
+        sampler.forget(client_id)
+        summary = latency_registry.finish(client_id, session_latency)
+        server_stage = summary["stages"].get("server", {})
+        log_event(logger, logging.INFO, "latency_summary", client_id=client_id, messages=summary["messages"],
+                  server_p50_ms=server_stage.get("p50_ms"), server_p95_ms=server_stage.get("p95_ms"),
+                  slo_met_ratio=summary["slo_met_ratio"])
+        if session_profile is not None:
+            profile_path = session_profile.dump()
+            logger.info(f"Profile for client {client_id} written to {profile_path}: {session_profile.summary()}")
+        broker.publish(client_id, {"type": "session", "event": "disconnected", "latency": summary})
+        if pending_sync is not None:
+            await asyncio.gather(pending_sync, return_exceptions=True)
+        state.connected = False
+        await _save_session(state, final=True)
+
+
+async def _resume_session(client_id: str, models: Optional[List[str]]) -> Optional[SessionState]:
+    """
+    Load a client's stored session and take it over on this worker.
+
+    Models asked for on the new connection replace the stored ones; stored models that
+    are no longer served are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        state = await loop.run_in_executor(None, session_store.get, client_id)
+    except Exception as e:
+        logger.error(f"Could not load session state of client {client_id}: {e}")
+        return None
+    if state is None:
+        return None
+
+    if models is None and state.models:
+        try:
+            models = prediction_service.resolve_models(state.models)
+        except ValueError:
+            logger.warning(f"Stored models {state.models} of client {client_id} are not all served; resuming without them")
+            models = None
+    logger.info(f"Client {client_id} resumes its session from node {state.node} "
+                f"({state.messages} messages, last seq {state.last_seq}, {'open' if state.connected else 'closed'})")
+    state.models = models
+    state.node = settings.NODE_ID
+    state.connection_id = uuid.uuid4().hex
+    state.connected = True
+    state.resumed += 1
+    return state
+
+
+async def _save_session(state: SessionState, final: bool = False):
+    """
+    Write a session state to the store off the event loop; store errors are logged, never raised.
+
+    The final save of a connection is skipped when the client has already reconnected
+    elsewhere, so the newer connection's state is not overwritten.
+    """
+    loop = asyncio.get_running_loop()
+
+    def save():
+        if final:
+            stored = session_store.get(state.client_id)
+            if stored is not None and stored.connection_id != state.connection_id:
+                return
+        session_store.put(state)
+
+    try:
+        await loop.run_in_executor(None, save)
+    except Exception as e:
+        logger.error(f"Could not save session state of client {state.client_id}: {e}")
+
+
+async def _read_frames(websocket: WebSocket, client_id: str, queue: asyncio.Queue, session_profile, seq: int = 0):
+    """
+    Read frames from a realtime session into its queue, ending with None on disconnect.
+
+    Text frames carry optional metadata for the next audio frame; binary frames carry audio
+    and are queued with a LatencyRecord stamped when they came off the socket. Server-side
+    numbering continues from seq (the last sequence number of a resumed session).
+    """
+    meta: Dict[str, Any] = {}
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("text") is not None:
+                try:
+                    frame = json.loads(message["text"])
+                except ValueError:
+                    logger.warning(f"Ignoring non-JSON text frame from client {client_id}")
+                    continue
+                if isinstance(frame, dict) and frame.get("type") == "meta":
+                    meta = frame
+                continue
+
+            data = message.get("bytes")
+            if data is None:
+                continue
+            seq = meta["seq"] if isinstance(meta.get("seq"), int) else seq + 1
+            capture_ts = meta.get("capture_ts") if isinstance(meta.get("capture_ts"), (int, float)) else None
+            meta = {}
+            record = LatencyRecord(seq, capture_ts, profile=session_profile)
+            log_event(receive_logger, logging.DEBUG, "audio_received", session=client_id, bytes=len(data), seq=seq)
+
+            await queue.put((data, record))
+            record.mark_enqueued()
+    except Exception as e:
+        logger.error(f"Error reading from client {client_id}: {e}")
+    finally:
+        # Never await here: after reader.cancel() nothing drains a full queue, so a blocking
+        # put would hang. The oldest frame makes room for the end marker instead.
+        try:
+            queue.put_nowait(None)
+        except asyncio.QueueFull:
+            queue.get_nowait()
+            queue.put_nowait(None)
+
+
+@router.get("/latency/{client_id}",
+            summary="Realtime latency summary",
+            description="Per-stage latency percentiles of an active session, or of a recently finished one")
+async def latency_summary(client_id: str) -> Dict[str, Any]:
+    """
+    Get the latency summary of a realtime session.
+
+    Args:
+        client_id: Session client id
+
+    Returns:
+        Dictionary with per-stage count/mean/percentiles and SLO attainment
+    """
+    summary = latency_registry.get(client_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No latency summary for this client")
+    return summary
+
+
+@router.get("/sessions", dependencies=[Depends(require_admin)],
+            summary="Stored realtime sessions",
+            description="Client ids with a stored session state, on any worker sharing the session store")
+async def list_sessions() -> Dict[str, Any]:
+    # Client ids let anyone resume or read a session, so the listing needs the admin token
+    loop = asyncio.get_running_loop()
+    client_ids = await loop.run_in_executor(None, session_store.client_ids)
+    return {"store": session_store.name, "node": settings.NODE_ID, "sessions": client_ids}
+
+
+@router.get("/sessions/{client_id}", dependencies=[Depends(require_admin)],
+            summary="Stored realtime session",
+            description="Owner node, sequence numbers, last result and recent results of a live or recently closed session")
+async def get_session(client_id: str) -> Dict[str, Any]:
+    """
+    Get the stored state of a realtime session, from whichever worker owns it.
+
+    Args:
+        client_id: Session client id
+
+    Returns:
+        Dictionary with the session metadata, last result, result history and stored audio length
+    """
+    loop = asyncio.get_running_loop()
+    state = await loop.run_in_executor(None, session_store.get, client_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No stored session for this client")
+    return state.describe()
+
+
+@router.websocket("/observe")
+async def observer_endpoint(
+    websocket: WebSocket,
+    client_ids: str = Query(..., description="Comma-separated client ids to watch"),
+    token: Optional[str] = Query(None, description="Token checked against PROFILING_TOKEN")
+):
+    """
+    Read-only WebSocket endpoint streaming the predictions of other clients.
+
+    Every message carries the client_id it belongs to. Observers never cause audio to be
+    processed again; they receive the results already published by each session.
+
+    Other users' predictions are private, so observing is off unless OBSERVE_ENABLED is
+    set, and even then needs the PROFILING_TOKEN.
+
+    Args:
+        websocket: WebSocket connection object
+        client_ids: Comma-separated list of client ids to subscribe to
+        token: Access token (browsers cannot set headers on a WebSocket handshake)
+    """
+    if not settings.OBSERVE_ENABLED or not profiling_authorized(token):
+        await websocket.close(code=1008, reason="Observing is not enabled for this caller")
+        return
+
+    watched = [client_id.strip() for client_id in client_ids.split(",") if client_id.strip()]
+    if not watched or len(watched) > settings.MAX_OBSERVED_CLIENTS:
+        await websocket.close(code=1008, reason=f"Subscribe to between 1 and {settings.MAX_OBSERVED_CLIENTS} client ids")
+        return
+
+    await websocket.accept()
+    subscriber = Subscriber(websocket, watched)
+    broker.subscribe(subscriber)
+    sender = asyncio.create_task(subscriber.run())
+    logger.info(f"Observer subscribed to {len(watched)} clients")
+
+    try:
+        # Incoming messages are ignored; receiving only detects the disconnect
+        while not sender.done():
+            receiver = asyncio.create_task(websocket.receive())
+            done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+            else:
+                receiver.cancel()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Unexpected error in observer connection: {e}")
+    finally:
+        broker.unsubscribe(subscriber)
+        sender.cancel()
+        logger.info(f"Observer of {len(watched)} clients disconnected, delivered {subscriber.delivered}, dropped {subscriber.dropped}")
+
+
+@router.get("/overload",
+            summary="Realtime overload controller state",
+            description="Current quality tier, load signals and messages served per tier")
+async def overload_stats() -> Dict[str, Any]:
+    """
+    Get the state of the realtime overload controller.
+
+    Returns:
+        Dictionary with the current tier, load, smoothed latency and queue backlog
+    """
+    return overload_controller.stats()
+
+
+@router.get("/inference",
+            summary="Inference worker pool state",
+            description="Workers, shared memory slots and request counters of the process-based inference pool")
+async def inference_stats() -> Dict[str, Any]:
+    """
+    Get the state of the inference worker pool.
+
+    Returns:
+        Dictionary with per-worker in-flight counts, free slots, restarts and fallbacks
+    """
+    return inference_pool.stats()
+
+
+@router.get("/cadence", dependencies=[Depends(require_admin)],
+            summary="Realtime inference cadence",
+            description="Per-session cadence intervals and effective inferences per second")
+async def cadence_stats() -> Dict[str, Any]:
+    """
+    Get the stability-adaptive cadence of realtime sessions.
+
+    Returns:
+        Dictionary with the overall inference ratio and, per live session, its interval,
+        messages and inferences per second and snap-back counts
+    """
+    return cadence_registry.stats()
+
+
+@router.get("/decoders", dependencies=[Depends(require_admin)],
+            summary="Compressed realtime audio decoders",
+            description="Per-session decoder processes, their CPU time per second of audio and bandwidth")
+async def decoder_stats() -> Dict[str, Any]:
+    """
+    Get the streaming decoders of realtime sessions sending WebM or Ogg audio.
+
+    Returns:
+        Dictionary with decoder capacity and totals and, per live session, bytes received,
+        audio decoded, CPU seconds per audio second and the wait per chunk
+    """
+    return stream_decoders.stats()
+
+
+@router.get("/observe/stats",
+            summary="Observer fan-out statistics",
+            description="Publish, delivery and drop counters for realtime observers")
+async def observer_stats() -> Dict[str, Any]:
+    """
+    Get fan-out statistics for realtime observers.
+
+    Returns:
+        Dictionary with publish/delivery/drop counters and fan-out cost
+    """
+    return broker.stats()
\ No newline at end of file
@@ -0,0 +1,142 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, status
+from typing import Dict, Any, Optional
+import asyncio
+import logging
+
+from services.waveform_preview import WaveformPreview, content_id, read_waveform_preview, waveform_cache
+from preprocessing.audio_decoding import stream_audio
+from utils.audio_headers import probe_audio, validate_audio_header, AudioHeaderError
+from config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/waveform")
+
+@router.post("/",
+             summary="Waveform preview of an audio file",
+             description="Upload an audio file and get its zoom levels and the peaks for a display width")
+async def create_waveform(
+    file: UploadFile = File(...),
+    width: int = Query(1000, ge=1, description="Display width in buckets; the coarsest level with at least this many is returned")
+) -> Dict[str, Any]:
+    """
+    Build (or look up) the waveform preview of an uploaded file.
+
+    Files already analyzed with waveform=true through /predict/file or /predict/file/stream
+    are found by their content hash and are not decoded again.
+
+    Args:
+        file: The audio file (WAV, MP3, etc.)
+        width: Number of min/max buckets the client wants to draw
+
+    Returns:
+        The preview metadata (audio_id, zoom levels, mel size) and the peaks of one level
+    """
+    file_ext = file.filename.split(".")[-1].lower()
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type {file_ext} not supported. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+        )
+
+    file_content = await file.read()
+    if len(file_content) > settings.MAX_STREAM_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size is {settings.MAX_STREAM_FILE_SIZE / (1024*1024):.1f}MB"
+        )
+
+    audio_id = content_id(file_content)
+    preview = waveform_cache.get(audio_id)
+    if preview is None:
+        try:
+            header = probe_audio(file_content)
+        except AudioHeaderError as e:
+            logger.warning(f"Rejected upload {file.filename}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file is not a valid audio file"
+            )
+        is_valid, error_message = validate_audio_header(header, max_duration=settings.MAX_STREAM_DURATION)
+        if not is_valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error_message
+            )
+
+        loop = asyncio.get_running_loop()
+        try:
+            preview = await loop.run_in_executor(None, lambda: read_waveform_preview(
+                audio_id, stream_audio(file_content, settings.DURATION, fmt=header.format), header.duration
+            ))
+        except Exception as e:
+            logger.error(f"Error building waveform preview for file {file.filename}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file is not a valid audio file"
+            )
+        waveform_cache.put(preview)
+        logger.info(f"Waveform preview built for file {file.filename} ({preview.duration:.1f}s)")
+
+    return {**preview.describe(), "peaks": preview.peaks(preview.level_for_width(width))}
+
+
+@router.get("/stats",
+            summary="Waveform cache statistics",
+            description="Entries, size and hit counts of the waveform preview cache")
+async def waveform_stats() -> Dict[str, Any]:
+    return waveform_cache.stats()
+
+
+@router.get("/{audio_id}",
+            summary="Waveform preview metadata",
+            description="Zoom levels and mel size of a cached preview")
+async def get_waveform(audio_id: str) -> Dict[str, Any]:
+    return _cached(audio_id).describe()
+
+
+@router.get("/{audio_id}/peaks",
+            summary="Waveform peaks",
+            description="Min/max peaks of one zoom level, optionally for a time range")
+async def get_waveform_peaks(
+    audio_id: str,
+    level: Optional[int] = Query(None, ge=0, description="Zoom level (0 is the finest)"),
+    width: int = Query(1000, ge=1, description="Used to pick the level when none is given; counts buckets within the range"),
+    start: float = Query(0.0, ge=0, description="Range start in seconds"),
+    end: Optional[float] = Query(None, gt=0, description="Range end in seconds; the end of the audio if omitted")
+) -> Dict[str, Any]:
+    """
+    Peaks of a cached preview for the zoom level a client needs.
+
+    Args:
+        audio_id: Content id returned by /waveform/ or the prediction endpoints
+        level: Explicit zoom level
+        width: Buckets to draw for the range, when no level is given
+        start: Range start in seconds
+        end: Range end in seconds
+
+    Returns:
+        The level's bucket length and int8 min/max values (divide by "scale" for amplitude)
+    """
+    preview = _cached(audio_id)
+    if level is None:
+        # Scale the width to the whole file so the chosen level has ~width buckets in the range
+        span = (end if end is not None else preview.duration) - start
+        level = preview.level_for_width(int(width * preview.duration / span)) if span > 0 else 0
+    try:
+        return preview.peaks(level, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/{audio_id}/mel",
+            summary="Log-mel spectrogram preview",
+            description="Downsampled log-mel spectrogram of a cached preview as 8-bit columns")
+async def get_waveform_mel(audio_id: str) -> Dict[str, Any]:
+    return _cached(audio_id).mel_preview()
+
+
+def _cached(audio_id: str) -> WaveformPreview:
+    preview = waveform_cache.get(audio_id)
+    if preview is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Waveform preview not found; upload the file to /waveform/")
+    return preview
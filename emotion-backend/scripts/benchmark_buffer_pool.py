@@ -0,0 +1,127 @@
+"""
+Measure allocation churn and latency of the realtime decode-to-prediction path with and without buffer pooling.
+
+Every mode runs in a fresh interpreter (BUFFER_POOL_ENABLED=false, then true) and
+pushes int16 messages through the same steps as a realtime session: PCM conversion,
+chunk normalization, feature extraction and prediction. It reports, per prediction,
+the pooled-site allocations (buffers that would be, or are, reused), the transient
+peak of numpy allocations seen by tracemalloc, latency percentiles, and how resident
+memory moved over the run. It also checks that both modes produce identical feature
+vectors.
+
+Usage (from the emotion-backend directory):
+    python scripts/benchmark_buffer_pool.py --messages 2000
+    python scripts/benchmark_buffer_pool.py --backends librosa numpy --seconds 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _child(messages: int, seconds: float):
+    sys.path.insert(0, BACKEND_DIR)
+    import numpy as np
+    from config import settings
+    from preprocessing.audio_processing import pcm_to_float, preprocess_audio_chunk
+    from services.prediction_service import prediction_service
+    from utils.buffer_pool import BufferPool, thread_buffer_pool
+
+    rng = np.random.default_rng(0)
+    samples = int(settings.SAMPLE_RATE * seconds)
+    payloads = [(rng.standard_normal(samples) * 3000).astype(np.int16).tobytes() for _ in range(8)]
+    session_buffers = BufferPool()
+
+    def run(data: bytes):
+        audio = pcm_to_float(np.frombuffer(data, dtype=np.int16), session_buffers)
+        audio = preprocess_audio_chunk(audio, settings.SAMPLE_RATE, out=audio)
+        return prediction_service.predict(audio, settings.SAMPLE_RATE)
+
+    def allocations() -> int:
+        return session_buffers.allocations + thread_buffer_pool().allocations
+
+    for data in payloads:
+        run(data)
+    rss_start = _rss_mib()
+    allocations_start = allocations()
+
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        run(payloads[i % len(payloads)])
+        latencies.append(time.perf_counter() - start)
+    allocations_per_prediction = (allocations() - allocations_start) / messages
+    rss_end = _rss_mib()
+
+    tracemalloc.start()
+    peaks = []
+    for i in range(min(messages, 50)):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        run(payloads[i % len(payloads)])
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    audio = pcm_to_float(np.frombuffer(payloads[0], dtype=np.int16), session_buffers)
+    features = prediction_service.audio_to_features(preprocess_audio_chunk(audio, settings.SAMPLE_RATE, out=audio),
+                                                    settings.SAMPLE_RATE)
+    latencies.sort()
+    print(json.dumps({
+        "pooled_allocations": allocations_per_prediction,
+        "transient_peak_mib": sorted(peaks)[len(peaks) // 2] / (1024 * 1024),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "rss_growth_mib": rss_end - rss_start,
+        "pool_mib": (session_buffers.nbytes + thread_buffer_pool().nbytes) / (1024 * 1024),
+        "features": features.tolist(),
+    }))
+
+
+def _run(backend: str, pooled: bool, messages: int, seconds: float) -> dict:
+    env = {**os.environ, "FEATURE_BACKEND": backend, "BUFFER_POOL_ENABLED": str(pooled).lower(),
+           "LOG_LEVEL": "WARNING", "TF_CPP_MIN_LOG_LEVEL": "3"}
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--messages", str(messages),
+                             "--seconds", str(seconds)], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["librosa", "numpy"])
+    parser.add_argument("--messages", type=int, default=1000, help="Predictions per mode")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Audio per message")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.messages, args.seconds)
+        return
+
+    columns = ("pooled_allocations", "transient_peak_mib", "p50_ms", "p99_ms", "rss_growth_mib", "pool_mib")
+    print(f"{'backend':<8} {'pooling':<8} " + " ".join(columns))
+    identical = True
+    for backend in args.backends:
+        runs = {pooled: _run(backend, pooled, args.messages, args.seconds) for pooled in (False, True)}
+        for pooled, result in runs.items():
+            print(f"{backend:<8} {'on' if pooled else 'off':<8} "
+                  + " ".join(f"{result[column]:{len(column)}.2f}" for column in columns))
+        identical &= runs[False]["features"] == runs[True]["features"]
+
+    if not identical:
+        print("\nPooled and unpooled feature vectors differ")
+        sys.exit(1)
+    print("\nPooled and unpooled feature vectors are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measure the event-loop time spent logging on the realtime hot path.
+
+Replays the per-message logging of websocket_endpoint for many sessions twice:
+once the old way (eight synchronous logger.info calls writing straight to a file,
+one of them formatting the whole result dict) and once through the queued,
+sampled structured logging in utils/logging_config. Only time spent in the
+calling thread is counted, since that is what blocks the event loop.
+
+Usage (from the emotion-backend directory):
+    python scripts/benchmark_logging.py --sessions 100 --messages 50
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from utils.logging_config import DeferredQueueHandler, KeyValueFormatter, SessionEventSampler, log_event
+import utils.logging_config as logging_config
+
+RESULT = {
+    "label": "happy",
+    "confidence": 0.8123,
+    "class_probs": {label: 1.0 / len(settings.EMOTION_LABELS) for label in settings.EMOTION_LABELS},
+}
+
+
+def _legacy_message(logger: logging.Logger, client_id: str, size: int):
+    logger.info(f"Waiting for audio data from client {client_id}")
+    logger.info(f"Received audio data from client {client_id}, size: {size} bytes")
+    logger.info(f"Attempting to process audio data from client {client_id}")
+    logger.info(f"Raw data size: {size} bytes")
+    logger.info(f"Successfully converted to int16, size: {size // 2}")
+    logger.info(f"Audio array shape: {(size // 2,)}")
+    logger.info("Audio preprocessing completed")
+    logger.info(f"Prediction result for client {client_id}: {RESULT}")
+
+
+def _structured_message(loggers, client_id: str, size: int):
+    receive_logger, decode_logger, predict_logger = loggers
+    log_event(receive_logger, logging.DEBUG, "audio_received", session=client_id, bytes=size)
+    log_event(decode_logger, logging.DEBUG, "audio_decoded", session=client_id, dtype="int16", samples=size // 2)
+    log_event(predict_logger, logging.INFO, "prediction", session=client_id,
+              label=RESULT["label"], confidence=round(RESULT["confidence"], 3))
+
+
+def _run(name: str, send_one, sessions: int, messages: int) -> float:
+    size = settings.SAMPLE_RATE * settings.DURATION * 2
+    start = time.perf_counter()
+    for _ in range(messages):
+        for session in range(sessions):
+            send_one(f"client-{session}", size)
+    elapsed = time.perf_counter() - start
+    total = sessions * messages
+    print(f"{name:<12} {elapsed * 1000:10.1f} ms total {elapsed / total * 1e6:10.2f} us/message")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=50, help="Messages per session")
+    parser.add_argument("--rate", type=float, default=settings.LOG_SESSION_EVENTS_PER_SECOND,
+                        help="Sampled events per second per session")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Old behaviour: synchronous formatting and file writes in the calling thread
+        legacy_logger = logging.getLogger("benchmark.legacy")
+        legacy_logger.propagate = False
+        legacy_logger.setLevel(logging.INFO)
+        legacy_handler = logging.FileHandler(os.path.join(log_dir, "legacy.log"))
+        legacy_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        legacy_logger.addHandler(legacy_handler)
+        legacy = _run("legacy", lambda c, s: _legacy_message(legacy_logger, c, s), args.sessions, args.messages)
+        legacy_handler.close()
+
+        # New behaviour: sampled structured records handed to a background writer thread
+        logging_config.sampler = SessionEventSampler(args.rate)
+        log_queue = queue.Queue(-1)
+        file_handler = logging.FileHandler(os.path.join(log_dir, "structured.log"))
+        file_handler.setFormatter(KeyValueFormatter())
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        loggers = []
+        for stage, level in (("receive", logging.INFO), ("decode", logging.INFO), ("predict", logging.INFO)):
+            stage_logger = logging.getLogger(f"benchmark.realtime.{stage}")
+            stage_logger.propagate = False
+            stage_logger.setLevel(level)
+            stage_logger.addHandler(DeferredQueueHandler(log_queue))
+            loggers.append(stage_logger)
+        structured = _run("structured", lambda c, s: _structured_message(loggers, c, s), args.sessions, args.messages)
+        listener.stop()
+        file_handler.close()
+
+        legacy_lines = sum(1 for _ in open(os.path.join(log_dir, "legacy.log")))
+        structured_lines = sum(1 for _ in open(os.path.join(log_dir, "structured.log")))
+
+    print(f"\nEvent-loop time reclaimed: {(legacy - structured) * 1000:.1f} ms "
+          f"({(1 - structured / legacy) * 100:.1f}%)")
+    print(f"Log lines written: legacy {legacy_lines}, structured {structured_lines}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure the cross-process cost of handing audio windows to a worker process.
+
+Round-trips windows of increasing length to an echo worker twice: once by pickling
+the array through a pipe (what a plain multiprocessing queue does) and once through
+the shared-memory slot ring in services/shm_transport, where only a SlotDescriptor
+crosses the pipe and the worker writes a probability row back in place. The worker
+does no inference, so the numbers are pure transport overhead.
+
+Usage (from the emotion-backend directory):
+    python scripts/benchmark_shm_transport.py --seconds 1 3 10 30 --messages 500
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from services.shm_transport import SlotDescriptor, SlotRing
+
+NUM_CLASSES = len(settings.EMOTION_LABELS)
+
+
+def _pickle_worker(conn):
+    while True:
+        audio = conn.recv()
+        if audio is None:
+            break
+        conn.send(np.full(NUM_CLASSES, float(audio[-1]), dtype=np.float32))
+
+
+def _ring_worker(conn, layout):
+    ring = SlotRing.attach(layout)
+    while True:
+        descriptor = conn.recv()
+        if descriptor is None:
+            break
+        ring.output_view(descriptor.slot)[0, :] = ring.audio_view(descriptor)[-1]
+        conn.send(descriptor.request_id)
+    ring.close()
+
+
+def _run_pickle(context, windows, messages: int) -> float:
+    parent, child = context.Pipe()
+    worker = context.Process(target=_pickle_worker, args=(child,))
+    worker.start()
+    parent.send(windows[0][:1])
+    parent.recv()
+    start = time.perf_counter()
+    for i in range(messages):
+        parent.send(windows[i % len(windows)])
+        parent.recv()
+    elapsed = time.perf_counter() - start
+    parent.send(None)
+    worker.join()
+    return elapsed
+
+
+def _run_ring(context, windows, messages: int) -> float:
+    ring = SlotRing.create(len(windows), len(windows[0]), 1, NUM_CLASSES)
+    parent, child = context.Pipe()
+    worker = context.Process(target=_ring_worker, args=(child, ring.layout))
+    worker.start()
+    try:
+        start = None
+        for i in range(-1, messages):
+            if i == 0:
+                start = time.perf_counter()
+            slot = max(i, 0) % len(windows)
+            length = ring.write_audio(slot, windows[slot])
+            parent.send(SlotDescriptor(i, slot, "audio", length, 1, settings.SAMPLE_RATE, 0))
+            parent.recv()
+            ring.output_view(slot).copy()
+        elapsed = time.perf_counter() - start
+        parent.send(None)
+        worker.join()
+    finally:
+        ring.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1, 3, 10, 30], help="Window lengths")
+    parser.add_argument("--messages", type=int, default=500, help="Round trips per window length")
+    parser.add_argument("--slots", type=int, default=8)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'window':>8} {'pickle us/msg':>14} {'shm us/msg':>12}")
+    for seconds in args.seconds:
+        samples = int(settings.SAMPLE_RATE * seconds)
+        windows = [np.random.randn(samples).astype(np.float32) for _ in range(args.slots)]
+        pickled = _run_pickle(context, windows, args.messages)
+        shared = _run_ring(context, windows, args.messages)
+        print(f"{seconds:>7.1f}s {pickled / args.messages * 1e6:14.1f} {shared / args.messages * 1e6:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
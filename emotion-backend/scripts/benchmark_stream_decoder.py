@@ -0,0 +1,101 @@
+"""
+Measure what streaming decode of compressed realtime audio costs per session.
+
+The file is encoded to WebM/Opus (or Ogg/Opus) once and cut into chunks of the given
+duration, as MediaRecorder would send them. N concurrent sessions then each feed the
+chunks, paced in real time unless --fast is given, through their own StreamingDecoder.
+The script reports the decoder CPU seconds per second of audio (the cores needed per
+stream), the wait per chunk, and the compressed bandwidth relative to 16-bit PCM.
+
+Needs ffmpeg (FFMPEG_PATH).
+
+Usage (from the emotion-backend directory):
+    python scripts/benchmark_stream_decoder.py speech.wav
+    python scripts/benchmark_stream_decoder.py speech.wav --format ogg --streams 32 --chunk 0.25 --fast
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import librosa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from preprocessing.stream_decoding import STREAM_CONTAINERS, StreamingDecoder
+
+
+def encode(path: str, audio_format: str, bitrate: str) -> bytes:
+    command = [
+        shutil.which(settings.FFMPEG_PATH), "-hide_banner", "-loglevel", "error", "-i", path,
+        "-ac", "1", "-c:a", "libopus", "-b:a", bitrate, "-f", "webm" if audio_format == "webm" else "ogg", "pipe:1"
+    ]
+    return subprocess.run(command, stdout=subprocess.PIPE, check=True).stdout
+
+
+def split(data: bytes, chunks: int) -> list:
+    # Byte ranges of equal size approximate MediaRecorder's timesliced chunks closely enough for cost
+    size = max(1, len(data) // chunks)
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+async def run_session(chunks: list, audio_format: str, chunk_seconds: float, fast: bool) -> dict:
+    decoder = StreamingDecoder(audio_format)
+    await decoder.start()
+    try:
+        for chunk in chunks:
+            sent = time.perf_counter()
+            await decoder.decode(chunk)
+            if not fast:
+                await asyncio.sleep(max(0.0, chunk_seconds - (time.perf_counter() - sent)))
+    finally:
+        await decoder.close()
+    return decoder.stats()
+
+
+async def benchmark(chunks: list, args) -> list:
+    return await asyncio.gather(*(run_session(chunks, args.format, args.chunk, args.fast) for _ in range(args.streams)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="Audio file to encode and stream")
+    parser.add_argument("--format", choices=sorted(STREAM_CONTAINERS), default="webm")
+    parser.add_argument("--bitrate", default="32k", help="Opus bitrate")
+    parser.add_argument("--chunk", type=float, default=settings.DURATION, help="Seconds of audio per chunk")
+    parser.add_argument("--streams", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--fast", action="store_true", help="Send chunks back to back instead of in real time")
+    args = parser.parse_args()
+
+    if shutil.which(settings.FFMPEG_PATH) is None:
+        sys.exit(f"ffmpeg ({settings.FFMPEG_PATH}) is not available; streaming decode needs it")
+
+    data = encode(args.file, args.format, args.bitrate)
+    duration = librosa.get_duration(path=args.file)
+    chunks = split(data, max(1, round(duration / args.chunk)))
+
+    start = time.perf_counter()
+    results = asyncio.run(benchmark(chunks, args))
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = sum(r["audio_seconds"] for r in results)
+    cpu_seconds = sum(r["cpu_seconds"] for r in results)
+    waits = [r["decode_wait_ms_per_chunk"] for r in results if r["decode_wait_ms_per_chunk"] is not None]
+    ratios = [r["bandwidth_ratio"] for r in results if r["bandwidth_ratio"] is not None]
+    print(f"{args.streams} {args.format} streams, {len(chunks)} chunks of {len(data) // len(chunks)} bytes each, "
+          f"{elapsed:.1f}s wall")
+    if audio_seconds:
+        print(f"Decoded {audio_seconds:.1f}s of audio with {cpu_seconds:.2f} decoder CPU seconds: "
+              f"{cpu_seconds / audio_seconds:.4f} cores per realtime stream")
+    if waits:
+        print(f"Wait per chunk: {sum(waits) / len(waits):.1f} ms mean, {max(waits):.1f} ms worst session")
+    if ratios:
+        print(f"Bandwidth: {sum(ratios) / len(ratios):.1%} of 16-bit PCM at {settings.SAMPLE_RATE} Hz")
+
+
+if __name__ == "__main__":
+    main()
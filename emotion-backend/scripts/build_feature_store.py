@@ -0,0 +1,113 @@
+"""
+Extract feature vectors for a corpus of audio files into a feature store.
+
+Walks the given files and directories, decodes each new audio file once and appends
+its unscaled feature vector to the store. Files already indexed with the same content
+are skipped, and files whose content is already stored under another path only get an
+index entry, so re-running the tool over a growing archive only extracts what is new.
+
+Usage (from the emotion-backend directory):
+    python scripts/build_feature_store.py /data/archive --store feature_store
+    python scripts/build_feature_store.py new_calls/*.wav --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings, resolve_path
+from preprocessing.audio_processing import decode_audio_file, preprocess_audio_chunk
+from services.feature_store import FeatureStore, file_sha256
+from services.prediction_service import prediction_service
+
+
+def _audio_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.rsplit(".", 1)[-1].lower() in settings.ALLOWED_EXTENSIONS:
+                        yield os.path.abspath(os.path.join(root, name))
+        elif os.path.isfile(path):
+            yield os.path.abspath(path)
+
+
+def _extract(path: str):
+    """Hash and featurize one file the same way /predict/file does."""
+    sha256 = file_sha256(path)
+    try:
+        decoded = decode_audio_file(path)
+        audio = preprocess_audio_chunk(decoded.audio, decoded.sample_rate)
+        return path, sha256, prediction_service.audio_to_features(audio, decoded.sample_rate), None
+    except Exception as e:
+        return path, sha256, None, str(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Audio files or directories to index")
+    parser.add_argument("--store", default=settings.FEATURE_STORE_DIR, help="Feature store directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Files decoded concurrently")
+    parser.add_argument("--flush-every", type=int, default=256, help="Vectors buffered before each append")
+    args = parser.parse_args()
+
+    store_dir = resolve_path(args.store)
+    store = None
+    if os.path.exists(os.path.join(store_dir, "meta.json")):
+        store = FeatureStore.open(store_dir, feature_config=prediction_service.feature_config, sample_rate=settings.SAMPLE_RATE)
+        print(f"Opened {store_dir}: {len(store)} files, {store.num_rows} vectors")
+
+    start = time.perf_counter()
+    pending = []
+    extracted = skipped = linked = failed = 0
+
+    def flush():
+        nonlocal store, pending
+        if not pending:
+            return
+        if store is None:
+            store = FeatureStore.open(
+                store_dir,
+                dimension=len(next(f for _, _, f in pending if f is not None)),
+                feature_config=prediction_service.feature_config,
+                sample_rate=settings.SAMPLE_RATE,
+                create=True
+            )
+        store.append(pending)
+        pending = []
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        to_extract = []
+        for path in _audio_files(args.paths):
+            sha256 = file_sha256(path)
+            if store is not None and store.has(path, sha256):
+                skipped += 1
+            elif store is not None and store.row_for_hash(sha256) is not None:
+                pending.append((path, sha256, None))
+                linked += 1
+            else:
+                to_extract.append(path)
+
+        for path, sha256, features, error in executor.map(_extract, to_extract):
+            if error is not None:
+                print(f"  failed {path}: {error}", file=sys.stderr)
+                failed += 1
+                continue
+            pending.append((path, sha256, features))
+            extracted += 1
+            if len(pending) >= args.flush_every:
+                flush()
+                print(f"  {extracted}/{len(to_extract)} extracted")
+        flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nExtracted {extracted}, linked {linked} duplicates, skipped {skipped} unchanged, failed {failed} in {elapsed:.1f}s")
+    if store is not None:
+        print(f"Store {store_dir}: {len(store)} files, {store.num_rows} vectors of {store.dimension} features")
+
+
+if __name__ == "__main__":
+    main()
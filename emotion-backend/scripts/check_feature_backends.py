@@ -0,0 +1,114 @@
+"""
+Check that the numpy feature backend matches the librosa backend.
+
+Compiles the configured feature plan (and the overload tiers' derived plans) with
+both backends and compares their feature vectors on synthetic signals (noise,
+tones, chirps, silence, clips shorter than one FFT frame, float64 input) and,
+optionally, on real audio files. Prints the worst absolute and relative error per
+feature block and exits non-zero when any exceeds the tolerance, so it can gate an
+image build that sets FEATURE_BACKEND=numpy.
+
+Usage (from the emotion-backend directory):
+    python scripts/check_feature_backends.py
+    python scripts/check_feature_backends.py --audio /data/samples --rtol 1e-5
+"""
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from preprocessing.audio_processing import decode_audio_file
+from preprocessing.feature_extraction import load_feature_config
+from preprocessing.feature_plan import compile_feature_plan, derive_feature_plan
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3", ".m4a")
+
+
+def _synthetic_signals(sample_rate: int, seconds: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    yield "noise", (rng.standard_normal(len(t)) * 0.1).astype(np.float32)
+    yield "tone_443hz", np.sin(2 * np.pi * 443 * t).astype(np.float32)
+    yield "chirp", np.sin(2 * np.pi * (100 + 400 * t) * t).astype(np.float32)
+    yield "tone_plus_noise", (np.sin(2 * np.pi * 220 * t) + rng.standard_normal(len(t)) * 0.3).astype(np.float32)
+    yield "silence", np.zeros(len(t), dtype=np.float32)
+    yield "shorter_than_frame", rng.standard_normal(settings.N_FFT // 3).astype(np.float32)
+    yield "float64", rng.standard_normal(len(t))
+
+
+def _audio_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _normalized(audio: np.ndarray) -> np.ndarray:
+    peak = np.max(np.abs(audio)) if len(audio) else 0
+    return audio / peak if peak > 0 else audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", nargs="*", default=[], help="Audio files or directories to compare on")
+    parser.add_argument("--rtol", type=float, default=1e-5, help="Allowed relative error")
+    parser.add_argument("--atol", type=float, default=1e-6, help="Allowed absolute error")
+    args = parser.parse_args()
+
+    config = load_feature_config()
+    plans = [("configured", compile_feature_plan(config, settings.SAMPLE_RATE, backend="librosa"),
+              compile_feature_plan(config, settings.SAMPLE_RATE, backend="numpy"))]
+    if plans[0][1].input_mode == "raw":
+        print("The configured plan takes raw samples; there are no features to compare")
+        return
+    skip = [name.strip() for name in settings.OVERLOAD_SKIP_FEATURES.split(",") if name.strip()]
+    derived = dict(sample_rate=settings.SAMPLE_RATE, hop_factor=settings.OVERLOAD_COARSE_HOP_FACTOR, skip=skip)
+    plans.append(("reduced_tier", derive_feature_plan(config, backend="librosa", **derived),
+                  derive_feature_plan(config, backend="numpy", **derived)))
+
+    clips = list(_synthetic_signals(settings.SAMPLE_RATE, settings.DURATION))
+    for path in _audio_files(args.audio):
+        clips.append((os.path.basename(path), _normalized(decode_audio_file(path).audio)))
+
+    failed = False
+    for plan_name, reference, candidate in plans:
+        layout = reference.describe()["layout"]
+        worst = {(block["feature"], block["stat"]): (0.0, 0.0) for block in layout}
+        for clip_name, audio in clips:
+            with warnings.catch_warnings():
+                # librosa warns on silence and on clips shorter than one frame
+                warnings.simplefilter("ignore")
+                expected = reference.extract(audio)
+            actual = candidate.extract(audio)
+            for block in layout:
+                key = (block["feature"], block["stat"])
+                span = slice(block["offset"], block["offset"] + block["size"])
+                error = np.abs(expected[span] - actual[span])
+                relative = error / np.maximum(np.abs(expected[span]), args.atol)
+                worst[key] = (max(worst[key][0], float(error.max())), max(worst[key][1], float(relative.max())))
+                if not np.allclose(actual[span], expected[span], rtol=args.rtol, atol=args.atol):
+                    failed = True
+                    print(f"MISMATCH {plan_name} {clip_name} {key[0]}.{key[1]}: max abs error {error.max():.3g}")
+
+        print(f"\n{plan_name} plan ({reference.dimension} features, {len(clips)} clips)")
+        print(f"{'feature':<22} {'stat':<8} {'max abs err':>12} {'max rel err':>12}")
+        for (feature, stat), (absolute, relative) in worst.items():
+            print(f"{feature:<22} {stat:<8} {absolute:12.3g} {relative:12.3g}")
+
+    if failed:
+        print("\nThe numpy backend does not match librosa within tolerance")
+        sys.exit(1)
+    print("\nThe numpy backend matches librosa within tolerance")
+
+
+if __name__ == "__main__":
+    main()
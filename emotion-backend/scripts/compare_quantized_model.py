@@ -0,0 +1,193 @@
+"""
+Compare the float Keras model with its quantized TFLite version.
+
+Runs both models over a labelled feature set (.npz with an "X" array of unscaled
+feature vectors and an optional "y" array of labels) or over features extracted from
+synthetic audio, and reports agreement rate, per-class probability drift, latency and
+memory. An int8 model without QUANTIZATION_CALIBRATION_PATH is calibrated on a random
+held-out part of the vectors, which is then left out of the comparison. Labels that are
+not in EMOTION_LABELS are left out of the accuracy and reported.
+
+Usage (from the emotion-backend directory):
+    python scripts/compare_quantized_model.py --mode int8 --features data/features.npz
+    python scripts/compare_quantized_model.py --mode dynamic --synthetic 500
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings, resolve_path
+from services.prediction_service import prediction_service, MockModel
+from services.quantized_model import (
+    QuantizedModel,
+    QUANTIZATION_MODES,
+    quantize_keras_model,
+    load_calibration_features,
+)
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process in bytes (Linux only, 0 elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _synthetic_features(num_clips: int, seed: int = 0) -> np.ndarray:
+    """Extract feature vectors from synthetic voiced/noisy clips of settings.DURATION seconds."""
+    rng = np.random.default_rng(seed)
+    num_samples = settings.DURATION * settings.SAMPLE_RATE
+    t = np.arange(num_samples) / settings.SAMPLE_RATE
+    features = []
+    for _ in range(num_clips):
+        f0 = rng.uniform(90, 350)
+        vibrato = 1 + 0.02 * np.sin(2 * np.pi * rng.uniform(3, 7) * t)
+        harmonics = sum(np.sin(2 * np.pi * f0 * k * vibrato * t) / k for k in range(1, 6))
+        envelope = np.abs(np.sin(np.pi * rng.uniform(1, 4) * t))
+        clip = envelope * harmonics + rng.uniform(0.01, 0.3) * rng.standard_normal(num_samples)
+        clip = clip / np.max(np.abs(clip))
+        features.append(prediction_service._extract_features(clip.astype(np.float32)))
+    return np.asarray(features, dtype=np.float32)
+
+
+def encode_labels(labels: np.ndarray, names) -> np.ndarray:
+    """Class indices of labels given by name or by index; -1 for a label the model does not know."""
+    if labels.dtype.kind not in "iuf":
+        index = {name: i for i, name in enumerate(names)}
+        return np.array([index.get(str(label), -1) for label in labels], dtype=np.int64)
+    codes = labels.astype(np.int64)
+    return np.where((codes >= 0) & (codes < len(names)) & (codes == labels), codes, -1)
+
+
+def split_calibration(num_vectors: int, num_calibration: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Random disjoint calibration and evaluation row indices; evaluation rows keep their order."""
+    rows = np.random.default_rng(seed).permutation(num_vectors)
+    return np.sort(rows[:num_calibration]), np.sort(rows[num_calibration:])
+
+
+def _scale(features: np.ndarray) -> np.ndarray:
+    try:
+        return np.asarray(prediction_service.scaler.transform(features), dtype=np.float32)
+    except Exception:
+        return features
+
+
+def _latency_ms(model, x: np.ndarray, repeats: int) -> dict:
+    """Median/p95 single-vector latency and batched throughput."""
+    single = []
+    for i in range(repeats):
+        row = x[i % len(x)].reshape(1, -1)
+        start = time.perf_counter()
+        model.predict(row, verbose=0)
+        single.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    model.predict(x, verbose=0)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "p50_ms": float(np.percentile(single, 50)),
+        "p95_ms": float(np.percentile(single, 95)),
+        "batch_vectors_per_s": len(x) / batch_seconds if batch_seconds > 0 else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, default="int8")
+    parser.add_argument("--features", help=".npz file with X (unscaled features) and optional y (labels)")
+    parser.add_argument("--synthetic", type=int, default=200, help="Number of synthetic clips when --features is not given")
+    parser.add_argument("--repeats", type=int, default=200, help="Number of single-vector latency measurements")
+    parser.add_argument("--output", help="Optional path to save the quantized .tflite model")
+    args = parser.parse_args()
+
+    keras_model = prediction_service.keras_model
+    if keras_model is None or isinstance(keras_model, MockModel):
+        sys.exit(f"No Keras model loaded from {settings.MODEL_PATH}, nothing to compare")
+
+    labels = None
+    if args.features:
+        data = np.load(args.features, allow_pickle=True)
+        raw_features = np.asarray(data["X"], dtype=np.float32)
+        if "y" in data:
+            raw_labels = np.asarray(data["y"])
+            labels = encode_labels(raw_labels, settings.EMOTION_LABELS)
+            unknown = sorted({str(label) for label in raw_labels[labels < 0]})
+            if unknown:
+                print(f"Leaving {np.sum(labels < 0)} vectors with unknown labels out of the accuracy: {', '.join(unknown)}")
+        print(f"Loaded {len(raw_features)} feature vectors from {args.features}")
+    else:
+        print(f"Extracting features from {args.synthetic} synthetic clips")
+        raw_features = _synthetic_features(args.synthetic)
+    x = _scale(raw_features)
+
+    calibration = None
+    if args.mode == "int8":
+        if settings.QUANTIZATION_CALIBRATION_PATH:
+            calibration = load_calibration_features(prediction_service.scaler, x.shape[1])
+        else:
+            # Calibrating on the vectors being compared would flatter the int8 model
+            num_calibration = min(settings.QUANTIZATION_CALIBRATION_SAMPLES, len(x) // 2)
+            if num_calibration == 0:
+                sys.exit("Too few feature vectors to hold out a calibration split")
+            calibration_rows, evaluation_rows = split_calibration(len(x), num_calibration)
+            calibration, x = x[calibration_rows], x[evaluation_rows]
+            if labels is not None:
+                labels = labels[evaluation_rows]
+            print(f"Calibrating on {len(calibration)} held-out vectors, comparing on the other {len(x)}")
+
+    rss_before = _rss_bytes()
+    tflite_model = quantize_keras_model(keras_model, args.mode, calibration)
+    quantized_model = QuantizedModel(model_content=tflite_model, num_threads=settings.QUANTIZED_NUM_THREADS)
+    rss_quantized = _rss_bytes() - rss_before
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(tflite_model)
+
+    float_probs = np.asarray(keras_model.predict(x, verbose=0), dtype=np.float32)
+    quant_probs = quantized_model.predict(x)
+    float_pred = np.argmax(float_probs, axis=1)
+    quant_pred = np.argmax(quant_probs, axis=1)
+    drift = np.abs(float_probs - quant_probs)
+
+    num_classes = float_probs.shape[1]
+    class_names = settings.EMOTION_LABELS if len(settings.EMOTION_LABELS) == num_classes else [str(i) for i in range(num_classes)]
+
+    print(f"\nQuantization mode: {args.mode}")
+    print(f"Vectors evaluated: {len(x)}")
+    print(f"Top-1 agreement:   {np.mean(float_pred == quant_pred):.4f}")
+    known = labels >= 0 if labels is not None else None
+    if known is not None and known.any():
+        print(f"Float accuracy:    {np.mean(float_pred[known] == labels[known]):.4f}")
+        print(f"Quant accuracy:    {np.mean(quant_pred[known] == labels[known]):.4f}")
+
+    print("\nPer-class probability drift (|float - quantized|):")
+    print(f"  {'class':<10} {'mean':>8} {'p95':>8} {'max':>8}")
+    for i, name in enumerate(class_names):
+        print(f"  {name:<10} {drift[:, i].mean():8.4f} {np.percentile(drift[:, i], 95):8.4f} {drift[:, i].max():8.4f}")
+
+    float_latency = _latency_ms(keras_model, x, args.repeats)
+    quant_latency = _latency_ms(quantized_model, x, args.repeats)
+    print("\nLatency:")
+    print(f"  {'model':<10} {'p50 ms':>8} {'p95 ms':>8} {'batch vec/s':>12}")
+    for name, latency in (("float", float_latency), (args.mode, quant_latency)):
+        print(f"  {name:<10} {latency['p50_ms']:8.3f} {latency['p95_ms']:8.3f} {latency['batch_vectors_per_s']:12.0f}")
+
+    model_file = resolve_path(settings.MODEL_PATH)
+    float_size = os.path.getsize(model_file) if os.path.isfile(model_file) else keras_model.count_params() * 4
+    print("\nMemory:")
+    print(f"  float model size:     {float_size / 1024:.1f} KiB")
+    print(f"  quantized model size: {len(tflite_model) / 1024:.1f} KiB")
+    print(f"  quantized load RSS:   {rss_quantized / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure cold-start-to-first-prediction time for each feature backend.
+
+Every run starts a fresh interpreter, as a new worker or pod would, and reports the
+time to import the prediction service (TensorFlow, model, scaler and feature plan
+compilation), then the first and a warm prediction on a DURATION-second window. With
+--cold-numba-cache each run gets an empty NUMBA_CACHE_DIR, which is what a new pod
+without a baked cache sees: librosa then JIT-compiles its numba helpers on first use.
+
+Usage (from the emotion-backend directory):
+    python scripts/measure_cold_start.py --runs 3 --cold-numba-cache
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _child():
+    started = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    import numpy as np
+    from config import settings
+    from services.prediction_service import prediction_service
+    loaded = time.perf_counter()
+
+    audio = (np.random.default_rng(0).standard_normal(settings.SAMPLE_RATE * settings.DURATION) * 0.1).astype(np.float32)
+    prediction_service.predict(audio, settings.SAMPLE_RATE)
+    first = time.perf_counter()
+    prediction_service.predict(audio, settings.SAMPLE_RATE)
+    warm = time.perf_counter()
+    print(json.dumps({
+        "load_ms": (loaded - started) * 1000,
+        "first_prediction_ms": (first - loaded) * 1000,
+        "warm_prediction_ms": (warm - first) * 1000,
+    }))
+
+
+def _run(backend: str, cold_cache: bool) -> dict:
+    env = {**os.environ, "FEATURE_BACKEND": backend, "LOG_LEVEL": "WARNING", "TF_CPP_MIN_LOG_LEVEL": "3"}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if cold_cache:
+            env["NUMBA_CACHE_DIR"] = cache_dir
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        total = (time.perf_counter() - start) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_start_to_first_prediction_ms"] = total - result["warm_prediction_ms"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["librosa", "numpy"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--cold-numba-cache", action="store_true", help="Give every run an empty numba cache")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+        return
+
+    columns = ("load_ms", "first_prediction_ms", "warm_prediction_ms", "process_start_to_first_prediction_ms")
+    print(f"{'backend':<8} " + " ".join(columns))
+    for backend in args.backends:
+        runs = [_run(backend, args.cold_numba_cache) for _ in range(args.runs)]
+        medians = {column: sorted(run[column] for run in runs)[len(runs) // 2] for column in columns}
+        print(f"{backend:<8} " + " ".join(f"{medians[column]:{len(column)}.0f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
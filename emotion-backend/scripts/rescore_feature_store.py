@@ -0,0 +1,87 @@
+"""
+Re-score every file in a feature store with the currently configured model.
+
+Reads the precomputed vectors straight from the store's memory map in large batches,
+so no audio is decoded and resident memory stays at roughly one batch. Writes one
+result per file as JSON lines or CSV (chosen by the output extension). Files whose
+prediction failed are left out of the output and listed on stderr, and the script then
+exits with status 1.
+
+Usage (from the emotion-backend directory):
+    python scripts/rescore_feature_store.py --store feature_store --output scores.jsonl
+    MODEL_PATH=models/new_model.keras python scripts/rescore_feature_store.py --output scores.csv
+    MODEL_REGISTRY_PATH=models/registry.json python scripts/rescore_feature_store.py --models general,arousal_valence --output scores.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings, resolve_path
+from services.feature_store import FeatureStore
+from services.model_registry import result_failed
+from services.prediction_service import prediction_service
+
+
+def _model_output(result, label):
+    """Class probability or regression value of one output of a model result."""
+    return result["values"][label] if "values" in result else result["class_probs"][label]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=settings.FEATURE_STORE_DIR, help="Feature store directory")
+    parser.add_argument("--output", required=True, help="Output .jsonl or .csv file")
+    parser.add_argument("--batch-size", type=int, default=settings.FEATURE_STORE_BATCH_SIZE, help="Vectors per model call")
+    parser.add_argument("--models", default=None, help="Comma-separated registry models scored alongside the default model")
+    args = parser.parse_args()
+    models = prediction_service.resolve_models(args.models)
+
+    store = FeatureStore.open(
+        resolve_path(args.store),
+        feature_config=prediction_service.feature_config,
+        sample_rate=settings.SAMPLE_RATE
+    )
+    print(f"Scoring {len(store)} files ({store.num_rows} vectors) from {args.store}")
+
+    start = time.perf_counter()
+    count = 0
+    failed = []
+    as_csv = args.output.endswith(".csv")
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f) if as_csv else None
+        # Extra models get one column per output, prefixed with the model name
+        extra_columns = [(name, label) for name in models or [] for label in prediction_service.get_model(name).labels]
+        if writer:
+            writer.writerow(["path", "sha256", "label", "confidence"] + list(settings.EMOTION_LABELS)
+                            + [f"{name}.{label}" for name, label in extra_columns])
+        for entry, result in prediction_service.score_feature_store(store, args.batch_size, models):
+            # A fallback result is not a prediction; writing it would look like a real score
+            if result_failed(result):
+                failed.append(entry.path)
+                continue
+            if writer:
+                writer.writerow([entry.path, entry.sha256, result["label"], result["confidence"]]
+                                + [result["class_probs"][label] for label in settings.EMOTION_LABELS]
+                                + [_model_output(result["models"][name], label) for name, label in extra_columns])
+            else:
+                f.write(json.dumps({"path": entry.path, "sha256": entry.sha256, **result}) + "\n")
+            count += 1
+    elapsed = time.perf_counter() - start
+
+    peak_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Scored {count} files in {elapsed:.2f}s ({count / elapsed if elapsed > 0 else 0:.0f} files/s), "
+          f"peak RSS {peak_rss_mib:.0f} MiB")
+    if failed:
+        for path in failed:
+            print(f"Prediction failed: {path}", file=sys.stderr)
+        sys.exit(f"{len(failed)} files could not be scored and were left out of {args.output}")
+
+
+if __name__ == "__main__":
+    main()
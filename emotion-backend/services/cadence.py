@@ -0,0 +1,195 @@
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from config import settings
+from services.model_registry import result_failed
+
+logger = logging.getLogger(__name__)
+
+_EPS = 1e-12
+
+
+def js_divergence(p: np.ndarray, q: np.ndarray) -> float:
+    """Jensen-Shannon divergence of two probability vectors, in bits (0 = identical, 1 = disjoint)."""
+    p = np.clip(np.asarray(p, dtype=np.float64), _EPS, None)
+    q = np.clip(np.asarray(q, dtype=np.float64), _EPS, None)
+    p /= p.sum()
+    q /= q.sum()
+    m = 0.5 * (p + q)
+    return float(0.5 * np.sum(p * np.log2(p / m)) + 0.5 * np.sum(q * np.log2(q / m)))
+
+
+def window_energy_db(audio: np.ndarray) -> float:
+    """RMS level of a window in dBFS (one pass over the samples)."""
+    if len(audio) == 0:
+        return -120.0
+    power = float(np.dot(audio, audio)) / len(audio)
+    return 10.0 * math.log10(max(power, 1e-12))
+
+
+class CadenceController:
+    """
+    Per-session inference cadence that backs off while predictions are stable.
+
+    Every message's level is checked (a dot product), but features and inference only
+    run every `interval` messages; the messages between repeat the last result. After
+    CADENCE_STABLE_INFERENCES consecutive inferences whose class_probs differ from the
+    previous one by less than CADENCE_DIVERGENCE_THRESHOLD (Jensen-Shannon, bits), the
+    interval doubles, up to CADENCE_MAX_INTERVAL. It snaps back to every message when
+    the predictions shift, when the level moves by more than CADENCE_ENERGY_CHANGE_DB
+    since the last inference, or when speech starts (the level rises above
+    CADENCE_SPEECH_DB from below). A failed inference (a fallback result) is never
+    counted as stable: the cadence snaps back and analyzes every message until a real
+    result arrives.
+    """
+
+    def __init__(self, max_interval: int = None, threshold: float = None, stable_inferences: int = None,
+                 energy_change_db: float = None, speech_db: float = None):
+        self.max_interval = max(1, max_interval or settings.CADENCE_MAX_INTERVAL)
+        self.threshold = settings.CADENCE_DIVERGENCE_THRESHOLD if threshold is None else threshold
+        self.stable_inferences = max(1, stable_inferences or settings.CADENCE_STABLE_INFERENCES)
+        self.energy_change_db = settings.CADENCE_ENERGY_CHANGE_DB if energy_change_db is None else energy_change_db
+        self.speech_db = settings.CADENCE_SPEECH_DB if speech_db is None else speech_db
+
+        self.interval = 1
+        self.since_inference = 0
+        self.stable = 0
+        self.reason = "start"
+        self._probs: Optional[np.ndarray] = None
+        self._label: Optional[str] = None
+        self._inference_energy: Optional[float] = None
+        self._last_energy: Optional[float] = None
+        self._energy: Optional[float] = None
+
+        self.started_at = time.monotonic()
+        self.messages = 0
+        self.inferences = 0
+        self.snaps = {"shift": 0, "energy": 0, "onset": 0, "failure": 0}
+
+    def should_infer(self, audio: np.ndarray) -> bool:
+        """
+        Decide whether this message is analyzed or repeats the last result.
+
+        Args:
+            audio: The message's decoded samples, before normalization (the level matters)
+
+        Returns:
+            True to run features and inference, False to reuse the last result
+        """
+        self.messages += 1
+        self._energy = energy = window_energy_db(audio)
+        previous, self._last_energy = self._last_energy, energy
+        if self._probs is None:
+            return True
+
+        if previous is not None and previous < self.speech_db <= energy:
+            self._snap("onset")
+            return True
+        if self._inference_energy is not None and abs(energy - self._inference_energy) > self.energy_change_db:
+            self._snap("energy")
+            return True
+
+        self.since_inference += 1
+        return self.since_inference >= self.interval
+
+    def observe(self, result: Dict[str, Any]):
+        """Update the cadence from a fresh (not reused) result."""
+        self.inferences += 1
+        self.since_inference = 0
+        self._inference_energy = self._energy
+
+        if result_failed(result):
+            # Repeated fallback outputs are identical, not stable; the next result is compared with nothing
+            if self.interval > 1:
+                self._snap("failure")
+            self.stable = 0
+            self._probs, self._label = None, None
+            return
+
+        class_probs = result.get("class_probs")
+        if not class_probs:
+            # Nothing to judge stability by (e.g. a regression model): stay at every message
+            self._probs = None
+            return
+        probs = np.fromiter(class_probs.values(), dtype=np.float64, count=len(class_probs))
+        label = result.get("label")
+        if self._probs is not None and len(self._probs) == len(probs):
+            if label != self._label or js_divergence(self._probs, probs) >= self.threshold:
+                if self.interval > 1:
+                    self._snap("shift")
+                self.stable = 0
+            else:
+                self.stable += 1
+                if self.stable >= self.stable_inferences and self.interval < self.max_interval:
+                    self.interval = min(self.interval * 2, self.max_interval)
+                    self.stable = 0
+                    self.reason = "stable"
+        self._probs, self._label = probs, label
+
+    def _snap(self, reason: str):
+        self.interval = 1
+        self.stable = 0
+        self.reason = reason
+        self.snaps[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "interval": self.interval,
+            "reason": self.reason,
+            "messages": self.messages,
+            "inferences": self.inferences,
+            "inference_ratio": round(self.inferences / self.messages, 3) if self.messages else None,
+            "inferences_per_second": round(self.inferences / elapsed, 3),
+            "messages_per_second": round(self.messages / elapsed, 3),
+            "snaps": dict(self.snaps),
+        }
+
+
+class CadenceRegistry:
+    """Cadence controllers of live sessions, and totals over finished ones."""
+
+    def __init__(self):
+        self.active: Dict[str, CadenceController] = {}
+        self.finished_sessions = 0
+        self.finished_messages = 0
+        self.finished_inferences = 0
+
+    def start(self, client_id: str) -> Optional[CadenceController]:
+        """A controller for a new session, or None while CADENCE_ENABLED is off."""
+        if not settings.CADENCE_ENABLED:
+            return None
+        controller = CadenceController()
+        self.active[client_id] = controller
+        return controller
+
+    def finish(self, client_id: str, controller: Optional[CadenceController]) -> Optional[Dict[str, Any]]:
+        if controller is None:
+            return None
+        if self.active.get(client_id) is controller:
+            del self.active[client_id]
+        self.finished_sessions += 1
+        self.finished_messages += controller.messages
+        self.finished_inferences += controller.inferences
+        return controller.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = {client_id: controller.stats() for client_id, controller in list(self.active.items())}
+        messages = self.finished_messages + sum(s["messages"] for s in sessions.values())
+        inferences = self.finished_inferences + sum(s["inferences"] for s in sessions.values())
+        return {
+            "enabled": settings.CADENCE_ENABLED,
+            "active_sessions": len(sessions),
+            "inference_ratio": round(inferences / messages, 3) if messages else None,
+            "inferences_per_second": round(sum(s["inferences_per_second"] for s in sessions.values()), 3),
+            "messages_per_second": round(sum(s["messages_per_second"] for s in sessions.values()), 3),
+            "sessions": sessions,
+        }
+
+
+# Global instance
+cadence_registry = CadenceRegistry()
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the store files changes
+FEATURE_STORE_VERSION = 1
+
+_FEATURES_FILE = "features.f32"
+_INDEX_FILE = "index.jsonl"
+_META_FILE = "meta.json"
+
+
+@dataclass
+class StoreEntry:
+    """One indexed file: where it came from and which feature row holds its vector."""
+    path: str
+    sha256: str
+    row: int
+    added_at: float
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Content hash of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def feature_signature(feature_config: Dict[str, Any], sample_rate: int, dimension: int) -> str:
+    """Short hash identifying the feature extraction that produced a store's vectors."""
+    payload = json.dumps(
+        {"feature_config": feature_config, "sample_rate": sample_rate, "dimension": dimension},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class FeatureStore:
+    """
+    Append-only store of precomputed feature vectors for a corpus of audio files.
+
+    Vectors are kept unscaled in a raw row-major float32 file read through np.memmap,
+    so scoring the whole store never holds more than one batch in memory. A JSON-lines
+    index maps each file path and content hash to a row; files with identical content
+    share a row. meta.json records the feature configuration the vectors were
+    extracted with, and opening a store with a different configuration fails instead
+    of silently mixing incompatible vectors.
+    """
+
+    def __init__(self, directory: str, dimension: int, feature_config: Dict[str, Any], sample_rate: int):
+        self.directory = directory
+        self.dimension = dimension
+        self.feature_config = feature_config
+        self.sample_rate = sample_rate
+        self.signature = feature_signature(feature_config, sample_rate, dimension)
+        self.entries: Dict[str, StoreEntry] = {}
+        self._rows_by_hash: Dict[str, int] = {}
+        self.num_rows = 0
+
+    @classmethod
+    def open(cls, directory: str, dimension: int = None, feature_config: Dict[str, Any] = None,
+             sample_rate: int = None, create: bool = False) -> "FeatureStore":
+        """
+        Open a store, optionally creating it.
+
+        Args:
+            directory: Store directory
+            dimension: Feature vector length; required when creating
+            feature_config: Feature extraction configuration; required when creating
+            sample_rate: Sample rate features are extracted at; required when creating
+            create: Create the store if it does not exist
+
+        Raises:
+            FileNotFoundError: If the store does not exist and create is False
+            ValueError: If the given configuration does not match the store's
+        """
+        meta_path = os.path.join(directory, _META_FILE)
+        if not os.path.exists(meta_path):
+            if not create:
+                raise FileNotFoundError(f"No feature store at {directory}")
+            if dimension is None or feature_config is None or sample_rate is None:
+                raise ValueError("dimension, feature_config and sample_rate are required to create a feature store")
+            os.makedirs(directory, exist_ok=True)
+            store = cls(directory, dimension, feature_config, sample_rate)
+            store._write_meta()
+            open(os.path.join(directory, _FEATURES_FILE), "ab").close()
+            open(os.path.join(directory, _INDEX_FILE), "a").close()
+            logger.info(f"Created feature store at {directory} ({dimension} features, signature {store.signature})")
+            return store
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != FEATURE_STORE_VERSION:
+            raise ValueError(f"Feature store version {meta.get('version')} is not supported (expected {FEATURE_STORE_VERSION})")
+        store = cls(directory, meta["dimension"], meta["feature_config"], meta["sample_rate"])
+        if feature_config is not None and sample_rate is not None:
+            expected = feature_signature(feature_config, sample_rate, dimension or store.dimension)
+            if expected != store.signature:
+                raise ValueError(
+                    f"Feature store {directory} was built with a different feature configuration "
+                    f"(signature {store.signature}, current {expected}); rebuild it"
+                )
+        store._load_index()
+        return store
+
+    def _write_meta(self):
+        meta = {
+            "version": FEATURE_STORE_VERSION,
+            "dimension": self.dimension,
+            "dtype": "float32",
+            "feature_config": self.feature_config,
+            "sample_rate": self.sample_rate,
+            "signature": self.signature,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self.directory, _META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def _load_index(self):
+        row_bytes = self.dimension * 4
+        features_path = os.path.join(self.directory, _FEATURES_FILE)
+        rows_on_disk = os.path.getsize(features_path) // row_bytes
+
+        index_path = os.path.join(self.directory, _INDEX_FILE)
+        with open(index_path, "rb") as f:
+            content = f.read()
+        if content and not content.endswith(b"\n"):
+            # Cut a torn last line from an interrupted append so the next append starts cleanly
+            logger.warning(f"Truncating incomplete last index line in {index_path}")
+            with open(index_path, "r+b") as f:
+                f.truncate(content.rfind(b"\n") + 1)
+
+        with open(index_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = StoreEntry(**json.loads(line))
+                except (ValueError, TypeError):
+                    logger.warning(f"Skipping unreadable index line in {self.directory}")
+                    continue
+                if entry.row >= rows_on_disk:
+                    continue
+                self.entries[entry.path] = entry
+                self._rows_by_hash[entry.sha256] = entry.row
+                self.num_rows = max(self.num_rows, entry.row + 1)
+
+        # Drop vectors written by an append that never reached the index
+        if rows_on_disk > self.num_rows:
+            logger.warning(f"Truncating {rows_on_disk - self.num_rows} unindexed rows from {features_path}")
+            with open(features_path, "r+b") as f:
+                f.truncate(self.num_rows * row_bytes)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def has(self, path: str, sha256: str) -> bool:
+        """True if the file at path with this content is already indexed."""
+        entry = self.entries.get(path)
+        return entry is not None and entry.sha256 == sha256
+
+    def row_for_hash(self, sha256: str) -> Optional[int]:
+        """Row already holding the vector for this content, if any."""
+        return self._rows_by_hash.get(sha256)
+
+    def append(self, items: List[Tuple[str, str, Optional[np.ndarray]]]) -> int:
+        """
+        Append files to the store.
+
+        Vectors are written before their index lines, so an interrupted append leaves
+        at most some unindexed rows, which are dropped on the next open.
+
+        Args:
+            items: (path, sha256, features) tuples. features may be None when the
+                content is already stored under another path
+
+        Returns:
+            Number of new feature rows written
+        """
+        new_vectors = []
+        new_entries = []
+        now = time.time()
+        pending_rows: Dict[str, int] = {}
+        for path, sha256, features in items:
+            row = self._rows_by_hash.get(sha256, pending_rows.get(sha256))
+            if row is None:
+                if features is None:
+                    raise ValueError(f"No features given for new content {sha256} ({path})")
+                vector = np.asarray(features, dtype=np.float32).reshape(-1)
+                if vector.shape[0] != self.dimension:
+                    raise ValueError(f"Feature vector for {path} has {vector.shape[0]} values, store expects {self.dimension}")
+                row = self.num_rows + len(new_vectors)
+                pending_rows[sha256] = row
+                new_vectors.append(vector)
+            new_entries.append(StoreEntry(path=path, sha256=sha256, row=row, added_at=now))
+
+        if new_vectors:
+            with open(os.path.join(self.directory, _FEATURES_FILE), "ab") as f:
+                f.write(np.stack(new_vectors).astype("<f4", copy=False).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        with open(os.path.join(self.directory, _INDEX_FILE), "a") as f:
+            for entry in new_entries:
+                f.write(json.dumps(asdict(entry)) + "\n")
+
+        self.num_rows += len(new_vectors)
+        for entry in new_entries:
+            self.entries[entry.path] = entry
+            self._rows_by_hash[entry.sha256] = entry.row
+        return len(new_vectors)
+
+    def matrix(self) -> np.ndarray:
+        """Read-only (rows, dimension) memory map of all stored vectors."""
+        if self.num_rows == 0:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.memmap(
+            os.path.join(self.directory, _FEATURES_FILE),
+            dtype="<f4",
+            mode="r",
+            shape=(self.num_rows, self.dimension)
+        )
+
+    def iter_batches(self, batch_size: int) -> Iterator[Tuple[np.ndarray, List[List[StoreEntry]]]]:
+        """
+        Yield (features, entries) batches in row order.
+
+        features is a copy of at most batch_size indexed rows; entries holds, for each
+        of those rows, the index entries that point at it. Rows no longer referenced by
+        any entry (files that were re-added with new content) are skipped.
+        """
+        entries_by_row: Dict[int, List[StoreEntry]] = {}
+        for entry in self.entries.values():
+            entries_by_row.setdefault(entry.row, []).append(entry)
+
+        matrix = self.matrix()
+        for start in range(0, self.num_rows, batch_size):
+            stop = min(start + batch_size, self.num_rows)
+            rows = [row for row in range(start, stop) if row in entries_by_row]
+            if not rows:
+                continue
+            features = np.asarray(matrix[start:stop])[[row - start for row in rows]]
+            yield features, [entries_by_row[row] for row in rows]
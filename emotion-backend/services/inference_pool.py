@@ -0,0 +1,432 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+from services.prediction_service import prediction_service
+from services.memory_monitor import process_rss_bytes
+from services.shm_transport import RingLayout, SlotDescriptor, SlotRing
+
+logger = logging.getLogger(__name__)
+
+# Output columns per row; wider than any label set so mismatched models are formatted as in-process
+_MAX_CLASSES = max([16] + [len(model.labels) for model in prediction_service.models.values()])
+
+
+class InferenceUnavailable(RuntimeError):
+    """No worker or shared memory slot could take the request in time."""
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker processing the request exited before answering."""
+
+
+class _StageTimer:
+    """Minimal stage() recorder used inside workers, where the request's profile does not exist."""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + (time.perf_counter() - start)
+
+
+def _worker_main(index: int, layout: RingLayout, tasks: Connection, results: Connection):
+    """
+    Inference worker: read descriptors, compute from zero-copy slot views, write model outputs in place.
+
+    Features are computed once per request. The default model's rows come first in the
+    output region, followed by those of each requested model. A model that fails is
+    reported back with its error message rather than just left out.
+    """
+    from utils.logging_config import setup_logging
+    setup_logging()
+    # Only the tiers' feature plans are needed here, not the API process's overload controller
+    from services.quality_tiers import build_quality_tiers
+
+    ring = SlotRing.attach(layout)
+    tiers = build_quality_tiers(prediction_service)
+    results.send(("ready", index, multiprocessing.current_process().pid))
+    try:
+        while True:
+            try:
+                descriptor: Optional[SlotDescriptor] = tasks.recv()
+            except EOFError:
+                # The API process went away
+                break
+            if descriptor is None:
+                break
+
+            timer = _StageTimer()
+            try:
+                if descriptor.kind == "audio":
+                    plan = tiers[descriptor.tier].plan if 0 < descriptor.tier < len(tiers) else None
+                    with timer.stage("features"):
+                        features = prediction_service.audio_to_features(
+                            ring.audio_view(descriptor), descriptor.sample_rate, plan
+                        ).reshape(1, -1)
+                else:
+                    features = ring.features_view(descriptor)
+                errors: Dict[str, str] = {}
+                with timer.stage("inference"):
+                    outputs = prediction_service.predict_model_outputs(features, list(descriptor.models), errors)
+
+                rows, written = len(features), []
+                for position, (name, output) in enumerate(outputs.items()):
+                    if output is None:
+                        # The model failed; the API process logs the error and reports a failed result
+                        written.append((name, None))
+                        continue
+                    classes = min(output.shape[1], layout.num_classes)
+                    ring.output_view(descriptor.slot, rows, classes, start=position * rows)[:] = output[:, :classes]
+                    written.append((name, classes))
+                results.send(("done", descriptor.request_id, (written, timer.durations, errors)))
+            except Exception as e:
+                results.send(("error", descriptor.request_id, str(e) or e.__class__.__name__))
+    finally:
+        ring.close()
+
+
+@dataclass
+class _Pending:
+    future: asyncio.Future
+    slot: int
+    worker: int
+    rows: int
+    submitted: float
+    abandoned: bool = False
+
+
+@dataclass
+class _Worker:
+    index: int
+    process: Any
+    tasks: Connection
+    results: Connection
+    ready: bool = False
+    dead: bool = False
+    failed_starts: int = 0
+    inflight: Set[int] = field(default_factory=set)
+
+
+class InferencePool:
+    """
+    Inference worker processes fed through a shared-memory slot ring.
+
+    The API process copies a window (or feature rows) into a free slot and sends the
+    worker a SlotDescriptor; the worker computes from a zero-copy view and writes the
+    probabilities back into the slot. A slot stays owned by its request until the
+    worker answers, even if the caller timed out, so a late write can never land in a
+    reused slot. Waiting for a free slot is the backpressure. A collector thread reads
+    worker answers and process sentinels; when a worker dies, its in-flight requests
+    fail, their slots are freed and the worker is respawned. With INFERENCE_WORKERS=0
+    (the default) nothing is started and predictions run in-process.
+    """
+
+    def __init__(self, workers: int = None, slots: int = None):
+        self.num_workers = settings.INFERENCE_WORKERS if workers is None else workers
+        self.num_slots = slots or settings.INFERENCE_SLOTS
+        self.ring: Optional[SlotRing] = None
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _Worker] = {}
+        self._workers_lock = threading.Lock()
+        self._pending: Dict[int, _Pending] = {}
+        self._free_slots: Optional[asyncio.Queue] = None
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._collector: Optional[threading.Thread] = None
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.slot_timeouts = 0
+        self.fallbacks = 0
+        self.model_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.num_workers > 0
+
+    @property
+    def available(self) -> bool:
+        """True when at least one worker is ready to take requests."""
+        return self.ring is not None and any(w.ready and not w.dead for w in self._workers.values())
+
+    async def start(self):
+        """Create the slot ring and spawn the workers."""
+        if not self.enabled or self.ring is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        input_capacity = int(settings.SAMPLE_RATE * settings.INFERENCE_SLOT_SECONDS)
+        self.ring = SlotRing.create(self.num_slots, input_capacity, settings.INFERENCE_SLOT_MAX_ROWS, _MAX_CLASSES)
+        self._free_slots = asyncio.Queue()
+        for slot in range(self.num_slots):
+            self._free_slots.put_nowait(slot)
+        self._stopping = False
+        for index in range(self.num_workers):
+            self._spawn(index)
+        self._collector = threading.Thread(target=self._collect, name="inference-collector", daemon=True)
+        self._collector.start()
+        logger.info(f"Inference pool started: {self.num_workers} workers, {self.num_slots} slots")
+
+    async def stop(self):
+        """Stop the workers, fail anything in flight and unlink the ring."""
+        if self.ring is None:
+            return
+        self._stopping = True
+        with self._workers_lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            with contextlib.suppress(Exception):
+                worker.tasks.send(None)
+        for worker in workers:
+            await asyncio.get_running_loop().run_in_executor(None, worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.tasks.close()
+            worker.results.close()
+        if self._collector is not None:
+            self._collector.join(timeout=2)
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.set_exception(InferenceUnavailable("Inference pool stopped"))
+        self._pending.clear()
+        self._workers.clear()
+        self.ring.close()
+        self.ring = None
+        logger.info("Inference pool stopped")
+
+    def _spawn(self, index: int, failed_starts: int = 0):
+        if self._stopping:
+            return
+        task_reader, task_writer = self._context.Pipe(duplex=False)
+        result_reader, result_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.ring.layout, task_reader, result_writer),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        # The child holds its own copies of these ends
+        task_reader.close()
+        result_writer.close()
+        with self._workers_lock:
+            self._workers[index] = _Worker(index, process, task_writer, result_reader, failed_starts=failed_starts)
+
+    def _collect(self):
+        """Collector thread: forward worker answers and deaths to the event loop."""
+        while not self._stopping:
+            with self._workers_lock:
+                workers = [w for w in self._workers.values() if not w.dead]
+            waitables = {w.results: w for w in workers}
+            waitables.update({w.process.sentinel: w for w in workers})
+            if not waitables:
+                time.sleep(0.1)
+                continue
+            for ready in wait(list(waitables), timeout=0.5):
+                worker = waitables[ready]
+                if ready is worker.results:
+                    try:
+                        while worker.results.poll():
+                            message = worker.results.recv()
+                            self._loop.call_soon_threadsafe(self._on_message, worker.index, message)
+                    except (EOFError, OSError):
+                        pass
+                elif not self._stopping and not worker.dead:
+                    worker.dead = True
+                    worker.process.join(timeout=1)
+                    self._loop.call_soon_threadsafe(self._on_worker_died, worker.index, worker.process.exitcode)
+
+    def _on_message(self, index: int, message: Tuple[str, Any, Any]):
+        kind, request_id, payload = message
+        worker = self._workers.get(index)
+        if kind == "ready":
+            if worker is not None and worker.process.pid == payload:
+                worker.ready = True
+                logger.info(f"Inference worker {index} ready (pid {payload})")
+            return
+
+        pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return
+        if worker is not None:
+            worker.inflight.discard(request_id)
+        if not pending.abandoned and not pending.future.done():
+            if kind == "done":
+                written, timings, errors = payload
+                for name, error in errors.items():
+                    logger.error(f"Model {name} failed in inference worker {index}: {error}")
+                self.model_errors += len(errors)
+                outputs = {
+                    name: None if classes is None
+                    else self.ring.output_view(pending.slot, pending.rows, classes, start=position * pending.rows).copy()
+                    for position, (name, classes) in enumerate(written)
+                }
+                timings["ipc"] = max(0.0, time.perf_counter() - pending.submitted - sum(timings.values()))
+                pending.future.set_result((outputs, timings))
+                self.completed += 1
+            else:
+                logger.error(f"Inference worker {index} failed a request: {payload}")
+                pending.future.set_exception(RuntimeError(payload))
+                self.failed += 1
+        # Only now can the slot be reused: the worker is done with it
+        self._free_slots.put_nowait(pending.slot)
+
+    def _on_worker_died(self, index: int, exitcode: Optional[int]):
+        worker = self._workers.get(index)
+        if worker is None or self._stopping:
+            return
+        logger.error(f"Inference worker {index} exited with code {exitcode}; failing {len(worker.inflight)} requests and restarting it")
+        for request_id in list(worker.inflight):
+            pending = self._pending.pop(request_id, None)
+            if pending is None:
+                continue
+            if not pending.future.done():
+                pending.future.set_exception(WorkerCrashed(f"Inference worker {index} crashed"))
+            self.failed += 1
+            self._free_slots.put_nowait(pending.slot)
+        worker.tasks.close()
+        worker.results.close()
+        self.restarts += 1
+        # A worker that dies before getting ready would otherwise be respawned in a tight loop
+        failed_starts = 0 if worker.ready else worker.failed_starts + 1
+        delay = min(2 ** failed_starts - 1, 30)
+        self._loop.call_later(delay, self._spawn, index, failed_starts)
+
+    def _pick_worker(self) -> _Worker:
+        candidates = [w for w in self._workers.values() if w.ready and not w.dead]
+        if not candidates:
+            raise InferenceUnavailable("No inference worker is ready")
+        return min(candidates, key=lambda w: len(w.inflight))
+
+    async def _submit(self, kind: str, payload: np.ndarray, sample_rate: int = 0, tier: int = 0,
+                      models: Optional[List[str]] = None):
+        try:
+            slot = await asyncio.wait_for(self._free_slots.get(), settings.INFERENCE_SLOT_WAIT)
+        except asyncio.TimeoutError:
+            self.slot_timeouts += 1
+            raise InferenceUnavailable("No free shared memory slot")
+
+        try:
+            worker = self._pick_worker()
+            if kind == "audio":
+                length, width, rows = self.ring.write_audio(slot, payload), 1, 1
+            else:
+                length, width = self.ring.write_features(slot, payload), payload.shape[1]
+                rows = length
+        except Exception:
+            self._free_slots.put_nowait(slot)
+            raise
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = _Pending(future, slot, worker.index, rows, time.perf_counter())
+        worker.inflight.add(request_id)
+        worker.tasks.send(SlotDescriptor(request_id, slot, kind, length, width, sample_rate, tier, tuple(models or ())))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), settings.INFERENCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Keep the slot reserved until the worker answers or dies
+            pending = self._pending.get(request_id)
+            if pending is not None:
+                pending.abandoned = True
+            raise
+
+    def _fits(self, values: int, rows: int, models: Optional[List[str]]) -> bool:
+        """Whether the input values and the outputs of the default and requested models fit in one slot."""
+        served = 1 + len([name for name in models or [] if name != prediction_service.default_model])
+        return values <= self.ring.layout.input_capacity and rows * served <= self.ring.layout.max_rows
+
+    async def predict(self, audio_data: np.ndarray, sample_rate: int, tier=None, profile=None,
+                      models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Predict one clip on a worker, with the same result semantics as PredictionService.predict.
+
+        Falls back to in-process prediction, in a thread, while no worker is ready and for
+        windows too long for a slot (see INFERENCE_SLOT_SECONDS).
+
+        Args:
+            audio_data: Audio samples
+            sample_rate: Sample rate of the audio
+            tier: Optional QualityTier; workers use their own copy of the tier's plan
+            profile: Optional profile or latency record; worker stage timings are added to it
+            models: Optional model names (see PredictionService.resolve_models)
+        """
+        if not self.available or not self._fits(len(audio_data), 1, models):
+            self.fallbacks += 1
+            return await asyncio.get_running_loop().run_in_executor(
+                None, lambda: prediction_service.predict(audio_data, sample_rate, profile=profile,
+                                                         plan=tier.plan if tier is not None else None, models=models)
+            )
+        try:
+            outputs, timings = await self._submit(
+                "audio", np.asarray(audio_data, dtype=np.float32), sample_rate, tier.level if tier is not None else 0,
+                models
+            )
+        except Exception as e:
+            logger.error(f"Worker prediction error: {e}")
+            return {**prediction_service.default_result(models), "error": str(e) or e.__class__.__name__}
+        _add_timings(profile, timings)
+        return prediction_service.results_from_outputs(outputs, 1, models)[0]
+
+    async def predict_features(self, features: np.ndarray, models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Predict a matrix of unscaled feature rows on a worker, like PredictionService.predict_features."""
+        if not self.available or not self._fits(features.size, len(features), models):
+            self.fallbacks += 1
+            return await asyncio.get_running_loop().run_in_executor(
+                None, prediction_service.predict_features, features, models
+            )
+        try:
+            outputs, _ = await self._submit("features", np.asarray(features, dtype=np.float32), models=models)
+        except Exception as e:
+            logger.error(f"Worker batch prediction error: {e}")
+            error = str(e) or e.__class__.__name__
+            return [{**prediction_service.default_result(models), "error": error} for _ in features]
+        return prediction_service.results_from_outputs(outputs, len(features), models)
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker, slot and request counters."""
+        return {
+            "enabled": self.enabled,
+            "workers": [
+                {"index": w.index, "pid": w.process.pid, "ready": w.ready, "inflight": len(w.inflight),
+                 "rss_bytes": process_rss_bytes(w.process.pid)}
+                for w in self._workers.values()
+            ],
+            "slots": self.num_slots,
+            "free_slots": self._free_slots.qsize() if self._free_slots is not None else 0,
+            "pending": len(self._pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "slot_timeouts": self.slot_timeouts,
+            "fallbacks": self.fallbacks,
+            "model_errors": self.model_errors,
+        }
+
+
+def _add_timings(profile, timings: Dict[str, float]):
+    if profile is None:
+        return
+    for name, seconds in timings.items():
+        profile.add_stage(name, seconds)
+
+
+# Global instance
+inference_pool = InferencePool()
@@ -0,0 +1,392 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings, resolve_path
+from preprocessing.audio_decoding import stream_audio
+from preprocessing.audio_processing import preprocess_audio_chunk
+from services.prediction_service import prediction_service
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    format TEXT,
+    duration REAL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first schema; databases created before them are migrated on connect
+_LEASE_COLUMNS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation was requested."""
+
+
+class JobQueue:
+    """
+    Durable queue of long-file analysis jobs.
+
+    Job metadata and results live in SQLite and uploads are spooled to disk, so queued
+    and interrupted jobs are picked up again after a restart. A fixed number of worker
+    tasks claim jobs one at a time and run the analysis on a thread pool, keeping the
+    event loop free.
+
+    Several processes (e.g. uvicorn workers) may share the database. A claimed job is
+    leased to its process, which renews the lease every JOB_HEARTBEAT_INTERVAL; only
+    jobs whose lease is older than JOB_LEASE_SECONDS are taken back and requeued.
+    """
+
+    def __init__(self, db_path: str = None, spool_dir: str = None, workers: int = None):
+        self.db_path = resolve_path(db_path or settings.JOB_DB_PATH)
+        self.spool_dir = resolve_path(spool_dir or settings.JOB_SPOOL_DIR)
+        self.workers = workers or settings.JOB_WORKERS
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        # Lease owner of the jobs this process runs
+        self.owner = f"{settings.NODE_ID}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            os.makedirs(self.spool_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in _LEASE_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: Tuple = ()) -> int:
+        """Run a statement and return the number of affected rows."""
+        with self._lock:
+            return self._connect().execute(sql, params).rowcount
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        """Run a query and fetch all rows while holding the connection lock."""
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _spool_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.audio")
+
+    async def start(self):
+        """Recover jobs whose lease expired, prune old ones and start the workers."""
+        if self._tasks:
+            return
+        self.requeue_expired()
+        self.prune()
+
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job-worker")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"Job queue started with {self.workers} workers as {self.owner}, database {self.db_path}")
+
+    async def stop(self):
+        """Stop the workers and hand this process's running jobs back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        released = self._execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, progress = 0, owner = NULL, heartbeat_at = NULL "
+            "WHERE status = ? AND owner = ?",
+            (QUEUED, RUNNING, self.owner)
+        )
+        if released:
+            logger.info(f"Requeued {released} running jobs on shutdown")
+
+    def requeue_expired(self) -> int:
+        """
+        Requeue running jobs whose owner stopped renewing the lease (e.g. a crashed process).
+
+        Returns:
+            Number of requeued jobs
+        """
+        requeued = self._execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, progress = 0, owner = NULL, heartbeat_at = NULL "
+            "WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (QUEUED, RUNNING, time.time() - settings.JOB_LEASE_SECONDS)
+        )
+        if requeued:
+            logger.info(f"Requeued {requeued} jobs whose lease expired")
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return requeued
+
+    async def _heartbeat(self):
+        """Renew the leases of this process's running jobs and take back expired ones."""
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            try:
+                self._execute("UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND owner = ?",
+                              (time.time(), RUNNING, self.owner))
+                self.requeue_expired()
+            except sqlite3.Error as e:
+                logger.error(f"Could not renew job leases: {e}")
+
+    async def submit(self, filename: str, content: bytes, fmt: Optional[str], duration: Optional[float]) -> Dict[str, Any]:
+        """
+        Spool an upload and queue it for analysis.
+
+        Args:
+            filename: Original file name
+            content: File contents
+            fmt: Container format from the probed header
+            duration: Duration in seconds from the probed header
+
+        Returns:
+            The new job's status record
+        """
+        job_id = uuid.uuid4().hex
+        self._connect()
+        # Uploads can be hundreds of megabytes, so they are written off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._write_spool, job_id, content)
+
+        self._execute(
+            "INSERT INTO jobs (id, filename, format, duration, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, filename, fmt, duration, QUEUED, time.time())
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Queued job {job_id} for file {filename}")
+        return self.get(job_id)
+
+    def _write_spool(self, job_id: str, content: bytes):
+        spool_path = self._spool_path(job_id)
+        # Write under a temporary name so a crash never leaves a half-written upload behind a job
+        with open(f"{spool_path}.part", "wb") as f:
+            f.write(content)
+        os.replace(f"{spool_path}.part", spool_path)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status record of a job, or None if it does not exist."""
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        job = {key: row[key] for key in row.keys() if key not in ("result", "cancel_requested", "owner", "heartbeat_at")}
+        job["cancel_requested"] = bool(row["cancel_requested"])
+        if row["status"] == QUEUED:
+            job["position"] = self._query(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, row["created_at"])
+            )[0][0]
+        return job
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Result of a succeeded job, or None if there is none."""
+        rows = self._query("SELECT result FROM jobs WHERE id = ? AND status = ?", (job_id, SUCCEEDED))
+        if not rows or rows[0]["result"] is None:
+            return None
+        return json.loads(rows[0]["result"])
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job.
+
+        Queued jobs are cancelled immediately; running jobs stop at their next block of
+        windows. Finished jobs are left unchanged.
+
+        Returns:
+            The job's status record, or None if it does not exist
+        """
+        now = time.time()
+        if self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, now, job_id, QUEUED)
+        ):
+            self._remove_spool(job_id)
+            logger.info(f"Cancelled queued job {job_id}")
+        else:
+            self._execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of jobs per status and the configured worker count."""
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED_STATUSES}
+        for row in self._query("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return {"workers": self.workers, "jobs": counts}
+
+    def prune(self):
+        """Delete finished jobs older than JOB_RETENTION_HOURS."""
+        cutoff = time.time() - settings.JOB_RETENTION_HOURS * 3600
+        placeholders = ",".join("?" * len(FINISHED_STATUSES))
+        removed = self._execute(
+            f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+            FINISHED_STATUSES + (cutoff,)
+        )
+        if removed:
+            logger.info(f"Pruned {removed} finished jobs")
+
+    def _claim_next(self) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to running, leased to this process."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, heartbeat_at = ? "
+                        "WHERE id = ?",
+                        (RUNNING, now, self.owner, now, row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id: str, status: str, result: Dict[str, Any] = None, error: str = None):
+        # Only the lease owner may finish a job; a job requeued after a missed heartbeat belongs to its new run
+        if not self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, owner = NULL, heartbeat_at = NULL "
+            "WHERE id = ? AND owner = ?",
+            (status, time.time(), json.dumps(result) if result else None, error, job_id, self.owner)
+        ):
+            logger.warning(f"Job {job_id} is no longer leased to this process; its {status} outcome is discarded")
+            return
+        self._remove_spool(job_id)
+
+    def _remove_spool(self, job_id: str):
+        try:
+            os.remove(self._spool_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    async def _worker(self, index: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = self._claim_next()
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = row["id"]
+            if row["attempts"] >= settings.JOB_MAX_ATTEMPTS:
+                # The job has already been interrupted repeatedly; do not let it crash-loop the server
+                self._finish(job_id, FAILED, error="Job was interrupted too many times")
+                continue
+
+            logger.info(f"Worker {index} started job {job_id} ({row['filename']})")
+            start = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(self._executor, self._analyze, row)
+            except JobCancelled:
+                self._finish(job_id, CANCELLED)
+                logger.info(f"Job {job_id} cancelled while running")
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                self._finish(job_id, FAILED, error=str(e) or e.__class__.__name__)
+            else:
+                self._finish(job_id, SUCCEEDED, result=result)
+                logger.info(f"Job {job_id} finished in {time.perf_counter() - start:.1f}s: {result['label']} with confidence {result['confidence']}")
+
+    def _analyze(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """
+        Analyze a spooled file window by window, in blocks, checking for cancellation between blocks.
+
+        The file is decoded once, front to back, as a stream of windows.
+
+        Returns:
+            Aggregated prediction with a per-window timeline
+        """
+        job_id = row["id"]
+        duration = row["duration"]
+        window_seconds = float(settings.DURATION)
+        total_windows = max(1, int(np.ceil(duration / window_seconds))) if duration else 1
+
+        windows: List[Dict[str, Any]] = []
+        window_results: List[Dict[str, Any]] = []
+        analyzed = 0
+        stream = stream_audio(self._spool_path(job_id), window_seconds, fmt=row["format"])
+        try:
+            while True:
+                if self._query("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))[0][0]:
+                    raise JobCancelled()
+
+                block = stream.read(settings.JOB_BLOCK_WINDOWS)
+                if not block:
+                    break
+                decoded = [(analyzed + i, chunk) for i, chunk in enumerate(block) if len(chunk) > 0]
+                analyzed += len(block)
+                if decoded:
+                    results = prediction_service.predict_batch(
+                        [preprocess_audio_chunk(chunk, stream.sample_rate) for _, chunk in decoded],
+                        stream.sample_rate
+                    )
+                    window_results.extend(results)
+                    windows.extend(
+                        {"start": index * window_seconds, "duration": len(chunk) / stream.sample_rate,
+                         "label": result["label"], "confidence": result["confidence"]}
+                        for (index, chunk), result in zip(decoded, results)
+                    )
+                self._execute(
+                    "UPDATE jobs SET progress = ? WHERE id = ?",
+                    (min(1.0, analyzed / total_windows), job_id)
+                )
+        finally:
+            stream.close()
+
+        if not window_results:
+            raise ValueError("Audio file contains no data")
+
+        result = prediction_service.aggregate_predictions(window_results)
+        result["duration"] = duration
+        result["windows"] = windows
+        return result
+
+
+# Global instance
+job_queue = JobQueue()
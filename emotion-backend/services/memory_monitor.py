@@ -0,0 +1,262 @@
+import asyncio
+import ctypes
+import gc
+import logging
+import os
+import signal
+import sys
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size of a process (this one by default), or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def tensor_memory() -> Dict[str, Any]:
+    """
+    Memory held by TensorFlow, per device, when TensorFlow is loaded.
+
+    Only accelerators report allocator statistics; on CPU the tensors are part of the
+    process RSS and the device list is empty.
+    """
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return {"loaded": False, "devices": {}}
+    devices = {}
+    for device in tf.config.list_logical_devices():
+        if device.device_type == "CPU":
+            continue
+        try:
+            info = tf.config.experimental.get_memory_info(device.name)
+            devices[device.name] = {"current_bytes": info["current"], "peak_bytes": info["peak"]}
+        except (ValueError, RuntimeError):
+            continue
+    return {"loaded": True, "devices": devices}
+
+
+def release_free_memory():
+    """Collect garbage and hand freed heap pages back to the OS (glibc only)."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class _Session:
+    def __init__(self, buffers, queue: Optional[asyncio.Queue]):
+        self.buffers = buffers
+        self.queue = queue
+        self.started_at = time.time()
+        self.peak_buffer_bytes = 0
+
+    def describe(self) -> Dict[str, Any]:
+        buffer_bytes = self.buffers.nbytes if self.buffers is not None else 0
+        self.peak_buffer_bytes = max(self.peak_buffer_bytes, buffer_bytes)
+        return {
+            "age_seconds": round(time.time() - self.started_at, 1),
+            "buffer_bytes": buffer_bytes,
+            "peak_buffer_bytes": self.peak_buffer_bytes,
+            "queued_messages": self.queue.qsize() if self.queue is not None else 0,
+        }
+
+
+class MemoryMonitor:
+    """
+    Memory accounting for long-running workers, and a guard that recycles the worker
+    before it is OOM-killed.
+
+    Realtime sessions register their buffers while they run; other holders of memory
+    (caches, connection tables, pools) register gauges. A background task samples the
+    process RSS every MEMORY_CHECK_INTERVAL seconds. When it stays above
+    MEMORY_RSS_LIMIT_MB after a garbage collection and heap trim, the worker starts
+    draining: new realtime sessions are refused and /health/ reports 503, so traffic
+    moves to other workers. Once the remaining sessions have ended (or after
+    MEMORY_DRAIN_TIMEOUT seconds) the worker sends itself SIGTERM and shuts down through
+    the normal shutdown handlers, for the process manager to start a fresh one.
+    """
+
+    def __init__(self, rss_limit_mb: float = None, check_interval: float = None, drain_timeout: float = None):
+        self.rss_limit_bytes = int((settings.MEMORY_RSS_LIMIT_MB if rss_limit_mb is None else rss_limit_mb) * 1024 * 1024)
+        self.check_interval = check_interval or settings.MEMORY_CHECK_INTERVAL
+        self.drain_timeout = settings.MEMORY_DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        self._sessions: Dict[str, _Session] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._history: Deque[Tuple[float, int]] = deque(maxlen=settings.MEMORY_HISTORY_SAMPLES)
+        self._task: Optional[asyncio.Task] = None
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self.draining_since: Optional[float] = None
+        self.started_at = time.time()
+
+    @property
+    def draining(self) -> bool:
+        return self.draining_since is not None
+
+    # Accounting
+
+    def track_session(self, client_id: str, buffers=None, queue: Optional[asyncio.Queue] = None) -> _Session:
+        session = _Session(buffers, queue)
+        self._sessions[client_id] = session
+        return session
+
+    def untrack_session(self, client_id: str, session: _Session):
+        if self._sessions.get(client_id) is session:
+            del self._sessions[client_id]
+
+    def register_gauge(self, name: str, read: Callable[[], Any]):
+        """Report read() under gauges[name] in stats(), e.g. the size of a cache."""
+        self._gauges[name] = read
+
+    def stats(self, sessions: bool = True) -> Dict[str, Any]:
+        rss = process_rss_bytes()
+        gauges = {}
+        for name, read in list(self._gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+        result = {
+            "rss_bytes": rss,
+            "rss_limit_bytes": self.rss_limit_bytes or None,
+            "rss_growth_bytes_per_hour": self._growth_rate(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "draining": self.draining,
+            "tensors": tensor_memory(),
+            "gauges": gauges,
+            "session_count": len(self._sessions),
+            "session_buffer_bytes": sum(s.buffers.nbytes for s in list(self._sessions.values()) if s.buffers is not None),
+            "tracemalloc": tracemalloc.is_tracing(),
+        }
+        if sessions:
+            result["sessions"] = {client_id: s.describe() for client_id, s in list(self._sessions.items())}
+        return result
+
+    def _growth_rate(self) -> Optional[float]:
+        if len(self._history) < 2:
+            return None
+        (t0, rss0), (t1, rss1) = self._history[0], self._history[-1]
+        return round((rss1 - rss0) / (t1 - t0) * 3600) if t1 > t0 else None
+
+    # tracemalloc
+
+    def start_tracing(self, frames: int = None):
+        """Start tracemalloc (if needed) and take the baseline snapshot later diffs compare against."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames or settings.MEMORY_TRACEMALLOC_FRAMES)
+        self._baseline = tracemalloc.take_snapshot()
+
+    def stop_tracing(self):
+        self._baseline = None
+        tracemalloc.stop()
+
+    def allocation_diff(self, limit: int = 20, key_type: str = "lineno", reset: bool = False) -> Dict[str, Any]:
+        """
+        Top allocation sites by growth since the baseline snapshot.
+
+        Args:
+            limit: Number of sites to return
+            key_type: "lineno", "filename" or "traceback"
+            reset: Make the current snapshot the new baseline afterwards
+
+        Returns:
+            Traced totals and the top sites with their size and count differences
+
+        Raises:
+            RuntimeError: If tracing has not been started
+        """
+        if not tracemalloc.is_tracing() or self._baseline is None:
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        diff = snapshot.compare_to(self._baseline, key_type)
+        current, peak = tracemalloc.get_traced_memory()
+        if reset:
+            self._baseline = snapshot
+        return {
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [
+                {
+                    "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+                    if key_type == "traceback" else f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff_bytes": stat.size_diff,
+                    "size_bytes": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in diff[:limit]
+            ],
+        }
+
+    # Guard
+
+    async def start(self):
+        """Start sampling RSS; the guard is active when MEMORY_RSS_LIMIT_MB is set."""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        if self.rss_limit_bytes:
+            logger.info(f"Memory guard started: recycle above {self.rss_limit_bytes / (1024 * 1024):.0f}MB RSS")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Memory check failed: {e}")
+
+    def check(self):
+        """Sample RSS once and start draining or recycle the worker when over the limit."""
+        rss = process_rss_bytes()
+        if rss is None:
+            return
+        self._history.append((time.time(), rss))
+        if not self.rss_limit_bytes:
+            return
+
+        if self.draining:
+            drained = not self._sessions
+            if drained or time.time() - self.draining_since >= self.drain_timeout:
+                logger.warning(f"Recycling worker at {rss / (1024 * 1024):.0f}MB RSS "
+                               f"({len(self._sessions)} realtime sessions still open)")
+                os.kill(os.getpid(), signal.SIGTERM)
+            return
+
+        if rss <= self.rss_limit_bytes:
+            return
+        release_free_memory()
+        rss = process_rss_bytes() or rss
+        if rss <= self.rss_limit_bytes:
+            logger.info(f"RSS back to {rss / (1024 * 1024):.0f}MB after releasing free memory")
+            return
+        self.draining_since = time.time()
+        logger.warning(f"RSS {rss / (1024 * 1024):.0f}MB above the {self.rss_limit_bytes / (1024 * 1024):.0f}MB limit; "
+                       f"draining {len(self._sessions)} realtime sessions before recycling. "
+                       f"Memory: {self.stats(sessions=False)}")
+
+
+# Global instance
+memory_monitor = MemoryMonitor()
@@ -0,0 +1,151 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TASKS = ("classification", "regression")
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """One entry of the model registry file."""
+    name: str
+    model_path: str
+    scaler_path: Optional[str]
+    labels: Tuple[str, ...]
+    task: str = "classification"
+
+
+def read_model_registry(path: str) -> List[ModelSpec]:
+    """
+    Read a model registry file.
+
+    The file holds {"models": [{"name", "path", "scaler_path", "labels", "task"}, ...]}.
+    "task" is "classification" (default; "labels" are the classes in output order) or
+    "regression" ("labels" name the outputs, e.g. ["arousal", "valence"]).
+    "scaler_path" may be omitted for models trained on unscaled features.
+
+    Raises:
+        ValueError: If an entry is incomplete or names are repeated
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    specs = []
+    for entry in config.get("models", []):
+        name = entry.get("name")
+        if not name or not entry.get("path") or not entry.get("labels"):
+            raise ValueError(f"Model registry entry {entry} needs a name, a path and labels")
+        task = entry.get("task", "classification")
+        if task not in TASKS:
+            raise ValueError(f"Unknown task {task} for model {name}. Supported tasks: {TASKS}")
+        if any(spec.name == name for spec in specs):
+            raise ValueError(f"Model {name} is registered more than once")
+        specs.append(ModelSpec(name, entry["path"], entry.get("scaler_path"), tuple(entry["labels"]), task))
+    return specs
+
+
+def result_failed(result: Dict[str, Any]) -> bool:
+    """Whether a result, or any extra model's result in it, is a fallback from a failed prediction."""
+    return bool(result.get("failed")) or any(result_failed(r) for r in result.get("models", {}).values())
+
+
+class ServedModel:
+    """
+    A named model with its own scaler and label set.
+
+    All served models take the feature vector of the service's feature plan, so one
+    extraction pass can feed any of them. Classification results have the usual
+    label/confidence/class_probs shape; regression results carry {"values": {output: value}}.
+    """
+
+    def __init__(self, name: str, model: Any, scaler: Any, labels: Tuple[str, ...],
+                 task: str = "classification", source: Optional[str] = None):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.labels = tuple(labels)
+        self.task = task
+        self.source = source
+
+    def scale(self, features: np.ndarray) -> np.ndarray:
+        """Scale a (n, features) matrix; features are used as-is if there is no usable scaler."""
+        if self.scaler is None:
+            return features
+        try:
+            return self.scaler.transform(features)
+        except Exception:
+            return features
+
+    def predict_rows(self, features: np.ndarray) -> np.ndarray:
+        """Raw (n, outputs) model output for a matrix of unscaled feature vectors. Errors are raised."""
+        prediction = np.asarray(self.model.predict(self.scale(features)))
+        if len(prediction.shape) == 1:
+            prediction = prediction.reshape(len(features), -1)
+        return prediction
+
+    def format(self, output: np.ndarray) -> Dict[str, Any]:
+        """Turn one row of model output into a result."""
+        if self.task == "regression":
+            values = np.zeros(len(self.labels))
+            values[:min(len(output), len(self.labels))] = output[:len(self.labels)]
+            return {"values": {label: float(value) for label, value in zip(self.labels, values)}}
+
+        probabilities = output
+        # If probabilities don't sum to 1, assume it's logits and apply softmax
+        if not np.isclose(np.sum(probabilities), 1.0, rtol=0.1):
+            # Apply softmax to convert logits to probabilities
+            exp_probs = np.exp(probabilities - np.max(probabilities))  # Subtract max for numerical stability
+            probabilities = exp_probs / np.sum(exp_probs)
+
+        # Ensure probabilities array matches the expected number of classes
+        if len(probabilities) != len(self.labels):
+            logger.warning(f"Model {self.name} output size {len(probabilities)} doesn't match expected classes {len(self.labels)}. Using default mapping.")
+            if len(probabilities) < len(self.labels):
+                # Pad with zeros
+                padded_probs = np.zeros(len(self.labels))
+                padded_probs[:len(probabilities)] = probabilities
+                probabilities = padded_probs
+            else:
+                # Use only the first N probabilities
+                probabilities = probabilities[:len(self.labels)]
+
+        predicted_idx = np.argmax(probabilities)
+        return {
+            "label": self.labels[predicted_idx],
+            "confidence": float(probabilities[predicted_idx]),
+            "class_probs": {label: float(prob) for label, prob in zip(self.labels, probabilities)}
+        }
+
+    def default_result(self) -> Dict[str, Any]:
+        """Result reported when a prediction fails; "failed" tells it apart from a real prediction."""
+        if self.task == "regression":
+            return {"values": {label: 0.0 for label in self.labels}, "failed": True}
+        return {
+            "label": "neutral" if "neutral" in self.labels else self.labels[0],
+            "confidence": 0.5,
+            "class_probs": {label: round(1.0 / len(self.labels), 3) for label in self.labels},
+            "failed": True
+        }
+
+    def aggregate(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-window results by averaging class probabilities (or output values)."""
+        if not results:
+            return self.default_result()
+        if self.task == "regression":
+            values = np.mean([[result["values"][label] for label in self.labels] for result in results], axis=0)
+            return self.format(values)
+        probabilities = np.mean([[result["class_probs"][label] for label in self.labels] for result in results], axis=0)
+        return self.format(probabilities)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "task": self.task,
+            "labels": list(self.labels),
+            "mock": type(self.model).__name__ == "MockModel",
+        }
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from services.prediction_service import prediction_service
+from services.quality_tiers import QualityTier, build_quality_tiers
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadController:
+    """
+    Steps realtime quality down under load and back up as load falls.
+
+    Load is the larger of two ratios: the smoothed receive-to-ready latency against
+    OVERLOAD_LATENCY_TARGET_MS, and the average number of messages waiting per session
+    against OVERLOAD_QUEUE_TARGET. The tier moves one step at a time, down after load
+    stays above OVERLOAD_HIGH_WATERMARK for OVERLOAD_STEP_DOWN_SECONDS and up after it
+    stays below OVERLOAD_LOW_WATERMARK for OVERLOAD_STEP_UP_SECONDS. The gap between
+    the watermarks and the longer recovery dwell keep it from oscillating.
+    """
+
+    def __init__(self, tiers: List[QualityTier], enabled: bool = None):
+        self.tiers = tiers
+        self.enabled = settings.OVERLOAD_ENABLED if enabled is None else enabled
+        self.level = 0
+        self.latency_ewma = 0.0
+        self.load = 0.0
+        self.queues: Set[asyncio.Queue] = set()
+        self.transitions = 0
+        self.tier_messages = {tier.name: 0 for tier in tiers}
+        self._high_since: Optional[float] = None
+        self._low_since: Optional[float] = None
+        self._changed_at = time.monotonic()
+
+    @property
+    def tier(self) -> QualityTier:
+        return self.tiers[self.level]
+
+    def register(self, queue: asyncio.Queue):
+        self.queues.add(queue)
+
+    def unregister(self, queue: asyncio.Queue):
+        self.queues.discard(queue)
+
+    def queue_backlog(self) -> float:
+        """Average number of messages waiting per session."""
+        if not self.queues:
+            return 0.0
+        return sum(queue.qsize() for queue in self.queues) / len(self.queues)
+
+    def observe(self, server_seconds: float):
+        """
+        Record the receive-to-ready time of a processed message and re-evaluate the tier.
+
+        Args:
+            server_seconds: Time from the message coming off the socket to its result being ready
+        """
+        alpha = settings.OVERLOAD_EWMA_ALPHA
+        self.latency_ewma = server_seconds * 1000 if self.latency_ewma == 0.0 else (
+            alpha * server_seconds * 1000 + (1 - alpha) * self.latency_ewma
+        )
+        if not self.enabled:
+            return
+
+        self.load = max(
+            self.latency_ewma / settings.OVERLOAD_LATENCY_TARGET_MS,
+            self.queue_backlog() / settings.OVERLOAD_QUEUE_TARGET
+        )
+        now = time.monotonic()
+        if self.load > settings.OVERLOAD_HIGH_WATERMARK:
+            self._low_since = None
+            self._high_since = self._high_since or now
+            if now - self._high_since >= settings.OVERLOAD_STEP_DOWN_SECONDS and self.level < len(self.tiers) - 1:
+                self._set_level(self.level + 1, now)
+        elif self.load < settings.OVERLOAD_LOW_WATERMARK:
+            self._high_since = None
+            self._low_since = self._low_since or now
+            if now - self._low_since >= settings.OVERLOAD_STEP_UP_SECONDS and self.level > 0:
+                self._set_level(self.level - 1, now)
+        else:
+            self._high_since = None
+            self._low_since = None
+
+    def _set_level(self, level: int, now: float):
+        previous = self.tier.name
+        self.level = level
+        self.transitions += 1
+        self._changed_at = now
+        # Require a fresh dwell period before the next step
+        self._high_since = None
+        self._low_since = None
+        logger.warning(f"Realtime quality tier {previous} -> {self.tier.name} "
+                       f"(load {self.load:.2f}, latency {self.latency_ewma:.1f} ms, backlog {self.queue_backlog():.2f})")
+
+    def count(self, tier: QualityTier):
+        self.tier_messages[tier.name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Current tier, load signals and per-tier message counts."""
+        return {
+            "enabled": self.enabled,
+            "tier": self.tier.name,
+            "level": self.level,
+            "tiers": [tier.name for tier in self.tiers],
+            "load": round(self.load, 3),
+            "latency_ewma_ms": round(self.latency_ewma, 3),
+            "queue_backlog": round(self.queue_backlog(), 3),
+            "sessions": len(self.queues),
+            "transitions": self.transitions,
+            "seconds_in_tier": round(time.monotonic() - self._changed_at, 3),
+            "messages_per_tier": dict(self.tier_messages),
+        }
+
+
+# Global instance
+overload_controller = OverloadController(build_quality_tiers(prediction_service))
@@ -4,68 +4,78 @@ from tensorflow import keras
 import joblib
 import librosa
 import logging
-from typing import Dict, Any, List, Tuple
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import io
 
-from config import settings
+from config import settings, resolve_path
+from preprocessing.feature_plan import compile_feature_plan
+from services.model_registry import ServedModel, read_model_registry
+from utils.buffer_pool import normalize_peak, thread_buffer_pool
+from utils.profiling import profile_stage
 
 logger = logging.getLogger(__name__)
 
 class PredictionService:
     def __init__(self):
         self.model = None
+        self.keras_model = None
         self.scaler = None
         self.feature_config = None
+        self.feature_plan = None
+        self.models: Dict[str, ServedModel] = {}
+        self.default_model = settings.DEFAULT_MODEL_NAME
         self._load_model()
         self._load_scaler()
         self._load_feature_config()
+        self._load_quantized_model()
+        self._load_model_registry()
     
     def _load_model(self):
         """Load the Keras model from the specified path."""
+        self.model = self._load_model_file(settings.MODEL_PATH)
+
+    def _load_model_file(self, model_path: str, num_classes: int = None):
+        """Load a Keras model file or SavedModel directory, or a mock model if it cannot be loaded."""
         import os
 
-        # Get the absolute path to the model
-        model_path = settings.MODEL_PATH
-        if not os.path.isabs(model_path):
-            # Get the current working directory (emotion-backend directory)
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            model_path = os.path.join(backend_dir, model_path)
-        else:
-            model_path = settings.MODEL_PATH
+        # Get the absolute path to the model (relative paths are under the emotion-backend directory)
+        model_path = resolve_path(model_path)
 
         # Check the file extension and load accordingly
         if os.path.isfile(model_path):
             # Single model file (can be .keras, .h5, or SavedModel format)
             try:
-                self.model = keras.models.load_model(model_path)
+                model = keras.models.load_model(model_path)
                 logger.info(f"Keras model loaded successfully from {model_path}")
+                return model
             except Exception as e:
                 logger.error(f"Failed to load Keras model from {model_path}: {e}")
-                self.model = self._create_mock_model()
+                return self._create_mock_model(num_classes)
         elif os.path.isdir(model_path):
             # SavedModel format (directory)
             try:
-                self.model = keras.models.load_model(model_path)
+                model = keras.models.load_model(model_path)
                 logger.info(f"SavedModel loaded successfully from {model_path}")
+                return model
             except Exception as e:
                 logger.error(f"Failed to load SavedModel from {model_path}: {e}")
-                self.model = self._create_mock_model()
+                return self._create_mock_model(num_classes)
         else:
             logger.error(f"Model not found at {model_path}")
-            self.model = self._create_mock_model()
+            return self._create_mock_model(num_classes)
     
     def _load_scaler(self):
         """Load the scaler used for preprocessing."""
+        self.scaler = self._load_scaler_file(settings.SCALER_PATH)
+
+    def _load_scaler_file(self, scaler_path: str):
+        """Load a pickled or joblib scaler, or an unfitted StandardScaler if it cannot be loaded."""
         import os
+        from sklearn.preprocessing import StandardScaler
 
-        # Get the absolute path to the scaler
-        scaler_path = settings.SCALER_PATH
-        if not os.path.isabs(scaler_path):
-            # Get the current working directory (emotion-backend directory)
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            scaler_path = os.path.join(backend_dir, scaler_path)
-        else:
-            scaler_path = settings.SCALER_PATH
+        # Get the absolute path to the scaler (relative paths are under the emotion-backend directory)
+        scaler_path = resolve_path(scaler_path)
 
         try:
             # Check if scaler file exists
@@ -76,30 +86,30 @@ class PredictionService:
                     try:
                         import pickle
                         with open(scaler_path, 'rb') as f:
-                            self.scaler = pickle.load(f)
+                            scaler = pickle.load(f)
                         logger.info(f"Scaler loaded successfully from {scaler_path} using pickle")
+                        return scaler
                     except:
                         # If pickle fails, try joblib
                         try:
-                            self.scaler = joblib.load(scaler_path)
+                            scaler = joblib.load(scaler_path)
                             logger.info(f"Scaler loaded successfully from {scaler_path} using joblib")
+                            return scaler
                         except Exception as joblib_error:
                             logger.error(f"Failed to load scaler with both pickle and joblib: {joblib_error}")
-                            from sklearn.preprocessing import StandardScaler
-                            self.scaler = StandardScaler()
+                            return StandardScaler()
                 else:
                     # For non-pkl formats, try joblib
-                    self.scaler = joblib.load(scaler_path)
+                    scaler = joblib.load(scaler_path)
                     logger.info(f"Scaler loaded successfully from {scaler_path}")
+                    return scaler
             else:
                 logger.warning(f"Scaler file not found at {scaler_path}. Using StandardScaler as default.")
-                from sklearn.preprocessing import StandardScaler
-                self.scaler = StandardScaler()
+                return StandardScaler()
         except Exception as e:
             logger.error(f"Failed to load scaler from {scaler_path}: {e}")
             # Create a mock scaler if loading fails
-            from sklearn.preprocessing import StandardScaler
-            self.scaler = StandardScaler()
+            return StandardScaler()
     
     def _load_feature_config(self):
         """Load the feature extraction configuration."""
@@ -117,17 +127,142 @@ class PredictionService:
                 "hop_length": settings.HOP_LENGTH,
                 "n_fft": settings.N_FFT
             }
+
+        # Compile once; a plan that does not fit the model is a deployment error, so fail at startup
+        start = time.perf_counter()
+        try:
+            self.feature_plan = compile_feature_plan(
+                self.feature_config,
+                settings.SAMPLE_RATE,
+                model_input_shape=getattr(self.model, "input_shape", None)
+            )
+        except ValueError as e:
+            logger.error(f"Invalid feature pipeline in {settings.PREPROCESSING_CONFIG_PATH}: {e}")
+            raise
+        logger.info(f"Feature plan compiled: {self.feature_plan.input_mode} input, {self.feature_plan.dimension} features, "
+                    f"{self.feature_plan.backend} backend in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def _load_quantized_model(self):
+        """Swap the Keras model for its quantized TFLite version if MODEL_QUANTIZATION is set."""
+        mode = settings.MODEL_QUANTIZATION.lower()
+        # Keep the float model around so the two can be compared
+        self.keras_model = self.model
+        if mode in ("", "none"):
+            return
+        if isinstance(self.model, MockModel):
+            logger.warning("Quantization requested but no Keras model is loaded, keeping mock model")
+            return
+
+        from config import resolve_path
+        from services.quantized_model import load_or_create_quantized_model
+
+        try:
+            self.model = load_or_create_quantized_model(
+                self.keras_model,
+                self.scaler,
+                mode,
+                source_path=resolve_path(settings.MODEL_PATH)
+            )
+        except Exception as e:
+            logger.error(f"Failed to load {mode} quantized model, serving the float model: {e}")
+            self.model = self.keras_model
     
-    def _create_mock_model(self):
+    def _load_model_registry(self):
+        """
+        Register the served models: the MODEL_PATH model under DEFAULT_MODEL_NAME, plus every
+        model listed in MODEL_REGISTRY_PATH. All of them are fed by the one feature plan.
+        """
+        self.models = {
+            self.default_model: ServedModel(self.default_model, self.model, self.scaler,
+                                            tuple(settings.EMOTION_LABELS), source=settings.MODEL_PATH)
+        }
+        if not settings.MODEL_REGISTRY_PATH:
+            return
+
+        for spec in read_model_registry(resolve_path(settings.MODEL_REGISTRY_PATH)):
+            if spec.name in self.models:
+                raise ValueError(f"Model {spec.name} is already registered")
+            model = self._load_model_file(spec.model_path, num_classes=len(spec.labels))
+            input_shape = getattr(model, "input_shape", None)
+            if input_shape is not None and len(input_shape) == 2 and input_shape[-1] not in (None, self.feature_plan.dimension):
+                # Every model must take the shared feature vector; a mismatch is a deployment error
+                raise ValueError(
+                    f"Model {spec.name} expects {input_shape[-1]} features but the feature plan produces {self.feature_plan.dimension}"
+                )
+            scaler = self._load_scaler_file(spec.scaler_path) if spec.scaler_path else None
+            self.models[spec.name] = ServedModel(spec.name, model, scaler, spec.labels, spec.task, source=spec.model_path)
+        logger.info(f"Serving models: {', '.join(self.models)} (default {self.default_model})")
+
+    def _create_mock_model(self, num_classes: int = None):
         """Create a mock model for demonstration purposes."""
         logger.info("Creating mock model for demonstration")
         # This is just a placeholder for when the actual model isn't available
-        return MockModel()
+        return MockModel(num_classes)
+
+    def get_model(self, name: str = None) -> ServedModel:
+        """
+        Get a served model by name.
+
+        Args:
+            name: Registry name. Defaults to the default model
+
+        Raises:
+            ValueError: If no model has that name
+        """
+        model = self.models.get(name or self.default_model)
+        if model is None:
+            raise ValueError(f"Unknown model {name}. Available models: {sorted(self.models)}")
+        return model
+
+    def resolve_models(self, names) -> Optional[List[str]]:
+        """
+        Validate the models a client asked for.
+
+        Args:
+            names: List of names or a comma-separated string; None or empty means none requested
+
+        Returns:
+            Ordered unique names, or None when no models were requested
+
+        Raises:
+            ValueError: If a name is not registered
+        """
+        if isinstance(names, str):
+            names = names.split(",")
+        names = list(dict.fromkeys(name.strip() for name in names or [] if name and name.strip()))
+        if not names:
+            return None
+        for name in names:
+            self.get_model(name)
+        return names
     
-    def preprocess_audio(self, audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
-        """Preprocess audio data for model input."""
-        # Remove any NaN or infinite values
-        audio_data = audio_data[np.isfinite(audio_data)]
+    def preprocess_audio(self, audio_data: np.ndarray, sample_rate: int, plan=None) -> np.ndarray:
+        """Preprocess audio data for model input, optionally with another FeaturePlan."""
+        features = self.audio_to_features(audio_data, sample_rate, plan)
+
+        # Reshape features to match model input
+        if len(features.shape) == 1:
+            features = features.reshape(1, -1)
+
+        return self._scale_features(features)
+
+    def preprocess_batch(self, audio_chunks: List[np.ndarray], sample_rate: int) -> np.ndarray:
+        """Preprocess several audio chunks into one scaled feature matrix."""
+        features = np.stack([self.audio_to_features(chunk, sample_rate) for chunk in audio_chunks])
+        return self._scale_features(features)
+
+    def audio_to_features(self, audio_data: np.ndarray, sample_rate: int, plan=None) -> np.ndarray:
+        """
+        Clean, resample and normalize audio, then extract its unscaled feature vector.
+
+        Intermediates go to the calling thread's buffer pool; the returned vector is new.
+        """
+        pool = thread_buffer_pool()
+
+        # Remove any NaN or infinite values (without copying clean audio)
+        finite = np.isfinite(audio_data, out=pool.get("finite", audio_data.shape, bool))
+        if audio_data.ndim > 1 or not finite.all():
+            audio_data = audio_data[finite]
 
         if len(audio_data) == 0:
             # If all values were NaN/inf, return a default small array
@@ -142,174 +277,172 @@ class PredictionService:
             audio_data = librosa.to_mono(audio_data)
 
         # Normalize audio
-        max_val = np.max(np.abs(audio_data))
-        if max_val > 0:
-            audio_data = audio_data / max_val
+        audio_data = normalize_peak(audio_data, out=pool.get("normalized", audio_data.shape, audio_data.dtype))
 
         # Extract features
-        features = self._extract_features(audio_data)
-
-        # Reshape features to match model input
-        if len(features.shape) == 1:
-            features = features.reshape(1, -1)
-
-        # Scale features if scaler is available
-        try:
-            features_scaled = self.scaler.transform(features)
-        except:
-            # If scaler fails, use the features as-is
-            features_scaled = features
+        return self._extract_features(audio_data, plan, pool)
 
-        return features_scaled
+    def _scale_features(self, features: np.ndarray) -> np.ndarray:
+        """Scale a (n, features) matrix with the default model's scaler."""
+        # If there is no usable scaler, the features are used as-is
+        return self.get_model().scale(features)
     
-    def _extract_features(self, audio_data: np.ndarray) -> np.ndarray:
-        """Extract features from audio data."""
-        # Determine the expected input shape from the model
-        try:
-            expected_shape = self.model.input_shape
-            # If the model expects a certain shape, we'll adapt our feature extraction
-        except:
-            # Default to MFCC-based features if model info not available
-            expected_shape = None
-
-        # If your model expects raw audio or a specific time series format
-        if expected_shape and len(expected_shape) > 2 and expected_shape[1] > 1000:  # Likely expects time series
-            # Pad or truncate to expected length
-            expected_len = expected_shape[1]
-            if len(audio_data) < expected_len:
-                # Pad with zeros
-                padding = np.zeros(expected_len - len(audio_data))
-                audio_data = np.concatenate([audio_data, padding])
-            elif len(audio_data) > expected_len:
-                # Truncate
-                audio_data = audio_data[:expected_len]
-            return audio_data
-        else:
-            # Default: Extract MFCCs and other audio features
-            # Extract MFCCs
-            mfccs = librosa.feature.mfcc(
-                y=audio_data,
-                sr=settings.SAMPLE_RATE,
-                n_mfcc=self.feature_config.get("n_mfcc", 13),
-                hop_length=self.feature_config.get("hop_length", settings.HOP_LENGTH),
-                n_fft=self.feature_config.get("n_fft", settings.N_FFT)
-            )
-
-            # Extract spectral centroid
-            spectral_centroids = librosa.feature.spectral_centroid(
-                y=audio_data,
-                sr=settings.SAMPLE_RATE,
-                n_fft=self.feature_config.get("n_fft", settings.N_FFT),
-                hop_length=self.feature_config.get("hop_length", settings.HOP_LENGTH)
-            )
-
-            # Extract spectral rolloff
-            spectral_rolloff = librosa.feature.spectral_rolloff(
-                y=audio_data,
-                sr=settings.SAMPLE_RATE,
-                n_fft=self.feature_config.get("n_fft", settings.N_FFT),
-                hop_length=self.feature_config.get("hop_length", settings.HOP_LENGTH)
-            )
-
-            # Extract zero crossing rate
-            zcr = librosa.feature.zero_crossing_rate(audio_data)
-
-            # Extract chroma
-            chroma = librosa.feature.chroma_stft(
-                y=audio_data,
-                sr=settings.SAMPLE_RATE,
-                n_chroma=12,  # Fixed to 12 chroma bins
-                n_fft=self.feature_config.get("n_fft", settings.N_FFT),
-                hop_length=self.feature_config.get("hop_length", settings.HOP_LENGTH)
-            )
-
-            # Extract spectral bandwidth
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(
-                y=audio_data,
-                sr=settings.SAMPLE_RATE,
-                n_fft=self.feature_config.get("n_fft", settings.N_FFT),
-                hop_length=self.feature_config.get("hop_length", settings.HOP_LENGTH)
-            )
-
-            # Compute statistics for each feature
-            # Ensure all arrays have consistent shapes before concatenating
-            features = np.concatenate([
-                np.mean(mfccs, axis=1),
-                np.var(mfccs, axis=1),
-                [np.mean(spectral_centroids)],
-                [np.var(spectral_centroids)],
-                [np.mean(spectral_rolloff)],
-                [np.var(spectral_rolloff)],
-                [np.mean(zcr)],
-                [np.var(zcr)],
-                np.mean(chroma, axis=1),
-                np.var(chroma, axis=1),
-                [np.mean(spectral_bandwidth)],
-                [np.var(spectral_bandwidth)]
-            ])
-
-            return features
+    def _extract_features(self, audio_data: np.ndarray, plan=None, pool=None) -> np.ndarray:
+        """Extract features from audio data with the compiled feature plan, or the given one."""
+        return (plan or self.feature_plan).extract(audio_data, pool)
     
-    def predict(self, audio_data: np.ndarray, sample_rate: int) -> Dict[str, Any]:
-        """Make a prediction on audio data."""
+    def predict(self, audio_data: np.ndarray, sample_rate: int, profile=None, plan=None,
+                models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Make a prediction on audio data.
+
+        Features are extracted once; the default model and every requested model then
+        score the same vector.
+
+        Args:
+            audio_data: Audio samples
+            sample_rate: Sample rate of the audio
+            profile: Optional RequestProfile (or anything with a stage() context manager)
+            plan: Optional FeaturePlan replacing the configured one, e.g. a degraded quality tier
+            models: Optional model names (see resolve_models); their results are added under "models"
+        """
         try:
-            # Preprocess the audio
-            processed_data = self.preprocess_audio(audio_data, sample_rate)
-
-            # Make prediction
-            if isinstance(self.model, MockModel):
-                # For demo purposes, return a mock prediction
-                prediction = self.model.predict(processed_data)
-            else:
-                prediction = self.model.predict(processed_data)
-
-            # Handle different prediction output formats
-            if len(prediction.shape) > 1:
-                # If prediction has multiple dimensions, get the first result
-                probabilities = prediction[0]
-            else:
-                # If prediction is 1D, use as is
-                probabilities = prediction
-
-            # If probabilities don't sum to 1, assume it's logits and apply softmax
-            if not np.isclose(np.sum(probabilities), 1.0, rtol=0.1):
-                # Apply softmax to convert logits to probabilities
-                exp_probs = np.exp(probabilities - np.max(probabilities))  # Subtract max for numerical stability
-                probabilities = exp_probs / np.sum(exp_probs)
-
-            # Ensure probabilities array matches the expected number of emotion classes
-            if len(probabilities) != len(settings.EMOTION_LABELS):
-                logger.warning(f"Model output size {len(probabilities)} doesn't match expected emotion classes {len(settings.EMOTION_LABELS)}. Using default mapping.")
-                # Create a default mapping or use top predictions
-                if len(probabilities) < len(settings.EMOTION_LABELS):
-                    # Pad with zeros
-                    padded_probs = np.zeros(len(settings.EMOTION_LABELS))
-                    padded_probs[:len(probabilities)] = probabilities
-                    probabilities = padded_probs
-                else:
-                    # Use only the first N probabilities
-                    probabilities = probabilities[:len(settings.EMOTION_LABELS)]
-
-            # Get the predicted label
-            predicted_idx = np.argmax(probabilities)
-            predicted_label = settings.EMOTION_LABELS[predicted_idx]
-
-            # Create result dictionary
-            result = {
-                "label": predicted_label,
-                "confidence": float(probabilities[predicted_idx]),
-                "class_probs": {label: float(prob) for label, prob in zip(settings.EMOTION_LABELS, probabilities)}
-            }
-
-            return result
+            with profile_stage(profile, "features"):
+                features = self.audio_to_features(audio_data, sample_rate, plan).reshape(1, -1)
         except Exception as e:
             logger.error(f"Prediction error: {e}")
             # Return a default result in case of error
-            return {
-                "label": "neutral",
-                "confidence": 0.5,
-                "class_probs": {label: 0.167 for label in settings.EMOTION_LABELS}
+            return self._default_result(models)
+
+        with profile_stage(profile, "inference"):
+            outputs = self.predict_model_outputs(features, models)
+        return self.results_from_outputs(outputs, 1, models)[0]
+
+    def predict_probabilities(self, audio_data: np.ndarray, sample_rate: int, profile=None, plan=None,
+                              model: str = None) -> np.ndarray:
+        """Raw output of one model for one clip. Unlike predict(), errors are raised to the caller."""
+        with profile_stage(profile, "features"):
+            features = self.audio_to_features(audio_data, sample_rate, plan).reshape(1, -1)
+        with profile_stage(profile, "inference"):
+            return self.get_model(model).predict_rows(features)[0]
+
+    def predict_feature_probabilities(self, features: np.ndarray, model: str = None) -> np.ndarray:
+        """Raw (n, outputs) output of one model for a matrix of unscaled feature vectors. Errors are raised."""
+        return self.get_model(model).predict_rows(features)
+
+    def predict_model_outputs(self, features: np.ndarray, models: Optional[List[str]] = None,
+                              errors: Optional[Dict[str, str]] = None) -> Dict[str, Optional[np.ndarray]]:
+        """
+        Raw outputs of the default model and the requested models for unscaled feature rows.
+
+        Each model scores all rows in one call. A model that fails is logged and maps to
+        None, so the other models' results are still returned.
+
+        Args:
+            features: (n, features) matrix of unscaled feature vectors
+            models: Optional model names scored alongside the default model
+            errors: Optional dict that receives the error message of each failed model
+        """
+        outputs: Dict[str, Optional[np.ndarray]] = {}
+        for name in [self.default_model] + [name for name in models or [] if name != self.default_model]:
+            try:
+                outputs[name] = self.get_model(name).predict_rows(features)
+            except Exception as e:
+                logger.error(f"Prediction error in model {name}: {e}")
+                outputs[name] = None
+                if errors is not None:
+                    errors[name] = str(e) or e.__class__.__name__
+        return outputs
+
+    def results_from_outputs(self, outputs: Dict[str, Optional[np.ndarray]], rows: int,
+                             models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Format predict_model_outputs() into one result per row: the default model's fields plus "models"."""
+        def model_result(name: str, row: int) -> Dict[str, Any]:
+            output = outputs.get(name)
+            served = self.get_model(name)
+            return served.default_result() if output is None else served.format(output[row])
+
+        results = []
+        for row in range(rows):
+            result = model_result(self.default_model, row)
+            if models is not None:
+                result["models"] = {name: model_result(name, row) for name in models}
+            results.append(result)
+        return results
+
+    def format_probabilities(self, probabilities: np.ndarray, model: str = None) -> Dict[str, Any]:
+        """Turn raw model output for one clip into a result of that model."""
+        return self.get_model(model).format(probabilities)
+
+    def default_result(self, models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Result reported when a prediction fails."""
+        return self._default_result(models)
+
+    def predict_batch(self, audio_chunks: List[np.ndarray], sample_rate: int,
+                      models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Make predictions on several audio chunks with a single call per model."""
+        if not audio_chunks:
+            return []
+        try:
+            features = np.stack([self.audio_to_features(chunk, sample_rate) for chunk in audio_chunks])
+        except Exception as e:
+            logger.error(f"Batch feature extraction error: {e}")
+            return [self._default_result(models) for _ in audio_chunks]
+        return self.predict_features(features, models)
+
+    def predict_features(self, features: np.ndarray, models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Scale an (n, features) matrix of unscaled feature vectors and predict all rows in one call per model."""
+        if len(features) == 0:
+            return []
+        return self.results_from_outputs(self.predict_model_outputs(features, models), len(features), models)
+
+    def score_feature_store(self, store, batch_size: int = None,
+                            models: Optional[List[str]] = None) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """
+        Score every file in a FeatureStore straight from its memory map, without decoding audio.
+
+        Args:
+            store: An open services.feature_store.FeatureStore
+            batch_size: Rows per model call. Defaults to settings.FEATURE_STORE_BATCH_SIZE
+            models: Optional model names scored alongside the default model
+
+        Yields:
+            (StoreEntry, result) for every indexed file, in row order
+        """
+        if store.dimension != self.feature_plan.dimension:
+            raise ValueError(f"Feature plan produces {self.feature_plan.dimension} features but the store holds {store.dimension}")
+        for features, row_entries in store.iter_batches(batch_size or settings.FEATURE_STORE_BATCH_SIZE):
+            for entries, result in zip(row_entries, self.predict_features(features, models)):
+                for entry in entries:
+                    yield entry, result
+
+    def aggregate_predictions(self, results: List[Dict[str, Any]],
+                              models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Combine per-window results into one result by averaging class probabilities (or regression outputs)."""
+        if not results:
+            return self._default_result(models)
+        result = self.get_model().aggregate(results)
+        if models is not None:
+            result["models"] = {
+                name: self.get_model(name).aggregate([window["models"][name] for window in results])
+                for name in models
             }
+        return result
+
+    def _format_result(self, probabilities: np.ndarray) -> Dict[str, Any]:
+        """Turn one row of default model output into a label/confidence/class_probs result."""
+        return self.get_model().format(probabilities)
+
+    def _default_result(self, models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Result returned when prediction fails."""
+        result = self.get_model().default_result()
+        if models is not None:
+            result["models"] = {name: self.get_model(name).default_result() for name in models}
+        return result
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        """Name, task and labels of every served model."""
+        return [{**model.describe(), "default": name == self.default_model} for name, model in self.models.items()]
     
     def _convert_to_multiclass(self, single_prob: float) -> np.ndarray:
         """Convert a single probability to multi-class probabilities (for demo purposes)."""
@@ -321,10 +454,13 @@ class PredictionService:
 
 class MockModel:
     """Mock model for demonstration purposes when the actual model isn't available."""
+    def __init__(self, num_classes: int = None):
+        self.num_classes = num_classes
+
     def predict(self, x):
         # Return random probabilities that sum to 1
         batch_size = x.shape[0] if len(x.shape) > 1 else 1
-        num_classes = len(settings.EMOTION_LABELS)
+        num_classes = self.num_classes or len(settings.EMOTION_LABELS)
         # Generate random probabilities
         probs = np.random.dirichlet(np.ones(num_classes), size=batch_size)
         return probs
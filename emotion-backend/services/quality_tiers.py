@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from config import settings
+from preprocessing.feature_plan import FeaturePlan, derive_feature_plan
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    """
+    One step of realtime quality.
+
+    plan is the FeaturePlan used for the tier (None means the service's own plan), and
+    sample_every > 1 means only every n-th message of a session is analyzed.
+    """
+    level: int
+    name: str
+    plan: Optional[FeaturePlan]
+    sample_every: int = 1
+
+
+def build_quality_tiers(service) -> List[QualityTier]:
+    """
+    Build the quality tiers for a PredictionService, from full quality down.
+
+    full:    the configured feature plan
+    coarse:  longer STFT and zero-crossing hops (fewer frames per window)
+    reduced: coarse, and OVERLOAD_SKIP_FEATURES are not computed; their values are taken
+             from the scaler's training means when the scaler matches the plan, otherwise
+             chroma uses a fixed tuning instead of per-window estimation
+    sampled: reduced, and only every OVERLOAD_SAMPLE_EVERY-th window of a session is analyzed
+
+    Raw-input models only get the full and sampled tiers, since their input cannot be coarsened.
+    """
+    tiers = [QualityTier(0, "full", None)]
+    if service.feature_plan.input_mode == "raw":
+        tiers.append(QualityTier(1, "sampled", None, settings.OVERLOAD_SAMPLE_EVERY))
+        return tiers
+
+    hop_factor = settings.OVERLOAD_COARSE_HOP_FACTOR
+    skip = [name.strip() for name in settings.OVERLOAD_SKIP_FEATURES.split(",") if name.strip()]
+    fill_values = getattr(service.scaler, "mean_", None)
+    if fill_values is not None and len(fill_values) != service.feature_plan.dimension:
+        fill_values = None
+
+    coarse = derive_feature_plan(service.feature_config, settings.SAMPLE_RATE, hop_factor=hop_factor)
+    reduced = derive_feature_plan(service.feature_config, settings.SAMPLE_RATE, hop_factor=hop_factor,
+                                  skip=skip, fill_values=fill_values)
+    tiers.append(QualityTier(1, "coarse", coarse))
+    tiers.append(QualityTier(2, "reduced", reduced))
+    tiers.append(QualityTier(3, "sampled", reduced, settings.OVERLOAD_SAMPLE_EVERY))
+    return tiers
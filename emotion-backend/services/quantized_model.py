@@ -0,0 +1,221 @@
+import numpy as np
+import tensorflow as tf
+import logging
+import os
+import threading
+from typing import Optional, Iterator, List
+
+from config import settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("dynamic", "int8")
+
+
+class QuantizedModel:
+    """
+    TFLite model wrapper exposing the subset of the Keras model API used by PredictionService.
+
+    Inputs are the scaled feature vectors that would be fed to the Keras model. For
+    full-integer models the inputs are quantized and the outputs dequantized here,
+    so callers always work with float32 arrays.
+    """
+
+    def __init__(self, model_path: str = None, model_content: bytes = None, num_threads: Optional[int] = None):
+        if model_path is None and model_content is None:
+            raise ValueError("Either model_path or model_content is required")
+        self.model_path = model_path
+        self._interpreter = tf.lite.Interpreter(
+            model_path=model_path,
+            model_content=model_content,
+            num_threads=num_threads
+        )
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        # The interpreter keeps internal state between set_tensor and invoke
+        self._lock = threading.Lock()
+
+    @property
+    def input_shape(self):
+        return (None,) + tuple(int(dim) for dim in self._input["shape"][1:])
+
+    @property
+    def size_bytes(self) -> int:
+        """Size of the serialized model in bytes (0 when loaded from memory)."""
+        if self.model_path and os.path.exists(self.model_path):
+            return os.path.getsize(self.model_path)
+        return 0
+
+    def predict(self, x: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """Run inference on a batch of scaled feature vectors."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+
+        with self._lock:
+            if x.shape[0] != self._batch_size:
+                self._interpreter.resize_tensor_input(self._input["index"], list(x.shape))
+                self._interpreter.allocate_tensors()
+                self._input = self._interpreter.get_input_details()[0]
+                self._output = self._interpreter.get_output_details()[0]
+                self._batch_size = x.shape[0]
+
+            self._interpreter.set_tensor(self._input["index"], self._quantize(x, self._input))
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output["index"])
+
+        return self._dequantize(output, self._output)
+
+    @staticmethod
+    def _quantize(x: np.ndarray, details: dict) -> np.ndarray:
+        dtype = details["dtype"]
+        if dtype == np.float32:
+            return x
+        scale, zero_point = details["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(dtype)
+
+    @staticmethod
+    def _dequantize(y: np.ndarray, details: dict) -> np.ndarray:
+        if details["dtype"] == np.float32:
+            return y
+        scale, zero_point = details["quantization"]
+        return (y.astype(np.float32) - zero_point) * scale
+
+
+def quantized_model_path(mode: str) -> str:
+    """
+    Get the absolute path of the quantized model file for a quantization mode.
+
+    Args:
+        mode: Quantization mode ("dynamic" or "int8")
+
+    Returns:
+        Absolute path to the .tflite file
+    """
+    return resolve_path(settings.QUANTIZED_MODEL_PATH.format(mode=mode))
+
+
+def load_calibration_features(scaler, num_features: int, num_samples: int = None) -> np.ndarray:
+    """
+    Load representative scaled feature vectors for int8 calibration.
+
+    Uses QUANTIZATION_CALIBRATION_PATH (a .npy array or a .npz file with an "X" array of
+    unscaled feature vectors, as produced by PredictionService._extract_features). Without
+    it, synthetic vectors from a standard normal distribution are used, but only when
+    QUANTIZATION_SYNTHETIC_CALIBRATION is set: they ignore how the real features are
+    correlated, so the int8 ranges they give can clip real inputs.
+
+    Args:
+        scaler: Fitted scaler applied to the unscaled vectors
+        num_features: Number of model input features
+        num_samples: Maximum number of vectors to return
+
+    Returns:
+        Scaled feature vectors of shape (n, num_features)
+
+    Raises:
+        ValueError: When no calibration path is set and synthetic calibration is not enabled
+    """
+    if num_samples is None:
+        num_samples = settings.QUANTIZATION_CALIBRATION_SAMPLES
+
+    calibration_path = settings.QUANTIZATION_CALIBRATION_PATH
+    if calibration_path:
+        calibration_path = resolve_path(calibration_path)
+        data = np.load(calibration_path)
+        features = data["X"] if isinstance(data, np.lib.npyio.NpzFile) else data
+        features = np.asarray(features, dtype=np.float32)[:num_samples]
+        try:
+            features = scaler.transform(features)
+        except Exception as e:
+            logger.warning(f"Scaler could not transform calibration features, using them unscaled: {e}")
+        logger.info(f"Loaded {len(features)} calibration feature vectors from {calibration_path}")
+        return np.asarray(features, dtype=np.float32)
+
+    if not settings.QUANTIZATION_SYNTHETIC_CALIBRATION:
+        raise ValueError("int8 quantization needs QUANTIZATION_CALIBRATION_PATH, "
+                         "or QUANTIZATION_SYNTHETIC_CALIBRATION=true to calibrate on synthetic vectors")
+    logger.warning("No QUANTIZATION_CALIBRATION_PATH set, calibrating on synthetic feature vectors")
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((num_samples, num_features)).astype(np.float32)
+
+
+def quantize_keras_model(model, mode: str, calibration_features: np.ndarray = None) -> bytes:
+    """
+    Convert a Keras model to a quantized TFLite flatbuffer.
+
+    Args:
+        model: Loaded Keras model taking scaled feature vectors
+        mode: "dynamic" for dynamic-range (int8 weights, float activations) or
+            "int8" for full-integer quantization calibrated on calibration_features
+        calibration_features: Representative scaled feature vectors (required for int8)
+
+    Returns:
+        Serialized TFLite model
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode {mode}. Supported modes: {QUANTIZATION_MODES}")
+
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+    input_spec = tf.TensorSpec([None] + list(model.input_shape[1:]), tf.float32)
+    concrete_fn = tf.function(lambda x: model(x, training=False)).get_concrete_function(input_spec)
+    # Freezing the variables first avoids converter failures on Keras 3 variable reads
+    frozen_fn = convert_variables_to_constants_v2(concrete_fn)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([frozen_fn])
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if mode == "int8":
+        if calibration_features is None or len(calibration_features) == 0:
+            raise ValueError("int8 quantization requires calibration feature vectors")
+
+        def representative_dataset() -> Iterator[List[np.ndarray]]:
+            for row in calibration_features:
+                yield [row.reshape(1, -1).astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    return converter.convert()
+
+
+def load_or_create_quantized_model(model, scaler, mode: str, source_path: str = None) -> QuantizedModel:
+    """
+    Load the quantized model for a mode, generating it from the Keras model when missing or stale.
+
+    Args:
+        model: Loaded Keras model
+        scaler: Fitted scaler, used to scale calibration features
+        mode: Quantization mode ("dynamic" or "int8")
+        source_path: Path of the Keras model file, used to detect a stale quantized model
+
+    Returns:
+        QuantizedModel ready for inference
+    """
+    output_path = quantized_model_path(mode)
+    is_stale = (
+        source_path is not None
+        and os.path.exists(source_path)
+        and os.path.exists(output_path)
+        and os.path.getmtime(output_path) < os.path.getmtime(source_path)
+    )
+
+    if not os.path.exists(output_path) or is_stale:
+        calibration_features = None
+        if mode == "int8":
+            calibration_features = load_calibration_features(scaler, int(model.input_shape[-1]))
+        logger.info(f"Generating {mode} quantized model at {output_path}")
+        tflite_model = quantize_keras_model(model, mode, calibration_features)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(tflite_model)
+
+    quantized = QuantizedModel(model_path=output_path, num_threads=settings.QUANTIZED_NUM_THREADS)
+    logger.info(f"Quantized ({mode}) model loaded from {output_path}, {quantized.size_bytes} bytes")
+    return quantized
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+from fastapi import WebSocket
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class Subscriber:
+    """
+    An observer WebSocket subscribed to the prediction streams of one or more clients.
+
+    Messages are buffered in a bounded queue and sent by the subscriber's own task,
+    so a slow observer only ever delays itself.
+    """
+
+    def __init__(self, websocket: WebSocket, client_ids: Iterable[str], queue_size: int = None, drop_policy: str = None):
+        self.websocket = websocket
+        self.client_ids: Set[str] = set(client_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.OBSERVER_QUEUE_SIZE)
+        self.drop_policy = drop_policy or settings.OBSERVER_DROP_POLICY
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, message: str) -> bool:
+        """
+        Queue a message without blocking.
+
+        Returns:
+            True if the message was queued, False if it was dropped
+        """
+        if self.queue.full():
+            self.dropped += 1
+            if self.drop_policy == DROP_NEWEST:
+                return False
+            # Drop the oldest message to make room for the newest one
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+        return True
+
+    async def run(self):
+        """Send queued messages until the WebSocket fails or the task is cancelled."""
+        while True:
+            message = await self.queue.get()
+            await self.websocket.send_text(message)
+            self.delivered += 1
+
+
+class PredictionBroker:
+    """Publishes each session's predictions once and fans them out to subscribed observers."""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.published = 0
+        self.fanout_messages = 0
+        self.fanout_seconds_total = 0.0
+        self.fanout_seconds_max = 0.0
+
+    def subscribe(self, subscriber: Subscriber):
+        for client_id in subscriber.client_ids:
+            self.subscribers.setdefault(client_id, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for client_id in subscriber.client_ids:
+            observers = self.subscribers.get(client_id)
+            if observers is not None:
+                observers.discard(subscriber)
+                if not observers:
+                    del self.subscribers[client_id]
+
+    def has_subscribers(self, client_id: str) -> bool:
+        return client_id in self.subscribers
+
+    def publish(self, client_id: str, payload: Dict[str, Any]):
+        """
+        Publish a message from a client session to its observers.
+
+        The payload is serialized once and handed to each subscriber's queue without
+        awaiting any network I/O.
+
+        Args:
+            client_id: Session the message belongs to
+            payload: JSON-serializable message
+        """
+        observers = self.subscribers.get(client_id)
+        if not observers:
+            return
+
+        start = time.perf_counter()
+        message = json.dumps({"client_id": client_id, **payload})
+        for subscriber in observers:
+            subscriber.offer(message)
+        elapsed = time.perf_counter() - start
+
+        self.published += 1
+        self.fanout_messages += len(observers)
+        self.fanout_seconds_total += elapsed
+        self.fanout_seconds_max = max(self.fanout_seconds_max, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Fan-out counters and per-subscriber queue state."""
+        all_subscribers: List[Subscriber] = list({s for observers in self.subscribers.values() for s in observers})
+        return {
+            "observed_clients": len(self.subscribers),
+            "subscribers": len(all_subscribers),
+            "published": self.published,
+            "fanout_messages": self.fanout_messages,
+            "fanout_avg_us": (self.fanout_seconds_total / self.published * 1e6) if self.published else 0.0,
+            "fanout_max_us": self.fanout_seconds_max * 1e6,
+            "delivered": sum(s.delivered for s in all_subscribers),
+            "dropped": sum(s.dropped for s in all_subscribers),
+            "max_queue_depth": max((s.queue.qsize() for s in all_subscribers), default=0),
+        }
+
+
+# Global instance
+broker = PredictionBroker()
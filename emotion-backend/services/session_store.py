@@ -0,0 +1,394 @@
+import abc
+import json
+import logging
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORES = ("memory", "sqlite", "redis")
+
+# Stored value: 4-byte big-endian JSON length, the JSON metadata, then the float32 audio
+_HEADER = struct.Struct(">I")
+# Characters with a meaning in Redis MATCH patterns
+_GLOB_SPECIAL = re.compile(r"([\\*?\[\]])")
+
+
+class SessionState:
+    """
+    What a realtime session needs to resume on another worker: its metadata, the last
+    result (and a short history of results) and, optionally, the most recent audio.
+    """
+
+    def __init__(self, client_id: str, node: str = None, connection_id: str = None, connected: bool = True,
+                 created_at: float = None, updated_at: float = None, messages: int = 0, last_seq: int = 0,
+                 models: Optional[List[str]] = None, last_result: Optional[Dict[str, Any]] = None,
+                 history: Optional[List[Dict[str, Any]]] = None, audio: Optional[np.ndarray] = None,
+                 resumed: int = 0):
+        now = time.time()
+        self.client_id = client_id
+        self.node = node or settings.NODE_ID
+        self.connection_id = connection_id or uuid.uuid4().hex
+        self.connected = connected
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+        self.messages = messages
+        self.last_seq = last_seq
+        self.models = models
+        self.last_result = last_result
+        self.history = history or []
+        self.audio = audio if audio is not None else np.zeros(0, dtype=np.float32)
+        self.resumed = resumed
+
+    def add_result(self, seq: int, result: Dict[str, Any]):
+        """Record a sent result; only the last SESSION_STORE_HISTORY are kept."""
+        self.messages += 1
+        self.last_seq = seq
+        self.last_result = result
+        self.updated_at = time.time()
+        if settings.SESSION_STORE_HISTORY:
+            self.history.append({"seq": seq, "at": self.updated_at, "label": result.get("label"),
+                                 "confidence": result.get("confidence")})
+            del self.history[:-settings.SESSION_STORE_HISTORY]
+
+    def add_audio(self, audio: np.ndarray, sample_rate: int):
+        """Keep the last SESSION_STORE_AUDIO_SECONDS of received audio (nothing when 0)."""
+        keep = int(settings.SESSION_STORE_AUDIO_SECONDS * sample_rate)
+        if keep <= 0:
+            return
+        if len(audio) >= keep:
+            self.audio = np.array(audio[-keep:], dtype=np.float32)
+        else:
+            self.audio = np.concatenate([self.audio[-(keep - len(audio)):], audio]).astype(np.float32, copy=False)
+
+    def window(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        A frame shorter than DURATION seconds, preceded by as much of the kept audio as fits.
+
+        After a resume the kept audio is the stored one, so the first frames on the new
+        worker are analyzed with the same context they would have had on the old one.
+        Frames of a full window, or sessions keeping no audio, are returned unchanged.
+        """
+        missing = int(settings.DURATION * sample_rate) - len(audio)
+        if missing <= 0 or len(self.audio) == 0:
+            return audio
+        return np.concatenate([self.audio[-missing:], audio])
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "client_id": self.client_id,
+            "node": self.node,
+            "connection_id": self.connection_id,
+            "connected": self.connected,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "messages": self.messages,
+            "last_seq": self.last_seq,
+            "models": self.models,
+            "last_result": self.last_result,
+            "history": self.history,
+            "resumed": self.resumed,
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        return {**self.metadata(), "audio_seconds": round(len(self.audio) / settings.SAMPLE_RATE, 3)}
+
+    def copy(self) -> "SessionState":
+        """Snapshot for saving off the event loop while the session goes on."""
+        metadata = self.metadata()
+        metadata["history"] = list(self.history)
+        return SessionState(audio=self.audio.copy(), **metadata)
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps(self.metadata()).encode()
+        return _HEADER.pack(len(header)) + header + self.audio.astype(np.float32, copy=False).tobytes()
+
+    @classmethod
+    def from_bytes(cls, value: bytes) -> "SessionState":
+        (length,) = _HEADER.unpack_from(value)
+        metadata = json.loads(value[_HEADER.size:_HEADER.size + length])
+        audio = np.frombuffer(value[_HEADER.size + length:], dtype=np.float32).copy()
+        return cls(audio=audio, **metadata)
+
+
+class SessionStore(abc.ABC):
+    """
+    Realtime session states by client id, kept for SESSION_STORE_TTL seconds after
+    their last save.
+
+    Backends only store opaque bytes under a key with an expiry; serialization lives
+    here, so every backend holds exactly the same data.
+    """
+
+    name = "base"
+
+    def __init__(self, ttl: float = None, prefix: str = None):
+        self.ttl = ttl or settings.SESSION_STORE_TTL
+        self.prefix = prefix or settings.SESSION_STORE_PREFIX
+
+    def get(self, client_id: str) -> Optional[SessionState]:
+        value = self._get(self.prefix + client_id)
+        if value is None:
+            return None
+        try:
+            return SessionState.from_bytes(value)
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            logger.warning(f"Discarding unreadable session state for client {client_id}: {e}")
+            self.delete(client_id)
+            return None
+
+    def put(self, state: SessionState):
+        self._set(self.prefix + state.client_id, state.to_bytes(), self.ttl)
+
+    def delete(self, client_id: str):
+        self._delete(self.prefix + client_id)
+
+    def client_ids(self) -> List[str]:
+        return sorted(key[len(self.prefix):] for key in self._keys(self.prefix))
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """The unexpired value of a key, or None."""
+
+    @abc.abstractmethod
+    def _set(self, key: str, value: bytes, ttl: float):
+        """Store a value that expires after ttl seconds."""
+
+    @abc.abstractmethod
+    def _delete(self, key: str):
+        """Remove a key if it exists."""
+
+    @abc.abstractmethod
+    def _keys(self, prefix: str) -> List[str]:
+        """Unexpired keys starting with prefix (taken literally)."""
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store; sessions only resume on the same worker."""
+
+    name = "memory"
+
+    def __init__(self, ttl: float = None, prefix: str = None):
+        super().__init__(ttl, prefix)
+        self._values: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.time():
+                del self._values[key]
+                return None
+            return item[1]
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._values[key] = (time.time() + ttl, value)
+            # Expired entries are dropped on write too, so abandoned sessions do not pile up
+            now = time.time()
+            for expired in [k for k, (expires_at, _) in self._values.items() if expires_at <= now]:
+                del self._values[expired]
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def _keys(self, prefix: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [k for k, (expires_at, _) in self._values.items() if k.startswith(prefix) and expires_at > now]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+"""
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Key-value store in a local SQLite file, shared by every worker process on the node
+    (and by nodes sharing the file on a volume that supports SQLite locking).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = None, ttl: float = None, prefix: str = None):
+        super().__init__(ttl, prefix)
+        self.path = resolve_path(path or settings.SESSION_STORE_PATH)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM sessions WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO sessions (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, now + ttl))
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._connect().execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def _keys(self, prefix: str) -> List[str]:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key FROM sessions WHERE key LIKE ? ESCAPE '\\' AND expires_at > ?", (escaped + "%", time.time())
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+def _glob_regex(pattern: str) -> "re.Pattern":
+    """A Redis MATCH pattern without character classes (*, ? and backslash escapes) as a regex."""
+    parts = []
+    for token in re.findall(r"\\.|.", pattern, re.DOTALL):
+        if token == "*":
+            parts.append(".*")
+        elif token == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(token[-1]))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the few Redis commands RedisSessionStore uses (GET, SET with
+    EX, DELETE, SCAN). Lets the Redis backend run without a server, e.g. in tests.
+
+    SCAN patterns support *, ? and backslash escapes, as Redis does; character classes
+    are not supported.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._values.get(name)
+            if item is None:
+                return None
+            if item[0] is not None and item[0] <= time.time():
+                del self._values[name]
+                return None
+            return item[1]
+
+    def set(self, name: str, value: bytes, ex: Optional[float] = None) -> bool:
+        with self._lock:
+            self._values[name] = (time.time() + ex if ex else None, bytes(value))
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._values.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*") -> Iterator[bytes]:
+        pattern = _glob_regex(match)
+        now = time.time()
+        with self._lock:
+            keys = [k for k, (expires_at, _) in self._values.items()
+                    if pattern.fullmatch(k) and (expires_at is None or expires_at > now)]
+        return iter(key.encode() for key in keys)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store in Redis (or anything speaking its protocol), shared by all nodes.
+
+    Needs the redis package unless SESSION_STORE_URL is "local://", which uses the
+    in-process LocalRedis stand-in.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = None, ttl: float = None, prefix: str = None, client=None):
+        super().__init__(ttl, prefix)
+        url = url or settings.SESSION_STORE_URL
+        if client is None:
+            if url == "local://":
+                client = LocalRedis()
+            else:
+                try:
+                    import redis
+                except ImportError:
+                    raise RuntimeError("SESSION_STORE=redis needs the redis package (pip install redis)")
+                client = redis.Redis.from_url(url)
+        self.client = client
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def _delete(self, key: str):
+        self.client.delete(key)
+
+    def _keys(self, prefix: str) -> List[str]:
+        keys = self.client.scan_iter(match=_GLOB_SPECIAL.sub(r"\\\1", prefix) + "*")
+        return [key.decode() if isinstance(key, bytes) else key for key in keys]
+
+
+def create_session_store(kind: str = None) -> SessionStore:
+    """
+    Build the configured session store.
+
+    Args:
+        kind: "memory", "sqlite" or "redis". Defaults to settings.SESSION_STORE
+
+    Returns:
+        SessionStore instance
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    kind = (kind or settings.SESSION_STORE).lower()
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SqliteSessionStore()
+    if kind == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown session store {kind}. Options: {', '.join(SESSION_STORES)}")
+
+
+# Global instance
+session_store = create_session_store()
@@ -0,0 +1,140 @@
+import logging
+import sys
+import uuid
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_ALIGNMENT = 64
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+@dataclass(frozen=True)
+class RingLayout:
+    """
+    Geometry of a slot ring, small enough to send to worker processes.
+
+    Every slot has an input region of input_capacity float32 values (PCM samples or
+    row-major feature rows) and an output region of max_rows x num_classes float32
+    probabilities.
+    """
+    name: str
+    slots: int
+    input_capacity: int
+    max_rows: int
+    num_classes: int
+
+    @property
+    def input_bytes(self) -> int:
+        return _aligned(self.slots * self.input_capacity * 4)
+
+    @property
+    def output_bytes(self) -> int:
+        return _aligned(self.slots * self.max_rows * self.num_classes * 4)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.input_bytes + self.output_bytes
+
+
+@dataclass(frozen=True)
+class SlotDescriptor:
+    """What actually crosses the process boundary for one request."""
+    request_id: int
+    slot: int
+    kind: str  # "audio" or "features"
+    length: int  # samples for audio, rows for features
+    width: int  # 1 for audio, feature vector length for features
+    sample_rate: int
+    tier: int
+    models: Tuple[str, ...] = ()  # extra models scored on the same features
+
+
+class SlotRing:
+    """
+    Preallocated shared-memory slots for moving audio and feature rows to inference workers.
+
+    The creating (API) process owns the segment and unlinks it on close; workers attach
+    by name and only ever see numpy views over it, so nothing on the hot path is
+    pickled except the SlotDescriptor.
+    """
+
+    def __init__(self, layout: RingLayout, shm: shared_memory.SharedMemory, owner: bool):
+        self.layout = layout
+        self.shm = shm
+        self.owner = owner
+        self.inputs = np.ndarray(
+            (layout.slots, layout.input_capacity), dtype=np.float32, buffer=shm.buf, offset=0
+        )
+        self.outputs = np.ndarray(
+            (layout.slots, layout.max_rows, layout.num_classes), dtype=np.float32,
+            buffer=shm.buf, offset=layout.input_bytes
+        )
+
+    @classmethod
+    def create(cls, slots: int, input_capacity: int, max_rows: int, num_classes: int) -> "SlotRing":
+        name = f"emotion-ring-{uuid.uuid4().hex[:12]}"
+        layout = RingLayout(name, slots, input_capacity, max_rows, num_classes)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=layout.total_bytes)
+        logger.info(f"Created shared memory ring {name}: {slots} slots, {layout.total_bytes / (1024*1024):.1f}MB")
+        return cls(layout, shm, owner=True)
+
+    @classmethod
+    def attach(cls, layout: RingLayout) -> "SlotRing":
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=layout.name, track=False)
+        else:
+            # Spawned workers share the owner's resource tracker, so the registration made
+            # here is the owner's own; unregistering it would break the owner's unlink
+            shm = shared_memory.SharedMemory(name=layout.name)
+        return cls(layout, shm, owner=False)
+
+    def write_audio(self, slot: int, audio: np.ndarray) -> int:
+        """Copy PCM samples into a slot's input region. Returns the number of samples."""
+        length = len(audio)
+        if length > self.layout.input_capacity:
+            raise ValueError(f"Audio of {length} samples does not fit a slot of {self.layout.input_capacity}")
+        self.inputs[slot, :length] = audio
+        return length
+
+    def write_features(self, slot: int, features: np.ndarray) -> int:
+        """Copy an (n, width) feature matrix into a slot's input region. Returns n."""
+        rows, width = features.shape
+        if rows > self.layout.max_rows or rows * width > self.layout.input_capacity:
+            raise ValueError(f"{rows} feature rows of width {width} do not fit a slot")
+        self.inputs[slot, :rows * width] = features.reshape(-1)
+        return rows
+
+    def audio_view(self, descriptor: SlotDescriptor) -> np.ndarray:
+        """Zero-copy view of the audio in a slot."""
+        return self.inputs[descriptor.slot, :descriptor.length]
+
+    def features_view(self, descriptor: SlotDescriptor) -> np.ndarray:
+        """Zero-copy (rows, width) view of the feature rows in a slot."""
+        return self.inputs[descriptor.slot, :descriptor.length * descriptor.width].reshape(descriptor.length, descriptor.width)
+
+    def output_view(self, slot: int, rows: int = 1, classes: Optional[int] = None, start: int = 0) -> np.ndarray:
+        """Zero-copy view of rows [start, start + rows) of a slot's output region."""
+        return self.outputs[slot, start:start + rows, :classes or self.layout.num_classes]
+
+    def close(self):
+        """Drop the views and detach; the owner also unlinks the segment."""
+        self.inputs = None
+        self.outputs = None
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.warning(f"Views into {self.layout.name} are still alive; detaching anyway")
+        if self.owner:
+            try:
+                self.shm.unlink()
+                logger.info(f"Unlinked shared memory ring {self.layout.name}")
+            except FileNotFoundError:
+                pass
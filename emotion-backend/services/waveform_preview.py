@@ -0,0 +1,314 @@
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from preprocessing.fast_features import hann_window, mel_filterbank
+
+logger = logging.getLogger(__name__)
+
+# Peaks are stored as int8 and mel columns as uint8; clients divide by these scales
+PEAK_SCALE = 127
+MEL_SCALE = 255
+MEL_TOP_DB = 80.0
+# STFT frames transformed at once; bounds the framed and complex spectrum arrays to a few MB
+MEL_BLOCK_FRAMES = 512
+
+
+def content_id(content: bytes) -> str:
+    """Cache key of an uploaded file: the SHA-256 of its bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class WaveformPreview:
+    """
+    Display summaries of one decoded file: min/max peaks at several zoom levels and a
+    downsampled log-mel spectrogram.
+
+    Level 0 holds one min/max pair per WAVEFORM_PEAK_BUCKET_SAMPLES samples; each
+    further level halves the resolution, down to WAVEFORM_PEAK_MIN_BUCKETS buckets.
+    """
+
+    def __init__(self, audio_id: str, sample_rate: int, num_samples: int,
+                 levels: List[Tuple[int, np.ndarray, np.ndarray]], mel: np.ndarray,
+                 samples_per_column: int, db_max: float):
+        self.audio_id = audio_id
+        self.sample_rate = sample_rate
+        self.num_samples = num_samples
+        self.levels = levels
+        self.mel = mel
+        self.samples_per_column = samples_per_column
+        self.db_max = db_max
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sample_rate
+
+    @property
+    def nbytes(self) -> int:
+        return self.mel.nbytes + sum(mins.nbytes + maxs.nbytes for _, mins, maxs in self.levels)
+
+    def level_for_width(self, width: int) -> int:
+        """Coarsest level that still has at least width buckets (level 0 if none has)."""
+        for level in range(len(self.levels) - 1, -1, -1):
+            if len(self.levels[level][1]) >= width:
+                return level
+        return 0
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "audio_id": self.audio_id,
+            "duration": round(self.duration, 3),
+            "sample_rate": self.sample_rate,
+            "levels": [
+                {"level": level, "bucket_seconds": bucket / self.sample_rate, "buckets": len(mins)}
+                for level, (bucket, mins, _) in enumerate(self.levels)
+            ],
+            "mel": {"bands": int(self.mel.shape[1]), "columns": int(self.mel.shape[0]),
+                    "seconds_per_column": self.samples_per_column / self.sample_rate},
+        }
+
+    def peaks(self, level: int, start: float = 0.0, end: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Min/max pairs of one level, optionally limited to [start, end) seconds.
+
+        Raises:
+            ValueError: If the level does not exist
+        """
+        if not 0 <= level < len(self.levels):
+            raise ValueError(f"Level {level} does not exist. Levels: 0-{len(self.levels) - 1}")
+        bucket, mins, maxs = self.levels[level]
+        first = max(0, int(start * self.sample_rate // bucket))
+        last = len(mins) if end is None else min(len(mins), int(math.ceil(end * self.sample_rate / bucket)))
+        return {
+            "audio_id": self.audio_id,
+            "level": level,
+            "bucket_seconds": bucket / self.sample_rate,
+            "start": first * bucket / self.sample_rate,
+            "scale": PEAK_SCALE,
+            "min": mins[first:last].tolist(),
+            "max": maxs[first:last].tolist(),
+        }
+
+    def mel_preview(self) -> Dict[str, Any]:
+        """The log-mel columns (one list of bands per column), mapped from [db_max - 80, db_max] dB to 0-255."""
+        return {
+            "audio_id": self.audio_id,
+            "seconds_per_column": self.samples_per_column / self.sample_rate,
+            "bands": int(self.mel.shape[1]),
+            "scale": MEL_SCALE,
+            "db_min": round(self.db_max - MEL_TOP_DB, 2),
+            "db_max": round(self.db_max, 2),
+            "columns": self.mel.tolist(),
+        }
+
+
+class WaveformPreviewBuilder:
+    """
+    Builds a WaveformPreview from consecutive blocks of decoded mono audio.
+
+    Fed from the decode that already happens for prediction (whole files or streamed
+    windows), so the file is not decoded a second time. Peaks are reduced per block;
+    the mel spectrogram is computed with an uncentered STFT carried across block
+    edges and averaged into columns as it goes, so memory stays proportional to the
+    preview size, not the audio length.
+    """
+
+    def __init__(self, audio_id: str, sample_rate: int, expected_duration: Optional[float] = None):
+        self.audio_id = audio_id
+        self.sample_rate = sample_rate
+        self.bucket = settings.WAVEFORM_PEAK_BUCKET_SAMPLES
+        self.n_fft = settings.WAVEFORM_MEL_N_FFT
+        self.hop = self.n_fft // 2
+        self.mel_basis = mel_filterbank(sample_rate, self.n_fft, settings.WAVEFORM_MEL_BANDS)
+        # Columns sized from the header duration, so the preview already fits WAVEFORM_MEL_COLUMNS
+        expected_samples = int((expected_duration or 0) * sample_rate)
+        hops_per_column = max(1, math.ceil(expected_samples / settings.WAVEFORM_MEL_COLUMNS / self.hop))
+        self.samples_per_column = hops_per_column * self.hop
+
+        self.num_samples = 0
+        self._peak_pending = np.zeros(0, dtype=np.float32)
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+        self._stft_pending = np.zeros(0, dtype=np.float32)
+        self._frames = 0
+        self._column_sums: List[np.ndarray] = []
+        self._column_counts: List[int] = []
+
+    def add(self, audio: np.ndarray):
+        """Add the next block of samples (at the builder's sample rate), of any length."""
+        audio = np.asarray(audio, dtype=np.float32)
+        self.num_samples += len(audio)
+        # Long blocks (a whole decoded file) go through in slices of MEL_BLOCK_FRAMES hops
+        step = MEL_BLOCK_FRAMES * self.hop
+        for start in range(0, len(audio), step):
+            self._add_peaks(audio[start:start + step])
+            self._add_mel(audio[start:start + step])
+
+    def _add_peaks(self, audio: np.ndarray):
+        pending = np.concatenate([self._peak_pending, audio]) if len(self._peak_pending) else audio
+        full = len(pending) // self.bucket * self.bucket
+        if full:
+            buckets = pending[:full].reshape(-1, self.bucket)
+            self._mins.append(buckets.min(axis=1))
+            self._maxs.append(buckets.max(axis=1))
+        self._peak_pending = pending[full:].copy()
+
+    def _add_mel(self, audio: np.ndarray):
+        pending = np.concatenate([self._stft_pending, audio]) if len(self._stft_pending) else audio
+        if len(pending) < self.n_fft:
+            self._stft_pending = pending.copy()
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(pending, self.n_fft)[::self.hop]
+        spectrum = np.fft.rfft(frames * hann_window(self.n_fft), axis=1)
+        power = self.mel_basis @ (np.abs(spectrum) ** 2).T.astype(np.float32)
+        self._accumulate_columns(power)
+        consumed = len(frames) * self.hop
+        self._stft_pending = pending[consumed:].copy()
+
+    def _accumulate_columns(self, power: np.ndarray):
+        # Frames are consecutive, so each column is a contiguous run of frames
+        columns = (self._frames + np.arange(power.shape[1])) * self.hop // self.samples_per_column
+        self._frames += power.shape[1]
+        starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+        sums = np.add.reduceat(power, starts, axis=1)
+        counts = np.diff(np.r_[starts, power.shape[1]])
+        for column, column_sum, count in zip(columns[starts], sums.T, counts):
+            if column < len(self._column_sums):
+                self._column_sums[column] += column_sum
+                self._column_counts[column] += count
+            else:
+                self._column_sums.append(column_sum.copy())
+                self._column_counts.append(int(count))
+
+    def finish(self) -> WaveformPreview:
+        """Flush the partial bucket and column and build the preview."""
+        if len(self._peak_pending):
+            self._mins.append(self._peak_pending.min(keepdims=True))
+            self._maxs.append(self._peak_pending.max(keepdims=True))
+            self._peak_pending = np.zeros(0, dtype=np.float32)
+        if len(self._stft_pending) and self._frames == 0:
+            # Shorter than one FFT frame: a single zero-padded frame
+            frame = np.zeros(self.n_fft, dtype=np.float32)
+            frame[:len(self._stft_pending)] = self._stft_pending
+            spectrum = np.fft.rfft(frame * hann_window(self.n_fft))
+            self._accumulate_columns((self.mel_basis @ (np.abs(spectrum) ** 2).astype(np.float32))[:, np.newaxis])
+
+        mins = np.concatenate(self._mins) if self._mins else np.zeros(0, dtype=np.float32)
+        maxs = np.concatenate(self._maxs) if self._maxs else np.zeros(0, dtype=np.float32)
+        levels = [(self.bucket, _quantize_peaks(mins), _quantize_peaks(maxs))]
+        while len(mins) > settings.WAVEFORM_PEAK_MIN_BUCKETS:
+            if len(mins) % 2:
+                mins, maxs = np.append(mins, mins[-1]), np.append(maxs, maxs[-1])
+            mins, maxs = mins.reshape(-1, 2).min(axis=1), maxs.reshape(-1, 2).max(axis=1)
+            levels.append((levels[-1][0] * 2, _quantize_peaks(mins), _quantize_peaks(maxs)))
+
+        mel, samples_per_column, db_max = self._mel_columns()
+        return WaveformPreview(self.audio_id, self.sample_rate, self.num_samples, levels, mel,
+                               samples_per_column, db_max)
+
+    def _mel_columns(self) -> Tuple[np.ndarray, int, float]:
+        if not self._column_sums:
+            return np.zeros((0, settings.WAVEFORM_MEL_BANDS), dtype=np.uint8), self.samples_per_column, 0.0
+        power = np.stack(self._column_sums) / np.asarray(self._column_counts, dtype=np.float32)[:, np.newaxis]
+        samples_per_column = self.samples_per_column
+        # Without a usable header duration the columns may be too fine; merge them in groups
+        group = math.ceil(len(power) / settings.WAVEFORM_MEL_COLUMNS)
+        if group > 1:
+            padded = np.concatenate([power, np.repeat(power[-1:], -len(power) % group, axis=0)])
+            power = padded.reshape(-1, group, power.shape[1]).mean(axis=1)
+            samples_per_column *= group
+        db = 10.0 * np.log10(np.maximum(power, 1e-10))
+        db_max = float(db.max())
+        scaled = np.clip((db - (db_max - MEL_TOP_DB)) / MEL_TOP_DB, 0.0, 1.0) * MEL_SCALE
+        return np.round(scaled).astype(np.uint8), samples_per_column, db_max
+
+
+def _quantize_peaks(values: np.ndarray) -> np.ndarray:
+    return np.round(np.clip(values, -1.0, 1.0) * PEAK_SCALE).astype(np.int8)
+
+
+def build_waveform_preview(audio_id: str, audio: np.ndarray, sample_rate: int) -> WaveformPreview:
+    """Preview of audio that is already fully decoded."""
+    builder = WaveformPreviewBuilder(audio_id, sample_rate, expected_duration=len(audio) / sample_rate)
+    builder.add(audio)
+    return builder.finish()
+
+
+def read_waveform_preview(audio_id: str, stream, expected_duration: Optional[float] = None) -> WaveformPreview:
+    """
+    Preview of a whole AudioStream, read a few windows at a time.
+
+    Args:
+        audio_id: Content id of the file
+        stream: AudioStream from preprocessing.audio_decoding.stream_audio; it is closed here
+        expected_duration: Duration from the file header, used to size the mel columns
+
+    Returns:
+        The finished WaveformPreview
+    """
+    builder = WaveformPreviewBuilder(audio_id, stream.sample_rate, expected_duration)
+    try:
+        while True:
+            windows = stream.read(settings.STREAM_BATCH_WINDOWS)
+            if not windows:
+                break
+            for window in windows:
+                builder.add(window)
+    finally:
+        stream.close()
+    return builder.finish()
+
+
+class WaveformCache:
+    """Least-recently-used WaveformPreviews by content id, bounded by WAVEFORM_CACHE_MAX_BYTES."""
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes or settings.WAVEFORM_CACHE_MAX_BYTES
+        self._previews: "OrderedDict[str, WaveformPreview]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, audio_id: str) -> Optional[WaveformPreview]:
+        with self._lock:
+            preview = self._previews.get(audio_id)
+            if preview is None:
+                self.misses += 1
+                return None
+            self._previews.move_to_end(audio_id)
+            self.hits += 1
+            return preview
+
+    def put(self, preview: WaveformPreview):
+        if preview.nbytes > self.max_bytes:
+            logger.warning(f"Preview {preview.audio_id} ({preview.nbytes} bytes) exceeds the cache size; not cached")
+            return
+        with self._lock:
+            previous = self._previews.pop(preview.audio_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._previews[preview.audio_id] = preview
+            self._bytes += preview.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._previews.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def __contains__(self, audio_id: str) -> bool:
+        with self._lock:
+            return audio_id in self._previews
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._previews), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# Global instance
+waveform_cache = WaveformCache()
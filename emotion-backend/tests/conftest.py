@@ -0,0 +1,27 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+# Tests import the backend modules the way main.py does (from the emotion-backend directory)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def encode_audio(audio: np.ndarray, sample_rate: int, fmt: str = "WAV", subtype: str = None) -> bytes:
+    """Encode samples ((frames,) or (frames, channels)) into file bytes with libsndfile."""
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format=fmt, subtype=subtype)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def tone():
+    """Factory for a sine tone of the given length, rate and channel count."""
+    def make(seconds: float = 1.0, sample_rate: int = 16000, channels: int = 1, freq: float = 440.0) -> np.ndarray:
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        audio = (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+        return np.repeat(audio[:, None], channels, axis=1) if channels > 1 else audio
+    return make
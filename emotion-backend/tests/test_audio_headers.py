@@ -0,0 +1,78 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from conftest import encode_audio
+from config import settings
+from preprocessing.audio_decoding import DECODER_FFMPEG, DECODER_SOUNDFILE, decode_audio, stream_audio
+from utils.audio_headers import AudioHeaderError, probe_audio, sniff_format, validate_audio_header
+
+
+def test_probe_wav_reads_stream_parameters(tone):
+    header = probe_audio(encode_audio(tone(2.0, 22050, channels=2), 22050))
+    assert (header.format, header.channels, header.sample_rate) == ("wav", 2, 22050)
+    assert header.duration == pytest.approx(2.0)
+
+
+def test_probe_flac_reads_stream_parameters(tone):
+    header = probe_audio(encode_audio(tone(1.5, 48000), 48000, fmt="FLAC"))
+    assert (header.format, header.channels, header.sample_rate) == ("flac", 1, 48000)
+    assert header.duration == pytest.approx(1.5)
+
+
+@pytest.mark.parametrize("data", [b"", b"not audio at all", b"RIFF\x00\x00\x00\x00WAVE"])
+def test_probe_rejects_unknown_or_truncated_data(data):
+    with pytest.raises(AudioHeaderError):
+        probe_audio(data)
+
+
+def test_sniff_format_magic_bytes():
+    assert sniff_format(b"fLaC" + b"\0" * 8) == "flac"
+    assert sniff_format(b"OggS" + b"\0" * 8) == "ogg"
+    assert sniff_format(b"\0\0\0\x20ftypM4A ") == "m4a"
+    assert sniff_format(b"ID3\x04" + b"\0" * 8) == "mp3"
+    assert sniff_format(b"\0" * 12) is None
+
+
+def test_validate_rejects_long_audio(tone):
+    header = probe_audio(encode_audio(tone(3.0), 16000))
+    assert validate_audio_header(header, max_duration=5) == (True, "")
+    is_valid, message = validate_audio_header(header, max_duration=2)
+    assert not is_valid and "too long" in message
+
+
+def test_decode_downmixes_and_resamples_to_target(tone):
+    decoded = decode_audio(encode_audio(tone(1.0, 44100, channels=2), 44100), target_sr=16000)
+    assert decoded.decoder == DECODER_SOUNDFILE
+    assert decoded.source_sample_rate == 44100
+    assert decoded.audio.dtype == np.float32 and decoded.audio.ndim == 1
+    assert len(decoded.audio) == pytest.approx(16000, abs=1)
+    assert np.abs(decoded.audio).max() == pytest.approx(0.5, abs=0.02)
+
+
+def test_stream_windows_match_whole_decode(tone):
+    data = encode_audio(tone(2.5, 22050), 22050)
+    whole = decode_audio(data, target_sr=16000).audio
+    stream = stream_audio(data, 1.0, target_sr=16000)
+    try:
+        windows = stream.read(10)
+    finally:
+        stream.close()
+    assert [len(w) for w in windows] == [16000, 16000, len(whole) - 32000]
+    np.testing.assert_allclose(np.concatenate(windows), whole, atol=1e-3)
+
+
+@pytest.mark.skipif(shutil.which(settings.FFMPEG_PATH) is None, reason="ffmpeg is not installed")
+def test_decode_mp3_with_ffmpeg(tone, tmp_path):
+    wav = tmp_path / "tone.wav"
+    wav.write_bytes(encode_audio(tone(1.0, 44100), 44100))
+    mp3 = subprocess.run([shutil.which(settings.FFMPEG_PATH), "-loglevel", "error", "-i", str(wav), "-f", "mp3", "pipe:1"],
+                         stdout=subprocess.PIPE, check=True).stdout
+    header = probe_audio(mp3)
+    assert header.format == "mp3" and header.duration == pytest.approx(1.0, abs=0.1)
+    decoded = decode_audio(mp3, target_sr=16000)
+    assert decoded.source_format == "mp3"
+    assert decoded.decoder in (DECODER_SOUNDFILE, DECODER_FFMPEG)
+    assert len(decoded.audio) == pytest.approx(16000, rel=0.1)
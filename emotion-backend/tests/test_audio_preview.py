@@ -0,0 +1,93 @@
+import sys
+
+import numpy as np
+import pytest
+
+from config import settings
+from conftest import encode_audio
+from preprocessing import audio_decoding, audio_preview
+from preprocessing.audio_decoding import DECODER_FFMPEG, DECODER_LIBROSA, DECODER_SOUNDFILE, decode_audio_regions
+from preprocessing.audio_preview import region_coverage, select_preview_regions
+
+SR = 8000
+
+
+@pytest.fixture
+def ramp_wav():
+    """20 s WAV whose sample i is i / 2^20, so decoded values tell their own position."""
+    audio = (np.arange(20 * SR) / 2 ** 20).astype(np.float32)
+    return audio, encode_audio(audio, SR, subtype="FLOAT")
+
+
+def test_short_file_is_one_region():
+    assert select_preview_regions(b"", 2.0, "uniform", window_seconds=3.0) == [(0.0, 2.0)]
+
+
+def test_head_and_uniform_regions():
+    assert select_preview_regions(b"", 60.0, "head", head_seconds=10.0, window_seconds=3.0) == [
+        (0.0, 3.0), (3.0, 3.0), (6.0, 3.0), (9.0, 1.0)
+    ]
+    regions = select_preview_regions(b"", 60.0, "uniform", num_windows=4, window_seconds=3.0)
+    assert regions == [(0.0, 3.0), (19.0, 3.0), (38.0, 3.0), (57.0, 3.0)]
+    assert region_coverage(regions, 60.0) == pytest.approx(0.2)
+
+
+def test_energy_regions_pick_the_loudest_windows(monkeypatch):
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(60 * SR) * 0.001).astype(np.float32)
+    for start in (12, 45):
+        audio[start * SR:(start + 3) * SR] *= 300
+    content = encode_audio(audio, SR)
+    monkeypatch.setattr(settings, "PREVIEW_ENERGY_CANDIDATES", 20)
+
+    regions = select_preview_regions(content, 60.0, "energy", num_windows=2, window_seconds=3.0)
+    assert len(regions) == 2
+    assert all(abs(offset - loud) < 1.5 for (offset, _), loud in zip(regions, (12, 45)))
+
+
+def test_energy_probes_are_capped(monkeypatch):
+    probed = []
+
+    def decode(source, regions, **kwargs):
+        probed.append(len(regions))
+        return [np.zeros(10, dtype=np.float32) for _ in regions], DECODER_SOUNDFILE
+
+    monkeypatch.setattr(audio_preview, "decode_audio_regions", decode)
+    monkeypatch.setattr(settings, "PREVIEW_ENERGY_MAX_PROBES", 16)
+    select_preview_regions(b"", 3600.0, "energy", num_windows=8, window_seconds=3.0)
+    select_preview_regions(b"", 3600.0, "energy", num_windows=32, window_seconds=3.0)
+    assert probed == [16, 32]
+
+
+@pytest.mark.parametrize("fmt", ["wav", "m4a"])
+def test_regions_are_cut_at_their_offsets(ramp_wav, fmt, monkeypatch):
+    audio, content = ramp_wav
+    # Without ffmpeg an "m4a" hint skips libsndfile, so the whole-file fallback cuts the regions
+    monkeypatch.setattr(audio_decoding, "_ffmpeg_path", "")
+    regions = [(12.5, 1.0), (0.0, 0.5), (12.0, 2.0), (19.5, 2.0)]
+    chunks, decoder = decode_audio_regions(content, regions, target_sr=SR, fmt=fmt)
+    assert decoder == (DECODER_SOUNDFILE if fmt == "wav" else DECODER_LIBROSA)
+    for (offset, duration), chunk in zip(regions, chunks):
+        start = int(offset * SR)
+        np.testing.assert_allclose(chunk, audio[start:start + int(duration * SR)], atol=1e-6)
+
+
+def test_ffmpeg_regions_come_from_one_process(tmp_path, monkeypatch):
+    calls = tmp_path / "calls"
+    fake = tmp_path / "ffmpeg"
+    # Stand-in decoder: 20 s of a ramp (sample i = i) at the requested rate, one line per start
+    fake.write_text(f"#!{sys.executable}\n"
+                    "import array, sys\n"
+                    f"open({str(calls)!r}, 'a').write('start\\n')\n"
+                    "rate = int(sys.argv[sys.argv.index('-ar') + 1])\n"
+                    "sys.stdout.buffer.write(array.array('f', range(20 * rate)).tobytes())\n")
+    fake.chmod(0o755)
+    monkeypatch.setattr(audio_decoding, "_ffmpeg_path", str(fake))
+
+    regions = [(float(offset), 0.25) for offset in np.linspace(0.0, 17.0, 40)]
+    chunks, decoder = decode_audio_regions(b"ID3" + bytes(100), regions, target_sr=SR, fmt="mp3")
+    assert decoder == DECODER_FFMPEG
+    assert calls.read_text().count("start") == 1
+    for (offset, duration), chunk in zip(regions, chunks):
+        start = int(offset * SR)
+        np.testing.assert_array_equal(chunk, np.arange(start, start + int(duration * SR), dtype=np.float32))
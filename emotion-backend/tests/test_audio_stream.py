@@ -0,0 +1,81 @@
+import sys
+
+import numpy as np
+import pytest
+
+from config import settings
+from conftest import encode_audio
+from preprocessing import audio_decoding
+from preprocessing.audio_decoding import DECODER_FFMPEG, DECODER_LIBROSA, DECODER_SOUNDFILE, decode_audio, stream_audio
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Point the decoder at a script standing in for ffmpeg; it runs the given body."""
+    def make(body: str) -> str:
+        path = tmp_path / "ffmpeg"
+        path.write_text(f"#!{sys.executable}\nimport array, os, sys\n{body}\n")
+        path.chmod(0o755)
+        monkeypatch.setattr(audio_decoding, "_ffmpeg_path", str(path))
+        return str(path)
+    return make
+
+
+def read_all(stream, count: int):
+    """Every window of a stream, read count at a time; returns the lengths of each read and the windows."""
+    reads, windows = [], []
+    try:
+        while True:
+            block = stream.read(count)
+            reads.append(len(block))
+            if not block:
+                return reads, windows
+            windows.extend(block)
+    finally:
+        stream.close()
+
+
+def test_windows_are_cut_across_block_boundaries(tone):
+    # 0.7 s windows at 16 kHz from a 22.05 kHz file: no window lines up with a decoded block
+    data = encode_audio(tone(3.0, 22050, channels=2), 22050)
+    whole = decode_audio(data, target_sr=16000).audio
+    stream = stream_audio(data, 0.7, target_sr=16000)
+    assert stream.decoder == DECODER_SOUNDFILE
+
+    reads, windows = read_all(stream, 2)
+    assert reads == [2, 2, 1, 0]
+    assert [len(w) for w in windows] == [11200] * 4 + [len(whole) - 4 * 11200]
+    np.testing.assert_allclose(np.concatenate(windows), whole, atol=1e-3)
+
+
+def test_ffmpeg_stream_is_released_when_closed_unread(fake_ffmpeg):
+    fake_ffmpeg("rate = int(sys.argv[sys.argv.index('-ar') + 1])\n"
+                "sys.stdout.buffer.write(array.array('f', range(60 * rate)).tobytes())")
+    free = audio_decoding._stream_slots._value
+    stream = stream_audio(b"ID3" + bytes(100), 1.0, target_sr=8000, fmt="mp3")
+    assert stream.decoder == DECODER_FFMPEG
+    assert audio_decoding._stream_slots._value == free - 1
+
+    stream.close()
+    assert audio_decoding._stream_slots._value == free
+
+
+def test_ffmpeg_stream_windows(fake_ffmpeg):
+    fake_ffmpeg("rate = int(sys.argv[sys.argv.index('-ar') + 1])\n"
+                "sys.stdout.buffer.write(array.array('f', range(int(2.5 * rate))).tobytes())")
+    reads, windows = read_all(stream_audio(b"ID3" + bytes(100), 1.0, target_sr=8000, fmt="mp3"), 5)
+    assert reads == [3, 0]
+    np.testing.assert_array_equal(np.concatenate(windows), np.arange(20000, dtype=np.float32))
+
+
+def test_ffmpeg_that_fails_to_start_falls_back_to_librosa(fake_ffmpeg, tone):
+    fake_ffmpeg("sys.stderr.write('Invalid data found when processing input')\nsys.exit(1)")
+    free = audio_decoding._stream_slots._value
+    data = encode_audio(tone(1.5, settings.SAMPLE_RATE), settings.SAMPLE_RATE)
+
+    # An "m4a" hint skips libsndfile, so only ffmpeg and the whole-file fallback are tried
+    stream = stream_audio(data, 1.0, fmt="m4a")
+    assert stream.decoder == DECODER_LIBROSA
+    assert audio_decoding._stream_slots._value == free
+    _, windows = read_all(stream, 4)
+    assert [len(w) for w in windows] == [settings.SAMPLE_RATE, settings.SAMPLE_RATE // 2]
@@ -0,0 +1,55 @@
+import io
+import zipfile
+
+import pytest
+
+from config import settings
+from conftest import encode_audio
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    return TestClient(main.app)
+
+
+def make_zip(members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def post_zip(client, content: bytes):
+    return client.post("/predict/files", files=[("files", ("batch.zip", content, "application/zip"))])
+
+
+def test_zip_over_the_uncompressed_budget_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_TOTAL_SIZE", 1_000_000)
+    # Two small deflated members that would inflate to 1.2 MB
+    archive = make_zip([("a.wav", bytes(600_000)), ("b.wav", bytes(600_000))])
+    assert len(archive) < 10_000
+
+    response = post_zip(client, archive)
+    assert response.status_code == 400 and "Batch too large" in response.json()["detail"]
+
+
+def test_zip_with_too_many_members_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_FILES", 3)
+    response = post_zip(client, make_zip([(f"{i}.wav", b"x") for i in range(4)]))
+    assert response.status_code == 400 and "Too many files" in response.json()["detail"]
+
+
+def test_zip_within_budget_scores_each_member(client, tone, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_TOTAL_SIZE", 1_000_000)
+    wav = encode_audio(tone(1.0), 16000)
+    response = post_zip(client, make_zip([("tone.wav", wav), ("notes.txt", b"not audio")]))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["succeeded"] == 1 and body["failed"] == 1
+    assert [result["filename"] for result in body["results"]] == ["tone.wav", "notes.txt"]
+    assert "label" in body["results"][0] and "error" in body["results"][1]
@@ -0,0 +1,74 @@
+import json
+import threading
+
+import numpy as np
+
+from config import settings
+from preprocessing.audio_processing import pcm_to_float, preprocess_audio_chunk
+from utils.buffer_pool import BufferPool, normalize_peak
+
+
+def test_pool_reuses_a_buffer_per_name():
+    pool = BufferPool(reuse=True, max_buffer_bytes=1 << 20)
+    first = pool.get("chunk", 1000)
+    second = pool.get("chunk", 900)
+    other = pool.get("pcm", 1000)
+    assert np.shares_memory(first, second) and not np.shares_memory(first, other)
+    assert pool.reuses == 1 and pool.allocations == 2
+    # Above the size limit every call gets its own array
+    assert not np.shares_memory(pool.get("chunk", 1 << 19), pool.get("chunk", 1 << 19))
+
+
+def test_session_pools_do_not_alias_each_other():
+    first, second = BufferPool(reuse=True), BufferPool(reuse=True)
+    a = pcm_to_float(np.full(800, 8192, dtype=np.int16), first)
+    b = pcm_to_float(np.full(800, -16384, dtype=np.int16), second)
+    assert not np.shares_memory(a, b)
+    np.testing.assert_allclose(a, 8192 / 32767)
+    np.testing.assert_allclose(b, -16384 / 32767)
+
+    # Normalizing into each session's chunk buffer leaves the other session's samples alone
+    a = preprocess_audio_chunk(a, settings.SAMPLE_RATE, out=first.get("chunk", len(a)))
+    b = preprocess_audio_chunk(b, settings.SAMPLE_RATE, out=second.get("chunk", len(b)))
+    np.testing.assert_allclose(a, 1.0)
+    np.testing.assert_allclose(b, -1.0)
+    assert normalize_peak(np.zeros(4, dtype=np.float32)).sum() == 0
+
+
+def test_interleaved_realtime_sessions_only_see_their_own_audio(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.overload import overload_controller
+    from services.prediction_service import prediction_service
+
+    windows = []
+    lock = threading.Lock()
+
+    def record(audio, sr, **kwargs):
+        with lock:
+            windows.append(np.array(audio))
+        label = "happy" if audio.max() > 0 else "sad"
+        return {"label": label, "confidence": 1.0, "class_probs": {label: 1.0}}
+
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", 0)
+    monkeypatch.setattr(overload_controller, "level", 0)
+    monkeypatch.setattr(overload_controller, "observe", lambda server_seconds: None)
+    monkeypatch.setattr(prediction_service, "predict", record)
+
+    ramp = np.linspace(100, 20000, settings.SAMPLE_RATE).astype(np.int16)
+    client = TestClient(main.app)
+    with client.websocket_connect("/ws/realtime/pool-up?resume=false") as up, \
+            client.websocket_connect("/ws/realtime/pool-down?resume=false") as down:
+        labels = {"up": [], "down": []}
+        for _ in range(4):
+            up.send_bytes(ramp.tobytes())
+            down.send_bytes((-ramp).tobytes())
+            labels["up"].append(json.loads(up.receive_text())["label"])
+            labels["down"].append(json.loads(down.receive_text())["label"])
+
+    assert labels == {"up": ["happy"] * 4, "down": ["sad"] * 4}
+    assert len(windows) == 8
+    for window in windows:
+        assert (window >= 0).all() or (window <= 0).all()
+        assert np.abs(window).max() == 1.0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from services.cadence import CadenceController, js_divergence, window_energy_db
+
+LABELS = ("happy", "neutral", "sad")
+
+
+def result(probs, failed: bool = False):
+    class_probs = dict(zip(LABELS, probs))
+    out = {"label": max(class_probs, key=class_probs.get), "confidence": max(probs), "class_probs": class_probs}
+    if failed:
+        out["failed"] = True
+    return out
+
+
+def level(db: float) -> np.ndarray:
+    """A constant window whose RMS level is db dBFS."""
+    return np.full(1600, 10 ** (db / 20), dtype=np.float32)
+
+
+def run(controller: CadenceController, probs, messages: int, db: float = -20.0, failed: bool = False) -> list:
+    """Feed messages at one level, answering analyzed ones with the same result; returns the decisions."""
+    decisions = []
+    for _ in range(messages):
+        analyzed = controller.should_infer(level(db))
+        if analyzed:
+            controller.observe(result(probs, failed))
+        decisions.append(analyzed)
+    return decisions
+
+
+@pytest.fixture
+def controller():
+    return CadenceController(max_interval=4, threshold=0.02, stable_inferences=2, energy_change_db=6.0, speech_db=-45.0)
+
+
+def test_divergence_and_level():
+    assert js_divergence([0.2, 0.8], [0.2, 0.8]) == pytest.approx(0.0, abs=1e-9)
+    assert js_divergence([1.0, 0.0], [0.0, 1.0]) == pytest.approx(1.0, abs=1e-6)
+    assert window_energy_db(level(-20.0)) == pytest.approx(-20.0, abs=1e-3)
+
+
+def test_stable_predictions_back_off_to_max_interval(controller):
+    run(controller, (0.8, 0.1, 0.1), 20)
+    assert controller.interval == 4 and controller.reason == "stable"
+    # At the slowest cadence one message in four is analyzed
+    assert run(controller, (0.8, 0.1, 0.1), 8).count(True) == 2
+
+
+def test_prediction_shift_snaps_back(controller):
+    run(controller, (0.8, 0.1, 0.1), 20)
+    run(controller, (0.1, 0.1, 0.8), 4)
+    assert controller.interval == 1 and controller.snaps["shift"] == 1
+
+
+def test_energy_change_snaps_back(controller):
+    run(controller, (0.8, 0.1, 0.1), 20)
+    assert controller.should_infer(level(-10.0))
+    assert controller.interval == 1 and controller.snaps["energy"] == 1
+
+
+def test_speech_onset_snaps_back(controller):
+    run(controller, (0.8, 0.1, 0.1), 20, db=-48.0)
+    assert controller.should_infer(level(-44.0))
+    assert controller.interval == 1 and controller.snaps["onset"] == 1
+
+
+def test_failed_results_are_not_stable(controller):
+    # Identical fallback outputs must not slow the session down
+    assert all(run(controller, (1 / 3, 1 / 3, 1 / 3), 10, failed=True))
+    assert controller.interval == 1
+
+    run(controller, (0.8, 0.1, 0.1), 20)
+    assert controller.interval == 4
+    run(controller, (0.8, 0.1, 0.1), 4, failed=True)
+    assert controller.interval == 1 and controller.snaps["failure"] == 1
+    assert controller.should_infer(level(-20.0))
@@ -0,0 +1,69 @@
+import librosa
+import numpy as np
+import pytest
+
+from config import settings
+from preprocessing.feature_extraction import extract_features, load_feature_config
+from preprocessing.feature_plan import compile_feature_plan
+
+
+def legacy_features(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """The extractor FeaturePlan replaced, with its statistics joined by concatenation."""
+    spectral = dict(y=audio, sr=sample_rate, n_fft=settings.N_FFT, hop_length=settings.HOP_LENGTH)
+    mfccs = librosa.feature.mfcc(n_mfcc=13, **spectral)
+    centroid = librosa.feature.spectral_centroid(**spectral)
+    rolloff = librosa.feature.spectral_rolloff(**spectral)
+    zcr = librosa.feature.zero_crossing_rate(audio)
+    chroma = librosa.feature.chroma_stft(n_chroma=12, **spectral)
+    bandwidth = librosa.feature.spectral_bandwidth(**spectral)
+    return np.concatenate([np.atleast_1d(stat) for stat in (
+        np.mean(mfccs, axis=1), np.var(mfccs, axis=1),
+        np.mean(centroid), np.var(centroid),
+        np.mean(rolloff), np.var(rolloff),
+        np.mean(zcr), np.var(zcr),
+        np.mean(chroma, axis=1), np.var(chroma, axis=1),
+        np.mean(bandwidth), np.var(bandwidth),
+    )])
+
+
+@pytest.fixture(scope="module")
+def clips():
+    rng = np.random.default_rng(0)
+    t = np.arange(settings.SAMPLE_RATE * settings.DURATION) / settings.SAMPLE_RATE
+    return {
+        "noise": (rng.standard_normal(len(t)) * 0.1).astype(np.float32),
+        "tone": np.sin(2 * np.pi * 443 * t).astype(np.float32),
+        "chirp": np.sin(2 * np.pi * (100 + 400 * t) * t).astype(np.float32),
+    }
+
+
+@pytest.mark.parametrize("name", ["noise", "tone", "chirp"])
+def test_librosa_plan_matches_legacy_extractor(clips, name):
+    audio = clips[name]
+    plan = compile_feature_plan(load_feature_config(), settings.SAMPLE_RATE, backend="librosa")
+    expected = legacy_features(audio, settings.SAMPLE_RATE)
+    assert plan.dimension == len(expected)
+    np.testing.assert_allclose(plan.extract(audio), expected, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(extract_features(audio, settings.SAMPLE_RATE), expected, rtol=1e-6, atol=1e-6)
+
+
+
+@pytest.mark.parametrize("name", ["noise", "tone", "chirp"])
+def test_numpy_backend_matches_librosa_within_tolerance(clips, name):
+    config = load_feature_config()
+    reference = compile_feature_plan(config, settings.SAMPLE_RATE, backend="librosa").extract(clips[name])
+    candidate = compile_feature_plan(config, settings.SAMPLE_RATE, backend="numpy").extract(clips[name])
+    np.testing.assert_allclose(candidate, reference, rtol=1e-5, atol=1e-6)
+
+
+def test_raw_plan_features_do_not_alias_the_pooled_buffer(clips):
+    from services.prediction_service import prediction_service
+
+    plan = compile_feature_plan({"input_mode": "raw", "raw_length": 4000}, sample_rate=settings.SAMPLE_RATE)
+    # Same-length clips that need scaling are both normalized into the thread's "normalized" buffer
+    tone, noise = clips["tone"] * 0.5, clips["noise"]
+    first = prediction_service.audio_to_features(tone, settings.SAMPLE_RATE, plan=plan)
+    second = prediction_service.audio_to_features(noise, settings.SAMPLE_RATE, plan=plan)
+    assert not np.shares_memory(first, second)
+    np.testing.assert_allclose(first, tone[:4000] / np.abs(tone).max(), rtol=1e-6)
+    np.testing.assert_allclose(second, noise[:4000] / np.abs(noise).max(), rtol=1e-6)
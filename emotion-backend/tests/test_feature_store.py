@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from services.feature_store import FeatureStore
+
+CONFIG = {"mfcc": {"n_mfcc": 13}}
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    return str(tmp_path / "store")
+
+
+def create(store_dir: str) -> FeatureStore:
+    return FeatureStore.open(store_dir, dimension=4, feature_config=CONFIG, sample_rate=16000, create=True)
+
+
+def test_vectors_round_trip_through_a_reopened_store(store_dir):
+    store = create(store_dir)
+    a, b = np.arange(4, dtype=np.float32), np.arange(4, 8, dtype=np.float64)
+    # c.wav has the same content as a.wav, so it shares a's row
+    assert store.append([("a.wav", "hash-a", a), ("b.wav", "hash-b", b), ("c.wav", "hash-a", None)]) == 2
+
+    reopened = FeatureStore.open(store_dir, dimension=4, feature_config=CONFIG, sample_rate=16000)
+    assert len(reopened) == 3 and reopened.has("b.wav", "hash-b") and not reopened.has("b.wav", "hash-x")
+    np.testing.assert_array_equal(reopened.matrix(), np.stack([a, b]).astype(np.float32))
+
+    batches = list(reopened.iter_batches(batch_size=1))
+    np.testing.assert_array_equal(batches[0][0], a[np.newaxis])
+    assert sorted(entry.path for entry in batches[0][1][0]) == ["a.wav", "c.wav"]
+    assert [entry.path for entry in batches[1][1][0]] == ["b.wav"]
+
+
+def test_store_refuses_another_feature_configuration(store_dir):
+    create(store_dir).append([("a.wav", "hash-a", np.zeros(4))])
+    with pytest.raises(ValueError, match="different feature configuration"):
+        FeatureStore.open(store_dir, dimension=4, feature_config={"mfcc": {"n_mfcc": 20}}, sample_rate=16000)
+    with pytest.raises(ValueError):
+        create(store_dir).append([("b.wav", "hash-b", np.zeros(5))])
+
+
+def test_interrupted_append_is_dropped_on_open(store_dir):
+    store = create(store_dir)
+    store.append([("a.wav", "hash-a", np.ones(4))])
+    # A vector written without its index line, then a torn index line
+    with open(os.path.join(store_dir, "features.f32"), "ab") as f:
+        f.write(np.full(4, 9, dtype="<f4").tobytes())
+    with open(os.path.join(store_dir, "index.jsonl"), "a") as f:
+        f.write('{"path": "b.wav", "sha2')
+
+    reopened = FeatureStore.open(store_dir)
+    assert len(reopened) == 1 and reopened.num_rows == 1
+    reopened.append([("b.wav", "hash-b", np.full(4, 2.0))])
+    again = FeatureStore.open(store_dir)
+    np.testing.assert_array_equal(again.matrix(), [[1] * 4, [2] * 4])
+    assert again.entries["b.wav"].row == 1
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.shm_transport import SlotDescriptor, SlotRing
+
+
+def _crashing_worker(index, layout, tasks, results):
+    """Stand-in worker: gets ready, then dies on its first request without answering."""
+    results.send(("ready", index, os.getpid()))
+    tasks.recv()
+    os._exit(3)
+
+
+@pytest.fixture
+def ring():
+    ring = SlotRing.create(slots=2, input_capacity=1000, max_rows=4, num_classes=3)
+    yield ring
+    if ring.inputs is not None:
+        ring.close()
+
+
+def test_slot_ring_round_trips_through_an_attached_view(ring):
+    audio = np.linspace(-1, 1, 800, dtype=np.float32)
+    features = np.arange(12, dtype=np.float32).reshape(3, 4)
+    assert ring.write_audio(1, audio) == 800
+    assert ring.write_features(0, features) == 3
+
+    worker = SlotRing.attach(ring.layout)
+    try:
+        np.testing.assert_array_equal(worker.audio_view(SlotDescriptor(1, 1, "audio", 800, 1, 16000, 0)), audio)
+        np.testing.assert_array_equal(worker.features_view(SlotDescriptor(2, 0, "features", 3, 4, 0, 0)), features)
+        worker.output_view(1, rows=1)[:] = [[0.1, 0.2, 0.7]]
+    finally:
+        worker.close()
+    np.testing.assert_allclose(ring.output_view(1, rows=1), [[0.1, 0.2, 0.7]])
+
+    with pytest.raises(ValueError):
+        ring.write_audio(0, np.zeros(1001, dtype=np.float32))
+    with pytest.raises(ValueError):
+        ring.write_features(0, np.zeros((5, 2), dtype=np.float32))
+
+    ring.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=ring.layout.name)
+
+
+class _Tasks:
+    """Task pipe end of a fake worker; keeps what the pool sends."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, descriptor):
+        self.sent.append(descriptor)
+
+    def close(self):
+        pass
+
+
+def _fake_pool(ring, monkeypatch):
+    """A pool on the given ring with one ready fake worker; must be called inside the event loop."""
+    from services.inference_pool import InferencePool, _Worker
+
+    pool = InferencePool(workers=1, slots=ring.layout.slots)
+    pool.ring = ring
+    pool._loop = asyncio.get_running_loop()
+    pool._free_slots = asyncio.Queue()
+    for slot in range(ring.layout.slots):
+        pool._free_slots.put_nowait(slot)
+    pool._workers[0] = _Worker(0, process=None, tasks=_Tasks(), results=_Tasks(), ready=True)
+    monkeypatch.setattr(settings, "INFERENCE_SLOT_WAIT", 0.2)
+    return pool
+
+
+def test_slots_are_freed_only_when_the_worker_answers(ring, monkeypatch):
+    from services.inference_pool import InferenceUnavailable
+
+    monkeypatch.setattr(settings, "INFERENCE_TIMEOUT", 0.1)
+
+    async def scenario():
+        pool = _fake_pool(ring, monkeypatch)
+        tasks = pool._workers[0].tasks
+        audio = np.ones(100, dtype=np.float32)
+
+        # Both callers time out; their slots stay reserved for the late answers
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await pool._submit("audio", audio, 16000)
+        assert pool._free_slots.qsize() == 0
+        with pytest.raises(InferenceUnavailable):
+            await pool._submit("audio", audio, 16000)
+
+        first = tasks.sent[0]
+        pool._on_message(0, ("done", first.request_id, ([("default", 3)], {}, {})))
+        assert pool._free_slots.qsize() == 1 and pool.completed == 0
+
+        # The freed slot is reused, and this time the answer arrives in time
+        submitted = asyncio.ensure_future(pool._submit("audio", audio * 2, 16000))
+        await asyncio.sleep(0.01)
+        reused = tasks.sent[-1]
+        assert reused.slot == first.slot
+        np.testing.assert_array_equal(ring.audio_view(reused), audio * 2)
+        ring.output_view(reused.slot, rows=1)[:] = [[0.2, 0.3, 0.5]]
+        pool._on_message(0, ("done", reused.request_id, ([("default", 3)], {"inference": 0.01}, {})))
+        outputs, timings = await submitted
+        np.testing.assert_allclose(outputs["default"], [[0.2, 0.3, 0.5]])
+        assert "ipc" in timings and pool.completed == 1 and pool._free_slots.qsize() == 1
+
+    asyncio.run(scenario())
+
+
+def test_windows_longer_than_a_slot_are_predicted_in_process(ring, monkeypatch):
+    from services.prediction_service import prediction_service
+
+    predicted = []
+    monkeypatch.setattr(prediction_service, "predict", lambda audio, sr, **kwargs: predicted.append(len(audio)) or {
+        "label": "neutral", "confidence": 1.0, "class_probs": {"neutral": 1.0}
+    })
+
+    async def scenario():
+        pool = _fake_pool(ring, monkeypatch)
+        result = await pool.predict(np.zeros(ring.layout.input_capacity + 1, dtype=np.float32), 16000)
+        assert result["label"] == "neutral" and "error" not in result
+        assert pool.fallbacks == 1 and pool._workers[0].tasks.sent == []
+        assert pool._free_slots.qsize() == ring.layout.slots
+
+    asyncio.run(scenario())
+    assert predicted == [ring.layout.input_capacity + 1]
+
+
+def test_crashed_worker_fails_its_requests_frees_slots_and_is_respawned(monkeypatch):
+    from services import inference_pool as pool_module
+    from services.inference_pool import InferencePool, WorkerCrashed
+
+    monkeypatch.setattr(pool_module, "_worker_main", _crashing_worker)
+    monkeypatch.setattr(settings, "INFERENCE_TIMEOUT", 30.0)
+
+    async def wait_for(condition, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.05)
+
+    async def scenario():
+        pool = InferencePool(workers=1, slots=2)
+        await pool.start()
+        try:
+            await wait_for(lambda: pool.available)
+            first_pid = pool._workers[0].process.pid
+            with pytest.raises(WorkerCrashed):
+                await pool._submit("audio", np.ones(100, dtype=np.float32), 16000)
+            assert pool.failed == 1 and pool.restarts == 1
+            assert pool._free_slots.qsize() == 2 and pool._pending == {}
+
+            await wait_for(lambda: pool.available)
+            assert pool._workers[0].process.pid != first_pid
+        finally:
+            await pool.stop()
+
+    asyncio.run(scenario())
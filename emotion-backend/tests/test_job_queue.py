@@ -0,0 +1,96 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from config import settings
+from conftest import encode_audio
+from services.job_queue import QUEUED, RUNNING, SUCCEEDED, JobQueue
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    """Queues sharing one database and spool directory, like the processes of one node."""
+    def make() -> JobQueue:
+        return JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), spool_dir=str(tmp_path / "spool"), workers=1)
+    return make
+
+
+def submit(queue: JobQueue, content: bytes = b"audio") -> str:
+    return asyncio.run(queue.submit("a.wav", content, "wav", 3.0))["id"]
+
+
+def test_submit_spools_upload_and_queues(make_queue):
+    queue = make_queue()
+    job_id = submit(queue, b"spooled bytes")
+    with open(queue._spool_path(job_id), "rb") as f:
+        assert f.read() == b"spooled bytes"
+    job = queue.get(job_id)
+    assert job["status"] == QUEUED and job["position"] == 0
+    assert "owner" not in job
+
+
+def test_live_lease_is_not_taken_by_another_process(make_queue):
+    first, second = make_queue(), make_queue()
+    job_id = submit(first)
+    assert first._claim_next()["id"] == job_id
+
+    assert second.requeue_expired() == 0
+    assert second._claim_next() is None
+    assert second.get(job_id)["status"] == RUNNING
+
+
+def test_expired_lease_is_requeued_and_stale_owner_cannot_finish(make_queue):
+    first, second = make_queue(), make_queue()
+    job_id = submit(first)
+    first._claim_next()
+
+    # The first process stops renewing (e.g. it crashed or its loop is stuck)
+    first._execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?",
+                   (time.time() - settings.JOB_LEASE_SECONDS - 1, job_id))
+    assert second.requeue_expired() == 1
+    assert second._claim_next()["id"] == job_id
+    assert second.get(job_id)["attempts"] == 2
+
+    first._finish(job_id, SUCCEEDED, result={"label": "stale"})
+    assert second.get(job_id)["status"] == RUNNING
+    second._finish(job_id, SUCCEEDED, result={"label": "fresh"})
+    assert second.result(job_id) == {"label": "fresh"}
+
+
+def test_stop_releases_only_own_running_jobs(make_queue):
+    first, second = make_queue(), make_queue()
+    own, other = submit(first), submit(second)
+    assert first._claim_next()["id"] == own
+    assert second._claim_next()["id"] == other
+
+    asyncio.run(first.stop())
+    assert first.get(own)["status"] == QUEUED
+    assert first.get(other)["status"] == RUNNING
+
+
+def test_database_without_lease_columns_is_migrated(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, filename TEXT NOT NULL, format TEXT, duration REAL, "
+                 "status TEXT NOT NULL, cancel_requested INTEGER NOT NULL DEFAULT 0, progress REAL NOT NULL DEFAULT 0, "
+                 "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                 "result TEXT, error TEXT)")
+    conn.execute("INSERT INTO jobs (id, filename, status, created_at) VALUES ('old', 'a.wav', ?, ?)", (RUNNING, time.time()))
+    conn.commit()
+    conn.close()
+
+    queue = JobQueue(db_path=str(db_path), spool_dir=str(tmp_path / "spool"), workers=1)
+    # A job from before leases has no heartbeat, so it counts as interrupted
+    assert queue.requeue_expired() == 1
+    assert queue.get("old")["status"] == QUEUED
+
+
+def test_analyze_scores_every_window(make_queue, tone):
+    queue = make_queue()
+    job_id = submit(queue, encode_audio(tone(7.0), 16000))
+    result = queue._analyze(queue._claim_next())
+    assert [window["start"] for window in result["windows"]] == [0.0, 3.0, 6.0]
+    assert result["windows"][-1]["duration"] == pytest.approx(1.0)
+    assert queue.get(job_id)["progress"] == 1.0
@@ -0,0 +1,9 @@
+import logging
+
+from utils.logging_config import _parse_stage_levels
+
+
+def test_parse_stage_levels_skips_invalid_entries():
+    levels, invalid = _parse_stage_levels("realtime.receive=debug, realtime.predict=WARNING,bogus,x=LOUD,=INFO,y=15,")
+    assert levels == {"realtime.receive": logging.DEBUG, "realtime.predict": logging.WARNING, "y": 15}
+    assert invalid == ["bogus", "x=LOUD", "=INFO"]
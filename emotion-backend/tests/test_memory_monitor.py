@@ -0,0 +1,61 @@
+import signal
+import time
+
+import pytest
+
+from services import memory_monitor as monitor_module
+from services.memory_monitor import MemoryMonitor, memory_monitor
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    """Settable stand-in for the process RSS; freeing memory does not lower it."""
+    value = {"bytes": 100 * MB}
+    monkeypatch.setattr(monitor_module, "process_rss_bytes", lambda *args: value["bytes"])
+    monkeypatch.setattr(monitor_module, "release_free_memory", lambda: None)
+    return value
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    return TestClient(main.app)
+
+
+def test_worker_drains_above_the_limit_and_recycles_once_sessions_end(rss, monkeypatch):
+    kills = []
+    monkeypatch.setattr(monitor_module.os, "kill", lambda pid, sig: kills.append(sig))
+    monitor = MemoryMonitor(rss_limit_mb=500, check_interval=1, drain_timeout=60)
+    session = monitor.track_session("client-1")
+
+    monitor.check()
+    assert not monitor.draining
+    rss["bytes"] = 600 * MB
+    monitor.check()
+    assert monitor.draining and kills == []
+
+    # Still serving its open session until it ends
+    monitor.check()
+    assert kills == []
+    monitor.untrack_session("client-1", session)
+    monitor.check()
+    assert kills == [signal.SIGTERM]
+
+
+def test_draining_worker_fails_health_checks_and_refuses_sessions(client, monkeypatch):
+    from starlette.websockets import WebSocketDisconnect
+
+    assert client.get("/health/").status_code == 200
+    monkeypatch.setattr(memory_monitor, "draining_since", time.time())
+
+    response = client.get("/health/")
+    assert response.status_code == 503 and response.json()["status"] == "draining"
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/ws/realtime/late-client?resume=false") as ws:
+            ws.receive_text()
+    assert refused.value.code == 1013
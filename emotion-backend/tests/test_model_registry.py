@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pytest
+
+from services.model_registry import ServedModel, read_model_registry, result_failed
+from services.prediction_service import prediction_service
+
+
+class RecordingModel:
+    """Returns a fixed output per row and keeps the (scaled) inputs it was given."""
+
+    def __init__(self, output):
+        self.output = np.asarray(output, dtype=np.float32)
+        self.inputs = []
+
+    def predict(self, x, verbose=0):
+        self.inputs.append(np.array(x))
+        return np.tile(self.output, (len(x), 1))
+
+
+class BrokenModel:
+    def predict(self, x, verbose=0):
+        raise RuntimeError("weights missing")
+
+
+@pytest.fixture
+def extra_models(monkeypatch):
+    """Two extra models next to the default one: a regressor and a model that always fails."""
+    arousal = RecordingModel([0.25, -0.5])
+    models = dict(prediction_service.models)
+    models["arousal_valence"] = ServedModel("arousal_valence", arousal, None, ("arousal", "valence"), "regression")
+    models["broken"] = ServedModel("broken", BrokenModel(), None, ("calm", "tense"))
+    monkeypatch.setattr(prediction_service, "models", models)
+    return arousal
+
+
+def test_extra_models_score_the_same_features_from_one_pass(extra_models, monkeypatch, tone):
+    extractions = []
+    audio_to_features = prediction_service.audio_to_features
+
+    def counted(*args, **kwargs):
+        features = audio_to_features(*args, **kwargs)
+        extractions.append(np.array(features))
+        return features
+
+    monkeypatch.setattr(prediction_service, "audio_to_features", counted)
+    result = prediction_service.predict(tone(3.0), 16000, models=["arousal_valence", "broken"])
+
+    assert len(extractions) == 1
+    np.testing.assert_array_equal(extra_models.inputs[0], extractions[0].reshape(1, -1))
+    # The default model keeps the top-level shape; the extra ones are under "models"
+    assert {"label", "confidence", "class_probs"} <= set(result)
+    assert result["models"]["arousal_valence"] == {"values": {"arousal": 0.25, "valence": -0.5}}
+    assert result["models"]["broken"]["failed"] and result_failed(result)
+    assert not result.get("failed")
+
+
+def test_batch_rows_keep_their_own_results(extra_models):
+    features = np.random.default_rng(0).standard_normal((3, prediction_service.feature_plan.dimension))
+    results = prediction_service.predict_features(features, ["arousal_valence"])
+    assert len(results) == 3 and len(extra_models.inputs) == 1 and len(extra_models.inputs[0]) == 3
+    assert all(r["models"]["arousal_valence"]["values"]["arousal"] == 0.25 for r in results)
+
+
+def test_unknown_models_are_rejected(extra_models):
+    assert prediction_service.resolve_models(" broken,arousal_valence,broken ") == ["broken", "arousal_valence"]
+    assert prediction_service.resolve_models("") is None
+    with pytest.raises(ValueError, match="Unknown model"):
+        prediction_service.resolve_models("arousal_valence,gender")
+
+
+def test_registry_file_validation(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text(json.dumps({"models": [
+        {"name": "female", "path": "female.keras", "labels": ["happy", "sad"]},
+        {"name": "av", "path": "av.keras", "labels": ["arousal", "valence"], "task": "regression", "scaler_path": "av.pkl"},
+    ]}))
+    specs = read_model_registry(str(path))
+    assert [(s.name, s.task, s.scaler_path) for s in specs] == [("female", "classification", None), ("av", "regression", "av.pkl")]
+
+    path.write_text(json.dumps({"models": [{"name": "a", "path": "a.keras", "labels": ["x"]}] * 2}))
+    with pytest.raises(ValueError, match="more than once"):
+        read_model_registry(str(path))
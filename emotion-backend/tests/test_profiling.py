@@ -0,0 +1,47 @@
+import pytest
+
+from config import settings
+from conftest import encode_audio
+from utils.profiling import profiling_authorized
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    return TestClient(main.app)
+
+
+def test_profiling_is_off_without_a_configured_token(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", None)
+    assert not profiling_authorized("anything") and not profiling_authorized(None)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    assert profiling_authorized("secret") and not profiling_authorized("wrong")
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile-Token": "wrong"}])
+def test_profiling_without_the_token_is_forbidden(client, tone, headers):
+    upload = {"file": ("tone.wav", encode_audio(tone(1.0), 16000), "audio/wav")}
+    assert client.post("/predict/file?profile=inline", files=upload, headers=headers).status_code == 403
+    assert client.get("/admin/memory", headers=headers).status_code == 403
+
+
+def test_profiled_prediction_reports_its_stages(client, tone):
+    upload = {"file": ("tone.wav", encode_audio(tone(1.0), 16000), "audio/wav")}
+    response = client.post("/predict/file?profile=inline", files=upload, headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    profile = response.json()["profile"]
+    assert {"probe_ms", "decode_ms", "preprocess_chunk_ms"} <= set(profile["stages"])
+    assert "cumulative" in profile["report"]
+
+
+def test_realtime_profiling_without_the_token_is_refused(client):
+    from starlette.websockets import WebSocketDisconnect
+
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/ws/realtime/profiled?profile=true&profile_token=wrong") as ws:
+            ws.receive_text()
+    assert refused.value.code == 1008
@@ -0,0 +1,90 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from config import settings
+
+tf = pytest.importorskip("tensorflow")
+
+from services.quantized_model import QuantizedModel, load_calibration_features, quantize_keras_model  # noqa: E402
+
+
+def load_compare_script():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "compare_quantized_model.py")
+    spec = importlib.util.spec_from_file_location("compare_quantized_model", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(8,)),
+        tf.keras.layers.Dense(16, activation="relu"),
+        tf.keras.layers.Dense(3, activation="softmax"),
+    ])
+    return model
+
+
+@pytest.fixture
+def features():
+    return np.random.default_rng(1).standard_normal((64, 8)).astype(np.float32)
+
+
+@pytest.mark.parametrize("mode, tolerance", [("dynamic", 0.05), ("int8", 0.1)])
+def test_quantized_model_tracks_the_float_model(keras_model, features, mode, tolerance):
+    calibration = features[:32] if mode == "int8" else None
+    quantized = QuantizedModel(model_content=quantize_keras_model(keras_model, mode, calibration))
+    assert quantized.input_shape == (None, 8)
+
+    expected = keras_model.predict(features, verbose=0)
+    # Batches of another size resize the interpreter input
+    for batch in (features, features[:1], features[0]):
+        output = quantized.predict(batch)
+        assert output.dtype == np.float32
+        np.testing.assert_allclose(output, expected[:len(output)], atol=tolerance)
+
+
+def test_int8_requires_calibration_vectors(keras_model):
+    with pytest.raises(ValueError):
+        quantize_keras_model(keras_model, "int8", None)
+    with pytest.raises(ValueError):
+        quantize_keras_model(keras_model, "float16")
+
+
+class _Shift:
+    def transform(self, x):
+        return x - 1.0
+
+
+def test_calibration_features(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "QUANTIZATION_CALIBRATION_PATH", None)
+    monkeypatch.setattr(settings, "QUANTIZATION_SYNTHETIC_CALIBRATION", False)
+    with pytest.raises(ValueError, match="QUANTIZATION_CALIBRATION_PATH"):
+        load_calibration_features(_Shift(), 8)
+
+    monkeypatch.setattr(settings, "QUANTIZATION_SYNTHETIC_CALIBRATION", True)
+    assert load_calibration_features(_Shift(), 8, num_samples=5).shape == (5, 8)
+
+    path = tmp_path / "calibration.npz"
+    np.savez(path, X=np.ones((10, 8), dtype=np.float32))
+    monkeypatch.setattr(settings, "QUANTIZATION_CALIBRATION_PATH", str(path))
+    loaded = load_calibration_features(_Shift(), 8, num_samples=4)
+    np.testing.assert_array_equal(loaded, np.zeros((4, 8), dtype=np.float32))
+
+
+def test_compare_script_holds_out_calibration_and_skips_unknown_labels():
+    script = load_compare_script()
+
+    calibration, evaluation = script.split_calibration(20, 5)
+    assert len(calibration) == 5 and len(evaluation) == 15
+    assert set(calibration).isdisjoint(evaluation) and set(calibration) | set(evaluation) == set(range(20))
+    assert list(evaluation) == sorted(evaluation)
+
+    names = ["angry", "happy", "sad"]
+    np.testing.assert_array_equal(script.encode_labels(np.array(["sad", "bored", "angry"]), names), [2, -1, 0])
+    np.testing.assert_array_equal(script.encode_labels(np.array([1, 3, -1, 0]), names), [1, -1, -1, 0])
@@ -0,0 +1,37 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+from config import settings
+
+
+def test_frames_are_received_while_a_window_is_analyzed(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.overload import overload_controller
+    from services.prediction_service import prediction_service
+
+    analyzing = threading.Event()
+
+    def slow_predict(audio, sr, **kwargs):
+        analyzing.set()
+        time.sleep(0.5)
+        return {"label": "neutral", "confidence": 1.0, "class_probs": {"neutral": 1.0}}
+
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", 0)
+    monkeypatch.setattr(overload_controller, "level", 0)
+    monkeypatch.setattr(overload_controller, "observe", lambda server_seconds: None)
+    monkeypatch.setattr(prediction_service, "predict", slow_predict)
+
+    frame = np.linspace(-0.5, 0.5, settings.SAMPLE_RATE, dtype=np.float32).tobytes()
+    with TestClient(main.app).websocket_connect("/ws/realtime/slow-model?latency=true&resume=false") as ws:
+        ws.send_bytes(frame)
+        assert analyzing.wait(10)
+        ws.send_bytes(frame)
+        replies = [json.loads(ws.receive_text()) for _ in range(2)]
+
+    # The second frame came off the socket during the first prediction, so its wait is on record
+    assert replies[1]["latency"]["queue_wait_ms"] > 300
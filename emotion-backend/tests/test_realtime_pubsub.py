@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from services.realtime_pubsub import DROP_NEWEST, DROP_OLDEST, PredictionBroker, Subscriber
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, message: str):
+        self.sent.append(message)
+
+
+def queued(subscriber: Subscriber) -> list:
+    return [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+
+
+@pytest.mark.parametrize("policy, accepted, kept", [
+    (DROP_OLDEST, [True, True, True], ["b", "c"]),
+    (DROP_NEWEST, [True, True, False], ["a", "b"]),
+])
+def test_full_queue_drop_policies(policy, accepted, kept):
+    subscriber = Subscriber(FakeWebSocket(), ["client"], queue_size=2, drop_policy=policy)
+    assert [subscriber.offer(message) for message in "abc"] == accepted
+    assert subscriber.dropped == 1
+    assert queued(subscriber) == kept
+
+
+def test_publish_fans_out_to_subscribers_of_the_client():
+    broker = PredictionBroker()
+    both = Subscriber(FakeWebSocket(), ["a", "b"])
+    only_a = Subscriber(FakeWebSocket(), ["a"])
+    broker.subscribe(both)
+    broker.subscribe(only_a)
+
+    broker.publish("a", {"type": "prediction", "label": "happy"})
+    broker.publish("b", {"type": "prediction", "label": "sad"})
+    broker.publish("c", {"type": "prediction", "label": "angry"})
+    assert [json.loads(m)["client_id"] for m in queued(both)] == ["a", "b"]
+    assert [json.loads(m)["label"] for m in queued(only_a)] == ["happy"]
+    stats = broker.stats()
+    assert stats["published"] == 2 and stats["fanout_messages"] == 3
+    assert stats["subscribers"] == 2 and stats["observed_clients"] == 2
+
+
+def test_unsubscribe_removes_empty_client_entries():
+    broker = PredictionBroker()
+    first = Subscriber(FakeWebSocket(), ["a", "b"])
+    second = Subscriber(FakeWebSocket(), ["a"])
+    broker.subscribe(first)
+    broker.subscribe(second)
+
+    broker.unsubscribe(first)
+    assert broker.subscribers == {"a": {second}}
+    assert not broker.has_subscribers("b")
+    broker.unsubscribe(second)
+    assert broker.subscribers == {} and broker.stats()["subscribers"] == 0
+    broker.publish("a", {"type": "prediction"})
+    assert broker.published == 0 and second.queue.empty()
+
+
+def test_subscriber_task_sends_queued_messages_in_order():
+    async def scenario():
+        websocket = FakeWebSocket()
+        subscriber = Subscriber(websocket, ["a"], queue_size=8)
+        for message in ("one", "two", "three"):
+            subscriber.offer(message)
+        task = asyncio.create_task(subscriber.run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        return websocket.sent, subscriber.delivered
+
+    assert asyncio.run(scenario()) == (["one", "two", "three"], 3)
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.session_store import (
+    LocalRedis, MemorySessionStore, RedisSessionStore, SessionState, SessionStore, SqliteSessionStore
+)
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_store(request, tmp_path):
+    """Every backend, the Redis one through the in-process LocalRedis stand-in."""
+    def make(ttl: float = 60, prefix: str = "test:session:") -> SessionStore:
+        if request.param == "memory":
+            return MemorySessionStore(ttl=ttl, prefix=prefix)
+        if request.param == "sqlite":
+            return SqliteSessionStore(path=str(tmp_path / "sessions.sqlite3"), ttl=ttl, prefix=prefix)
+        return RedisSessionStore(ttl=ttl, prefix=prefix, client=LocalRedis())
+    return make
+
+
+def test_state_round_trips(make_store):
+    store = make_store()
+    state = SessionState("client-1", models=["fast"], audio=np.linspace(-1, 1, 800, dtype=np.float32))
+    state.add_result(7, {"label": "happy", "confidence": 0.9, "class_probs": {"happy": 0.9, "sad": 0.1}})
+    store.put(state)
+
+    loaded = store.get("client-1")
+    assert loaded.metadata() == state.metadata()
+    np.testing.assert_array_equal(loaded.audio, state.audio)
+    assert store.client_ids() == ["client-1"]
+
+    store.delete("client-1")
+    assert store.get("client-1") is None and store.client_ids() == []
+
+
+def test_state_expires_after_ttl(make_store, monkeypatch):
+    store = make_store(ttl=60)
+    store.put(SessionState("client-1"))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert store.get("client-1") is None
+    assert store.client_ids() == []
+
+
+def test_keys_match_prefix_literally(make_store):
+    store = make_store(prefix="a*b?[c]%_:")
+    store.put(SessionState("mine"))
+    # Keys that the prefix would match as a Redis glob or an SQL LIKE pattern
+    store._set("a*bY[c]%_:glob", b"x", 60)
+    store._set("a*b?[c]XY:like", b"x", 60)
+    assert store.client_ids() == ["mine"]
+
+
+def test_unreadable_state_is_discarded(make_store):
+    store = make_store()
+    store._set(store.prefix + "client-1", b"\x00\x00\x00\x09not json", 60)
+    assert store.get("client-1") is None
+    assert store.client_ids() == []
+
+
+def test_store_without_backend_methods_cannot_be_created():
+    class Incomplete(SessionStore):
+        def _get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_window_fills_short_frames_with_kept_audio(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_STORE_AUDIO_SECONDS", 5.0)
+    sr = 100
+    state = SessionState("client-1")
+    frame = np.ones(sr, dtype=np.float32)
+    assert state.window(frame, sr) is frame
+
+    state.add_audio(np.arange(4 * sr, dtype=np.float32), sr)
+    resumed = SessionState.from_bytes(state.to_bytes())
+    window = resumed.window(frame, sr)
+    assert len(window) == settings.DURATION * sr
+    np.testing.assert_array_equal(window[:-sr], np.arange(4 * sr - (settings.DURATION - 1) * sr, 4 * sr))
+    full = np.zeros(settings.DURATION * sr, dtype=np.float32)
+    assert resumed.window(full, sr) is full
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from config import settings
+from conftest import encode_audio
+from preprocessing.stream_decoding import StreamDecoderError, StreamDecoderPool, sniff_stream_container
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Point FFMPEG_PATH at a script standing in for ffmpeg; it runs the given body on stdin/stdout."""
+    def make(body: str) -> str:
+        path = tmp_path / "ffmpeg"
+        path.write_text(f"#!{sys.executable}\nimport os, sys\n{body}\n")
+        path.chmod(0o755)
+        monkeypatch.setattr(settings, "FFMPEG_PATH", str(path))
+        return str(path)
+    return make
+
+
+def run_session(pool: StreamDecoderPool, chunks, audio_format: str = "webm"):
+    """Decode chunks through one pooled decoder; returns the samples of each chunk."""
+    async def session():
+        decoder = await pool.acquire("client", audio_format)
+        try:
+            return [await decoder.decode(chunk) for chunk in chunks]
+        finally:
+            await pool.release("client", decoder)
+    # A decoder stalled on a full pipe would otherwise hang the test run
+    return asyncio.run(asyncio.wait_for(session(), 30))
+
+
+def test_sniff_stream_container():
+    assert sniff_stream_container(b"\x1a\x45\xdf\xa3rest") == "webm"
+    assert sniff_stream_container(b"OggS\x00\x02") == "ogg"
+    assert sniff_stream_container(np.zeros(8, dtype=np.int16).tobytes()) is None
+
+
+def test_pool_rejects_sessions_beyond_capacity(fake_ffmpeg):
+    fake_ffmpeg("sys.stdin.buffer.read()")
+    pool = StreamDecoderPool(max_streams=1)
+
+    async def sessions():
+        first = await pool.acquire("a", "webm")
+        with pytest.raises(StreamDecoderError):
+            await pool.acquire("b", "webm")
+        await pool.release("a", first)
+        await pool.release("b", await pool.acquire("b", "webm"))
+
+    asyncio.run(sessions())
+    assert pool.rejected == 1 and pool.started == 2 and pool.in_use == 0
+
+
+def test_chatty_decoder_does_not_stall(fake_ffmpeg):
+    # More error output than a pipe buffer holds, then an echo of the input as float32
+    fake_ffmpeg("os.write(2, b'warning: ' * 50000)\n"
+                "while True:\n"
+                "    data = os.read(0, 4096)\n"
+                "    if not data:\n"
+                "        break\n"
+                "    os.write(1, data)")
+    samples = np.arange(256, dtype=np.float32)
+    decoded = run_session(StreamDecoderPool(), [samples.tobytes()])
+    np.testing.assert_array_equal(decoded[0], samples)
+
+
+def test_exited_decoder_reports_its_error_output(fake_ffmpeg):
+    fake_ffmpeg("os.write(2, b'x' * 100000 + b' Invalid data found when processing input')\nsys.exit(1)")
+    with pytest.raises(StreamDecoderError, match="Invalid data found"):
+        run_session(StreamDecoderPool(), [b"\x1a\x45\xdf\xa3" + bytes(1 << 20)])
+
+
+@pytest.mark.skipif(shutil.which(settings.FFMPEG_PATH) is None, reason="ffmpeg is not installed")
+def test_webm_opus_stream_decodes_chunk_by_chunk(tone, tmp_path):
+    wav = tmp_path / "tone.wav"
+    wav.write_bytes(encode_audio(tone(2.0, 48000), 48000))
+    webm = subprocess.run([shutil.which(settings.FFMPEG_PATH), "-loglevel", "error", "-i", str(wav),
+                           "-c:a", "libopus", "-f", "webm", "pipe:1"], stdout=subprocess.PIPE, check=True).stdout
+    assert sniff_stream_container(webm) == "webm"
+
+    # Only the first chunk carries the container header, as with MediaRecorder
+    size = len(webm) // 4 + 1
+    decoded = run_session(StreamDecoderPool(), [webm[i:i + size] for i in range(0, len(webm), size)])
+    audio = np.concatenate(decoded)
+    assert len(audio) == pytest.approx(2.0 * settings.SAMPLE_RATE, rel=0.15)
+    assert 0.2 < np.abs(audio).max() <= 1.0
+
+
+def test_sampled_tier_still_feeds_every_chunk_to_the_decoder(fake_ffmpeg, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.overload import overload_controller
+    from services.prediction_service import prediction_service
+    from services.session_store import session_store
+
+    fake_ffmpeg("while True:\n"
+                "    data = os.read(0, 1 << 16)\n"
+                "    if not data:\n"
+                "        break\n"
+                "    os.write(1, data)")
+    # Long enough for the stand-in to start, so every chunk gets its samples back
+    monkeypatch.setattr(settings, "REALTIME_DECODER_MAX_WAIT_MS", 5000)
+    monkeypatch.setattr(settings, "SESSION_STORE_AUDIO_SECONDS", 60.0)
+    sampled = next(i for i, tier in enumerate(overload_controller.tiers) if tier.sample_every > 1)
+    monkeypatch.setattr(overload_controller, "level", sampled)
+    monkeypatch.setattr(overload_controller, "observe", lambda server_seconds: None)
+    monkeypatch.setattr(prediction_service, "predict", lambda audio, sr, **kwargs: {
+        "label": "neutral", "confidence": 1.0, "class_probs": {"neutral": 1.0}
+    })
+
+    samples = np.linspace(-0.5, 0.5, 4096, dtype=np.float32)
+    chunks = [b"\x1a\x45\xdf\xa3" + samples.tobytes()[4:]] + [samples.tobytes()] * 5
+    with TestClient(main.app).websocket_connect("/ws/realtime/sampled-webm?audio_format=webm&resume=false") as ws:
+        replies = []
+        for chunk in chunks:
+            ws.send_bytes(chunk)
+            replies.append(json.loads(ws.receive_text()))
+
+    assert [reply.get("reused", False) for reply in replies] == [False, False, True, False, True, False]
+    # Skipped chunks reached the decoder too, and their samples are in the kept audio
+    assert len(session_store.get("sampled-webm").audio) == len(samples) * len(chunks)
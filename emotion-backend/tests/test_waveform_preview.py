@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from config import settings
+from conftest import encode_audio
+from services.waveform_preview import (
+    PEAK_SCALE, WaveformCache, WaveformPreviewBuilder, build_waveform_preview, content_id
+)
+
+SR = 16000
+
+
+@pytest.fixture
+def audio():
+    rng = np.random.default_rng(0)
+    return (rng.uniform(-0.9, 0.9, 30 * SR) * np.linspace(0.1, 1.0, 30 * SR)).astype(np.float32)
+
+
+def test_blocks_of_any_length_give_the_whole_file_preview(audio):
+    whole = build_waveform_preview("a", audio, SR)
+    builder = WaveformPreviewBuilder("a", SR, expected_duration=len(audio) / SR)
+    for start in range(0, len(audio), 7777):
+        builder.add(audio[start:start + 7777])
+    blocks = builder.finish()
+
+    assert len(blocks.levels) == len(whole.levels)
+    for (bucket, mins, maxs), (whole_bucket, whole_mins, whole_maxs) in zip(blocks.levels, whole.levels):
+        assert bucket == whole_bucket
+        np.testing.assert_array_equal(mins, whole_mins)
+        np.testing.assert_array_equal(maxs, whole_maxs)
+    assert blocks.mel.shape == whole.mel.shape
+    assert np.abs(blocks.mel.astype(int) - whole.mel.astype(int)).max() <= 1
+
+
+def test_peak_levels(audio):
+    preview = build_waveform_preview("a", audio, SR)
+    bucket, mins, maxs = preview.levels[0]
+    assert bucket == settings.WAVEFORM_PEAK_BUCKET_SAMPLES
+    assert len(mins) == int(np.ceil(len(audio) / bucket))
+    first = audio[:bucket]
+    assert mins[0] == round(first.min() * PEAK_SCALE) and maxs[0] == round(first.max() * PEAK_SCALE)
+
+    # Each level halves the previous one, down to the minimum bucket count
+    for (coarse, coarse_mins, _), (fine, fine_mins, _) in zip(preview.levels[1:], preview.levels):
+        assert coarse == 2 * fine and len(coarse_mins) == (len(fine_mins) + 1) // 2
+    assert len(preview.levels[-1][1]) <= settings.WAVEFORM_PEAK_MIN_BUCKETS < len(preview.levels[-2][1])
+    assert preview.level_for_width(len(preview.levels[2][1])) == 2
+    assert preview.level_for_width(10 ** 9) == 0
+
+
+def test_peaks_of_a_time_range(audio):
+    preview = build_waveform_preview("a", audio, SR)
+    peaks = preview.peaks(1, start=10.0, end=12.0)
+    bucket_seconds = 2 * settings.WAVEFORM_PEAK_BUCKET_SAMPLES / SR
+    assert peaks["start"] <= 10.0 < peaks["start"] + bucket_seconds
+    assert len(peaks["min"]) == pytest.approx(2.0 / bucket_seconds, abs=2)
+    with pytest.raises(ValueError):
+        preview.peaks(len(preview.levels))
+
+
+def test_mel_columns_follow_the_loud_part():
+    t = np.arange(20 * SR) / SR
+    audio = (0.001 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    audio[10 * SR:] *= 500
+    preview = build_waveform_preview("a", audio, SR)
+    assert 0 < preview.mel.shape[0] <= settings.WAVEFORM_MEL_COLUMNS
+    assert preview.mel.shape[1] == settings.WAVEFORM_MEL_BANDS
+    half = preview.mel.shape[0] // 2
+    assert preview.mel[half + 1:].max() > preview.mel[:half - 1].max()
+
+    short = build_waveform_preview("b", audio[:100], SR)
+    assert short.mel.shape[0] == 1 and short.duration == pytest.approx(100 / SR)
+
+
+def test_cache_evicts_least_recently_used_previews(audio):
+    previews = [build_waveform_preview(str(i), audio[i * SR:(i + 5) * SR], SR) for i in range(3)]
+    cache = WaveformCache(max_bytes=previews[0].nbytes * 2 + 1)
+    cache.put(previews[0])
+    cache.put(previews[1])
+    assert cache.get("0") is previews[0]
+    cache.put(previews[2])
+    # "1" was used least recently
+    assert "1" not in cache and "0" in cache and "2" in cache
+    assert cache.stats()["bytes"] == previews[0].nbytes + previews[2].nbytes
+
+    cache.put(previews[2])
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] == previews[0].nbytes + previews[2].nbytes
+    cache.put(build_waveform_preview("big", audio, SR))
+    assert "big" not in cache and cache.stats()["entries"] == 2
+
+
+def test_file_prediction_caches_a_preview_only_when_asked(tone):
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.waveform_preview import waveform_cache
+
+    client = TestClient(main.app)
+    plain = encode_audio(tone(2.0, SR, freq=300.0), SR)
+    asked = encode_audio(tone(2.0, SR, freq=500.0), SR)
+
+    response = client.post("/predict/file", files={"file": ("plain.wav", plain, "audio/wav")})
+    assert response.status_code == 200 and response.json()["audio_id"] == content_id(plain)
+    assert content_id(plain) not in waveform_cache
+
+    response = client.post("/predict/file?waveform=true", files={"file": ("asked.wav", asked, "audio/wav")})
+    assert response.status_code == 200
+    peaks = client.get(f"/waveform/{response.json()['audio_id']}/peaks?width=50")
+    assert peaks.status_code == 200 and len(peaks.json()["max"]) >= 50
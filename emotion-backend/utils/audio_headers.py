@@ -0,0 +1,330 @@
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from config import settings
+
+
+class AudioHeaderError(ValueError):
+    """Raised when audio bytes do not carry a parseable container header."""
+
+
+@dataclass
+class AudioHeader:
+    """Stream properties read from a container header, without decoding any samples."""
+    format: str
+    channels: int
+    sample_rate: int
+    duration: Optional[float]
+    bitrate: Optional[int] = None
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """
+    Guess the container format from the magic bytes at the start of a file.
+
+    Args:
+        header: At least the first 12 bytes of the file
+
+    Returns:
+        One of "wav", "flac", "ogg", "mp3", "m4a", or None if unknown
+    """
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[4:8] == b"ftyp":
+        return "m4a"
+    if header[:3] == b"ID3" or _parse_mp3_frame_header(header, 0) is not None:
+        return "mp3"
+    return None
+
+
+def probe_audio(data: bytes) -> AudioHeader:
+    """
+    Read format, channels, sample rate and duration from the container header.
+
+    Supports WAV, FLAC, MP3 and M4A. Only headers are parsed, so this is cheap enough
+    to run on every upload before any decode work starts.
+
+    Args:
+        data: Audio file contents
+
+    Returns:
+        AudioHeader describing the stream
+
+    Raises:
+        AudioHeaderError: If the format is unknown or the header is malformed
+    """
+    fmt = sniff_format(data[:12])
+    parsers = {
+        "wav": _probe_wav,
+        "flac": _probe_flac,
+        "mp3": _probe_mp3,
+        "m4a": _probe_m4a,
+    }
+    if fmt not in parsers:
+        raise AudioHeaderError("Unrecognized audio format")
+    try:
+        header = parsers[fmt](data)
+    except (struct.error, IndexError) as e:
+        raise AudioHeaderError(f"Truncated {fmt} header") from e
+    if header.channels <= 0 or header.sample_rate <= 0:
+        raise AudioHeaderError(f"Invalid {fmt} stream parameters")
+    return header
+
+
+def validate_audio_header(header: AudioHeader, max_duration: float = None) -> Tuple[bool, str]:
+    """
+    Check a probed header against the upload limits.
+
+    Args:
+        header: Probed audio header
+        max_duration: Maximum allowed duration in seconds. Defaults to settings.MAX_AUDIO_DURATION
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if max_duration is None:
+        max_duration = settings.MAX_AUDIO_DURATION
+    if header.format not in settings.ALLOWED_EXTENSIONS:
+        return False, f"Audio format {header.format} not supported. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+    if header.duration is None or header.duration <= 0:
+        return False, "Audio file contains no data"
+    if header.duration > max_duration:
+        return False, f"Audio too long ({header.duration:.1f}s). Maximum duration is {max_duration:.0f}s"
+    return True, ""
+
+
+def _probe_wav(data: bytes) -> AudioHeader:
+    offset = 12
+    channels = sample_rate = block_align = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            _, channels, sample_rate, byte_rate, block_align = struct.unpack_from("<HHIIH", data, body)
+        elif chunk_id == b"data":
+            if channels is None:
+                raise AudioHeaderError("WAV data chunk before fmt chunk")
+            if block_align == 0:
+                raise AudioHeaderError("Invalid WAV block alignment")
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF; trust the bytes we have
+            available = len(data) - body
+            data_size = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+            duration = data_size / block_align / sample_rate if sample_rate else None
+            return AudioHeader("wav", channels, sample_rate, duration, bitrate=byte_rate * 8)
+        # Chunks are word aligned
+        offset = body + chunk_size + (chunk_size & 1)
+    raise AudioHeaderError("WAV file has no data chunk")
+
+
+def _probe_flac(data: bytes) -> AudioHeader:
+    offset = 4
+    while offset + 4 <= len(data):
+        block_header = data[offset]
+        block_type = block_header & 0x7F
+        block_size = int.from_bytes(data[offset + 1:offset + 4], "big")
+        if block_type == 0:
+            streaminfo = data[offset + 4:offset + 4 + 34]
+            if len(streaminfo) < 18:
+                raise AudioHeaderError("Truncated FLAC STREAMINFO")
+            # 20 bits sample rate, 3 bits channels-1, 5 bits bps-1, 36 bits total samples
+            packed = int.from_bytes(streaminfo[10:18], "big")
+            sample_rate = packed >> 44
+            channels = ((packed >> 41) & 0x7) + 1
+            total_samples = packed & 0xFFFFFFFFF
+            duration = total_samples / sample_rate if sample_rate and total_samples else None
+            return AudioHeader("flac", channels, sample_rate, duration)
+        if block_header & 0x80:
+            break
+        offset += 4 + block_size
+    raise AudioHeaderError("FLAC file has no STREAMINFO block")
+
+
+_MP3_BITRATES = {
+    # (mpeg1, layer) -> kbps table indexed by bitrate index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _parse_mp3_frame_header(data: bytes, offset: int) -> Optional[dict]:
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version = (b1 >> 3) & 0x3
+    layer_bits = (b1 >> 1) & 0x3
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x3
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    layer = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x1
+    channels = 1 if (b3 >> 6) == 3 else 2
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples_per_frame = 1152 if (layer == 2 or mpeg1) else 576
+        frame_length = (samples_per_frame // 8) * bitrate // sample_rate + padding
+
+    return {
+        "mpeg1": mpeg1,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "samples_per_frame": samples_per_frame,
+        "frame_length": frame_length,
+    }
+
+
+def _probe_mp3(data: bytes) -> AudioHeader:
+    offset = 0
+    if data[:3] == b"ID3":
+        # Synchsafe tag size, plus an optional 10-byte footer
+        tag_size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + tag_size + (10 if data[5] & 0x10 else 0)
+
+    # Find the first frame whose successor is also a valid frame, to skip false syncs
+    search_end = min(len(data), offset + 64 * 1024)
+    frame = None
+    while offset < search_end:
+        frame = _parse_mp3_frame_header(data, offset)
+        if frame is not None:
+            next_offset = offset + frame["frame_length"]
+            if next_offset + 4 > len(data) or _parse_mp3_frame_header(data, next_offset) is not None:
+                break
+        frame = None
+        offset += 1
+    if frame is None:
+        raise AudioHeaderError("No MPEG audio frame found")
+
+    sample_rate = frame["sample_rate"]
+    frame_count = _mp3_vbr_frame_count(data, offset, frame)
+    if frame_count:
+        duration = frame_count * frame["samples_per_frame"] / sample_rate
+        bitrate = None
+    else:
+        # Constant bitrate: duration follows from the audio payload size
+        audio_bytes = len(data) - offset - (128 if data[-128:-125] == b"TAG" else 0)
+        bitrate = frame["bitrate"]
+        duration = audio_bytes * 8 / bitrate
+    return AudioHeader("mp3", frame["channels"], sample_rate, duration, bitrate=bitrate)
+
+
+def _mp3_vbr_frame_count(data: bytes, offset: int, frame: dict) -> Optional[int]:
+    """Frame count from a Xing/Info or VBRI header in the first frame, if present."""
+    if frame["mpeg1"]:
+        side_info = 17 if frame["channels"] == 1 else 32
+    else:
+        side_info = 9 if frame["channels"] == 1 else 17
+
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 0x1:
+            return struct.unpack_from(">I", data, xing + 8)[0]
+
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        return struct.unpack_from(">I", data, vbri + 14)[0]
+    return None
+
+
+def _iter_boxes(data: bytes, start: int, end: int):
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            raise AudioHeaderError("Malformed MP4 box")
+        yield box_type, offset + header_size, min(offset + size, end)
+        offset += size
+
+
+def _find_box(data: bytes, start: int, end: int, box_type: bytes) -> Optional[Tuple[int, int]]:
+    for found_type, body, box_end in _iter_boxes(data, start, end):
+        if found_type == box_type:
+            return body, box_end
+    return None
+
+
+def _probe_m4a(data: bytes) -> AudioHeader:
+    moov = _find_box(data, 0, len(data), b"moov")
+    if moov is None:
+        raise AudioHeaderError("MP4 file has no moov box")
+
+    duration = None
+    mvhd = _find_box(data, moov[0], moov[1], b"mvhd")
+    if mvhd is not None:
+        duration = _mp4_header_duration(data, mvhd[0])
+
+    for box_type, trak_body, trak_end in _iter_boxes(data, moov[0], moov[1]):
+        if box_type != b"trak":
+            continue
+        mdia = _find_box(data, trak_body, trak_end, b"mdia")
+        if mdia is None:
+            continue
+        hdlr = _find_box(data, mdia[0], mdia[1], b"hdlr")
+        if hdlr is None or data[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+
+        mdhd = _find_box(data, mdia[0], mdia[1], b"mdhd")
+        timescale = None
+        if mdhd is not None:
+            track_duration = _mp4_header_duration(data, mdhd[0])
+            duration = track_duration or duration
+            timescale = _mp4_header_timescale(data, mdhd[0])
+
+        minf = _find_box(data, mdia[0], mdia[1], b"minf")
+        stbl = _find_box(data, minf[0], minf[1], b"stbl") if minf else None
+        stsd = _find_box(data, stbl[0], stbl[1], b"stsd") if stbl else None
+        if stsd is None:
+            raise AudioHeaderError("MP4 sound track has no sample description")
+
+        # Skip version/flags and entry count, then the 8-byte sample entry box header
+        entry = stsd[0] + 8 + 8
+        channels = struct.unpack_from(">H", data, entry + 16)[0]
+        sample_rate = struct.unpack_from(">I", data, entry + 24)[0] >> 16
+        return AudioHeader("m4a", channels, sample_rate or timescale or 0, duration)
+
+    raise AudioHeaderError("MP4 file has no sound track")
+
+
+def _mp4_header_timescale(data: bytes, body: int) -> int:
+    version = data[body]
+    return struct.unpack_from(">I", data, body + (20 if version == 1 else 12))[0]
+
+
+def _mp4_header_duration(data: bytes, body: int) -> Optional[float]:
+    """Duration in seconds from an mvhd/mdhd box (same layout for both)."""
+    version = data[body]
+    if version == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, body + 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, body + 12)
+    if not timescale:
+        return None
+    return duration / timescale
@@ -1,12 +1,14 @@
 import numpy as np
-import librosa
 from typing import Tuple
-import io
+
+from utils.audio_headers import probe_audio, validate_audio_header, AudioHeaderError
 
 def validate_audio_file(audio_bytes: bytes) -> Tuple[bool, str]:
     """
     Validate if the provided bytes represent a valid audio file.
     
+    Only the container header is parsed; no audio is decoded.
+    
     Args:
         audio_bytes: Audio data as bytes
         
@@ -14,22 +16,11 @@ def validate_audio_file(audio_bytes: bytes) -> Tuple[bool, str]:
         Tuple of (is_valid, error_message)
     """
     try:
-        # Try to load the audio from bytes
-        buffer = io.BytesIO(audio_bytes)
-        audio_data, sample_rate = librosa.load(buffer, duration=1.0)  # Load just 1 second to test
-        
-        # Check if we got some data
-        if len(audio_data) == 0:
-            return False, "Audio file contains no data"
-        
-        # Check for valid sample rate
-        if sample_rate <= 0:
-            return False, "Invalid sample rate"
-        
-        return True, ""
-    
-    except Exception as e:
+        header = probe_audio(audio_bytes)
+    except AudioHeaderError as e:
         return False, f"Invalid audio file: {str(e)}"
+    
+    return validate_audio_header(header)
 
 
 def convert_audio_format(audio_bytes: bytes, target_format: str = 'wav') -> bytes:
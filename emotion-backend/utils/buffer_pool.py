@@ -0,0 +1,116 @@
+import threading
+import weakref
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config import settings
+
+
+class BufferPool:
+    """
+    Named scratch arrays reused across calls, for writing with out= instead of allocating.
+
+    get() returns a view of the buffer kept under a name, growing it when a larger
+    shape is asked for. The contents are valid until the next get() of the same name,
+    so a pool must only be used by one caller at a time: one realtime session, or one
+    thread (see thread_buffer_pool). Requests above BUFFER_POOL_MAX_BUFFER_BYTES (e.g. a
+    whole long upload) get a fresh array that is not kept, so a pool never holds more
+    than a few windows' worth of memory. With reuse=False every get() allocates, which
+    is the baseline the benchmark compares against.
+    """
+
+    def __init__(self, reuse: bool = None, max_buffer_bytes: int = None):
+        self.reuse = settings.BUFFER_POOL_ENABLED if reuse is None else reuse
+        self.max_buffer_bytes = max_buffer_bytes or settings.BUFFER_POOL_MAX_BUFFER_BYTES
+        self._buffers: Dict[Tuple[str, np.dtype], np.ndarray] = {}
+        self.allocations = 0
+        self.reuses = 0
+        self.oversize = 0
+
+    def get(self, name: str, shape: Union[int, Sequence[int]], dtype=np.float32) -> np.ndarray:
+        """
+        Get an uninitialized C-contiguous array of the given shape and dtype.
+
+        Args:
+            name: Buffer name; each call site uses its own
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            An array owned by the pool until the next get() of the same name
+        """
+        shape = (shape,) if isinstance(shape, (int, np.integer)) else tuple(shape)
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        if not self.reuse or size * dtype.itemsize > self.max_buffer_bytes:
+            if self.reuse:
+                self.oversize += 1
+            self.allocations += 1
+            return np.empty(shape, dtype)
+
+        key = (name, dtype)
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.size < size:
+            # Some headroom, so a window that is a few samples longer does not reallocate
+            capacity = size if buffer is None else min(int(size * 1.25), self.max_buffer_bytes // dtype.itemsize)
+            buffer = np.empty(max(capacity, size), dtype)
+            self._buffers[key] = buffer
+            self.allocations += 1
+        else:
+            self.reuses += 1
+        return buffer[:size].reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        # Snapshot, since memory stats read other threads' pools
+        return sum(buffer.nbytes for buffer in list(self._buffers.values()))
+
+    def clear(self):
+        """Drop every kept buffer."""
+        self._buffers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reuse": self.reuse,
+            "buffers": len(self._buffers),
+            "bytes": self.nbytes,
+            "allocations": self.allocations,
+            "reuses": self.reuses,
+            "oversize": self.oversize,
+        }
+
+
+_local = threading.local()
+# Every live thread's pool, for memory accounting; a pool goes away with its thread
+_thread_pools: "weakref.WeakSet[BufferPool]" = weakref.WeakSet()
+
+
+def thread_buffer_pool() -> BufferPool:
+    """The calling thread's pool, for intermediates that never outlive a synchronous call."""
+    pool: Optional[BufferPool] = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = BufferPool()
+        _thread_pools.add(pool)
+    return pool
+
+
+def thread_buffer_pool_bytes() -> int:
+    """Bytes kept by the pools of all live threads."""
+    return sum(pool.nbytes for pool in list(_thread_pools))
+
+
+def normalize_peak(audio: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Scale audio to a peak of 1, like audio / np.max(np.abs(audio)), without temporaries.
+
+    The result is written to out (which may be audio itself) or a new array. Silent
+    audio, and audio already peaking at 1, needs no scaling and is returned as is.
+    """
+    if audio.size == 0:
+        return audio
+    peak = max(audio.max(), -audio.min())
+    if peak == 0 or peak == 1:
+        # Division by one is exact, so the samples are already the result
+        return audio
+    return np.divide(audio, peak, out=out)
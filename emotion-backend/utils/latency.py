@@ -0,0 +1,167 @@
+import contextlib
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from config import settings
+
+# Stages reported per message, in pipeline order
+STAGES = ("receive_to_enqueue", "queue_wait", "decode", "preprocess_chunk", "features", "inference", "ipc", "server", "send")
+
+
+class LatencyRecord:
+    """
+    Timings of one realtime audio message, from the moment it came off the socket.
+
+    Implements the same stage() interface as RequestProfile, so it can be passed as the
+    profile argument of PredictionService.predict; an inner profile, if any, is still
+    driven for every stage.
+    """
+
+    def __init__(self, seq: int, capture_ts: Optional[float], profile=None):
+        self.seq = seq
+        self.capture_ts = capture_ts
+        self.received_at = time.time()
+        self.received = time.perf_counter()
+        self.enqueued = None
+        self.dequeued = None
+        self.durations: Dict[str, float] = {}
+        self.profile = profile
+
+    def mark_enqueued(self):
+        self.enqueued = time.perf_counter()
+        self.durations["receive_to_enqueue"] = self.enqueued - self.received
+
+    def mark_dequeued(self):
+        self.dequeued = time.perf_counter()
+        self.durations["queue_wait"] = self.dequeued - self.enqueued
+
+    def mark_ready(self):
+        """The result is computed and about to be sent."""
+        self.durations["server"] = time.perf_counter() - self.received
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        inner = self.profile.stage(name) if self.profile is not None else contextlib.nullcontext()
+        try:
+            with inner:
+                yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + (time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float):
+        """Record a stage timed elsewhere, such as in an inference worker process."""
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        if self.profile is not None:
+            self.profile.add_stage(name, seconds)
+
+    def to_response(self, previous_send: Optional[float]) -> Dict[str, Any]:
+        """
+        Latency section of a result message.
+
+        The send duration of a message can only be known after it is sent, so each
+        message reports the send duration of the session's previous message.
+        """
+        response: Dict[str, Any] = {
+            "seq": self.seq,
+            "capture_ts": self.capture_ts,
+            "received_at": round(self.received_at * 1000, 3),
+        }
+        for name in STAGES:
+            if name in self.durations:
+                response[f"{name}_ms"] = round(self.durations[name] * 1000, 3)
+        response["previous_send_ms"] = round(previous_send * 1000, 3) if previous_send is not None else None
+        return response
+
+
+class SessionLatency:
+    """Per-session latency aggregate over the most recent messages."""
+
+    def __init__(self, client_id: str, window: int = None):
+        self.client_id = client_id
+        self.started_at = time.time()
+        self.messages = 0
+        self.slo_violations = 0
+        self.last_send: Optional[float] = None
+        self._samples: Dict[str, Deque[float]] = {
+            name: deque(maxlen=window or settings.LATENCY_SUMMARY_WINDOW) for name in STAGES
+        }
+
+    def add(self, record: LatencyRecord):
+        self.messages += 1
+        for name, seconds in record.durations.items():
+            if name in self._samples:
+                self._samples[name].append(seconds)
+        if record.durations.get("server", 0.0) * 1000 > settings.REALTIME_LATENCY_SLO_MS:
+            self.slo_violations += 1
+
+    def add_send(self, seconds: float):
+        self.last_send = seconds
+        self._samples["send"].append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, mean, p50/p95/p99 and max per stage in milliseconds, plus SLO attainment."""
+        stages = {}
+        for name, samples in self._samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=np.float64) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stages[name] = {
+                "count": len(values),
+                "mean_ms": round(float(values.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(values.max()), 3),
+            }
+        return {
+            "client_id": self.client_id,
+            "started_at": self.started_at,
+            "duration_s": round(time.time() - self.started_at, 3),
+            "messages": self.messages,
+            "slo_ms": settings.REALTIME_LATENCY_SLO_MS,
+            "slo_met_ratio": round(1 - self.slo_violations / self.messages, 4) if self.messages else None,
+            "stages": stages,
+        }
+
+
+class LatencyRegistry:
+    """Live sessions plus the summaries of recently finished ones."""
+
+    def __init__(self, retention: int = None):
+        self.retention = retention or settings.LATENCY_SUMMARY_RETENTION
+        self.active: Dict[str, SessionLatency] = {}
+        self.finished: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def start(self, client_id: str) -> SessionLatency:
+        session = SessionLatency(client_id)
+        self.active[client_id] = session
+        return session
+
+    def finish(self, client_id: str, session: SessionLatency) -> Dict[str, Any]:
+        """Freeze a session's summary and keep it for later retrieval."""
+        summary = session.summary()
+        summary["ended_at"] = time.time()
+        if self.active.get(client_id) is session:
+            del self.active[client_id]
+        self.finished[client_id] = summary
+        self.finished.move_to_end(client_id)
+        while len(self.finished) > self.retention:
+            self.finished.popitem(last=False)
+        return summary
+
+    def get(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """Live summary of an active session, or the final summary of a finished one."""
+        session = self.active.get(client_id)
+        if session is not None:
+            return {**session.summary(), "active": True}
+        summary = self.finished.get(client_id)
+        return {**summary, "active": False} if summary is not None else None
+
+
+# Global instance
+latency_registry = LatencyRegistry()
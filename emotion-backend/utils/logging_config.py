@@ -0,0 +1,188 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class KeyValueFormatter(logging.Formatter):
+    """
+    Format records as `key=value` pairs.
+
+    Structured fields passed with `extra={"fields": {...}}` are appended after the
+    standard ones, so log lines stay greppable and machine-parseable.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            f"ts={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+            f"msg={_quote(record.getMessage())}",
+        ]
+        for key, value in getattr(record, "fields", {}).items():
+            parts.append(f"{key}={_quote(value)}")
+        line = " ".join(parts)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f"{line} exc={_quote(record.exc_text)}"
+        return line
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats every record in the calling thread, which is
+    exactly the work we want off the event loop. The queue is in-process, so the
+    record can be passed through as-is; only exception tracebacks are rendered
+    eagerly because their frames do not outlive the except block.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SessionEventSampler:
+    """
+    Per-session, per-event rate limiter for hot-path log records.
+
+    Allows one record per event per session every 1/rate seconds and counts what it
+    suppressed in between, so the next emitted record can report it.
+    """
+
+    def __init__(self, events_per_second: float):
+        self.interval = 1.0 / events_per_second if events_per_second > 0 else 0.0
+        self._last: Dict[Tuple[str, str], float] = {}
+        self._suppressed: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, session: str, event: str) -> Tuple[bool, int]:
+        """
+        Returns:
+            Tuple of (emit, suppressed_count_since_last_emit)
+        """
+        key = (session, event)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False, 0
+            self._last[key] = now
+            return True, self._suppressed.pop(key, 0)
+
+    def forget(self, session: str):
+        """Drop sampler state for a finished session."""
+        with self._lock:
+            for key in [key for key in self._last if key[0] == session]:
+                self._last.pop(key, None)
+                self._suppressed.pop(key, None)
+
+
+sampler = SessionEventSampler(settings.LOG_SESSION_EVENTS_PER_SECOND)
+
+
+def _quote(value: Any) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' ="\n'):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+    return text
+
+
+def _parse_stage_levels(spec: str) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Parse "realtime.receive=DEBUG,realtime.predict=INFO" into logger levels.
+
+    Returns:
+        Tuple of (levels by logger name, entries that are not name=LEVEL and were skipped)
+    """
+    levels = {}
+    invalid = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if level.isdigit():
+            value = int(level)
+        else:
+            value = logging.getLevelName(level)
+        if not name or not isinstance(value, int):
+            invalid.append(item.strip())
+            continue
+        levels[name] = value
+    return levels, invalid
+
+
+def setup_logging():
+    """
+    Route all log records through a queue to a background writer thread.
+
+    Configures the root logger from settings.LOG_LEVEL and LOG_FORMAT, and per-stage
+    logger levels from settings.LOG_STAGE_LEVELS. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if settings.LOG_FORMAT == "kv":
+        stream_handler.setFormatter(KeyValueFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    levels, invalid = _parse_stage_levels(settings.LOG_STAGE_LEVELS)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+    if invalid:
+        # A typo in a log setting must not keep the service from starting
+        logging.getLogger(__name__).warning(f"Ignoring invalid LOG_STAGE_LEVELS entries: {', '.join(invalid)}")
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, session: str = None, **fields):
+    """
+    Emit a structured record, cheaply skipping it when disabled or sampled out.
+
+    The level check happens before anything is formatted, and records tagged with a
+    session are rate limited per session and event.
+
+    Args:
+        logger: Logger to emit on (usually a per-stage logger)
+        level: Logging level
+        event: Short event name, used as the message
+        session: Optional session id; enables per-session sampling
+        **fields: Structured key/value fields
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if session is not None:
+        emit, suppressed = sampler.allow(session, event)
+        if not emit:
+            return
+        fields["session"] = session
+        if suppressed:
+            fields["suppressed"] = suppressed
+    logger.log(level, event, extra={"fields": fields})
@@ -0,0 +1,119 @@
+import cProfile
+import contextlib
+import hmac
+import io
+import os
+import pstats
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from config import settings, resolve_path
+
+# Functions whose cumulative time is reported alongside the explicit stages
+_REPORTED_FUNCTIONS = ("preprocess_audio", "_extract_features")
+
+# Shared no-op context returned when a request is not being profiled
+_NOT_PROFILED = contextlib.nullcontext()
+
+
+class RequestProfile:
+    """
+    Deterministic (cProfile) profile of a single request's path through the pipeline.
+
+    The profiler is only enabled inside stage() blocks. Those blocks are synchronous,
+    so work from other requests interleaved on the event loop is never captured.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.profiler = cProfile.Profile()
+        self.stages: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float):
+        """Record a stage timed elsewhere (e.g. in an inference worker); it has no cProfile data."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def summary(self) -> Dict[str, float]:
+        """Wall time per stage plus cumulative time of key pipeline functions, in milliseconds."""
+        summary = {f"{name}_ms": seconds * 1000 for name, seconds in self.stages.items()}
+        stats = pstats.Stats(self.profiler)
+        for (_, _, function_name), (_, _, _, cumulative, _) in stats.stats.items():
+            if function_name in _REPORTED_FUNCTIONS:
+                key = f"{function_name.lstrip('_')}_ms"
+                summary[key] = summary.get(key, 0.0) + cumulative * 1000
+        return summary
+
+    def report(self, limit: int = None) -> str:
+        """Text report of the hottest functions by cumulative time."""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit or settings.PROFILE_REPORT_LINES)
+        return stream.getvalue()
+
+    def dump(self, directory: str = None) -> str:
+        """
+        Write the raw profile (.prof, loadable with pstats/snakeviz) and a text report.
+
+        Returns:
+            Path of the .prof file
+        """
+        directory = resolve_path(directory or settings.PROFILE_OUTPUT_DIR)
+        os.makedirs(directory, exist_ok=True)
+        safe_label = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.label)
+        base = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{safe_label}-{uuid.uuid4().hex[:8]}")
+        self.profiler.dump_stats(f"{base}.prof")
+        with open(f"{base}.txt", "w") as f:
+            f.write(self.report())
+        return f"{base}.prof"
+
+    def to_response(self, delivery: str) -> Dict[str, Any]:
+        """
+        Profile section for a response.
+
+        Args:
+            delivery: "inline" to embed the text report, "file" to write it to PROFILE_OUTPUT_DIR
+
+        Returns:
+            Dictionary with stage timings and either the report or the written path
+        """
+        response: Dict[str, Any] = {"stages": self.summary()}
+        if delivery == "file":
+            response["path"] = self.dump()
+        else:
+            response["report"] = self.report()
+        return response
+
+
+def profiling_authorized(token: Optional[str]) -> bool:
+    """
+    Check a caller-supplied profiling token against settings.PROFILING_TOKEN.
+
+    Profiling is disabled entirely while PROFILING_TOKEN is unset.
+    """
+    if not settings.PROFILING_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+
+def profile_stage(profile: Optional[RequestProfile], name: str):
+    """
+    Context manager timing a stage when the request is profiled, a shared no-op otherwise.
+
+    Args:
+        profile: The request's profile, or None when the request is not profiled
+        name: Stage name
+    """
+    if profile is None:
+        return _NOT_PROFILED
+    return profile.stage(name)
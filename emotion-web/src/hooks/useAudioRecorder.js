@@ -55,7 +55,10 @@ const useAudioRecorder = (webSocketService) => {
       visualize();
 
       // Set up MediaRecorder to capture audio in chunks
-      const mediaRecorder = new MediaRecorder(stream, { mimeType: 'audio/webm;codecs=pcm' });
+      // Opus chunks are a fraction of the size of PCM; the server decodes them as one stream per session
+      const mimeType = ['audio/webm;codecs=opus', 'audio/ogg;codecs=opus']
+        .find((type) => MediaRecorder.isTypeSupported(type)) || 'audio/webm;codecs=pcm';
+      const mediaRecorder = new MediaRecorder(stream, { mimeType });
       mediaRecorderRef.current = mediaRecorder;
       audioChunksRef.current = [];
 
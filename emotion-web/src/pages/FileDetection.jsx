@@ -3,7 +3,7 @@ import FileUploader from '../components/FileUploader';
 import ResultCard from '../components/ResultCard';
 import WaveformVisualizer from '../components/WaveformVisualizer';
 import useFileUpload from '../hooks/useFileUpload';
-import { predictFromFile } from '../services/api';
+import { getWaveform, predictFromFile } from '../services/api';
 
 const FileDetection = () => {
   const [predictionResult, setPredictionResult] = useState(null);
@@ -18,20 +18,33 @@ const FileDetection = () => {
     reset
   } = useFileUpload();
   
-  // Mock waveform data for visualization
+  // Waveform peaks for visualization
   const [waveformData, setWaveformData] = useState([]);
 
-  // Generate mock waveform data when a file is selected
+  // Load the waveform peaks the server cached while analyzing the file
+  const audioId = predictionResult?.audio_id;
   React.useEffect(() => {
-    if (selectedFile) {
-      // Generate mock waveform data
-      const mockData = Array.from({ length: 200 }, () => (Math.random() - 0.5));
-      setWaveformData(mockData);
-    }
-  }, [selectedFile]);
+    if (!audioId) return;
+    let cancelled = false;
+    getWaveform(audioId, 100)
+      .then((peaks) => {
+        if (cancelled) return;
+        // Interleave min/max pairs so each bucket draws as a vertical stroke
+        const samples = peaks.min.flatMap((min, i) => [min / peaks.scale, peaks.max[i] / peaks.scale]);
+        setWaveformData(samples);
+      })
+      .catch(() => {
+        if (!cancelled) setWaveformData([]);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [audioId]);
 
   const handleFileSelect = (file) => {
     selectFile(file);
+    setPredictionResult(null);
+    setWaveformData([]);
   };
 
   const handleAnalyze = async () => {
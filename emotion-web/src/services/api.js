@@ -7,7 +7,8 @@ export const predictFromFile = async (file) => {
   formData.append('file', file);
 
   try {
-    const response = await fetch(`${API_BASE_URL}/predict/file`, {
+    // The file page draws a waveform, so the server caches one from the same decode
+    const response = await fetch(`${API_BASE_URL}/predict/file?waveform=true`, {
       method: 'POST',
       body: formData,
     });
@@ -43,4 +44,21 @@ export const healthCheck = async () => {
     console.error('Error checking health:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+
+export const getWaveform = async (audioId, width = 200) => {
+  try {
+    // The preview was cached when the file was analyzed, so the upload is not sent again
+    const response = await fetch(`${API_BASE_URL}/waveform/${audioId}/peaks?width=${width}`);
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const result = await response.json();
+    return result;
+  } catch (error) {
+    console.error('Error loading waveform:', error);
+    throw error;
+  }
+};